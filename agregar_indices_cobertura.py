@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Agregar los índices del reporte de cobertura de mesas
+Crea COVERAGE_INDEXES de CoordinationService y actualiza las estadísticas
+del planificador (ANALYZE) para las tablas involucradas
+"""
+
+import argparse
+import sqlite3
+
+from services.coordination_service import COVERAGE_INDEXES
+
+TABLAS = ('asignaciones_testigos', 'mesas_votacion', 'puestos_votacion')
+
+
+def agregar_indices_cobertura(db_path: str = 'caqueta_electoral.db'):
+    """Crear índices de cobertura si no existen"""
+    conn = sqlite3.connect(db_path)
+    try:
+        existentes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+
+        for sql in COVERAGE_INDEXES:
+            nombre = sql.split(' IF NOT EXISTS ')[1].split()[0]
+            conn.execute(sql)
+            if nombre in existentes:
+                print(f"✅ El índice {nombre} ya existe")
+            else:
+                print(f"✅ Índice {nombre} creado")
+
+        for tabla in TABLAS:
+            conn.execute(f"ANALYZE {tabla}")
+        conn.commit()
+        print("✅ Estadísticas del planificador actualizadas")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Agregar índices del reporte de cobertura')
+    parser.add_argument('--db', default='caqueta_electoral.db')
+    agregar_indices_cobertura(parser.parse_args().db)
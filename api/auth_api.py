@@ -9,13 +9,16 @@ import sqlite3
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 
+from core.database import get_connection_pool
+from core.permissions import invalidate_user_permissions
+
 auth_api = Blueprint('auth_api', __name__)
 
+db_pool = get_connection_pool('caqueta_electoral.db')
+
 def get_db_connection():
-    """Obtener conexión a la base de datos"""
-    conn = sqlite3.connect('caqueta_electoral.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Obtener conexión del pool compartido"""
+    return db_pool.connect(row_factory=sqlite3.Row)
 
 @auth_api.route('/api/auth/register', methods=['POST'])
 def register():
@@ -95,149 +98,6 @@ def register():
         return jsonify({'error': str(e)}), 500
 
 
-@auth_api.route('/api/ubicacion/municipios', methods=['GET'])
-def get_municipios():
-    """Obtener lista de municipios con códigos DIVIPOLA"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT id, codigo, nombre, departamento, codigo_dd, codigo_mm
-            FROM municipios
-            WHERE activo = 1
-            ORDER BY nombre
-        """)
-        
-        municipios = []
-        for row in cursor.fetchall():
-            municipios.append({
-                'id': row['id'],
-                'codigo': row['codigo'],
-                'codigo_dd': row['codigo_dd'],
-                'codigo_mm': row['codigo_mm'],
-                'nombre': row['nombre'],
-                'departamento': row['departamento']
-            })
-        
-        conn.close()
-        
-        return jsonify({
-            'success': True,
-            'municipios': municipios
-        })
-        
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
-
-@auth_api.route('/api/ubicacion/zonas/<int:municipio_id>', methods=['GET'])
-def get_zonas(municipio_id):
-    """Obtener zonas de un municipio"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT id, codigo_zz, nombre, codigo_completo
-            FROM zonas
-            WHERE municipio_id = ? AND activo = 1
-            ORDER BY codigo_zz
-        """, (municipio_id,))
-        
-        zonas = []
-        for row in cursor.fetchall():
-            zonas.append({
-                'id': row['id'],
-                'codigo_zz': row['codigo_zz'],
-                'nombre': row['nombre'],
-                'codigo_completo': row['codigo_completo']
-            })
-        
-        conn.close()
-        
-        return jsonify({
-            'success': True,
-            'zonas': zonas
-        })
-        
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
-
-@auth_api.route('/api/ubicacion/puestos-municipio/<int:municipio_id>', methods=['GET'])
-def get_puestos_municipio(municipio_id):
-    """Obtener puestos de votación de un municipio con códigos DIVIPOLA"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT p.id, p.nombre, p.direccion, p.codigo, p.codigo_divipola, 
-                   p.codigo_pp, z.codigo_zz, z.nombre as zona_nombre
-            FROM puestos_votacion p
-            LEFT JOIN zonas z ON p.zona_id = z.id
-            WHERE p.municipio_id = ? AND p.activo = 1
-            ORDER BY p.codigo_divipola
-        """, (municipio_id,))
-        
-        puestos = []
-        for row in cursor.fetchall():
-            puestos.append({
-                'id': row['id'],
-                'nombre': row['nombre'],
-                'direccion': row['direccion'],
-                'codigo': row['codigo'],
-                'codigo_divipola': row['codigo_divipola'],
-                'codigo_pp': row['codigo_pp'],
-                'codigo_zz': row['codigo_zz'],
-                'zona_nombre': row['zona_nombre']
-            })
-        
-        conn.close()
-        
-        return jsonify({
-            'success': True,
-            'puestos': puestos
-        })
-        
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
-
-@auth_api.route('/api/ubicacion/mesas/<int:puesto_id>', methods=['GET'])
-def get_mesas(puesto_id):
-    """Obtener mesas de votación de un puesto"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT id, numero, votantes_habilitados
-            FROM mesas_votacion
-            WHERE puesto_id = ? AND activa = 1
-            ORDER BY numero
-        """, (puesto_id,))
-        
-        mesas = []
-        for row in cursor.fetchall():
-            mesas.append({
-                'id': row['id'],
-                'numero': row['numero'],
-                'votantes_habilitados': row['votantes_habilitados']
-            })
-        
-        conn.close()
-        
-        return jsonify({
-            'success': True,
-            'mesas': mesas
-        })
-        
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
-
 @auth_api.route('/api/admin/users', methods=['GET'])
 def get_all_users():
     """Obtener todos los usuarios (solo admin)"""
@@ -417,6 +277,7 @@ def update_user(user_id):
         cursor.execute(query, params)
         conn.commit()
         conn.close()
+        invalidate_user_permissions(user_id)
         
         return jsonify({
             'success': True,
@@ -439,6 +300,7 @@ def delete_user(user_id):
         
         conn.commit()
         conn.close()
+        invalidate_user_permissions(user_id)
         
         return jsonify({
             'success': True,
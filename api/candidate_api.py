@@ -11,6 +11,7 @@ import logging
 from datetime import datetime
 from typing import Dict, Any, List
 
+from core.pagination import TOTAL_EXACTO, InvalidCursorError, pagination_args
 # Importar el servicio
 from services.candidate_management_service import (
     CandidateManagementService, 
@@ -212,6 +213,25 @@ def get_candidates():
         coalition_id = request.args.get('coalition_id', type=int)
         active_only = request.args.get('active_only', 'true').lower() == 'true'
         
+        # Paginación por cursor solo si el cliente la pide (per_page/cursor)
+        if any(arg in request.args for arg in ('per_page', 'cursor')):
+            argumentos = pagination_args(request.args)
+            if 'include_total' not in request.args:
+                argumentos['include_total'] = TOTAL_EXACTO
+            result = candidate_service.paginate_candidates(
+                election_type_id=election_type_id,
+                party_id=party_id,
+                coalition_id=coalition_id,
+                active_only=active_only,
+                **argumentos
+            )
+            return jsonify({
+                'success': True,
+                'data': result['data'],
+                'total': result['pagination'].get('total'),
+                'pagination': result['pagination']
+            })
+        
         candidates = candidate_service.get_candidates(
             election_type_id=election_type_id,
             party_id=party_id,
@@ -225,6 +245,11 @@ def get_candidates():
             'total': len(candidates)
         })
         
+    except InvalidCursorError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         logger.error(f"Error obteniendo candidatos: {e}")
         return jsonify({
@@ -295,6 +320,7 @@ def search_candidates():
     """Búsqueda avanzada de candidatos"""
     try:
         search_params = {
+            'q': request.args.get('q'),
             'nombre': request.args.get('nombre'),
             'cedula': request.args.get('cedula'),
             'cargo': request.args.get('cargo'),
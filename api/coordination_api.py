@@ -8,6 +8,7 @@ from flask import Blueprint, request, jsonify, session
 from functools import wraps
 import logging
 from services.coordination_service import CoordinationService
+from services.witness_assignment_service import WitnessAssignmentService
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -18,6 +19,7 @@ coordination_bp = Blueprint('coordination', __name__, url_prefix='/api/coordinat
 
 # Inicializar servicios
 coordination_service = CoordinationService()
+witness_assignment_service = WitnessAssignmentService()
 
 def require_coordinator_auth(f):
     """Decorador para requerir autenticación de coordinador municipal"""
@@ -595,26 +597,31 @@ def bulk_assign_witnesses(coordinator_info):
             }), 400
         
         assignments = bulk_data['assignments']
-        results = []
-        errors = []
-        
-        for assignment_data in assignments:
-            try:
-                assignment_id = coordination_service.assign_witness_to_table(
-                    assignment_data, coordinator_id
-                )
-                results.append({
-                    'assignment_id': assignment_id,
-                    'testigo_id': assignment_data['testigo_id'],
-                    'mesa_id': assignment_data['mesa_id'],
-                    'success': True
-                })
-            except Exception as e:
-                errors.append({
-                    'testigo_id': assignment_data.get('testigo_id'),
-                    'mesa_id': assignment_data.get('mesa_id'),
-                    'error': str(e)
-                })
+        if not isinstance(assignments, list):
+            return jsonify({
+                'success': False,
+                'error': 'assignments debe ser una lista'
+            }), 400
+        
+        # all_or_nothing: cualquier error cancela todas las asignaciones del lote
+        all_or_nothing = bool(bulk_data.get('all_or_nothing'))
+        bulk_result = coordination_service.bulk_assign_witnesses(
+            assignments, coordinator_id, all_or_nothing=all_or_nothing
+        )
+        results = bulk_result['results']
+        errors = bulk_result['errors']
+        
+        if all_or_nothing and errors:
+            return jsonify({
+                'success': False,
+                'data': {
+                    'successful_assignments': 0,
+                    'failed_assignments': len(errors),
+                    'results': [],
+                    'errors': errors
+                },
+                'error': f'Asignación masiva cancelada: {len(errors)} errores'
+            }), 400
         
         return jsonify({
             'success': True,
@@ -634,6 +641,48 @@ def bulk_assign_witnesses(coordinator_info):
             'error': str(e)
         }), 500
 
+@coordination_bp.route('/auto-assign', methods=['POST'])
+@require_coordinator_auth
+def auto_assign_witnesses(coordinator_info):
+    """Plan automático de asignación de testigos (opcionalmente aplicado con la asignación masiva)"""
+    try:
+        coordinator_id = coordinator_info['id']
+        data = request.get_json(silent=True) or {}
+        
+        proceso_ids = data.get('proceso_ids')
+        if proceso_ids is not None and (not isinstance(proceso_ids, list)
+                                        or not all(isinstance(p, int) for p in proceso_ids)):
+            return jsonify({
+                'success': False,
+                'error': 'proceso_ids debe ser una lista de IDs'
+            }), 400
+        
+        plan = witness_assignment_service.plan_assignments(
+            coordinator_id=coordinator_id, proceso_ids=proceso_ids
+        )
+        response = {
+            'success': True,
+            'data': plan,
+            'message': f"{plan['resumen']['asignaciones']} asignaciones propuestas"
+        }
+        
+        if data.get('apply'):
+            applied = witness_assignment_service.apply_plan(
+                plan['asignaciones'], all_or_nothing=bool(data.get('all_or_nothing'))
+            )
+            response['data']['aplicacion'] = applied
+            response['message'] = (f"{len(applied['results'])} asignaciones creadas, "
+                                   f"{len(applied['errors'])} errores")
+        
+        return jsonify(response)
+        
+    except Exception as e:
+        logger.error(f"Error en asignación automática: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 # ==================== MANEJO DE ERRORES ====================
 
 @coordination_bp.errorhandler(404)
@@ -11,6 +11,10 @@ from datetime import datetime, timedelta
 import os
 import psutil
 
+from core.database import get_connection_pool
+from core.pagination import TOTAL_EXACTO, InvalidCursorError, ensure_indexes, keyset_paginate, pagination_args
+from services.search_index_service import get_search_index
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -18,11 +22,16 @@ logger = logging.getLogger(__name__)
 # Crear blueprint
 system_bp = Blueprint('system', __name__, url_prefix='/api/system')
 
+db_pool = get_connection_pool('caqueta_electoral.db')
+search_index = get_search_index('caqueta_electoral.db')
+
+# Listado de usuarios por cursor: nombre con el id como desempate
+USERS_ORDER = [('nombre_completo', 'nombre_completo', False), ('id', 'id', False)]
+USERS_INDEXES = ["CREATE INDEX IF NOT EXISTS idx_users_nombre_id ON users(nombre_completo, id)"]
+
 def get_db_connection():
-    """Obtener conexión a la base de datos"""
-    conn = sqlite3.connect('caqueta_electoral.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Obtener conexión del pool compartido"""
+    return db_pool.connect(row_factory=sqlite3.Row)
 
 # ==================== SALUD DEL SISTEMA ====================
 
@@ -124,39 +133,62 @@ def get_users():
     """Obtener lista de usuarios del sistema"""
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
         
         # Filtros opcionales
         role_filter = request.args.get('role')
         active_filter = request.args.get('active')
         
-        query = "SELECT * FROM users WHERE 1=1"
-        params = []
+        conditions = []
+        params = {}
         
         if role_filter:
-            query += " AND rol = ?"
-            params.append(role_filter)
+            conditions.append("rol = :rol")
+            params['rol'] = role_filter
         
         if active_filter is not None:
-            query += " AND activo = ?"
-            params.append(int(active_filter))
-        
-        query += " ORDER BY nombre_completo"
-        
-        cursor.execute(query, params)
-        users = [dict(row) for row in cursor.fetchall()]
+            conditions.append("activo = :activo")
+            params['activo'] = int(active_filter)
+        
+        # Paginación por cursor solo si el cliente la pide (per_page/cursor); 'page' solo no basta
+        paginar = any(arg in request.args for arg in ('per_page', 'cursor'))
+        pagination = None
+        if paginar:
+            ensure_indexes(lambda sql: (conn.execute(sql), conn.commit()), 'users_nombre', USERS_INDEXES)
+            argumentos = pagination_args(request.args)
+            if 'include_total' not in request.args:
+                # 'total' siempre poblado en este endpoint, también en páginas con cursor
+                argumentos['include_total'] = TOTAL_EXACTO
+            result = keyset_paginate(lambda sql, values: conn.execute(sql, values).fetchall(),
+                                     "SELECT * FROM users", USERS_ORDER, conditions=conditions,
+                                     params=params, **argumentos)
+            rows, pagination = result['data'], result['pagination']
+        else:
+            query = "SELECT * FROM users"
+            if conditions:
+                query += " WHERE " + " AND ".join(conditions)
+            rows = conn.execute(query + " ORDER BY nombre_completo", params).fetchall()
+        users = [dict(row) for row in rows]
         conn.close()
         
         # Limpiar datos sensibles
         for user in users:
             user.pop('password_hash', None)
         
-        return jsonify({
+        response = {
             'success': True,
             'data': users,
             'total': len(users)
-        })
+        }
+        if pagination is not None:
+            response['total'] = pagination.get('total')
+            response['pagination'] = pagination
+        return jsonify(response)
         
+    except InvalidCursorError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         logger.error(f"Error obteniendo usuarios: {e}")
         return jsonify({
@@ -238,6 +270,36 @@ def create_user():
             'error': str(e)
         }), 500
 
+# ==================== BÚSQUEDA ====================
+
+@system_bp.route('/search', methods=['GET'])
+def search():
+    """Búsqueda de texto completo en candidatos, testigos, usuarios y puestos"""
+    try:
+        texto = request.args.get('q', '').strip()
+        if not texto:
+            return jsonify({
+                'success': False,
+                'error': 'Parámetro q requerido'
+            }), 400
+        
+        tipos = request.args.get('tipos')
+        entidades = [tipo.strip() for tipo in tipos.split(',') if tipo.strip()] if tipos else None
+        resultados = search_index.search(texto, entidades, request.args.get('limit', type=int))
+        
+        return jsonify({
+            'success': True,
+            'data': resultados,
+            'total': sum(len(filas) for filas in resultados.values())
+        })
+        
+    except Exception as e:
+        logger.error(f"Error en búsqueda: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 # ==================== REPORTES DEL SISTEMA ====================
 
 @system_bp.route('/reports/generate', methods=['POST'])
@@ -4,85 +4,66 @@ API de Testigo Electoral
 Maneja capturas E14, OCR automático y registro de datos
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response
+import json
 import sqlite3
 from datetime import datetime
 import base64
 import os
 
+from core.database import get_connection_pool
+from services.e14_ingestion_service import (
+    get_e14_ingestion_queue, E14ValidationError, TIPO_ENVIO_TESTIGO, ESTADO_CONFIRMADO, ESTADO_RECHAZADO
+)
+from services.ocr_worker_pool import get_ocr_worker_pool, OCRQueueFullError, ESTADOS_FINALES
+
 testigo_api = Blueprint('testigo_api', __name__)
 
+db_pool = get_connection_pool('caqueta_electoral.db')
+
 def get_db_connection():
-    """Obtener conexión a la base de datos"""
-    conn = sqlite3.connect('caqueta_electoral.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Obtener conexión del pool compartido"""
+    return db_pool.connect(row_factory=sqlite3.Row)
 
 @testigo_api.route('/api/testigo/enviar-e14', methods=['POST'])
 def enviar_e14():
     """Enviar formulario E14 con foto y datos digitados"""
     try:
-        data = request.get_json()
-        
-        # Validar datos requeridos
-        if not data.get('candidatos') or len(data['candidatos']) == 0:
-            return jsonify({'error': 'Debe incluir al menos un candidato'}), 400
-        
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        data = request.get_json() or {}
         
         # Obtener información del testigo (simulado por ahora)
-        testigo_id = 1  # En producción, obtener del token JWT
-        mesa_id = 1  # En producción, obtener de la asignación del testigo
-        
-        # Calcular totales
-        total_votos_candidatos = sum(c['votos'] for c in data['candidatos'])
-        votos_blanco = data.get('votosBlanco', 0)
-        votos_nulos = data.get('votosNulos', 0)
-        tarjetas_no_marcadas = data.get('tarjetasNoMarcadas', 0)
-        
-        total_votos = total_votos_candidatos + votos_blanco + votos_nulos
-        
-        # Insertar captura E14
-        cursor.execute("""
-            INSERT INTO capturas_e14 (
-                testigo_id, mesa_id, imagen_path, 
-                total_votos_candidatos, votos_blanco, votos_nulos, tarjetas_no_marcadas,
-                total_votos, observaciones, estado, procesado_ocr
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            testigo_id, mesa_id, 'uploads/e14/temp.jpg',
-            total_votos_candidatos, votos_blanco, votos_nulos, tarjetas_no_marcadas,
-            total_votos, data.get('observaciones', ''), 'enviado', 1
-        ))
-        
-        captura_id = cursor.lastrowid
-        
-        # Insertar votos por candidato
-        for candidato in data['candidatos']:
-            cursor.execute("""
-                INSERT INTO datos_ocr_e14 (
-                    captura_e14_id, posicion, tipo, nombre_candidato, partido,
-                    votos_detectados, votos_confirmados, confianza, editado
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                captura_id, 0, 'candidato', 
-                candidato['nombre'], candidato['partido'],
-                candidato['votos'], candidato['votos'], 0.95, 1
-            ))
-        
-        conn.commit()
-        conn.close()
+        payload = dict(data)
+        payload['testigo_id'] = 1  # En producción, obtener del token JWT
+        # Mesa seleccionada en el formulario (select mesaForm con el id de la mesa)
+        payload['mesa_id'] = data.get('mesa_id') or data.get('mesa')
+
+        # Mesa, testigo y candidatos se validan aquí; la captura y sus votos se escriben en lote desde la cola
+        cola = get_e14_ingestion_queue()
+        acuse = cola.submit(TIPO_ENVIO_TESTIGO, payload)
+        
+        # Confirmada dentro de la espera: misma respuesta que la escritura directa
+        estado = cola.wait_for(acuse['ack_id']) or acuse
+        if estado['estado'] == ESTADO_CONFIRMADO:
+            return jsonify({
+                'success': True,
+                'message': 'Formulario E14 enviado exitosamente',
+                'captura_id': estado['registro_id'],
+                'ack_id': acuse['ack_id'],
+                'total_votos': acuse['total_votos']
+            }), 201
+        if estado['estado'] == ESTADO_RECHAZADO:
+            return jsonify({'error': estado['error'], 'codigo_error': estado['codigo_error']}), 400
         
         return jsonify({
             'success': True,
-            'message': 'Formulario E14 enviado exitosamente',
-            'captura_id': captura_id,
-            'total_votos': total_votos
-        }), 201
-        
+            'message': 'Formulario E14 recibido exitosamente',
+            'ack_id': acuse['ack_id'],
+            'estado': acuse['estado'],
+            'total_votos': acuse['total_votos']
+        }), 202
+        
+    except E14ValidationError as e:
+        return jsonify({'error': str(e), 'codigo_error': e.codigo_error}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -280,15 +261,20 @@ def procesar_ocr():
         
         file.save(filepath)
         
-        # Procesar con OCR
-        from services.ocr_e14_service import ocr_service
-        
-        resultado = ocr_service.procesar_imagen_e14(filepath, tipo_eleccion)
+        # Encolar en el pool de procesos OCR; el cliente consulta el job_id
+        try:
+            job = get_ocr_worker_pool().submit(os.path.abspath(filepath), tipo_eleccion)
+        except OCRQueueFullError as e:
+            response = jsonify({'success': False, 'error': str(e)})
+            response.headers['Retry-After'] = '5'
+            return response, 503
         
-        if resultado['success']:
-            return jsonify(resultado), 200
-        else:
-            return jsonify(resultado), 500
+        return jsonify({
+            'success': True,
+            'job_id': job['job_id'],
+            'estado': job['estado'],
+            'consultar_en': f"/api/testigo/ocr/{job['job_id']}"
+        }), 202
             
     except Exception as e:
         return jsonify({
@@ -300,6 +286,35 @@ def procesar_ocr():
         }), 500
 
 
+@testigo_api.route('/api/testigo/ocr/<job_id>', methods=['GET'])
+def estado_ocr(job_id):
+    """Consultar el estado y resultado de un trabajo OCR"""
+    job = get_ocr_worker_pool().get_job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Trabajo OCR no encontrado'}), 404
+    return jsonify({'success': True, 'job': job}), 200
+
+
+@testigo_api.route('/api/testigo/ocr/<job_id>/stream', methods=['GET'])
+def stream_ocr(job_id):
+    """Notificar por Server-Sent Events cuando el trabajo OCR termine"""
+    pool = get_ocr_worker_pool()
+    if pool.get_job(job_id) is None:
+        return jsonify({'success': False, 'error': 'Trabajo OCR no encontrado'}), 404
+
+    def eventos():
+        while True:
+            job = pool.wait(job_id, timeout=15)
+            if job is None:
+                return
+            yield f"event: {job['estado']}\ndata: {json.dumps(job)}\n\n"
+            if job['estado'] in ESTADOS_FINALES:
+                return
+
+    return Response(eventos(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
 def register_testigo_api(app):
     """Registrar el blueprint de testigo"""
     app.register_blueprint(testigo_api)
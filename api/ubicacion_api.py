@@ -3,47 +3,69 @@
 API para carga dinámica de ubicación (Departamento → Municipio → Zona → Puesto → Mesa)
 """
 
-from flask import Blueprint, jsonify
+from flask import Blueprint, current_app, jsonify, make_response, request
+from functools import wraps
+import logging
 import sqlite3
 
+from core.database import get_connection_pool
+from services.location_tree_service import get_location_tree_service
+
 ubicacion_api = Blueprint('ubicacion_api', __name__)
+logger = logging.getLogger(__name__)
+
+db_pool = get_connection_pool('caqueta_electoral.db')
+
+
+@ubicacion_api.record_once
+def cargar_arbol_al_iniciar(state):
+    """Cargar el árbol DIVIPOLA al registrar el blueprint"""
+    try:
+        get_location_tree_service().get_tree()
+    except Exception as e:
+        logger.warning(f"No se pudo precargar el árbol DIVIPOLA: {e}")
 
 def get_db_connection():
-    """Obtener conexión a la base de datos"""
-    conn = sqlite3.connect('caqueta_electoral.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Obtener conexión del pool compartido"""
+    return db_pool.connect(row_factory=sqlite3.Row)
+
+def require_super_admin(f):
+    """Decorador para requerir JWT de super administrador (APIManager.require_role)"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        api_manager = getattr(current_app, 'api_manager', None)
+        if api_manager is None:
+            # Sin módulos core no hay forma de verificar el rol
+            return jsonify({'success': False, 'error': 'Autenticación no disponible'}), 403
+        return api_manager.require_role('super_admin')(f)(*args, **kwargs)
+    return decorated_function
+
+def responder_desde_arbol(construir):
+    """
+    Responder con datos del árbol DIVIPOLA en memoria
+
+    El ETag es la firma del árbol completo; si el cliente ya tiene esa
+    versión se responde 304 sin construir ni serializar el cuerpo.
+    """
+    tree = get_location_tree_service().get_tree()
+    if request.if_none_match.contains(tree.etag):
+        response = make_response('', 304)
+    else:
+        payload = construir(tree)
+        if payload is None:
+            return jsonify({'success': False, 'error': 'No encontrado'}), 404
+        response = jsonify(dict(success=True, **payload))
+    response.set_etag(tree.etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 
 @ubicacion_api.route('/api/ubicacion/municipios', methods=['GET'])
 def get_municipios():
-    """Obtener todos los municipios del Caquetá"""
+    """Obtener municipios activos (opcional ?departamento=<codigo_dd>)"""
     try:
-        conn = sqlite3.connect('caqueta_electoral.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id, codigo, nombre, poblacion
-            FROM municipios
-            WHERE activo = 1
-            ORDER BY nombre
-        ''')
-        
-        municipios = []
-        for row in cursor.fetchall():
-            municipios.append({
-                'id': row[0],
-                'codigo': row[1],
-                'nombre': row[2],
-                'poblacion': row[3]
-            })
-        
-        conn.close()
-        
-        return jsonify({
-            'success': True,
-            'municipios': municipios
-        })
-        
+        departamento = request.args.get('departamento')
+        return responder_desde_arbol(lambda tree: {'municipios': tree.get_municipios(departamento)})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -52,33 +74,7 @@ def get_municipios():
 def get_zonas(municipio_id):
     """Obtener zonas de un municipio"""
     try:
-        conn = sqlite3.connect('caqueta_electoral.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id, codigo_zz, nombre, descripcion, tipo_zona
-            FROM zonas
-            WHERE municipio_id = ? AND activo = 1
-            ORDER BY codigo_zz
-        ''', (municipio_id,))
-        
-        zonas = []
-        for row in cursor.fetchall():
-            zonas.append({
-                'id': row[0],
-                'codigo': row[1] or '',
-                'nombre': row[2] or '',
-                'descripcion': row[3] or '',
-                'tipo': row[4] or ''
-            })
-        
-        conn.close()
-        
-        return jsonify({
-            'success': True,
-            'zonas': zonas
-        })
-        
+        return responder_desde_arbol(lambda tree: {'zonas': tree.get_zonas(municipio_id)})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -87,39 +83,17 @@ def get_zonas(municipio_id):
 def get_puestos(zona_id):
     """Obtener puestos de votación de una zona"""
     try:
-        conn = sqlite3.connect('caqueta_electoral.db')
-        cursor = conn.cursor()
-        
-        print(f"DEBUG: Buscando puestos para zona_id={zona_id}")
-        
-        cursor.execute('''
-            SELECT id, nombre, direccion
-            FROM puestos_votacion
-            WHERE zona_id = ? AND activo = 1
-            ORDER BY nombre
-        ''', (zona_id,))
-        
-        rows = cursor.fetchall()
-        print(f"DEBUG: Encontradas {len(rows)} filas")
-        
-        puestos = []
-        for row in rows:
-            print(f"DEBUG: Puesto ID={row[0]}, Nombre={row[1]}")
-            puestos.append({
-                'id': row[0],
-                'nombre': row[1],
-                'direccion': row[2] or ''
-            })
-        
-        conn.close()
-        
-        return jsonify({
-            'success': True,
-            'puestos': puestos
-        })
-        
+        return responder_desde_arbol(lambda tree: {'puestos': tree.get_puestos_zona(zona_id)})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@ubicacion_api.route('/api/ubicacion/puestos-municipio/<int:municipio_id>', methods=['GET'])
+def get_puestos_municipio(municipio_id):
+    """Obtener puestos de votación de un municipio con códigos DIVIPOLA"""
+    try:
+        return responder_desde_arbol(lambda tree: {'puestos': tree.get_puestos_municipio(municipio_id)})
     except Exception as e:
-        print(f"DEBUG: Error={e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
@@ -127,31 +101,35 @@ def get_puestos(zona_id):
 def get_mesas(puesto_id):
     """Obtener mesas de votación de un puesto"""
     try:
-        conn = sqlite3.connect('caqueta_electoral.db')
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id, numero, votantes_habilitados
-            FROM mesas_votacion
-            WHERE puesto_id = ? AND activa = 1
-            ORDER BY numero
-        ''', (puesto_id,))
-        
-        mesas = []
-        for row in cursor.fetchall():
-            mesas.append({
-                'id': row[0],
-                'numero': row[1],
-                'votantes_habilitados': row[2]
-            })
-        
-        conn.close()
-        
+        return responder_desde_arbol(lambda tree: {'mesas': tree.get_mesas(puesto_id)})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@ubicacion_api.route('/api/ubicacion/municipio/<int:municipio_id>/arbol', methods=['GET'])
+def get_arbol_municipio(municipio_id):
+    """Municipio completo (zonas → puestos → mesas) en una sola respuesta"""
+    try:
+        def construir(tree):
+            municipio = tree.get_municipio_subtree(municipio_id)
+            return {'municipio': municipio} if municipio else None
+        return responder_desde_arbol(construir)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@ubicacion_api.route('/api/ubicacion/recargar', methods=['POST'])
+@require_super_admin
+def recargar_arbol():
+    """Reconstruir el árbol DIVIPOLA tras una edición administrativa"""
+    try:
+        tree = get_location_tree_service().reload()
         return jsonify({
             'success': True,
-            'mesas': mesas
+            'version': tree.version,
+            'etag': tree.etag,
+            'municipios': len(tree.municipios)
         })
-        
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -163,8 +141,6 @@ def get_usuario_por_ubicacion():
     Query params: municipio_id, puesto_id, mesa_id
     """
     try:
-        from flask import request
-        
         municipio_id = request.args.get('municipio_id', type=int)
         puesto_id = request.args.get('puesto_id', type=int)
         mesa_id = request.args.get('mesa_id', type=int)
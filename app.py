@@ -6,8 +6,17 @@ Arquitectura modular inspirada en Frappe Framework
 
 from flask import Flask, request, jsonify, session, render_template, redirect, url_for
 import os
+import sqlite3
 from datetime import datetime, timedelta
 
+from core.audit import get_audit_stats
+from core.database import get_connection_pool
+from services.e14_ingestion_service import (
+    get_e14_ingestion_queue, E14ValidationError, TIPO_CAPTURA_E14,
+    ESTADO_CONFIRMADO, ESTADO_RECHAZADO
+)
+from services.login_service import LoginService, LoginBusyError
+
 # Importaciones opcionales
 try:
     from flask_cors import CORS
@@ -27,6 +36,10 @@ try:
 except ImportError:
     WERKZEUG_AVAILABLE = False
 
+def verificar_password_demo(password_hash, password):
+    """Verificación simple para demo (sin werkzeug)"""
+    return password in ('demo123', 'Demo2024!')
+
 def create_app():
     """Factory para crear la aplicación Flask"""
     
@@ -45,6 +58,17 @@ def create_app():
     if JWT_AVAILABLE:
         jwt = JWTManager(app)
     
+    # Pool de conexiones SQLite compartido por todo el proceso
+    db_pool = get_connection_pool('caqueta_electoral.db')
+    app.db_pool = db_pool
+    
+    # Login: perfil desnormalizado y verificación de passwords fuera de los hilos web
+    login_service = LoginService(
+        'caqueta_electoral.db', db_pool,
+        verificar_password=check_password_hash if WERKZEUG_AVAILABLE else verificar_password_demo
+    )
+    app.login_service = login_service
+    
     def get_role_display_name(role):
         """Obtener nombre de display para el rol"""
         role_names = {
@@ -186,12 +210,18 @@ def create_app():
     try:
         from core.database import DatabaseManager
         from core.auth import AuthManager
-        from core.permissions import PermissionManager
+        from core.permissions import PermissionManager, ensure_permissions_version_schema
         from core.api import APIManager
         
         db_manager = DatabaseManager(app.config['DATABASE_URL'])
         auth_manager = AuthManager(db_manager)
         permission_manager = PermissionManager(db_manager)
+        if db_manager.connection_pool is not None:
+            # Versiones de rol compartidas entre procesos (invalidación de la caché de permisos)
+            try:
+                ensure_permissions_version_schema(db_manager.connection_pool)
+            except sqlite3.Error as e:
+                print(f"⚠️  No se pudo crear permisos_version: {e}")
         api_manager = APIManager(db_manager, auth_manager, permission_manager)
         
         # Almacenar managers en app context
@@ -548,8 +578,7 @@ def create_app():
     def get_user_location(user_id):
         """Obtener información de ubicación del usuario"""
         try:
-            import sqlite3
-            conn = sqlite3.connect('caqueta_electoral.db')
+            conn = db_pool.connect()
             cursor = conn.cursor()
             
             query = """
@@ -594,8 +623,7 @@ def create_app():
     def get_mesas_puesto(puesto_id):
         """Obtener todas las mesas de un puesto para testigos"""
         try:
-            import sqlite3
-            conn = sqlite3.connect('caqueta_electoral.db')
+            conn = db_pool.connect()
             cursor = conn.cursor()
             
             query = """
@@ -630,8 +658,7 @@ def create_app():
     def validar_e14_mesa(mesa_id):
         """Validar si una mesa ya tiene E14 capturado"""
         try:
-            import sqlite3
-            conn = sqlite3.connect('caqueta_electoral.db')
+            conn = db_pool.connect()
             cursor = conn.cursor()
             
             query = """
@@ -670,57 +697,56 @@ def create_app():
     
     @app.route('/api/e14/capturar', methods=['POST'])
     def capturar_e14():
-        """Capturar E14 con validaciones"""
+        """Capturar E14 con validaciones (escritura por lotes en la cola de ingesta)"""
         try:
             data = request.get_json()
-            mesa_id = data.get('mesa_id')
-            testigo_id = data.get('testigo_id')
             
-            # Validar que la mesa no tenga E14 ya capturado
-            import sqlite3
-            conn = sqlite3.connect('caqueta_electoral.db')
-            cursor = conn.cursor()
-            
-            # Verificar E14 existente
-            cursor.execute("SELECT id FROM e14_capturas WHERE mesa_id = ?", (mesa_id,))
-            existing = cursor.fetchone()
+            # Valida, rechaza duplicados por mesa y registra en el journal antes de responder
+            cola = get_e14_ingestion_queue()
+            acuse = cola.submit(TIPO_CAPTURA_E14, data)
             
-            if existing:
-                conn.close()
+            # El lote suele escribirse en milisegundos: se responde con el e14_id como siempre
+            estado = cola.wait_for(acuse['ack_id']) or acuse
+            if estado['estado'] == ESTADO_CONFIRMADO:
+                return jsonify({
+                    'success': True,
+                    'message': 'E14 capturado exitosamente',
+                    'e14_id': estado['registro_id'],
+                    'ack_id': acuse['ack_id']
+                })
+            if estado['estado'] == ESTADO_RECHAZADO:
                 return jsonify({
                     'success': False,
-                    'error': 'Esta mesa ya tiene un E14 capturado. No se permite duplicados.',
-                    'codigo_error': 'E14_DUPLICADO'
+                    'error': estado['error'],
+                    'codigo_error': estado['codigo_error']
                 }), 400
             
-            # Insertar nuevo E14
-            query = """
-                INSERT INTO e14_capturas 
-                (mesa_id, testigo_id, imagen_e14, votos_validos, votos_blanco, votos_nulos, 
-                 observaciones, confirmado, fecha_captura)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-            """
-            
-            cursor.execute(query, (
-                mesa_id,
-                testigo_id,
-                data.get('imagen_e14'),
-                data.get('votos_validos'),
-                data.get('votos_blanco'),
-                data.get('votos_nulos'),
-                data.get('observaciones'),
-                1 if data.get('confirmado') else 0
-            ))
-            
-            e14_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
-            
+            # Escritura aún pendiente: el cliente consulta /api/e14/ingesta/<ack_id>
             return jsonify({
                 'success': True,
-                'message': 'E14 capturado exitosamente',
-                'e14_id': e14_id
-            })
+                'message': 'E14 recibido, pendiente de registro',
+                'ack_id': acuse['ack_id'],
+                'estado': acuse['estado']
+            }), 202
+            
+        except E14ValidationError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e),
+                'codigo_error': e.codigo_error
+            }), 400
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)}), 500
+    
+    @app.route('/api/e14/ingesta/<ack_id>')
+    def estado_ingesta_e14(ack_id):
+        """Consultar el estado de un E14 enviado a la cola de ingesta"""
+        try:
+            estado = get_e14_ingestion_queue().get_status(ack_id)
+            if not estado:
+                return jsonify({'success': False, 'error': 'Acuse no encontrado'}), 404
+            
+            return jsonify({'success': True, 'ingesta': estado})
             
         except Exception as e:
             return jsonify({'success': False, 'error': str(e)}), 500
@@ -803,66 +829,24 @@ def create_app():
             if not cedula or not password:
                 return jsonify({'error': 'Cédula and password required'}), 400
             
-            # Buscar usuario por cédula o username
-            import sqlite3
-            conn = sqlite3.connect('caqueta_electoral.db')
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT 
-                    u.id, u.username, u.nombre_completo, u.password_hash, u.rol, u.activo,
-                    u.cedula, u.email, u.telefono,
-                    u.municipio_id, u.puesto_id, u.mesa_id,
-                    mu.nombre as municipio_nombre, mu.codigo as municipio_codigo,
-                    p.nombre as puesto_nombre, p.direccion as puesto_direccion,
-                    m.numero as mesa_numero, m.votantes_habilitados,
-                    z.codigo_zz as zona_codigo, z.nombre as zona_nombre
-                FROM users u
-                LEFT JOIN municipios mu ON u.municipio_id = mu.id
-                LEFT JOIN puestos_votacion p ON u.puesto_id = p.id
-                LEFT JOIN mesas_votacion m ON u.mesa_id = m.id
-                LEFT JOIN zonas z ON p.zona_id = z.id
-                WHERE (u.cedula = ? OR u.username = ?) AND u.activo = 1
-            """, (cedula, cedula))
-            
-            user_data = cursor.fetchone()
+            # Perfil desnormalizado + verificación del password en el pool acotado
+            try:
+                user = login_service.authenticate(cedula, password)
+            except LoginBusyError as e:
+                response = jsonify({'error': str(e)})
+                response.headers['Retry-After'] = '2'
+                return response, 503
             
-            if not user_data:
-                conn.close()
+            if not user:
                 return jsonify({'error': 'Invalid credentials'}), 401
             
-            # Verificar password (simplificado para demo)
-            if WERKZEUG_AVAILABLE:
-                if not check_password_hash(user_data[3], password):
-                    conn.close()
-                    return jsonify({'error': 'Invalid credentials'}), 401
-            else:
-                # Verificación simple para demo
-                if password != 'demo123' and password != 'Demo2024!':
-                    conn.close()
-                    return jsonify({'error': 'Invalid credentials'}), 401
-            
-            # Contar capturas E14 si es testigo
-            total_capturas = 0
-            if user_data[4] == 'testigo_mesa':
-                cursor.execute("""
-                    SELECT COUNT(*) as total_capturas
-                    FROM capturas_e14
-                    WHERE testigo_id = ?
-                """, (user_data[0],))
-                stats = cursor.fetchone()
-                if stats:
-                    total_capturas = stats[0]
-            
-            conn.close()
-            
             # Crear token JWT si está disponible
             if JWT_AVAILABLE:
                 access_token = create_access_token(
-                    identity=user_data[0],
+                    identity=user['id'],
                     additional_claims={
-                        'username': user_data[1],
-                        'role': user_data[4]
+                        'username': user['username'],
+                        'role': user['rol']
                     }
                 )
             else:
@@ -870,27 +854,7 @@ def create_app():
             
             return jsonify({
                 'access_token': access_token,
-                'user': {
-                    'id': user_data[0],
-                    'username': user_data[1],
-                    'nombre_completo': user_data[2],
-                    'rol': user_data[4],
-                    'cedula': user_data[6],
-                    'email': user_data[7],
-                    'telefono': user_data[8],
-                    'municipio_id': user_data[9],
-                    'puesto_id': user_data[10],
-                    'mesa_id': user_data[11],
-                    'municipio_nombre': user_data[12],
-                    'municipio_codigo': user_data[13],
-                    'puesto_nombre': user_data[14],
-                    'puesto_direccion': user_data[15],
-                    'mesa_numero': user_data[16],
-                    'votantes_habilitados': user_data[17],
-                    'zona_codigo': user_data[18],
-                    'zona_nombre': user_data[19],
-                    'total_capturas': total_capturas
-                }
+                'user': user
             })
             
         except Exception as e:
@@ -968,6 +932,7 @@ def create_app():
                 'timestamp': datetime.utcnow().isoformat(),
                 'version': '1.0.0',
                 'database': db_status,
+                'audit': get_audit_stats(),
                 'uptime': 'ok'
             }), 200
         except Exception as e:
@@ -1001,8 +966,7 @@ def create_app():
     def get_candidatos():
         """Obtener todos los candidatos"""
         try:
-            import sqlite3
-            conn = sqlite3.connect('caqueta_electoral.db')
+            conn = db_pool.connect()
             cursor = conn.cursor()
             
             query = """
@@ -1036,8 +1000,7 @@ def create_app():
         """Crear nuevo candidato"""
         try:
             data = request.get_json()
-            import sqlite3
-            conn = sqlite3.connect('caqueta_electoral.db')
+            conn = db_pool.connect()
             cursor = conn.cursor()
             
             query = """
@@ -1082,8 +1045,7 @@ def create_app():
     def get_partidos():
         """Obtener todos los partidos"""
         try:
-            import sqlite3
-            conn = sqlite3.connect('caqueta_electoral.db')
+            conn = db_pool.connect()
             cursor = conn.cursor()
             
             cursor.execute("SELECT * FROM partidos_politicos WHERE activo = 1 ORDER BY nombre")
@@ -1105,8 +1067,7 @@ def create_app():
     def get_cargos():
         """Obtener todos los cargos electorales"""
         try:
-            import sqlite3
-            conn = sqlite3.connect('caqueta_electoral.db')
+            conn = db_pool.connect()
             cursor = conn.cursor()
             
             cursor.execute("SELECT * FROM cargos_electorales WHERE activo = 1 ORDER BY nivel, nombre")
@@ -1128,8 +1089,7 @@ def create_app():
     def get_municipios():
         """Obtener todos los municipios"""
         try:
-            import sqlite3
-            conn = sqlite3.connect('caqueta_electoral.db')
+            conn = db_pool.connect()
             cursor = conn.cursor()
             
             cursor.execute("SELECT * FROM municipios WHERE activo = 1 ORDER BY nombre")
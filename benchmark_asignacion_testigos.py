@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Benchmark de asignación automática de testigos
+Genera en una copia de la base de datos un municipio con P puestos (con
+coordenadas), M mesas y N testigos de 10 partidos (una parte con un puesto de
+referencia por asignaciones anteriores) y compara:
+
+    uno_a_uno:  por cada mesa, get_available_witnesses_for_assignment y
+                assign_witness_to_table con el primer testigo (flujo manual actual)
+    plan:       WitnessAssignmentService.plan_assignments (flujo de costo mínimo)
+                y su aplicación con bulk_assign_witnesses
+
+Uso:
+    python benchmark_asignacion_testigos.py --testigos 3000 --mesas 2000 --puestos 150
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import Counter
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Centro aproximado de Florencia (Caquetá)
+LAT_CENTRO, LNG_CENTRO = 1.6144, -75.6062
+
+
+def generar_datos(db_path, testigos, mesas, puestos, semilla):
+    """Municipio del coordinador con puestos, mesas y testigos sintéticos; retorna (coordinador, proceso)"""
+    aleatorio = random.Random(semilla)
+    conn = sqlite3.connect(db_path)
+    coordinador_id, municipio_id = conn.execute(
+        "SELECT id, municipio_id FROM coordinadores_municipales ORDER BY id LIMIT 1").fetchone()
+    proceso_id, proceso_referencia = [row[0] for row in conn.execute(
+        "SELECT id FROM procesos_electorales ORDER BY id LIMIT 2")]
+    partidos = [row[0] for row in conn.execute("SELECT id FROM partidos_politicos ORDER BY id LIMIT 10")]
+
+    puesto_ids = []
+    for i in range(puestos):
+        cursor = conn.execute("""
+            INSERT INTO puestos_votacion (nombre, direccion, municipio_id, coordenadas_lat, coordenadas_lng)
+            VALUES (?, ?, ?, ?, ?)
+        """, (f'Puesto Prueba {i}', f'Dirección {i}', municipio_id,
+              LAT_CENTRO + aleatorio.uniform(-0.25, 0.25), LNG_CENTRO + aleatorio.uniform(-0.25, 0.25)))
+        puesto_ids.append(cursor.lastrowid)
+
+    # Puestos de tamaño desigual: unos pocos concentran muchas mesas
+    pesos = [aleatorio.paretovariate(1.5) for _ in puesto_ids]
+    conn.executemany("""
+        INSERT INTO mesas_votacion (numero, puesto_id, puesto_votacion_id, municipio_id,
+                                    votantes_habilitados, estado)
+        VALUES (?, ?, ?, ?, ?, 'configurada')
+    """, [(f'{i + 1:03d}', puesto, puesto, municipio_id, aleatorio.randint(150, 400))
+          for i, puesto in enumerate(aleatorio.choices(puesto_ids, weights=pesos, k=mesas))])
+    mesa_ids = [row[0] for row in conn.execute(
+        "SELECT id FROM mesas_votacion WHERE puesto_id IN (SELECT id FROM puestos_votacion "
+        "WHERE nombre LIKE 'Puesto Prueba %')")]
+
+    # Partidos con presencia desigual (el primero con ~40% de los testigos)
+    pesos_partidos = [8, 4, 3, 2, 1, 1, 1, 1, 1, 1][:len(partidos)]
+    filas = []
+    for i in range(testigos):
+        filas.append((coordinador_id, municipio_id, f'Testigo Prueba {i}', f'8{i:09d}',
+                      aleatorio.choices(partidos, weights=pesos_partidos)[0]))
+    conn.executemany("""
+        INSERT INTO testigos_electorales (coordinador_id, municipio_id, nombre_completo, cedula,
+                                          partido_id, estado)
+        VALUES (?, ?, ?, ?, ?, 'disponible')
+    """, filas)
+    nuevos = [row[0] for row in conn.execute(
+        "SELECT id FROM testigos_electorales WHERE nombre_completo LIKE 'Testigo Prueba %'")]
+
+    # 40% con una asignación ya cumplida en otro proceso (puesto de referencia)
+    conn.executemany("""
+        INSERT INTO asignaciones_testigos (testigo_id, mesa_id, coordinador_id, proceso_electoral_id, estado)
+        VALUES (?, ?, ?, ?, 'completado')
+    """, [(testigo, aleatorio.choice(mesa_ids), coordinador_id, proceso_referencia)
+          for testigo in aleatorio.sample(nuevos, int(len(nuevos) * 0.4))])
+    conn.commit()
+    conn.close()
+    return coordinador_id, proceso_id
+
+
+def uno_a_uno(db_path, coordinador_id, proceso_id):
+    """Réplica del flujo manual: una consulta de disponibles y una asignación por mesa"""
+    from services.coordination_service import CoordinationService
+    servicio = CoordinationService(db_path)
+    conn = sqlite3.connect(db_path)
+    mesas = [row[0] for row in conn.execute("""
+        SELECT mv.id FROM mesas_votacion mv
+        JOIN coordinadores_municipales cm ON cm.municipio_id = mv.municipio_id
+        WHERE cm.id = ? AND mv.estado IN ('activa', 'configurada')
+          AND mv.id NOT IN (SELECT mesa_id FROM asignaciones_testigos
+                            WHERE estado = 'asignado' AND proceso_electoral_id = ?)
+        ORDER BY mv.id
+    """, (coordinador_id, proceso_id))]
+    conn.close()
+    creadas = 0
+    for mesa_id in mesas:
+        disponibles = servicio.get_available_witnesses_for_assignment(coordinador_id, mesa_id)
+        if not disponibles:
+            break
+        servicio.assign_witness_to_table({'testigo_id': disponibles[0]['id'], 'mesa_id': mesa_id,
+                                          'proceso_electoral_id': proceso_id}, coordinador_id)
+        creadas += 1
+    return creadas
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de asignación automática de testigos')
+    parser.add_argument('--testigos', type=int, default=3000)
+    parser.add_argument('--mesas', type=int, default=2000)
+    parser.add_argument('--puestos', type=int, default=150)
+    parser.add_argument('--semilla', type=int, default=7)
+    parser.add_argument('--sin-uno-a-uno', action='store_true', help='Omitir el flujo manual')
+    args = parser.parse_args()
+
+    # Trabajar sobre copias para no modificar la base de datos del repositorio
+    workdir = tempfile.mkdtemp(prefix='bench_asignacion_')
+    original = os.path.join(BASE_DIR, 'caqueta_electoral.db')
+    sys.path.insert(0, BASE_DIR)
+    from services.witness_assignment_service import WitnessAssignmentService
+
+    base = os.path.join(workdir, 'base.db')
+    shutil.copy(original, base)
+    coordinador_id, proceso_id = generar_datos(base, args.testigos, args.mesas, args.puestos, args.semilla)
+
+    print("=" * 70)
+    print("BENCHMARK ASIGNACIÓN AUTOMÁTICA DE TESTIGOS")
+    print("=" * 70)
+    print(f"Testigos {args.testigos:,} | mesas {args.mesas:,} | puestos {args.puestos} | proceso {proceso_id}")
+
+    if not args.sin_uno_a_uno:
+        db_path = os.path.join(workdir, 'uno_a_uno.db')
+        shutil.copy(base, db_path)
+        inicio = time.perf_counter()
+        creadas = uno_a_uno(db_path, coordinador_id, proceso_id)
+        transcurrido = time.perf_counter() - inicio
+        print(f"uno_a_uno:   {transcurrido:7.2f} s | {creadas:,} asignaciones (sin balance ni cercanía)")
+
+    db_path = os.path.join(workdir, 'plan.db')
+    shutil.copy(base, db_path)
+    servicio = WitnessAssignmentService(db_path)
+    inicio = time.perf_counter()
+    plan = servicio.plan_assignments(coordinator_id=coordinador_id, proceso_ids=[proceso_id])
+    calculo = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    aplicado = servicio.apply_plan(plan['asignaciones'], all_or_nothing=True)
+    aplicacion = time.perf_counter() - inicio
+
+    resumen = plan['resumen']
+    print(f"plan:        {calculo:7.2f} s | {resumen['asignaciones']:,} asignaciones para "
+          f"{resumen['mesas_pendientes']:,} mesas ({resumen['cobertura']}%) | etapas {plan['tiempos']}")
+    print(f"aplicación:  {aplicacion:7.2f} s | {len(aplicado['results']):,} creadas, "
+          f"{len(aplicado['errors']):,} errores (bulk_assign_witnesses)")
+
+    por_puesto = Counter((a['puesto_id'], a['partido_id']) for a in plan['asignaciones'])
+    totales = Counter(a['puesto_id'] for a in plan['asignaciones'])
+    # Participación del partido mayoritario en los puestos con al menos 5 testigos
+    maxima = max((n / totales[p] for (p, _), n in por_puesto.items() if totales[p] >= 5), default=0)
+    print(f"Balance: {resumen['excesos_balance']} testigos sobre la cuota de su partido | "
+          f"mayor participación de un partido en un puesto (>= 5 testigos) {maxima:.0%}")
+    print(f"Distancia promedio (testigos con puesto de referencia): {resumen['distancia_promedio_km']} km")
+
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
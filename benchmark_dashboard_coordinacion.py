@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Benchmark del dashboard de coordinación municipal
+Compara consultas por petición y latencia de la secuencia de COUNT(*)
+independientes (antes), la consulta agrupada (después, sin caché) y la
+respuesta desde la caché por coordinador
+
+Uso:
+    python benchmark_dashboard_coordinacion.py --testigos 500 --peticiones 200
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def dashboard_anterior(conn, coordinator_id):
+    """Secuencia de consultas del dashboard antes de agruparlas"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT cm.*, m.nombre as municipio_nombre
+        FROM coordinadores_municipales cm
+        JOIN municipios m ON cm.municipio_id = m.id
+        WHERE cm.id = ?
+    """, (coordinator_id,))
+    coordinator = cursor.fetchone()
+    municipio_id = coordinator['municipio_id']
+
+    cursor.execute("""
+        SELECT COUNT(*) FROM testigos_electorales
+        WHERE coordinador_id = ? AND estado != 'inactivo'
+    """, (coordinator_id,))
+    cursor.fetchone()
+    cursor.execute("""
+        SELECT COUNT(*) FROM testigos_electorales te
+        JOIN asignaciones_testigos at ON te.id = at.testigo_id
+        WHERE te.coordinador_id = ? AND at.estado = 'asignado'
+    """, (coordinator_id,))
+    cursor.fetchone()
+    cursor.execute("""
+        SELECT COUNT(*) FROM mesas_votacion
+        WHERE municipio_id = ? AND estado IN ('activa', 'configurada')
+    """, (municipio_id,))
+    cursor.fetchone()
+    cursor.execute("""
+        SELECT COUNT(DISTINCT at.mesa_id) FROM asignaciones_testigos at
+        JOIN testigos_electorales te ON at.testigo_id = te.id
+        WHERE te.coordinador_id = ? AND at.estado = 'asignado'
+    """, (coordinator_id,))
+    cursor.fetchone()
+    cursor.execute("""
+        SELECT * FROM tareas_coordinacion
+        WHERE coordinador_id = ? AND estado IN ('pendiente', 'en_progreso')
+        ORDER BY prioridad ASC, fecha_limite ASC LIMIT 5
+    """, (coordinator_id,))
+    cursor.fetchall()
+    cursor.execute("""
+        SELECT * FROM notificaciones_coordinacion
+        WHERE coordinador_id = ? AND leida = 0
+        ORDER BY fecha_envio DESC LIMIT 5
+    """, (coordinator_id,))
+    cursor.fetchall()
+    cursor.execute("""
+        SELECT pv.nombre as puesto_nombre, pv.id as puesto_id,
+               COUNT(mv.id) as total_mesas,
+               COUNT(DISTINCT at.mesa_id) as mesas_cubiertas
+        FROM puestos_votacion pv
+        LEFT JOIN mesas_votacion mv ON pv.id = mv.puesto_votacion_id AND mv.estado IN ('activa', 'configurada')
+        LEFT JOIN asignaciones_testigos at ON mv.id = at.mesa_id
+            AND at.testigo_id IN (
+                SELECT id FROM testigos_electorales WHERE coordinador_id = ?
+            ) AND at.estado = 'asignado'
+        WHERE pv.municipio_id = ?
+        GROUP BY pv.id, pv.nombre
+        ORDER BY pv.nombre
+    """, (coordinator_id, municipio_id))
+    cursor.fetchall()
+
+
+def crear_coordinador(conn):
+    """Coordinador sintético para el municipio con más mesas"""
+    municipio_id = conn.execute("""
+        SELECT mv.municipio_id FROM mesas_votacion mv
+        JOIN municipios m ON m.id = mv.municipio_id
+        GROUP BY mv.municipio_id ORDER BY COUNT(*) DESC LIMIT 1
+    """).fetchone()[0]
+    user_id = conn.execute("SELECT id FROM users ORDER BY id LIMIT 1").fetchone()[0]
+    cursor = conn.execute("""
+        INSERT INTO coordinadores_municipales (user_id, municipio_id, nombre_completo, cedula)
+        VALUES (?, ?, 'Coordinador benchmark', 'BENCH-COORD')
+    """, (user_id, municipio_id))
+    conn.commit()
+    return cursor.lastrowid
+
+
+def sembrar_testigos(conn, coordinator_id, cantidad):
+    """Crear testigos sintéticos asignados a las mesas del municipio del coordinador"""
+    municipio_id = conn.execute(
+        "SELECT municipio_id FROM coordinadores_municipales WHERE id = ?", (coordinator_id,)
+    ).fetchone()[0]
+    mesas = [r[0] for r in conn.execute(
+        "SELECT id FROM mesas_votacion WHERE municipio_id = ?", (municipio_id,))]
+    proceso_id = conn.execute("SELECT id FROM procesos_electorales ORDER BY id LIMIT 1").fetchone()[0]
+
+    for i in range(cantidad):
+        cursor = conn.execute("""
+            INSERT INTO testigos_electorales (coordinador_id, municipio_id, nombre_completo, cedula, telefono)
+            VALUES (?, ?, ?, ?, '3000000000')
+        """, (coordinator_id, municipio_id, f'Testigo benchmark {i}', f'BENCH{i:07d}'))
+        if mesas and i % 3:
+            conn.execute("""
+                INSERT INTO asignaciones_testigos (testigo_id, mesa_id, coordinador_id, proceso_electoral_id)
+                VALUES (?, ?, ?, ?)
+            """, (cursor.lastrowid, mesas[i % len(mesas)], coordinator_id, proceso_id))
+    conn.commit()
+
+
+def instrumentar(service):
+    """Contar las sentencias SELECT que ejecuta el servicio"""
+    contador = {'consultas': 0}
+    conectar = service.get_connection
+
+    def contar(sql):
+        if sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+            contador['consultas'] += 1
+
+    def get_connection():
+        conn = conectar()
+        conn.set_trace_callback(contar)
+        return conn
+
+    service.get_connection = get_connection
+    return contador
+
+
+def medir(funcion, contador, peticiones):
+    tiempos = []
+    contador['consultas'] = 0
+    for _ in range(peticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos), contador['consultas'] / peticiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del dashboard de coordinación')
+    parser.add_argument('--coordinador-id', type=int, default=None,
+                        help='Por defecto se crea uno para el municipio con más mesas')
+    parser.add_argument('--testigos', type=int, default=500,
+                        help='Testigos sintéticos a agregar a la copia de la BD')
+    parser.add_argument('--peticiones', type=int, default=200)
+    args = parser.parse_args()
+
+    # Trabajar sobre una copia para no modificar la base de datos del repositorio
+    workdir = tempfile.mkdtemp(prefix='bench_dashboard_coord_')
+    shutil.copy(os.path.join(BASE_DIR, 'caqueta_electoral.db'), workdir)
+    os.chdir(workdir)
+    sys.path.insert(0, BASE_DIR)
+
+    from services.coordination_service import CoordinationService
+
+    service = CoordinationService()
+    contador = instrumentar(service)
+
+    conn = service.get_connection()
+    if args.coordinador_id is None:
+        args.coordinador_id = crear_coordinador(conn)
+    sembrar_testigos(conn, args.coordinador_id, args.testigos)
+    conn.close()
+
+    def anterior():
+        conn = service.get_connection()
+        dashboard_anterior(conn, args.coordinador_id)
+        conn.close()
+
+    def agrupado():
+        service._build_coordination_dashboard(args.coordinador_id)
+
+    def con_cache():
+        service.get_coordination_dashboard(args.coordinador_id)
+
+    print("=" * 70)
+    print("BENCHMARK DASHBOARD DE COORDINACIÓN")
+    print("=" * 70)
+    print(f"Coordinador: {args.coordinador_id} | Testigos sintéticos: {args.testigos} | "
+          f"Peticiones: {args.peticiones}\n")
+
+    t_antes, q_antes = medir(anterior, contador, args.peticiones)
+    t_agrupado, q_agrupado = medir(agrupado, contador, args.peticiones)
+    service.invalidate_dashboard_cache(args.coordinador_id)
+    t_cache, q_cache = medir(con_cache, contador, args.peticiones)
+
+    print(f"{'COUNT(*) separados (antes)':<30} {t_antes * 1000:>8.3f} ms  {q_antes:>5.2f} consultas/petición")
+    print(f"{'consulta agrupada (después)':<30} {t_agrupado * 1000:>8.3f} ms  {q_agrupado:>5.2f} consultas/petición")
+    print(f"{'con caché por coordinador':<30} {t_cache * 1000:>8.3f} ms  {q_cache:>5.2f} consultas/petición")
+    print("-" * 70)
+    print(f"Mejora sin caché: {t_antes / t_agrupado:.1f}x | con caché: {t_antes / t_cache:.1f}x")
+
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
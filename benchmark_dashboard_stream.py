@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark del canal SSE de dashboards
+Conecta N clientes simulados al canal mientras un escritor inserta
+asignaciones y capturas E-14 a una tasa fija, y compara los recálculos de la
+instantánea con las consultas que harían los mismos clientes haciendo
+polling cada 30 s a los widgets.
+
+Uso:
+    python benchmark_dashboard_stream.py --clientes 200 --segundos 10 --escrituras 5
+"""
+
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def escritor(db_path, por_segundo, segundos, detener):
+    """Inserta asignaciones y capturas E-14 a la tasa pedida"""
+    conn = sqlite3.connect(db_path, timeout=10)
+    mesas = [row[0] for row in conn.execute("SELECT id FROM mesas_votacion LIMIT 50")]
+    testigo = conn.execute("SELECT id FROM testigos_electorales LIMIT 1").fetchone()[0]
+    escritas = 0
+    fin = time.monotonic() + segundos
+    while time.monotonic() < fin and not detener.is_set():
+        mesa = mesas[escritas % len(mesas)]
+        if escritas % 2:
+            conn.execute("""
+                INSERT INTO asignaciones_testigos (testigo_id, mesa_id, coordinador_id, proceso_electoral_id,
+                                                   estado, tipo_asignacion)
+                VALUES (?, ?, 1, 1, 'asignado', 'principal')
+            """, (testigo, mesa))
+        else:
+            conn.execute("""
+                INSERT INTO capturas_e14 (mesa_id, testigo_id, ruta_foto, datos_json, estado)
+                VALUES (?, ?, 'bench.jpg', '{}', 'pendiente')
+            """, (mesa, testigo))
+        conn.commit()
+        escritas += 1
+        time.sleep(1.0 / por_segundo)
+    conn.close()
+    return escritas
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del canal SSE de dashboards')
+    parser.add_argument('--clientes', type=int, default=200)
+    parser.add_argument('--segundos', type=float, default=10)
+    parser.add_argument('--escrituras', type=float, default=5, help='Escrituras por segundo')
+    args = parser.parse_args()
+
+    # Trabajar sobre una copia para no modificar la base de datos del repositorio
+    workdir = tempfile.mkdtemp(prefix='bench_stream_')
+    shutil.copy(os.path.join(BASE_DIR, 'caqueta_electoral.db'), workdir)
+    os.chdir(workdir)
+    sys.path.insert(0, BASE_DIR)
+
+    from services.dashboard_stream_service import DashboardStreamService
+
+    db_path = 'caqueta_electoral.db'
+    stream = DashboardStreamService(db_path, check_interval=0.5, heartbeat=2,
+                                    max_clientes=args.clientes)
+    stream.ensure_schema()
+
+    recibidos = [0] * args.clientes
+    suscripciones = [stream.subscribe() for _ in range(args.clientes)]
+    detener = threading.Event()
+
+    def cliente(indice):
+        for frame in suscripciones[indice]:
+            if frame.startswith(b'id:'):
+                recibidos[indice] += 1
+            if detener.is_set():
+                break
+
+    hilos = [threading.Thread(target=cliente, args=(i,), daemon=True) for i in range(args.clientes)]
+    for hilo in hilos:
+        hilo.start()
+
+    inicio = time.perf_counter()
+    escritas = escritor(db_path, args.escrituras, args.segundos, detener)
+    time.sleep(1.5)
+    transcurrido = time.perf_counter() - inicio
+    detener.set()
+    # Cada cliente sale en su siguiente frame o ping; el servidor WSGI llama close()
+    for hilo in hilos:
+        hilo.join()
+    for suscripcion in suscripciones:
+        suscripcion.close()
+
+    stats = stream.get_stats()
+    polling = args.clientes * transcurrido / 30.0
+    print("=" * 70)
+    print("BENCHMARK CANAL SSE DE DASHBOARDS")
+    print("=" * 70)
+    print(f"Clientes {args.clientes} | {transcurrido:.1f} s | escrituras {escritas} "
+          f"({args.escrituras:g}/s)")
+    print(f"Verificaciones de versión: {stats['verificaciones']} (1 fila por verificación)")
+    print(f"Recálculos de la instantánea: {stats['recalculos']}")
+    print(f"Frames enviados: {stats['frames_enviados']:,} | "
+          f"instantáneas por cliente: min {min(recibidos)} máx {max(recibidos)}")
+    print(f"Polling a 30 s con los mismos clientes: ~{polling:.0f} consultas completas de widgets")
+    print(f"Clientes conectados al final: {stats['clientes']}")
+
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark de importación masiva de candidatos desde Excel
+Genera un libro con N candidatos (con algunas filas duplicadas e inválidas)
+y compara sobre copias de la base de datos:
+
+    por_fila:     SELECT de duplicado + INSERT por fila con iterrows (camino anterior,
+                  sin contar la lectura del libro)
+    vectorizado:  ExcelImportService.import_candidates_from_excel (incluye la lectura)
+
+La lectura usa el motor de EXCEL_IMPORT_ENGINE (calamine si está instalado,
+si no openpyxl) y se muestra aparte.
+
+Uso:
+    python benchmark_importacion_excel.py --candidatos 100000
+"""
+
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def generar_libro(ruta, cantidad, siglas, cargos, municipios):
+    """Libro con una hoja Candidatos; 1% de cédulas repetidas y 1% de partidos inexistentes"""
+    import pandas as pd
+    filas = []
+    for i in range(cantidad):
+        cedula = 900000000 + (i - 1 if i % 100 == 99 else i)
+        sigla = 'NOEXISTE' if i % 100 == 50 else siglas[i % len(siglas)]
+        filas.append({
+            'cedula': cedula,
+            'nombre_completo': f'Candidato Prueba {i}',
+            'partido_sigla': sigla,
+            'cargo_nombre': cargos[i % len(cargos)],
+            'municipio_nombre': municipios[i % len(municipios)],
+            'numero_lista': i % 30 + 1,
+            'telefono': f'310{i:07d}',
+            'email': f'candidato{i}@correo.co'
+        })
+    pd.DataFrame(filas).to_excel(ruta, sheet_name='Candidatos', index=False)
+
+
+def importar_por_fila(db_path, df):
+    """Réplica del camino anterior: una consulta de duplicado y un INSERT por fila"""
+    import pandas as pd
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    party_map = {row['sigla'].upper(): row['id'] for row in
+                 cursor.execute("SELECT id, sigla FROM partidos_politicos WHERE activo = 1")}
+    cargo_map = {row['nombre']: row['id'] for row in
+                 cursor.execute("SELECT id, nombre FROM cargos_electorales WHERE activo = 1")}
+    municipio_map = {row['nombre']: row['id'] for row in
+                     cursor.execute("SELECT id, nombre FROM municipios WHERE activo = 1")}
+    procesados = 0
+    for _, row in df.iterrows():
+        cedula = str(row['cedula']).strip()
+        cursor.execute("SELECT id FROM candidatos WHERE cedula = ? AND activo = 1", (cedula,))
+        if cursor.fetchone():
+            continue
+        partido_id = party_map.get(str(row['partido_sigla']).strip().upper())
+        cargo_id = cargo_map.get(str(row['cargo_nombre']).strip())
+        if not partido_id or not cargo_id:
+            continue
+        municipio_id = municipio_map.get(str(row['municipio_nombre']).strip())
+        numero_lista = None if pd.isna(row['numero_lista']) else int(row['numero_lista'])
+        cursor.execute("""
+            INSERT INTO candidatos
+            (cedula, nombre_completo, telefono, email, partido_id, cargo_id,
+             municipio_id, numero_lista, estado, fecha_inscripcion)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (cedula, str(row['nombre_completo']).strip(), str(row['telefono']), str(row['email']),
+              partido_id, cargo_id, municipio_id, numero_lista, 'inscrito', date.today().isoformat()))
+        procesados += 1
+    conn.commit()
+    conn.close()
+    return procesados
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de importación masiva de candidatos')
+    parser.add_argument('--candidatos', type=int, default=100000)
+    parser.add_argument('--sin-por-fila', action='store_true', help='Omitir el camino anterior')
+    args = parser.parse_args()
+
+    import pandas as pd
+
+    # Trabajar sobre copias para no modificar la base de datos del repositorio
+    workdir = tempfile.mkdtemp(prefix='bench_excel_')
+    original = os.path.join(BASE_DIR, 'caqueta_electoral.db')
+    sys.path.insert(0, BASE_DIR)
+    from services.excel_import_service import EXCEL_IMPORT_ENGINE, ExcelImportService
+
+    conn = sqlite3.connect(original)
+    siglas = [row[0] for row in conn.execute("SELECT sigla FROM partidos_politicos WHERE activo = 1")]
+    cargos = [row[0] for row in conn.execute("SELECT DISTINCT nombre FROM cargos_electorales WHERE activo = 1")]
+    municipios = [row[0] for row in conn.execute("SELECT nombre FROM municipios WHERE activo = 1")]
+    conn.close()
+
+    libro = os.path.join(workdir, 'candidatos.xlsx')
+    inicio = time.perf_counter()
+    generar_libro(libro, args.candidatos, siglas, cargos, municipios)
+    generacion = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    df = pd.read_excel(libro, sheet_name='Candidatos', engine=EXCEL_IMPORT_ENGINE)
+    lectura = time.perf_counter() - inicio
+
+    print("=" * 70)
+    print("BENCHMARK IMPORTACIÓN DE CANDIDATOS DESDE EXCEL")
+    print("=" * 70)
+    print(f"Filas: {args.candidatos:,} | generación del libro {generacion:.1f} s | "
+          f"lectura {lectura:.1f} s (motor {EXCEL_IMPORT_ENGINE or 'openpyxl'})")
+
+    if not args.sin_por_fila:
+        db_path = os.path.join(workdir, 'por_fila.db')
+        shutil.copy(original, db_path)
+        inicio = time.perf_counter()
+        procesados = importar_por_fila(db_path, df)
+        transcurrido = time.perf_counter() - inicio
+        print(f"por_fila:    {transcurrido:7.2f} s | {procesados:,} candidatos creados")
+
+    db_path = os.path.join(workdir, 'vectorizado.db')
+    shutil.copy(original, db_path)
+    servicio = ExcelImportService(db_path)
+    inicio = time.perf_counter()
+    resultado = servicio.import_candidates_from_excel(libro, 'Candidatos')
+    transcurrido = time.perf_counter() - inicio
+    print(f"vectorizado: {transcurrido:7.2f} s | {resultado['processed']:,} candidatos creados, "
+          f"{len(resultado['errors']):,} errores, {len(resultado['warnings']):,} advertencias "
+          f"(incluye la lectura)")
+
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
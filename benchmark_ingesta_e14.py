@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga de ingesta E14
+Simula N testigos enviando su E14 al mismo tiempo (cierre de mesas 16:00)
+
+Modos:
+    directo: conexión, SELECT, INSERT y commit por envío (comportamiento anterior)
+    cola:    POST /api/e14/capturar sobre la cola de ingesta con group commit
+
+Uso:
+    python benchmark_ingesta_e14.py --testigos 2000 --hilos 64
+"""
+
+import argparse
+import os
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def preparar_mesas(db_path, cantidad):
+    """Asegurar al menos `cantidad` mesas libres y retornar sus IDs"""
+    conn = sqlite3.connect(db_path)
+    conn.execute("DELETE FROM e14_capturas")
+    existentes = conn.execute("SELECT COUNT(*) FROM mesas_votacion").fetchone()[0]
+    if existentes < cantidad:
+        puesto = conn.execute("SELECT id, municipio_id FROM puestos_votacion LIMIT 1").fetchone()
+        conn.executemany("""
+            INSERT INTO mesas_votacion (numero, puesto_id, municipio_id, votantes_habilitados, activa)
+            VALUES (?, ?, ?, 300, 1)
+        """, [(f"BENCH-{i}", puesto[0], puesto[1]) for i in range(cantidad - existentes)])
+    conn.commit()
+    ids = [row[0] for row in conn.execute("SELECT id FROM mesas_votacion ORDER BY id LIMIT ?", (cantidad,))]
+    conn.close()
+    return ids
+
+
+def payload_para(mesa_id):
+    return {
+        'mesa_id': mesa_id,
+        'testigo_id': 1,
+        'imagen_e14': f'uploads/e14/mesa_{mesa_id}.jpg',
+        'votos_validos': 250,
+        'votos_blanco': 5,
+        'votos_nulos': 3,
+        'observaciones': 'Carga simulada',
+        'confirmado': True
+    }
+
+
+def envio_directo(db_path, data):
+    """Réplica del camino anterior de /api/e14/capturar"""
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM e14_capturas WHERE mesa_id = ?", (data['mesa_id'],))
+        if cursor.fetchone():
+            return 400
+        cursor.execute("""
+            INSERT INTO e14_capturas
+            (mesa_id, testigo_id, imagen_e14, votos_validos, votos_blanco, votos_nulos,
+             observaciones, confirmado, fecha_captura)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        """, (data['mesa_id'], data['testigo_id'], data['imagen_e14'], data['votos_validos'],
+              data['votos_blanco'], data['votos_nulos'], data['observaciones'], 1))
+        conn.commit()
+        return 200
+    except sqlite3.Error:
+        # database is locked / carrera en UNIQUE(mesa_id): ambos eran HTTP 500
+        return 500
+    finally:
+        conn.close()
+
+
+def ejecutar(enviar, mesas, hilos, duplicados):
+    """Repartir los envíos entre hilos y medir latencias"""
+    trabajos = [payload_para(m) for m in mesas]
+    trabajos += [payload_para(m) for m in mesas[:duplicados]]
+    latencias = []
+    codigos = {}
+    lock = threading.Lock()
+    indice = {'i': 0}
+
+    def worker():
+        while True:
+            with lock:
+                if indice['i'] >= len(trabajos):
+                    return
+                data = trabajos[indice['i']]
+                indice['i'] += 1
+            inicio = time.perf_counter()
+            codigo = enviar(data)
+            duracion = time.perf_counter() - inicio
+            with lock:
+                latencias.append(duracion)
+                codigos[codigo] = codigos.get(codigo, 0) + 1
+
+    threads = [threading.Thread(target=worker) for _ in range(hilos)]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - inicio, latencias, codigos
+
+
+def reportar(nombre, total, latencias, codigos, db_path, extra=''):
+    latencias.sort()
+    conn = sqlite3.connect(db_path)
+    guardados = conn.execute("SELECT COUNT(*) FROM e14_capturas").fetchone()[0]
+    conn.close()
+    p95 = latencias[int(len(latencias) * 0.95) - 1] if latencias else 0
+    print(f"\n[{nombre}]")
+    print(f"   Envíos: {len(latencias)} en {total:.2f}s ({len(latencias) / total:.0f} envíos/s)")
+    print(f"   Latencia p50: {statistics.median(latencias) * 1000:.1f} ms | p95: {p95 * 1000:.1f} ms")
+    print(f"   Códigos HTTP: {dict(sorted(codigos.items()))}")
+    print(f"   E14 guardados: {guardados}{extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prueba de carga de ingesta E14')
+    parser.add_argument('--testigos', type=int, default=1000, help='Número de testigos (mesas distintas)')
+    parser.add_argument('--hilos', type=int, default=32, help='Envíos concurrentes')
+    parser.add_argument('--duplicados', type=int, default=50, help='Reenvíos de mesas ya capturadas')
+    parser.add_argument('--modo', choices=['directo', 'cola', 'ambos'], default='ambos')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_e14_')
+    origen = os.path.join(BASE_DIR, 'caqueta_electoral.db')
+    db_path = os.path.join(workdir, 'caqueta_electoral.db')
+    shutil.copy(origen, db_path)
+    os.chdir(workdir)
+    sys.path.insert(0, BASE_DIR)
+
+    print("=" * 70)
+    print("PRUEBA DE CARGA - INGESTA E14")
+    print("=" * 70)
+    print(f"Testigos: {args.testigos} | Hilos: {args.hilos} | Duplicados: {args.duplicados}")
+
+    if args.modo in ('directo', 'ambos'):
+        mesas = preparar_mesas(db_path, args.testigos)
+        total, latencias, codigos = ejecutar(lambda d: envio_directo(db_path, d), mesas,
+                                             args.hilos, args.duplicados)
+        reportar('directo (antes)', total, latencias, codigos, db_path,
+                 ' (500 = database is locked o UNIQUE)')
+
+    if args.modo in ('cola', 'ambos'):
+        mesas = preparar_mesas(db_path, args.testigos)
+
+        from app import create_app
+        from services.e14_ingestion_service import get_e14_ingestion_queue
+
+        app = create_app()
+        cola = get_e14_ingestion_queue()
+        client_local = threading.local()
+
+        def enviar(data):
+            client = getattr(client_local, 'client', None)
+            if client is None:
+                client = client_local.client = app.test_client()
+            return client.post('/api/e14/capturar', json=data).status_code
+
+        total, latencias, codigos = ejecutar(enviar, mesas, args.hilos, args.duplicados)
+        inicio = time.perf_counter()
+        cola.wait_idle(60)
+        drenado = time.perf_counter() - inicio
+        reportar('cola (después)', total, latencias, codigos, db_path,
+                 f" | lotes: {cola.stats['lotes']} | drenado final: {drenado * 1000:.0f} ms")
+        cola.shutdown()
+
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
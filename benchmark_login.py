@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Benchmark de tormenta de login (07:00 del día electoral)
+Crea testigos sintéticos con mesa asignada y capturas E14 en una copia de la
+BD y compara el login anterior (JOIN de cinco tablas + COUNT(*) sobre
+capturas_e14 + check_password_hash en el hilo web) con LoginService (perfil
+desnormalizado, contador por testigo y pool acotado de verificación).
+
+Mientras dura la tormenta un hilo sonda hace consultas livianas, como las
+del resto de endpoints, para medir cuánto se degradan.
+
+Uso:
+    python benchmark_login.py --testigos 500 --capturas 200000 --hilos 32
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PASSWORD = 'Demo2024!'
+
+LOGIN_ANTERIOR = """
+    SELECT
+        u.id, u.username, u.nombre_completo, u.password_hash, u.rol, u.activo,
+        u.cedula, u.email, u.telefono,
+        u.municipio_id, u.puesto_id, u.mesa_id,
+        mu.nombre as municipio_nombre, mu.codigo as municipio_codigo,
+        p.nombre as puesto_nombre, p.direccion as puesto_direccion,
+        m.numero as mesa_numero, m.votantes_habilitados,
+        z.codigo_zz as zona_codigo, z.nombre as zona_nombre
+    FROM users u
+    LEFT JOIN municipios mu ON u.municipio_id = mu.id
+    LEFT JOIN puestos_votacion p ON u.puesto_id = p.id
+    LEFT JOIN mesas_votacion m ON u.mesa_id = m.id
+    LEFT JOIN zonas z ON p.zona_id = z.id
+    WHERE (u.cedula = ? OR u.username = ?) AND u.activo = 1
+"""
+
+
+def login_anterior(pool, check_password_hash, cedula, password):
+    """Flujo de /api/auth/login antes del cambio"""
+    conn = pool.connect()
+    try:
+        user = conn.execute(LOGIN_ANTERIOR, (cedula, cedula)).fetchone()
+        if not user or not check_password_hash(user[3], password):
+            return None
+        total_capturas = 0
+        if user[4] == 'testigo_mesa':
+            total_capturas = conn.execute(
+                "SELECT COUNT(*) FROM capturas_e14 WHERE testigo_id = ?", (user[0],)).fetchone()[0]
+        return user[0], total_capturas
+    finally:
+        conn.close()
+
+
+def cargar_testigos(conn, testigos, capturas, password_hash):
+    """Testigos con mesa asignada y capturas E14 repartidas entre ellos"""
+    mesas = conn.execute("""
+        SELECT mv.id, mv.puesto_id, mv.municipio_id FROM mesas_votacion mv WHERE mv.activa = 1
+    """).fetchall()
+    usuarios = []
+    for i in range(testigos):
+        mesa_id, puesto_id, municipio_id = mesas[i % len(mesas)]
+        cedula = f'BENCH{i:07d}'
+        usuarios.append((f'testigo_bench_{i}', cedula, f'Testigo {i}', password_hash, 'testigo_mesa',
+                         municipio_id, puesto_id, mesa_id))
+    conn.executemany("""
+        INSERT INTO users (username, cedula, nombre_completo, password_hash, rol,
+                           municipio_id, puesto_id, mesa_id, activo)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1)
+    """, usuarios)
+
+    mesa_de = dict(conn.execute("SELECT id, mesa_id FROM users WHERE cedula LIKE 'BENCH%'").fetchall())
+    ids = list(mesa_de)
+    aleatorio = random.Random(42)
+    filas = []
+    for _ in range(capturas):
+        testigo_id = aleatorio.choice(ids)
+        filas.append((mesa_de[testigo_id], testigo_id, 'bench.jpg', '{}', 'pendiente'))
+    conn.executemany("""
+        INSERT INTO capturas_e14 (mesa_id, testigo_id, ruta_foto, datos_json, estado)
+        VALUES (?, ?, ?, ?, ?)
+    """, filas)
+    conn.commit()
+    return [u[1] for u in usuarios]
+
+
+def tormenta(login, cedulas, hilos, pool):
+    """Todos los testigos inician sesión a la vez; retorna métricas de login y de la sonda"""
+    latencias, sonda, errores = [], [], []
+    fin_sonda = threading.Event()
+
+    def una(cedula):
+        inicio = time.perf_counter()
+        try:
+            ok = login(cedula) is not None
+        except Exception as e:
+            errores.append(type(e).__name__)
+            return
+        latencias.append(time.perf_counter() - inicio)
+        if not ok:
+            errores.append('credenciales')
+
+    def sondear():
+        conn = pool.connect()
+        try:
+            while not fin_sonda.is_set():
+                inicio = time.perf_counter()
+                conn.execute("SELECT numero, votantes_habilitados FROM mesas_votacion WHERE id = 1").fetchone()
+                sonda.append(time.perf_counter() - inicio)
+                time.sleep(0.005)
+        finally:
+            conn.close()
+
+    hilo_sonda = threading.Thread(target=sondear)
+    hilo_sonda.start()
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as web:
+        list(web.map(una, cedulas))
+    transcurrido = time.perf_counter() - inicio
+    fin_sonda.set()
+    hilo_sonda.join()
+
+    def p95(valores):
+        return statistics.quantiles(valores, n=20)[-1] if len(valores) > 1 else (valores or [0])[0]
+
+    return {
+        'logins_s': len(latencias) / transcurrido,
+        'p50_ms': statistics.median(latencias) * 1000 if latencias else 0,
+        'p95_ms': p95(latencias) * 1000,
+        'sonda_p95_ms': p95(sonda) * 1000,
+        'sonda_max_ms': max(sonda or [0]) * 1000,
+        'errores': len(errores)
+    }
+
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de tormenta de login')
+    parser.add_argument('--testigos', type=int, default=500)
+    parser.add_argument('--capturas', type=int, default=200000)
+    parser.add_argument('--hilos', type=int, default=32, help='Hilos web simultáneos')
+    parser.add_argument('--workers-hash', type=int, default=None,
+                        help='Workers del pool de verificación (LOGIN_HASH_WORKERS)')
+    args = parser.parse_args()
+
+    # Trabajar sobre una copia para no modificar la base de datos del repositorio
+    workdir = tempfile.mkdtemp(prefix='bench_login_')
+    shutil.copy(os.path.join(BASE_DIR, 'caqueta_electoral.db'), workdir)
+    os.chdir(workdir)
+    sys.path.insert(0, BASE_DIR)
+
+    from werkzeug.security import check_password_hash, generate_password_hash
+    from core.database import get_connection_pool
+    from services.login_service import LoginService, PasswordVerifier
+
+    pool = get_connection_pool('caqueta_electoral.db')
+    conn = sqlite3.connect('caqueta_electoral.db')
+    inicio = time.perf_counter()
+    cedulas = cargar_testigos(conn, args.testigos, args.capturas, generate_password_hash(PASSWORD))
+    conn.close()
+
+    print("=" * 78)
+    print("BENCHMARK TORMENTA DE LOGIN")
+    print("=" * 78)
+    print(f"Carga: {time.perf_counter() - inicio:.1f} s | testigos {len(cedulas):,} | "
+          f"capturas {args.capturas:,} | hilos web {args.hilos}\n")
+
+    service = LoginService(connection_pool=pool,
+                           verifier=PasswordVerifier(check_password_hash, workers=args.workers_hash,
+                                                     max_queue=len(cedulas)))
+    inicio = time.perf_counter()
+    service.ensure_schema()
+    print(f"Creación y poblado de perfiles: {(time.perf_counter() - inicio) * 1000:.0f} ms")
+
+    # Costo de la búsqueda del perfil sin verificar el password
+    cedula = cedulas[len(cedulas) // 2]
+    t_antes = medir(lambda: login_anterior(pool, lambda h, p: True, cedula, PASSWORD), 200)
+    t_despues = medir(lambda: service.get_profile(cedula), 200)
+    print(f"{'perfil anterior (JOIN + COUNT(*))':<38} {t_antes * 1000:>9.3f} ms")
+    print(f"{'perfil desnormalizado + contador':<38} {t_despues * 1000:>9.3f} ms  "
+          f"({t_antes / t_despues:.0f}x)\n")
+
+    # Mismos totales de capturas en ambos caminos
+    for c in cedulas[:50]:
+        assert login_anterior(pool, lambda h, p: True, c, PASSWORD)[1] == service.get_profile(c)['total_capturas']
+
+    escenarios = (
+        ('anterior (hash en hilo web)', lambda c: login_anterior(pool, check_password_hash, c, PASSWORD)),
+        ('LoginService (pool acotado)', lambda c: service.authenticate(c, PASSWORD)),
+    )
+    print(f"{'escenario':<30} {'logins/s':>9} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'sonda p95':>10} {'sonda máx':>10} {'errores':>8}")
+    for nombre, login in escenarios:
+        r = tormenta(login, cedulas, args.hilos, pool)
+        print(f"{nombre:<30} {r['logins_s']:>9.1f} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} "
+              f"{r['sonda_p95_ms']:>10.2f} {r['sonda_max_ms']:>10.2f} {r['errores']:>8}")
+
+    print(f"\nPool de verificación: {service.verifier.get_stats()}")
+    service.verifier.shutdown()
+    pool.close_all()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
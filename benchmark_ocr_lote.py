@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark del OCR en lote de OCRService
+Compara un proceso de Tesseract por zona (antes) contra una sola pasada
+sobre el montaje de todas las zonas (después) usando E14_basico_001.png
+
+Uso:
+    python benchmark_ocr_lote.py --posiciones 30 --repeticiones 5
+"""
+
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+
+def estructura_desde_bd(tipo_eleccion_id):
+    """Cargar las zonas OCR de estructura_e14 si existen para el tipo de elección"""
+    conn = sqlite3.connect(os.path.join(BASE_DIR, 'caqueta_electoral.db'))
+    rows = conn.execute("""
+        SELECT posicion, tipo, zona_ocr_x, zona_ocr_y, zona_ocr_width, zona_ocr_height
+        FROM estructura_e14
+        WHERE tipo_eleccion_id = ? AND zona_ocr_width > 0 AND zona_ocr_height > 0
+        ORDER BY posicion
+    """, (tipo_eleccion_id,)).fetchall()
+    conn.close()
+    return [{
+        'posicion': posicion,
+        'tipo': tipo or 'candidato',
+        'zona_ocr': {'x': x, 'y': y, 'width': w, 'height': h}
+    } for posicion, tipo, x, y, w, h in rows]
+
+
+def estructura_sintetica(alto, ancho, posiciones):
+    """Repartir `posiciones` renglones de votos sobre la columna derecha del formulario"""
+    alto_fila = max(alto // posiciones, 8)
+    ancho_zona = max(ancho // 4, 16)
+    return [{
+        'posicion': i + 1,
+        'tipo': 'candidato',
+        'zona_ocr': {
+            'x': ancho - ancho_zona,
+            'y': i * alto_fila,
+            'width': ancho_zona,
+            'height': min(alto_fila, alto - i * alto_fila)
+        }
+    } for i in range(posiciones) if i * alto_fila < alto]
+
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos), resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del OCR en lote')
+    parser.add_argument('--imagen', default=os.path.join(BASE_DIR, 'E14_basico_001.png'))
+    parser.add_argument('--tipo-eleccion-id', type=int, default=None,
+                        help='Usar las zonas de estructura_e14 de este tipo de elección')
+    parser.add_argument('--posiciones', type=int, default=30,
+                        help='Zonas sintéticas si no hay estructura en la BD')
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    from modules.testigo.services.ocr_service import OCRService
+
+    service = OCRService()
+    imagen = service.preprocesar_imagen(args.imagen)
+
+    estructura = estructura_desde_bd(args.tipo_eleccion_id) if args.tipo_eleccion_id else []
+    if not estructura:
+        estructura = estructura_sintetica(imagen.shape[0], imagen.shape[1], args.posiciones)
+    zonas = [p['zona_ocr'] for p in estructura]
+
+    print("=" * 70)
+    print("BENCHMARK OCR EN LOTE")
+    print("=" * 70)
+    print(f"Imagen: {os.path.basename(args.imagen)} ({imagen.shape[1]}x{imagen.shape[0]})")
+    print(f"Zonas: {len(zonas)} | Repeticiones: {args.repeticiones}\n")
+
+    t_zona, lecturas_zona = medir(
+        lambda: [service.extraer_numero_de_zona(imagen, z) for z in zonas], args.repeticiones)
+    t_lote, lecturas_lote = medir(
+        lambda: service.extraer_numeros_en_lote(imagen, zonas), args.repeticiones)
+
+    coincidencias = sum(1 for a, b in zip(lecturas_zona, lecturas_lote) if a[0] == b[0])
+
+    print(f"{'por zona (antes)':<22} {t_zona * 1000:>9.1f} ms/formulario  ({len(zonas)} procesos)")
+    print(f"{'en lote (después)':<22} {t_lote * 1000:>9.1f} ms/formulario  (1 proceso)")
+    print("-" * 70)
+    print(f"Mejora: {t_zona / t_lote:.1f}x")
+    print(f"Lecturas coincidentes: {coincidencias}/{len(zonas)}")
+
+    t_completo, resultado = medir(lambda: service.procesar_e14(args.imagen, estructura), 1)
+    print(f"procesar_e14 completo (lote): {t_completo * 1000:.1f} ms | "
+          f"confianza promedio: {resultado['confianza_promedio']}")
+
+
+if __name__ == '__main__':
+    main()
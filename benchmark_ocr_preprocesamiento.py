@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark del preprocesamiento OCR: modo completo vs modo rápido
+Simula fotos de celular a partir de las muestras E14_basico_*.png (llevadas al
+marco de la plantilla, ampliadas a --ancho-foto y giradas --rotacion grados
+sobre un fondo) y compara tiempo de preprocesamiento y lecturas de OCR entre
+ambos modos. Las zonas se definen una sola vez en coordenadas de la plantilla.
+
+Uso:
+    python benchmark_ocr_preprocesamiento.py --ancho-foto 3024 --rotacion 4
+"""
+
+import argparse
+import glob
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+# Medir siempre el trabajo real, no la caché por contenido
+os.environ['OCR_CACHE_ENABLED'] = 'false'
+
+
+def simular_foto(gris, ancho_foto, rotacion, cv2):
+    """
+    Retornar (escaneo alineado en el marco de la plantilla, escaneo ampliado a
+    la resolución de la foto, foto girada sobre fondo oscuro)
+    """
+    from services.ocr_preprocessing import marco_formulario
+    alineada = cv2.resize(gris, marco_formulario(), interpolation=cv2.INTER_AREA)
+
+    factor = ancho_foto / alineada.shape[1]
+    ampliada = cv2.resize(alineada, None, fx=factor, fy=factor, interpolation=cv2.INTER_CUBIC)
+    alto, ancho = ampliada.shape
+    borde = int(max(alto, ancho) * 0.08)
+    lienzo = cv2.copyMakeBorder(ampliada, borde, borde, borde, borde, cv2.BORDER_CONSTANT, value=60)
+    centro = (lienzo.shape[1] / 2, lienzo.shape[0] / 2)
+    matriz = cv2.getRotationMatrix2D(centro, rotacion, 1.0)
+    foto = cv2.warpAffine(lienzo, matriz, (lienzo.shape[1], lienzo.shape[0]), borderValue=60)
+    return alineada, ampliada, foto
+
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos), resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del preprocesamiento OCR')
+    parser.add_argument('--muestras', default=os.path.join(BASE_DIR, 'E14_basico_*.png'))
+    parser.add_argument('--ancho-foto', type=int, default=3024, help='Ancho simulado (12MP = 3024x4032)')
+    parser.add_argument('--rotacion', type=float, default=4.0, help='Inclinación simulada en grados')
+    parser.add_argument('--posiciones', type=int, default=30)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args()
+
+    import cv2
+    from benchmark_ocr_lote import estructura_sintetica
+    from modules.testigo.services.ocr_service import OCRService
+    from services.ocr_preprocessing import MODO_COMPLETO, MODO_RAPIDO
+
+    service = OCRService()
+    workdir = tempfile.mkdtemp(prefix='bench_ocr_pre_')
+
+    print("=" * 78)
+    print("BENCHMARK PREPROCESAMIENTO OCR (completo vs rápido)")
+    print("=" * 78)
+    print(f"Foto simulada: {args.ancho_foto}px de ancho, {args.rotacion}° de inclinación\n")
+
+    for muestra in sorted(glob.glob(args.muestras)):
+        gris = cv2.imread(muestra, cv2.IMREAD_GRAYSCALE)
+        alineada, ampliada, foto = simular_foto(gris, args.ancho_foto, args.rotacion, cv2)
+
+        ruta_alineada = os.path.join(workdir, 'alineada.png')
+        ruta_ampliada = os.path.join(workdir, 'ampliada.png')
+        ruta_foto = os.path.join(workdir, 'foto.png')
+        cv2.imwrite(ruta_alineada, alineada)
+        cv2.imwrite(ruta_ampliada, ampliada)
+        cv2.imwrite(ruta_foto, foto)
+
+        # Plantilla en coordenadas del marco (la imagen alineada ya está en ese marco)
+        estructura = estructura_sintetica(alineada.shape[0], alineada.shape[1], args.posiciones)
+        zonas = [p['zona_ocr'] for p in estructura]
+
+        # Tiempo del modo completo sobre una foto a resolución de cámara (sin rectificar)
+        t_completo, _ = medir(
+            lambda: service.preprocesar_para_zonas(ruta_ampliada, zonas, MODO_COMPLETO), args.repeticiones)
+        t_rapido, (imagen_rapida, _) = medir(
+            lambda: service.preprocesar_para_zonas(ruta_foto, zonas, MODO_RAPIDO), args.repeticiones)
+
+        referencia = service.procesar_e14(ruta_alineada, estructura, modo_preprocesamiento=MODO_COMPLETO)
+        rapido = service.procesar_e14(ruta_foto, estructura, modo_preprocesamiento=MODO_RAPIDO)
+
+        lecturas_ref = [d['votos'] for d in referencia['datos_extraidos']]
+        lecturas_rap = [d['votos'] for d in rapido['datos_extraidos']]
+        coincidencias = sum(1 for a, b in zip(lecturas_ref, lecturas_rap) if a == b)
+
+        print(f"[{os.path.basename(muestra)}] foto {foto.shape[1]}x{foto.shape[0]} -> "
+              f"rápido {imagen_rapida.shape[1]}x{imagen_rapida.shape[0]} (marco {alineada.shape[1]}x{alineada.shape[0]})")
+        print(f"   preprocesamiento completo: {t_completo * 1000:>9.1f} ms")
+        print(f"   preprocesamiento rápido:   {t_rapido * 1000:>9.1f} ms  ({t_completo / t_rapido:.1f}x)")
+        print(f"   lecturas iguales a la referencia: {coincidencias}/{len(lecturas_ref)} | "
+              f"confianza completo {referencia['confianza_promedio']} / rápido {rapido['confianza_promedio']}\n")
+
+    for ruta in glob.glob(os.path.join(workdir, '*')):
+        os.remove(ruta)
+    os.rmdir(workdir)
+
+
+if __name__ == '__main__':
+    main()
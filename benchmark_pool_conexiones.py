@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark del pool de conexiones SQLite
+Mide peticiones por segundo en /api/mesas/puesto/<id> y /api/auth/login
+con conexiones directas (antes) y con el pool compartido (después)
+
+Uso:
+    python benchmark_pool_conexiones.py --hilos 8 --segundos 5
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def medir(client_factory, metodo, url, payload, hilos, segundos):
+    """Ejecutar peticiones concurrentes durante `segundos` y retornar (req/s, errores)"""
+    contador = {'ok': 0, 'error': 0}
+    lock = threading.Lock()
+    fin = time.perf_counter() + segundos
+
+    def worker():
+        client = client_factory()
+        ok = error = 0
+        while time.perf_counter() < fin:
+            if metodo == 'POST':
+                response = client.post(url, json=payload)
+            else:
+                response = client.get(url)
+            if response.status_code == 200:
+                ok += 1
+            else:
+                error += 1
+        with lock:
+            contador['ok'] += ok
+            contador['error'] += error
+
+    threads = [threading.Thread(target=worker) for _ in range(hilos)]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    transcurrido = time.perf_counter() - inicio
+    return contador['ok'] / transcurrido, contador['error']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del pool de conexiones SQLite')
+    parser.add_argument('--hilos', type=int, default=8)
+    parser.add_argument('--segundos', type=float, default=5.0)
+    parser.add_argument('--puesto-id', type=int, default=None)
+    parser.add_argument('--cedula', default='1000000001')
+    parser.add_argument('--password', default='Demo2024!')
+    args = parser.parse_args()
+
+    # Trabajar sobre una copia para no modificar la base de datos del repositorio
+    workdir = tempfile.mkdtemp(prefix='bench_pool_')
+    shutil.copy(os.path.join(BASE_DIR, 'caqueta_electoral.db'), workdir)
+    os.chdir(workdir)
+    sys.path.insert(0, BASE_DIR)
+
+    from app import create_app
+    from core.database import get_connection_pool
+
+    app = create_app()
+    pool = get_connection_pool('caqueta_electoral.db')
+
+    puesto_id = args.puesto_id
+    if puesto_id is None:
+        conn = pool.connect()
+        row = conn.execute("""
+            SELECT puesto_id FROM mesas_votacion WHERE activa = 1
+            GROUP BY puesto_id ORDER BY COUNT(*) DESC LIMIT 1
+        """).fetchone()
+        conn.close()
+        puesto_id = row[0] if row else 1
+
+    escenarios = [
+        ('GET', f'/api/mesas/puesto/{puesto_id}', None),
+        ('POST', '/api/auth/login', {'cedula': args.cedula, 'password': args.password}),
+    ]
+
+    print("=" * 70)
+    print("BENCHMARK POOL DE CONEXIONES SQLITE")
+    print("=" * 70)
+    print(f"Hilos: {args.hilos} | Duración por escenario: {args.segundos}s\n")
+
+    resultados = {}
+    for modo, habilitado in (('antes (sqlite3.connect)', False), ('después (pool)', True)):
+        pool.close_all()
+        pool.enabled = habilitado
+        for metodo, url, payload in escenarios:
+            rps, errores = medir(app.test_client, metodo, url, payload, args.hilos, args.segundos)
+            resultados[(modo, url)] = rps
+            print(f"{modo:<26} {metodo:<5} {url:<28} {rps:>9.1f} req/s  errores: {errores}")
+        print()
+
+    print("-" * 70)
+    for metodo, url, _ in escenarios:
+        antes = resultados[('antes (sqlite3.connect)', url)]
+        despues = resultados[('después (pool)', url)]
+        mejora = despues / antes if antes else 0
+        print(f"{url:<28} mejora: {mejora:.2f}x")
+    print(f"\nConexiones abiertas por el pool: {pool.stats['opened']} | reutilizadas: {pool.stats['reused']}")
+
+    pool.close_all()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
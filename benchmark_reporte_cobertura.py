@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Benchmark del reporte de cobertura de mesas a escala nacional
+Carga los ~13k puestos de divipola.csv en una copia de la BD con mesas,
+coordinadores y testigos sintéticos, y compara el cálculo anterior
+(NOT IN / IN en el LEFT JOIN, sin índices) con el semi-join por mesa
+
+Uso:
+    python benchmark_reporte_cobertura.py --factor-mesas 6 --cobertura 0.7
+"""
+
+import argparse
+import csv
+import os
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def reporte_anterior(conn, municipio_id):
+    """Consultas de generate_coverage_report antes del cambio (sin filtro de proceso)"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT COUNT(*) FROM mesas_votacion
+        WHERE municipio_id = ? AND estado IN ('activa', 'configurada')
+    """, (municipio_id,))
+    total_mesas = cursor.fetchone()[0]
+    cursor.execute("""
+        SELECT COUNT(DISTINCT at.mesa_id) FROM asignaciones_testigos at
+        JOIN testigos_electorales te ON at.testigo_id = te.id
+        WHERE te.municipio_id = ? AND at.estado = 'asignado'
+    """, (municipio_id,))
+    mesas_cubiertas = cursor.fetchone()[0]
+    cursor.execute("""
+        SELECT pv.nombre as puesto_nombre, pv.direccion,
+               COUNT(mv.id) as total_mesas,
+               COUNT(DISTINCT at.mesa_id) as mesas_cubiertas
+        FROM puestos_votacion pv
+        LEFT JOIN mesas_votacion mv ON pv.id = mv.puesto_votacion_id AND mv.estado IN ('activa', 'configurada')
+        LEFT JOIN asignaciones_testigos at ON mv.id = at.mesa_id
+            AND at.testigo_id IN (
+                SELECT id FROM testigos_electorales WHERE municipio_id = ?
+            ) AND at.estado = 'asignado'
+        WHERE pv.municipio_id = ?
+        GROUP BY pv.id
+        ORDER BY pv.nombre
+    """, (municipio_id, municipio_id))
+    por_puesto = cursor.fetchall()
+    cursor.execute("""
+        SELECT mv.numero as numero_mesa, COALESCE(mv.ubicacion_especifica, pv.direccion) as direccion, pv.nombre as puesto_nombre
+        FROM mesas_votacion mv
+        LEFT JOIN puestos_votacion pv ON mv.puesto_votacion_id = pv.id
+        WHERE mv.municipio_id = ? AND mv.estado IN ('activa', 'configurada')
+        AND mv.id NOT IN (
+            SELECT DISTINCT at.mesa_id
+            FROM asignaciones_testigos at
+            JOIN testigos_electorales te ON at.testigo_id = te.id
+            WHERE te.municipio_id = ? AND at.estado = 'asignado'
+        )
+        ORDER BY mv.numero
+    """, (municipio_id, municipio_id))
+    sin_cobertura = cursor.fetchall()
+    return total_mesas, mesas_cubiertas, len(por_puesto), len(sin_cobertura)
+
+
+def cargar_divipola(conn, ruta_csv, factor_mesas, cobertura):
+    """Cargar puestos nacionales con mesas, un coordinador y testigos por municipio"""
+    user_id = conn.execute("SELECT id FROM users ORDER BY id LIMIT 1").fetchone()[0]
+    proceso_id = conn.execute("SELECT id FROM procesos_electorales ORDER BY id LIMIT 1").fetchone()[0]
+
+    municipios = {}
+    with open(ruta_csv, encoding='utf-8') as f:
+        filas = list(csv.DictReader(f))
+
+    for fila in filas:
+        codigo = f"{fila['dd']}{int(float(fila['mm'])):03d}"
+        if codigo not in municipios:
+            conn.execute("""
+                INSERT OR IGNORE INTO municipios (codigo, nombre, departamento) VALUES (?, ?, ?)
+            """, (codigo, fila['municipio'], fila['departamento']))
+            municipios[codigo] = conn.execute(
+                "SELECT id FROM municipios WHERE codigo = ?", (codigo,)).fetchone()[0]
+
+    mesas_por_municipio = {}
+    for fila in filas:
+        municipio_id = municipios[f"{fila['dd']}{int(float(fila['mm'])):03d}"]
+        cursor = conn.execute("""
+            INSERT INTO puestos_votacion (nombre, direccion, municipio_id) VALUES (?, ?, ?)
+        """, (fila['puesto'], fila['dirección'] or '', municipio_id))
+        puesto_id = cursor.lastrowid
+        mesas = [(str(n), puesto_id, municipio_id, puesto_id)
+                 for n in range(1, max(int(fila['mesas'] or 1), 1) * factor_mesas + 1)]
+        conn.executemany("""
+            INSERT INTO mesas_votacion (numero, puesto_id, municipio_id, puesto_votacion_id)
+            VALUES (?, ?, ?, ?)
+        """, mesas)
+        mesas_por_municipio[municipio_id] = mesas_por_municipio.get(municipio_id, 0) + len(mesas)
+
+    coordinadores = {}
+    for codigo, municipio_id in municipios.items():
+        cursor = conn.execute("""
+            INSERT INTO coordinadores_municipales (user_id, municipio_id, nombre_completo, cedula)
+            VALUES (?, ?, ?, ?)
+        """, (user_id, municipio_id, f'Coordinador {codigo}', f'BENCH-C{codigo}'))
+        coordinador_id = cursor.lastrowid
+        coordinadores[municipio_id] = coordinador_id
+
+        mesa_ids = [r[0] for r in conn.execute(
+            "SELECT id FROM mesas_votacion WHERE municipio_id = ? ORDER BY id", (municipio_id,))]
+        paso = max(int(round(1 / cobertura)), 1) if cobertura > 0 else 0
+        for i, mesa_id in enumerate(mesa_ids[::paso] if paso else []):
+            cursor = conn.execute("""
+                INSERT INTO testigos_electorales (coordinador_id, municipio_id, nombre_completo, cedula)
+                VALUES (?, ?, ?, ?)
+            """, (coordinador_id, municipio_id, f'Testigo {codigo}-{i}', f'BENCH-T{codigo}-{i}'))
+            conn.execute("""
+                INSERT INTO asignaciones_testigos (testigo_id, mesa_id, coordinador_id, proceso_electoral_id)
+                VALUES (?, ?, ?, ?)
+            """, (cursor.lastrowid, mesa_id, coordinador_id, proceso_id))
+    conn.commit()
+    return coordinadores, mesas_por_municipio
+
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos), resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del reporte de cobertura')
+    parser.add_argument('--csv', default=os.path.join(BASE_DIR, 'divipola.csv'))
+    parser.add_argument('--factor-mesas', type=int, default=6,
+                        help='Multiplicador de la columna mesas del CSV')
+    parser.add_argument('--cobertura', type=float, default=0.5,
+                        help='Fracción aproximada de mesas con testigo asignado')
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    # Trabajar sobre una copia para no modificar la base de datos del repositorio
+    workdir = tempfile.mkdtemp(prefix='bench_cobertura_')
+    shutil.copy(os.path.join(BASE_DIR, 'caqueta_electoral.db'), workdir)
+    os.chdir(workdir)
+    sys.path.insert(0, BASE_DIR)
+
+    from services.coordination_service import CoordinationService
+
+    conn = sqlite3.connect('caqueta_electoral.db')
+    conn.row_factory = sqlite3.Row
+    inicio = time.perf_counter()
+    coordinadores, mesas_por_municipio = cargar_divipola(conn, args.csv, args.factor_mesas, args.cobertura)
+    totales = conn.execute("""
+        SELECT (SELECT COUNT(*) FROM puestos_votacion), (SELECT COUNT(*) FROM mesas_votacion),
+               (SELECT COUNT(*) FROM asignaciones_testigos)
+    """).fetchone()
+
+    print("=" * 78)
+    print("BENCHMARK REPORTE DE COBERTURA (escala nacional)")
+    print("=" * 78)
+    print(f"Carga: {time.perf_counter() - inicio:.1f} s | puestos {totales[0]:,} | mesas {totales[1]:,} | "
+          f"asignaciones {totales[2]:,}\n")
+
+    municipio_id = max(mesas_por_municipio, key=mesas_por_municipio.get)
+    coordinador_id = coordinadores[municipio_id]
+    nombre = conn.execute("SELECT nombre FROM municipios WHERE id = ?", (municipio_id,)).fetchone()[0]
+
+    # El cálculo anterior tarda decenas de segundos en el municipio más grande: una sola vez
+    t_antes, antes = medir(lambda: reporte_anterior(conn, municipio_id), 1)
+    conn.close()
+
+    service = CoordinationService()
+    inicio = time.perf_counter()
+    service.ensure_coverage_indexes()
+    t_indices = time.perf_counter() - inicio
+
+    t_despues, reporte = medir(lambda: service.generate_coverage_report(coordinador_id), args.repeticiones)
+    t_proceso, _ = medir(lambda: service.generate_coverage_report(coordinador_id, process_id=1),
+                         args.repeticiones)
+
+    resumen = reporte['summary']
+    print(f"Municipio más grande: {nombre} ({mesas_por_municipio[municipio_id]:,} mesas, "
+          f"{len(reporte['coverage_by_station'])} puestos)")
+    print(f"{'anterior (NOT IN, sin índices)':<34} {t_antes * 1000:>9.1f} ms")
+    print(f"{'semi-join por mesa + índices':<34} {t_despues * 1000:>9.1f} ms  "
+          f"(creación de índices {t_indices * 1000:.0f} ms)")
+    print(f"{'  con filtro de proceso':<34} {t_proceso * 1000:>9.1f} ms")
+    print(f"Mejora: {t_antes / t_despues:.1f}x")
+    print(f"Cubiertas {resumen['mesas_cubiertas']:,}/{resumen['total_mesas']:,} "
+          f"(antes {antes[1]:,}/{antes[0]:,}) | sin cobertura {len(reporte['uncovered_tables']):,} "
+          f"(antes {antes[3]:,})\n")
+
+    inicio = time.perf_counter()
+    for coordinador in coordinadores.values():
+        service.generate_coverage_report(coordinador)
+    transcurrido = time.perf_counter() - inicio
+    print(f"Reportes de los {len(coordinadores):,} municipios: {transcurrido:.2f} s "
+          f"({transcurrido / len(coordinadores) * 1000:.2f} ms por reporte)")
+
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
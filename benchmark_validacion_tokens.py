@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark de validación de tokens en AuthService
+Compara validaciones por segundo con la consulta a users por token
+(AUTH_TOKEN_VALIDATION=base_datos) y con el registro en memoria, y verifica
+que los tokens de sesiones cerradas y de usuarios desactivados se rechacen.
+
+Uso:
+    python benchmark_validacion_tokens.py --usuarios 5000 --validaciones 50000 --hilos 4
+"""
+
+import argparse
+import hashlib
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PASSWORD = 'Demo2024!'
+
+
+def crear_usuarios(db_path, cantidad):
+    """Usuarios activos sintéticos con el hash SHA256 que usa AuthService"""
+    conn = sqlite3.connect(db_path)
+    password_hash = hashlib.sha256(PASSWORD.encode()).hexdigest()
+    conn.executemany("""
+        INSERT INTO users (username, cedula, nombre_completo, password_hash, rol, activo)
+        VALUES (?, ?, ?, ?, 'testigo_mesa', 1)
+    """, [(f'token_bench_{i}', f'TOK{i:07d}', f'Usuario {i}', password_hash) for i in range(cantidad)])
+    conn.commit()
+    conn.close()
+
+
+def validar(service, tokens, validaciones, hilos):
+    """Validaciones por segundo repartidas en `hilos` hilos"""
+    por_hilo = validaciones // hilos
+    rechazos = [0]
+    lock = threading.Lock()
+
+    def worker(desplazamiento):
+        invalidos = 0
+        for i in range(por_hilo):
+            if service.validate_token(tokens[(desplazamiento + i) % len(tokens)]) is None:
+                invalidos += 1
+        with lock:
+            rechazos[0] += invalidos
+
+    threads = [threading.Thread(target=worker, args=(h * 7919,)) for h in range(hilos)]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    transcurrido = time.perf_counter() - inicio
+    return por_hilo * hilos / transcurrido, rechazos[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Microbenchmark de validación de tokens')
+    parser.add_argument('--usuarios', type=int, default=5000)
+    parser.add_argument('--tokens', type=int, default=500, help='Sesiones iniciadas para el benchmark')
+    parser.add_argument('--validaciones', type=int, default=50000)
+    parser.add_argument('--hilos', type=int, default=4)
+    args = parser.parse_args()
+
+    # Trabajar sobre una copia para no modificar la base de datos del repositorio
+    workdir = tempfile.mkdtemp(prefix='bench_tokens_')
+    shutil.copy(os.path.join(BASE_DIR, 'caqueta_electoral.db'), workdir)
+    os.chdir(workdir)
+    sys.path.insert(0, BASE_DIR)
+
+    from modules.users.models import LoginData
+    from modules.users.services.auth_service import AuthService, VALIDACION_BASE_DATOS, VALIDACION_MEMORIA
+
+    db_path = 'caqueta_electoral.db'
+    crear_usuarios(db_path, args.usuarios)
+
+    service = AuthService(db_path=db_path, validation_mode=VALIDACION_MEMORIA)
+    inicio = time.perf_counter()
+    tokens = []
+    for i in range(args.tokens):
+        resultado = service.authenticate_user(LoginData(username=f'token_bench_{i}', password=PASSWORD))
+        tokens.append(resultado['token'])
+    t_login = (time.perf_counter() - inicio) / args.tokens
+    service.event_writer.wait_idle()
+    sesiones = sqlite3.connect(db_path).execute("SELECT COUNT(*) FROM user_sessions").fetchone()[0]
+
+    print("=" * 70)
+    print("MICROBENCHMARK VALIDACIÓN DE TOKENS")
+    print("=" * 70)
+    print(f"Usuarios {args.usuarios:,} | tokens {len(tokens):,} | validaciones {args.validaciones:,} | "
+          f"hilos {args.hilos}")
+    print(f"Login: {t_login * 1000:.2f} ms por login | sesiones escritas {sesiones:,} | "
+          f"escritor {service.event_writer.get_stats()}\n")
+
+    resultados = {}
+    for modo in (VALIDACION_BASE_DATOS, VALIDACION_MEMORIA):
+        service.validation_mode = modo
+        for hilos in (1, args.hilos):
+            por_segundo, rechazos = validar(service, tokens, args.validaciones, hilos)
+            resultados[(modo, hilos)] = por_segundo
+            print(f"{modo:<12} {hilos:>2} hilo(s) {por_segundo:>12,.0f} validaciones/s  rechazos: {rechazos}")
+    print()
+    for hilos in (1, args.hilos):
+        mejora = resultados[(VALIDACION_MEMORIA, hilos)] / resultados[(VALIDACION_BASE_DATOS, hilos)]
+        print(f"Mejora con {hilos} hilo(s): {mejora:.1f}x")
+
+    # Revocación y desactivación
+    service.validation_mode = VALIDACION_MEMORIA
+    service.logout_user(tokens[0], 0)
+    revocado = service.validate_token(tokens[0]) is None
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE users SET activo = 0 WHERE username = 'token_bench_1'")
+    conn.commit()
+    conn.close()
+    service.token_registry.refresh(force=True)
+    desactivado = service.validate_token(tokens[1]) is None
+    vigente = service.validate_token(tokens[2]) is not None
+    print(f"\nToken tras logout rechazado: {revocado} | usuario desactivado rechazado: {desactivado} | "
+          f"token vigente aceptado: {vigente}")
+
+    service.event_writer.shutdown()
+    # Vaciar el sink de auditoría antes de borrar la copia (si no, lo haría atexit sobre un directorio ya eliminado)
+    service.audit_sink.shutdown()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
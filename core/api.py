@@ -8,8 +8,22 @@ from flask import jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 import logging
 
+from .audit import get_audit_sink
+from .pagination import TOTAL_EXACTO, InvalidCursorError, keyset_paginate
+
 logger = logging.getLogger(__name__)
 
+USER_ACTIONS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS user_actions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        action VARCHAR(100) NOT NULL,
+        resource VARCHAR(255),
+        details TEXT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
 class APIManager:
     """Gestor de APIs y funcionalidades comunes"""
     
@@ -17,6 +31,12 @@ class APIManager:
         self.db = db_manager
         self.auth = auth_manager
         self.permissions = permission_manager
+        
+        # Auditoría asíncrona cuando la base es SQLite
+        sqlite_path = getattr(db_manager, 'sqlite_path', None)
+        self.audit_sink = get_audit_sink(sqlite_path) if sqlite_path else None
+        if self.audit_sink is not None:
+            self.audit_sink.register_schema(USER_ACTIONS_SCHEMA)
     
     def require_permission(self, permission):
         """Decorador para requerir permisos específicos"""
@@ -55,28 +75,40 @@ class APIManager:
             @jwt_required()
             def decorated_function(*args, **kwargs):
                 user_id = get_jwt_identity()
-                user = self.auth.get_user_by_id(user_id)
                 
-                if not user or user['rol'] != role:
+                # Rol resuelto desde la caché de permisos (sin consulta en el caso común)
+                if self.permissions.get_user_role(user_id) != role:
                     return jsonify({'error': 'Insufficient role'}), 403
                 
                 return f(*args, **kwargs)
             return decorated_function
         return decorator
     
-    def paginate_query(self, base_query, page=1, per_page=20):
-        """Paginación de consultas"""
+    def paginate_query(self, base_query, page=1, per_page=20, order_by=None, conditions=None,
+                       params=None, cursor=None, include_total=TOTAL_EXACTO):
+        """
+        Paginación de consultas
+
+        Con order_by (lista de (expresión, posición, descendente) terminada en
+        una columna única) se pagina por cursor: la respuesta trae next_cursor
+        y el total es opcional. Sin order_by se mantiene LIMIT/OFFSET.
+        """
         try:
+            if order_by:
+                return keyset_paginate(self.db.execute_query, base_query, order_by,
+                                       conditions=conditions, params=params, cursor=cursor,
+                                       per_page=per_page, include_total=include_total, page=page)
+
             offset = (page - 1) * per_page
             
             # Contar total de registros
             count_query = f"SELECT COUNT(*) FROM ({base_query}) as count_table"
-            total_result = self.db.execute_query(count_query)
+            total_result = self.db.execute_query(count_query, params)
             total = total_result[0][0] if total_result else 0
             
             # Obtener registros paginados
             paginated_query = f"{base_query} LIMIT {per_page} OFFSET {offset}"
-            data = self.db.execute_query(paginated_query)
+            data = self.db.execute_query(paginated_query, params)
             
             return {
                 'data': data,
@@ -123,7 +155,9 @@ class APIManager:
         """Manejo centralizado de errores de API"""
         logger.error(f"API Error: {error}")
         
-        if isinstance(error, ValueError):
+        if isinstance(error, InvalidCursorError):
+            return jsonify({'error': 'Invalid pagination cursor'}), 400
+        elif isinstance(error, ValueError):
             return jsonify({'error': 'Invalid data provided'}), 400
         elif isinstance(error, PermissionError):
             return jsonify({'error': 'Permission denied'}), 403
@@ -165,21 +199,47 @@ class APIManager:
                 'details': details
             }
             
-            self.db.execute_insert(query, params)
+            if self.audit_sink is not None:
+                # Se escribe en el siguiente lote, sin esperar en el request
+                self.audit_sink.submit(query, params)
+            else:
+                self.db.execute_insert(query, params)
             
         except Exception as e:
             logger.error(f"Log user action error: {e}")
     
-    def search_filter(self, base_query, search_fields, search_term):
-        """Agregar filtro de búsqueda a query"""
+    def search_filter(self, base_query, search_fields, search_term, *, params=None,
+                      fts_table=None, key_field='id'):
+        """
+        Agregar filtro de búsqueda a query
+        
+        Con params, el término se agrega como :search_term (nunca se interpola).
+        Sin params (llamadas de tres argumentos) se incrusta como literal SQL
+        con las comillas escapadas. Con fts_table (índice FTS5 de
+        SearchIndexService) se filtra key_field por el índice en lugar de LIKE
+        sobre search_fields.
+        """
         if not search_term:
             return base_query
         
-        search_conditions = []
-        for field in search_fields:
-            search_conditions.append(f"{field} LIKE '%{search_term}%'")
+        if fts_table:
+            from services.search_index_service import match_terms
+            valor = match_terms(search_term)
+            if not valor:
+                return base_query
+        else:
+            valor = f'%{search_term}%'
         
-        search_clause = " OR ".join(search_conditions)
+        if params is not None:
+            params['search_term'] = valor
+            termino = ':search_term'
+        else:
+            termino = "'" + str(valor).replace("'", "''") + "'"
+        
+        if fts_table:
+            search_clause = f"{key_field} IN (SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH {termino})"
+        else:
+            search_clause = " OR ".join(f"{field} LIKE {termino}" for field in search_fields)
         
         if "WHERE" in base_query.upper():
             return f"{base_query} AND ({search_clause})"
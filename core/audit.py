@@ -0,0 +1,265 @@
+"""
+Core Audit Sink
+Registro asíncrono de auditoría y acciones de usuario
+
+Los registros de auditoría (acciones de usuario, log de coordinación
+municipal, exportaciones, login/logout) se encolan en un buffer circular
+acotado en memoria y un hilo de fondo los escribe por lotes, una transacción
+por lote. Los hilos web nunca esperan una escritura de auditoría: si el
+buffer está lleno se descarta el registro más antiguo y se contabiliza.
+
+Las inserciones que sí deben quedar escritas (sesiones de usuario) siguen
+en AuthEventWriter, cuya cola no descarta.
+"""
+
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from .database import DEFAULT_SQLITE_PATH, SQLiteConnectionPool, get_connection_pool
+
+logger = logging.getLogger(__name__)
+
+# Parámetros de ajuste (sobrescribibles por variables de entorno)
+AUDIT_BUFFER_SIZE = int(os.environ.get('AUDIT_BUFFER_SIZE', '10000'))
+AUDIT_FLUSH_SIZE = int(os.environ.get('AUDIT_FLUSH_SIZE', '500'))
+AUDIT_FLUSH_INTERVAL_MS = int(os.environ.get('AUDIT_FLUSH_INTERVAL_MS', '1000'))
+# Espera máxima (s) entre reintentos cuando la base de datos no responde
+AUDIT_MAX_BACKOFF = float(os.environ.get('AUDIT_MAX_BACKOFF', '30'))
+
+Params = Union[Sequence, Dict]
+
+
+class AuditLogSink:
+    """Buffer circular de registros de auditoría con escritura por lotes"""
+
+    def __init__(self, db_path: str = DEFAULT_SQLITE_PATH,
+                 connection_pool: Optional[SQLiteConnectionPool] = None,
+                 buffer_size: Optional[int] = None, flush_size: Optional[int] = None,
+                 flush_interval_ms: Optional[int] = None):
+        self.db_path = db_path
+        self.connection_pool = connection_pool or get_connection_pool(db_path)
+        self.buffer_size = buffer_size or AUDIT_BUFFER_SIZE
+        self.flush_size = flush_size or AUDIT_FLUSH_SIZE
+        self.flush_interval = (flush_interval_ms or AUDIT_FLUSH_INTERVAL_MS) / 1000.0
+        self.logger = logging.getLogger(__name__)
+
+        self._buffer = deque(maxlen=self.buffer_size)
+        self._lock = threading.Lock()
+        self._despertar = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._escribiendo = 0
+        # DDL de las tablas de auditoría; se aplica en el hilo escritor
+        self._esquemas: List[str] = []
+        self._esquemas_aplicados = 0
+        self.stats = {'encolados': 0, 'escritos': 0, 'descartados': 0, 'fallidos': 0, 'lotes': 0}
+
+    # ==================== CICLO DE VIDA ====================
+
+    def start(self):
+        """Iniciar el hilo de escritura"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='auditoria', daemon=True)
+            self._thread.start()
+
+    def shutdown(self, timeout: float = 10.0):
+        """Escribir lo pendiente y detener el hilo (hook de apagado)"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._despertar.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """Esperar a que el buffer quede escrito (pruebas/apagado)"""
+        limite = time.monotonic() + timeout
+        self._despertar.set()
+        while time.monotonic() < limite:
+            with self._lock:
+                if not self._buffer and not self._escribiendo:
+                    return True
+            self._despertar.set()
+            time.sleep(0.005)
+        return False
+
+    def register_schema(self, ddl: str):
+        """Registrar el CREATE TABLE/INDEX de una tabla de auditoría"""
+        with self._lock:
+            if ddl not in self._esquemas:
+                self._esquemas.append(ddl)
+
+    def submit(self, sql: str, params: Params):
+        """Encolar un registro sin bloquear; si el buffer está lleno se descarta el más antiguo"""
+        hilo = self._thread
+        if hilo is None or not hilo.is_alive():
+            # Primer registro o hilo escritor terminado: se (re)inicia
+            self.start()
+        with self._lock:
+            if len(self._buffer) == self.buffer_size:
+                self.stats['descartados'] += 1
+            self._buffer.append((sql, params))
+            self.stats['encolados'] += 1
+            lleno = len(self._buffer) >= self.flush_size
+        if lleno:
+            self._despertar.set()
+
+    # ==================== ESCRITURA POR LOTES ====================
+
+    def _run(self):
+        espera = self.flush_interval
+        while True:
+            self._despertar.wait(espera)
+            self._despertar.clear()
+            detener = self._stop.is_set()
+
+            try:
+                self._escribir_pendientes(detener)
+                espera = self.flush_interval
+            except Exception as e:
+                # El hilo no debe morir: se reintenta con espera creciente
+                espera = min(max(espera, self.flush_interval) * 2, AUDIT_MAX_BACKOFF)
+                self.logger.error(f"Error escribiendo auditoría (reintento en {espera:.1f} s): {e}")
+                if detener:
+                    break
+                continue
+
+            if detener:
+                break
+
+    def _escribir_pendientes(self, detener: bool):
+        while True:
+            with self._lock:
+                lote = [self._buffer.popleft() for _ in range(min(self.flush_size, len(self._buffer)))]
+                self._escribiendo = len(lote)
+                esquemas = self._esquemas[self._esquemas_aplicados:]
+            if not lote:
+                return
+            try:
+                escritos = self._flush(lote, esquemas)
+            except Exception:
+                self._devolver(lote)
+                raise
+            with self._lock:
+                self._escribiendo = 0
+                self.stats['escritos'] += escritos
+                self.stats['fallidos'] += len(lote) - escritos
+                self.stats['lotes'] += 1
+            # Tras un lote parcial se vuelve a esperar el intervalo
+            if len(lote) < self.flush_size and not detener:
+                return
+
+    def _devolver(self, lote: List[Tuple[str, Params]]):
+        """Devolver al frente del buffer un lote no escrito (si no cabe, se descartan los más antiguos)"""
+        with self._lock:
+            self._escribiendo = 0
+            libres = self.buffer_size - len(self._buffer)
+            if libres < len(lote):
+                self.stats['descartados'] += len(lote) - libres
+                lote = lote[len(lote) - libres:] if libres > 0 else []
+            self._buffer.extendleft(reversed(lote))
+
+    @staticmethod
+    def _agrupar(lote: List[Tuple[str, Params]]) -> List[Tuple[str, List[Params]]]:
+        """Sentencias consecutivas iguales se ejecutan con un solo executemany"""
+        grupos = []
+        for sql, params in lote:
+            if grupos and grupos[-1][0] == sql:
+                grupos[-1][1].append(params)
+            else:
+                grupos.append((sql, [params]))
+        return grupos
+
+    def _esquemas_escritos(self, cantidad: int):
+        with self._lock:
+            self._esquemas_aplicados += cantidad
+
+    def _flush(self, lote: List[Tuple[str, Params]], esquemas: List[str]) -> int:
+        """Escribir un lote en una transacción; si falla, uno por uno. Retorna los escritos"""
+        for intento in range(5):
+            # Un error al conectar sube a _run, que devuelve el lote al buffer y reintenta
+            conn = self.connection_pool.connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                for ddl in esquemas:
+                    conn.execute(ddl)
+                for sql, filas in self._agrupar(lote):
+                    conn.executemany(sql, filas)
+                conn.commit()
+                self._esquemas_escritos(len(esquemas))
+                return len(lote)
+            except sqlite3.OperationalError as e:
+                conn.rollback()
+                if 'locked' in str(e) and intento < 4:
+                    time.sleep(0.05 * (2 ** intento))
+                    continue
+                break
+            except sqlite3.DatabaseError:
+                conn.rollback()
+                break
+            finally:
+                conn.close()
+
+        # Un registro inválido no debe perder el resto del lote
+        escritos = 0
+        conn = self.connection_pool.connect()
+        try:
+            try:
+                for ddl in esquemas:
+                    conn.execute(ddl)
+                conn.commit()
+                self._esquemas_escritos(len(esquemas))
+            except sqlite3.Error as e:
+                conn.rollback()
+                self.logger.error(f"Error creando tablas de auditoría: {e}")
+            for sql, params in lote:
+                try:
+                    conn.execute(sql, params)
+                    conn.commit()
+                    escritos += 1
+                except sqlite3.Error as e:
+                    conn.rollback()
+                    self.logger.error(f"Error escribiendo registro de auditoría: {e}")
+        finally:
+            conn.close()
+        return escritos
+
+    def get_stats(self) -> Dict[str, int]:
+        """Métricas del sink: encolados, escritos, descartados por buffer lleno, fallidos, pendientes"""
+        with self._lock:
+            return dict(self.stats, pendientes=len(self._buffer) + self._escribiendo,
+                        capacidad=self.buffer_size)
+
+
+_sinks: Dict[str, AuditLogSink] = {}
+_sinks_lock = threading.Lock()
+
+
+def get_audit_sink(db_path: str = DEFAULT_SQLITE_PATH) -> AuditLogSink:
+    """Sink de auditoría compartido por base de datos"""
+    clave = os.path.abspath(db_path)
+    sink = _sinks.get(clave)
+    if sink is None:
+        with _sinks_lock:
+            sink = _sinks.get(clave)
+            if sink is None:
+                sink = AuditLogSink(db_path)
+                _sinks[clave] = sink
+                atexit.register(sink.shutdown)
+    return sink
+
+
+def get_audit_stats() -> Dict[str, Dict[str, int]]:
+    """Métricas de todos los sinks de auditoría del proceso"""
+    with _sinks_lock:
+        sinks = dict(_sinks)
+    return {clave: sink.get_stats() for clave, sink in sinks.items()}
@@ -7,6 +7,8 @@ from werkzeug.security import check_password_hash, generate_password_hash
 from datetime import datetime
 import logging
 
+from core.permissions import invalidate_user_permissions
+
 logger = logging.getLogger(__name__)
 
 class AuthManager:
@@ -139,7 +141,9 @@ class AuthManager:
                 WHERE id = :user_id
             """
             
-            return self.db.execute_update(query, params)
+            rows_affected = self.db.execute_update(query, params)
+            invalidate_user_permissions(user_id)
+            return rows_affected
             
         except Exception as e:
             logger.error(f"Update user error: {e}")
@@ -3,21 +3,228 @@ Core Database Manager
 Maneja todas las conexiones y operaciones de base de datos
 """
 
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
 from contextlib import contextmanager
 import logging
+import os
+import sqlite3
+import threading
+import weakref
+from typing import Dict, Optional
+
+try:
+    from sqlalchemy import create_engine, event, text
+    from sqlalchemy.orm import sessionmaker
+    SQLALCHEMY_AVAILABLE = True
+except ImportError:
+    SQLALCHEMY_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_SQLITE_PATH = 'caqueta_electoral.db'
+
+# Parámetros de ajuste del pool (sobrescribibles por variables de entorno)
+POOL_ENABLED = os.environ.get('DB_POOL_ENABLED', 'true').lower() == 'true'
+POOL_MAX_IDLE_PER_THREAD = int(os.environ.get('DB_POOL_MAX_IDLE', '4'))
+BUSY_TIMEOUT_MS = int(os.environ.get('DB_BUSY_TIMEOUT_MS', '5000'))
+CACHED_STATEMENTS = int(os.environ.get('DB_CACHED_STATEMENTS', '256'))
+
+
+class PooledConnection(sqlite3.Connection):
+    """Conexión SQLite que vuelve al pool al cerrarse en lugar de destruirse"""
+
+    pool = None
+    foreign_keys = False
+
+    def close(self):
+        """Devolver la conexión al pool del hilo actual"""
+        if self.pool is None:
+            super().close()
+        else:
+            self.pool.release(self)
+
+    def close_physical(self):
+        """Cerrar realmente la conexión subyacente"""
+        self.pool = None
+        super().close()
+
+
+class SQLiteConnectionPool:
+    """
+    Pool de conexiones SQLite por hilo
+
+    Cada hilo reutiliza sus propias conexiones (SQLite no permite compartirlas
+    entre hilos), que se abren una sola vez con WAL, busy_timeout,
+    synchronous=NORMAL y caché de sentencias preparadas. Las llamadas
+    anidadas dentro del mismo hilo reciben conexiones distintas, igual que
+    con ``sqlite3.connect`` directo.
+    """
+
+    def __init__(self, db_path: str, max_idle_per_thread: int = POOL_MAX_IDLE_PER_THREAD,
+                 busy_timeout_ms: int = BUSY_TIMEOUT_MS, cached_statements: int = CACHED_STATEMENTS,
+                 enabled: bool = POOL_ENABLED):
+        self.db_path = db_path
+        self.max_idle_per_thread = max_idle_per_thread
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cached_statements = cached_statements
+        self.enabled = enabled
+        self._local = threading.local()
+        self._connections = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self.stats = {'opened': 0, 'reused': 0}
+
+    def _idle(self) -> list:
+        idle = getattr(self._local, 'idle', None)
+        if idle is None:
+            idle = self._local.idle = []
+        return idle
+
+    def _open(self) -> PooledConnection:
+        """Abrir una conexión física y aplicar los PRAGMA una única vez"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000.0,
+            factory=PooledConnection,
+            cached_statements=self.cached_statements
+        )
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")
+        except sqlite3.OperationalError as e:
+            logger.warning(f"No se pudo activar WAL en {self.db_path}: {e}")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.pool = self
+        with self._lock:
+            self._connections.add(conn)
+            self.stats['opened'] += 1
+        return conn
+
+    def connect(self, row_factory=None, foreign_keys: bool = False) -> sqlite3.Connection:
+        """
+        Obtener una conexión del pool
+
+        Args:
+            row_factory: Fábrica de filas a usar (p.ej. sqlite3.Row)
+            foreign_keys: Activar validación de llaves foráneas
+
+        Returns:
+            Conexión lista para usar; ``close()`` la devuelve al pool
+        """
+        if not self.enabled:
+            conn = sqlite3.connect(self.db_path)
+            conn.row_factory = row_factory
+            if foreign_keys:
+                conn.execute("PRAGMA foreign_keys = ON")
+            return conn
+
+        idle = self._idle()
+        if idle:
+            conn = idle.pop()
+            self.stats['reused'] += 1
+        else:
+            conn = self._open()
+
+        conn.row_factory = row_factory
+        if conn.foreign_keys != foreign_keys:
+            conn.execute(f"PRAGMA foreign_keys = {'ON' if foreign_keys else 'OFF'}")
+            conn.foreign_keys = foreign_keys
+        return conn
+
+    def release(self, conn: PooledConnection):
+        """Devolver una conexión al pool, descartando transacciones abiertas"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error as e:
+            logger.warning(f"Descartando conexión del pool: {e}")
+            conn.close_physical()
+            return
+
+        idle = self._idle()
+        if len(idle) < self.max_idle_per_thread and conn not in idle:
+            conn.row_factory = None
+            idle.append(conn)
+        else:
+            conn.close_physical()
+
+    @contextmanager
+    def transaction(self, row_factory=None, foreign_keys: bool = False):
+        """Context manager que hace commit/rollback y devuelve la conexión al pool"""
+        conn = self.connect(row_factory=row_factory, foreign_keys=foreign_keys)
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def close_all(self):
+        """Cerrar todas las conexiones abiertas por el pool (apagado/pruebas)"""
+        with self._lock:
+            connections = list(self._connections)
+            self._connections = weakref.WeakSet()
+        for conn in connections:
+            try:
+                conn.close_physical()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+
+_pools: Dict[str, SQLiteConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_connection_pool(db_path: str = DEFAULT_SQLITE_PATH) -> SQLiteConnectionPool:
+    """Obtener el pool compartido del proceso para un archivo de base de datos"""
+    key = db_path if db_path == ':memory:' else os.path.abspath(db_path)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = SQLiteConnectionPool(db_path)
+    return pool
+
+
+def sqlite_path_from_url(database_url: str) -> Optional[str]:
+    """Extraer la ruta del archivo de una URL sqlite:///..."""
+    if database_url and database_url.startswith('sqlite:///'):
+        return database_url[len('sqlite:///'):]
+    return None
+
+
 class DatabaseManager:
     """Gestor centralizado de base de datos"""
-    
+
     def __init__(self, database_url):
+        if not SQLALCHEMY_AVAILABLE:
+            raise ImportError("SQLAlchemy no está instalado")
+
         self.database_url = database_url
         self.engine = create_engine(database_url)
         self.SessionLocal = sessionmaker(bind=self.engine)
-    
+
+        self.sqlite_path = sqlite_path_from_url(database_url)
+        self.connection_pool = get_connection_pool(self.sqlite_path) if self.sqlite_path else None
+        if self.connection_pool is not None:
+            event.listen(self.engine, 'connect', self._configure_sqlite_connection)
+
+    def _configure_sqlite_connection(self, dbapi_connection, connection_record):
+        """Aplicar los mismos PRAGMA del pool a las conexiones de SQLAlchemy"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout = {int(self.connection_pool.busy_timeout_ms)}")
+        cursor.execute("PRAGMA journal_mode = WAL")
+        cursor.execute("PRAGMA synchronous = NORMAL")
+        cursor.close()
+
+    def get_connection(self, row_factory=None, foreign_keys: bool = False) -> sqlite3.Connection:
+        """Obtener conexión sqlite3 del pool compartido"""
+        if self.connection_pool is None:
+            raise RuntimeError(f"El pool de conexiones solo está disponible para SQLite: {self.database_url}")
+        return self.connection_pool.connect(row_factory=row_factory, foreign_keys=foreign_keys)
+
     @contextmanager
     def get_session(self):
         """Context manager para sesiones de base de datos"""
@@ -31,35 +238,35 @@ class DatabaseManager:
             raise
         finally:
             session.close()
-    
+
     def execute_query(self, query, params=None):
         """Ejecutar query SQL directa"""
         with self.get_session() as session:
             result = session.execute(text(query), params or {})
             return result.fetchall()
-    
+
     def execute_insert(self, query, params=None):
         """Ejecutar INSERT y retornar ID"""
         with self.get_session() as session:
             result = session.execute(text(query), params or {})
             return result.lastrowid
-    
+
     def execute_update(self, query, params=None):
         """Ejecutar UPDATE/DELETE"""
         with self.get_session() as session:
             result = session.execute(text(query), params or {})
             return result.rowcount
-    
+
     def get_table_info(self, table_name):
         """Obtener información de una tabla"""
         query = f"PRAGMA table_info({table_name})"
         return self.execute_query(query)
-    
+
     def get_all_tables(self):
         """Obtener todas las tablas de la base de datos"""
         query = "SELECT name FROM sqlite_master WHERE type='table'"
         return [row[0] for row in self.execute_query(query)]
-    
+
     def health_check(self):
         """Verificar estado de la base de datos"""
         try:
@@ -67,4 +274,4 @@ class DatabaseManager:
             return True
         except Exception as e:
             logger.error(f"Database health check failed: {e}")
-            return False
\ No newline at end of file
+            return False
@@ -0,0 +1,178 @@
+"""
+Core Pagination
+Paginación por cursor (keyset) para listados
+
+En lugar de LIMIT/OFFSET y un SELECT COUNT(*) por página, cada página
+continúa desde los valores de orden de la última fila de la anterior:
+
+    WHERE (orden1, orden2, id) > (:k0, :k1, :k2) ORDER BY orden1, orden2, id LIMIT n
+
+Con un índice sobre las columnas de orden, el costo de una página no
+depende de su profundidad. El cursor que recibe el cliente es opaco
+(base64 de los valores de la última fila) y solo vale para el mismo orden.
+El total es opcional: exacto, aproximado (conteo acotado) o ninguno.
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+PAGINATION_MAX_PER_PAGE = int(os.environ.get('PAGINATION_MAX_PER_PAGE', '100'))
+# Filas que cuenta un total aproximado antes de reportarlo como cota inferior
+PAGINATION_COUNT_CAP = int(os.environ.get('PAGINATION_COUNT_CAP', '10000'))
+
+TOTAL_EXACTO = 'exact'
+TOTAL_APROXIMADO = 'approx'
+
+# (expresión SQL, posición de la columna en el SELECT (o nombre con sqlite3.Row), descendente)
+SortKey = Tuple[str, Union[int, str], bool]
+
+_indices_creados = set()
+_indices_lock = threading.Lock()
+
+
+class InvalidCursorError(ValueError):
+    """Cursor mal formado o de otro listado/orden"""
+
+
+def _firma_orden(order_by: Sequence[SortKey]) -> str:
+    return hashlib.sha1(repr([(expr, desc) for expr, _, desc in order_by]).encode()).hexdigest()[:8]
+
+
+def encode_cursor(values: Sequence[Any], order_by: Sequence[SortKey]) -> str:
+    """Cursor opaco con los valores de orden de la última fila entregada"""
+    datos = json.dumps({'o': _firma_orden(order_by), 'k': list(values)}, separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(datos.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, order_by: Sequence[SortKey]) -> List[Any]:
+    """Valores de orden de un cursor; InvalidCursorError si no corresponde a este orden"""
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        datos = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        valores = datos['k']
+        firma = datos['o']
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursorError('Cursor de paginación inválido')
+    if firma != _firma_orden(order_by) or not isinstance(valores, list) or len(valores) != len(order_by):
+        raise InvalidCursorError('El cursor corresponde a otro listado u orden')
+    return valores
+
+
+def keyset_condition(order_by: Sequence[SortKey], prefijo: str = 'k') -> str:
+    """Condición "después del cursor" para el orden dado (parámetros :k0, :k1, ...)"""
+    direcciones = {desc for _, _, desc in order_by}
+    if len(direcciones) == 1:
+        # Mismo sentido en todas las columnas: comparación de row values (usa el índice)
+        operador = '<' if direcciones.pop() else '>'
+        columnas = ', '.join(expr for expr, _, _ in order_by)
+        valores = ', '.join(f':{prefijo}{i}' for i in range(len(order_by)))
+        return f"({columnas}) {operador} ({valores})"
+
+    alternativas = []
+    for i, (expr, _, desc) in enumerate(order_by):
+        iguales = [f"{order_by[j][0]} = :{prefijo}{j}" for j in range(i)]
+        iguales.append(f"{expr} {'<' if desc else '>'} :{prefijo}{i}")
+        alternativas.append('(' + ' AND '.join(iguales) + ')')
+    return '(' + ' OR '.join(alternativas) + ')'
+
+
+def order_clause(order_by: Sequence[SortKey]) -> str:
+    return ', '.join(f"{expr} {'DESC' if desc else 'ASC'}" for expr, _, desc in order_by)
+
+
+def ensure_indexes(execute: Callable[[str], Any], clave: str, statements: Sequence[str]):
+    """Crear una vez por proceso los índices de las columnas de orden (los errores solo se registran)"""
+    with _indices_lock:
+        if clave in _indices_creados:
+            return
+        _indices_creados.add(clave)
+    for sql in statements:
+        try:
+            execute(sql)
+        except Exception as e:
+            logger.warning(f"No se pudo crear índice de paginación ({clave}): {e}")
+
+
+def pagination_args(args) -> Dict[str, Any]:
+    """
+    Parámetros de paginación de un request (request.args)
+
+    include_total: exact | approx | none. Por omisión el total se calcula solo
+    en la primera página; con cursor el cliente ya lo conoce.
+    """
+    cursor = args.get('cursor') or None
+    include_total = (args.get('include_total') or ('none' if cursor else TOTAL_EXACTO)).lower()
+    return {
+        'page': args.get('page', 1, type=int),
+        'per_page': args.get('per_page', 20, type=int),
+        'cursor': cursor,
+        'include_total': include_total if include_total in (TOTAL_EXACTO, TOTAL_APROXIMADO) else None
+    }
+
+
+def keyset_paginate(execute_query: Callable[[str, Dict[str, Any]], Sequence],
+                    base_query: str, order_by: Sequence[SortKey],
+                    conditions: Optional[List[str]] = None, params: Optional[Dict[str, Any]] = None,
+                    cursor: Optional[str] = None, per_page: int = 20,
+                    include_total: Optional[str] = None, page: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Paginar base_query (SELECT ... FROM ... sin WHERE ni ORDER BY) por cursor
+
+    order_by debe terminar en una columna única (normalmente el id) y sus
+    columnas no deben ser NULL (envolver con COALESCE si pueden serlo).
+    Sin cursor y con page > 1 se usa OFFSET, para clientes anteriores.
+    """
+    per_page = max(1, min(int(per_page or 20), PAGINATION_MAX_PER_PAGE))
+    conditions = list(conditions or [])
+    params = dict(params or {})
+
+    filtros = list(conditions)
+    offset = 0
+    if cursor:
+        for i, valor in enumerate(decode_cursor(cursor, order_by)):
+            params[f'k{i}'] = valor
+        filtros.append(keyset_condition(order_by))
+    elif page and page > 1:
+        offset = (page - 1) * per_page
+
+    where = (" WHERE " + " AND ".join(filtros)) if filtros else ""
+    query = f"{base_query}{where} ORDER BY {order_clause(order_by)} LIMIT {per_page + 1}"
+    if offset:
+        query += f" OFFSET {offset}"
+    rows = list(execute_query(query, params))
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    pagination = {
+        'per_page': per_page,
+        'has_more': has_more,
+        'next_cursor': encode_cursor([rows[-1][pos] for _, pos, _ in order_by], order_by)
+        if has_more and rows else None
+    }
+    if page and not cursor:
+        pagination['page'] = page
+
+    if include_total in (TOTAL_EXACTO, TOTAL_APROXIMADO):
+        # El total no depende del cursor: solo los filtros del listado
+        where_total = (" WHERE " + " AND ".join(conditions)) if conditions else ""
+        params_total = {k: v for k, v in params.items() if not (k.startswith('k') and k[1:].isdigit())}
+        if include_total == TOTAL_EXACTO:
+            total_query = f"SELECT COUNT(*) FROM ({base_query}{where_total}) as count_table"
+        else:
+            total_query = (f"SELECT COUNT(*) FROM ({base_query}{where_total} "
+                           f"LIMIT {PAGINATION_COUNT_CAP}) as count_table")
+        resultado = execute_query(total_query, params_total)
+        total = resultado[0][0] if resultado else 0
+        pagination['total'] = total
+        pagination['total_is_estimate'] = include_total == TOTAL_APROXIMADO and total >= PAGINATION_COUNT_CAP
+        if include_total == TOTAL_EXACTO:
+            pagination['pages'] = (total + per_page - 1) // per_page
+
+    return {'data': rows, 'pagination': pagination}
@@ -1,13 +1,144 @@
 """
 Core Permission Manager
 Sistema de permisos granular basado en roles y recursos
+
+El rol activo de cada usuario se resuelve una vez y queda en caché (TTL
+PERMISSIONS_CACHE_TTL); los cambios de rol o de estado invalidan la entrada
+con invalidate_user_permissions, así que autorizar una petición no consulta
+la base de datos en el caso común.
+
+Para los demás procesos, triggers sobre users registran en permisos_version
+una versión creciente por usuario cada vez que cambian rol o activo (lo haga
+quien lo haga). Cada proceso consulta como máximo cada
+PERMISSIONS_VERSION_CHECK segundos las versiones nuevas y descarta esos
+usuarios de su caché.
 """
 
 import logging
+import os
+import sqlite3
+import threading
+import time
 from enum import Enum
 
 logger = logging.getLogger(__name__)
 
+PERMISSIONS_CACHE_TTL = float(os.environ.get('PERMISSIONS_CACHE_TTL', '300'))
+# Intervalo máximo para ver cambios de rol hechos por otros procesos
+PERMISSIONS_VERSION_CHECK = float(os.environ.get('PERMISSIONS_VERSION_CHECK', '2'))
+
+PERMISOS_VERSION_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS permisos_version (
+        user_id INTEGER PRIMARY KEY,
+        version INTEGER NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_permisos_version_version ON permisos_version(version)",
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_permisos_version_update
+    AFTER UPDATE OF rol, activo ON users
+    WHEN OLD.rol IS NOT NEW.rol OR OLD.activo IS NOT NEW.activo
+    BEGIN
+        INSERT OR REPLACE INTO permisos_version (user_id, version)
+        VALUES (NEW.id, (SELECT COALESCE(MAX(version), 0) + 1 FROM permisos_version));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_permisos_version_delete
+    AFTER DELETE ON users
+    BEGIN
+        INSERT OR REPLACE INTO permisos_version (user_id, version)
+        VALUES (OLD.id, (SELECT COALESCE(MAX(version), 0) + 1 FROM permisos_version));
+    END
+    """
+]
+
+# user_id -> (expira, rol activo o None si no existe o está inactivo)
+_roles_cache = {}
+_roles_cache_lock = threading.Lock()
+# Aumenta en cada invalidación: una consulta iniciada antes no guarda un rol viejo
+_roles_generation = 0
+# Por base de datos: (mayor versión vista en permisos_version, próxima verificación)
+_versiones_vistas = {}
+
+
+def _user_key(user_id):
+    """La identidad del JWT puede llegar como int o como str"""
+    try:
+        return int(user_id)
+    except (TypeError, ValueError):
+        return user_id
+
+
+def invalidate_user_permissions(user_id=None):
+    """
+    Descartar el rol en caché de un usuario (o de todos)
+
+    Llamar después de cambiar el rol, activar o desactivar usuarios.
+    """
+    global _roles_generation
+    with _roles_cache_lock:
+        _roles_generation += 1
+        if user_id is None:
+            _roles_cache.clear()
+        else:
+            _roles_cache.pop(_user_key(user_id), None)
+
+
+def ensure_permissions_version_schema(connection_pool):
+    """
+    Crear permisos_version y sus triggers (idempotente)
+
+    Se ejecuta al iniciar la aplicación; los constructores no crean esquema.
+    """
+    conn = connection_pool.connect()
+    try:
+        for sentencia in PERMISOS_VERSION_SCHEMA:
+            conn.execute(sentencia)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def sync_permissions_versions(connection_pool, now=None):
+    """
+    Descartar de la caché los usuarios cuya versión de rol cambió en otro proceso
+
+    Consulta la base de datos como máximo cada PERMISSIONS_VERSION_CHECK segundos
+    """
+    now = time.monotonic() if now is None else now
+    clave = connection_pool.db_path
+    vista, proxima = _versiones_vistas.get(clave, (0, 0.0))
+    if now < proxima:
+        return
+    # También ante un error: no reintentar en cada petición
+    _versiones_vistas[clave] = (vista, now + PERMISSIONS_VERSION_CHECK)
+
+    conn = connection_pool.connect()
+    try:
+        cambios = conn.execute(
+            "SELECT user_id, version FROM permisos_version WHERE version > ?", (vista,)
+        ).fetchall()
+    except sqlite3.OperationalError as e:
+        if 'no such table' not in str(e):
+            raise
+        # Base sin permisos_version: solo cuenta la invalidación local y el TTL
+        return
+    finally:
+        conn.close()
+
+    global _roles_generation
+    if not cambios:
+        return
+    with _roles_cache_lock:
+        _roles_generation += 1
+        for user_id, version in cambios:
+            _roles_cache.pop(user_id, None)
+            vista = max(vista, version)
+        _versiones_vistas[clave] = (vista, now + PERMISSIONS_VERSION_CHECK)
+
+
 class Permission(Enum):
     """Permisos disponibles en el sistema"""
     # Permisos generales
@@ -50,9 +181,12 @@ class Role(Enum):
 class PermissionManager:
     """Gestor de permisos del sistema"""
     
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, cache_ttl=None):
         self.db = db_manager
+        self.cache_ttl = PERMISSIONS_CACHE_TTL if cache_ttl is None else cache_ttl
         self._role_permissions = self._initialize_role_permissions()
+        # Versiones de rol compartidas entre procesos (solo SQLite; la tabla se crea al iniciar la app)
+        self._connection_pool = getattr(db_manager, 'connection_pool', None)
     
     def _initialize_role_permissions(self):
         """Inicializar matriz de permisos por rol"""
@@ -162,24 +296,44 @@ class PermissionManager:
             ],
         }
     
-    def get_user_permissions(self, user_id):
-        """Obtener permisos de un usuario"""
+    def get_user_role(self, user_id):
+        """Obtener el rol de un usuario activo (None si no existe o está inactivo)"""
+        key = _user_key(user_id)
+        now = time.monotonic()
+        if self._connection_pool is not None:
+            try:
+                sync_permissions_versions(self._connection_pool, now)
+            except Exception as e:
+                logger.error(f"Error verificando versiones de permisos: {e}")
+        cached = _roles_cache.get(key)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        
+        generation = _roles_generation
         try:
-            # Obtener rol del usuario
             query = "SELECT rol FROM users WHERE id = :user_id AND activo = 1"
-            result = self.db.execute_query(query, {'user_id': user_id})
-            
-            if not result:
-                return []
-            
-            user_role = result[0][0]
-            
-            # Obtener permisos del rol
-            return self._role_permissions.get(user_role, [])
-            
+            result = self.db.execute_query(query, {'user_id': key})
         except Exception as e:
-            logger.error(f"Get user permissions error: {e}")
+            # Los errores no se guardan en caché
+            logger.error(f"Get user role error: {e}")
+            return None
+        
+        user_role = result[0][0] if result else None
+        if self.cache_ttl > 0:
+            with _roles_cache_lock:
+                if generation == _roles_generation:
+                    _roles_cache[key] = (now + self.cache_ttl, user_role)
+        return user_role
+    
+    def get_user_permissions(self, user_id):
+        """Obtener permisos de un usuario"""
+        user_role = self.get_user_role(user_id)
+        
+        if not user_role:
             return []
+        
+        # Obtener permisos del rol
+        return self._role_permissions.get(user_role, [])
     
     def has_permission(self, user_id, permission):
         """Verificar si un usuario tiene un permiso específico"""
@@ -0,0 +1,19 @@
+"""
+Configuración de Gunicorn para producción
+Uso: gunicorn wsgi:app (Gunicorn lee este archivo desde el directorio actual)
+
+El canal SSE de los dashboards (/api/dashboard/stream) mantiene una conexión
+abierta por navegador. Con el worker síncrono cada conexión bloquearía un
+worker completo; con gthread ocupa solo un hilo. DASHBOARD_STREAM_MAX_CLIENTES
+debe quedar por debajo de GUNICORN_THREADS para que sobren hilos para las
+peticiones normales.
+"""
+
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', '4'))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', '64'))
+# Las conexiones SSE envían un ping cada DASHBOARD_STREAM_HEARTBEAT segundos
+keepalive = 5
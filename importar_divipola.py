@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Importar la estructura DIVIPOLA (departamentos, municipios, zonas y puestos)
+desde divipola.csv con DivipolaImportService, para todo el país o un departamento
+
+Uso:
+    python importar_divipola.py                               # todo el país
+    python importar_divipola.py --departamento CAQUETA --mesas
+"""
+
+import argparse
+
+from services.divipola_import_service import DivipolaImportService
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Importar DIVIPOLA desde CSV')
+    parser.add_argument('--csv', default='divipola.csv')
+    parser.add_argument('--db', default='caqueta_electoral.db')
+    parser.add_argument('--departamento', default=None, help='Nombre o código dd del CSV')
+    parser.add_argument('--mesas', action='store_true',
+                        help='Crear mesas para los puestos que no tienen ninguna')
+    args = parser.parse_args()
+
+    resultado = DivipolaImportService(args.db).import_csv(
+        args.csv, departamento=args.departamento, crear_mesas=args.mesas)
+
+    print("=" * 60)
+    print("IMPORTACIÓN DIVIPOLA")
+    print("=" * 60)
+    print(f"Filas leídas:            {resultado['filas']:>8,}")
+    print(f"Filas sin municipio:     {resultado['filas_sin_municipio']:>8,}")
+    print(f"Departamentos:           {resultado['departamentos']:>8,}")
+    print(f"Municipios nuevos:       {resultado['municipios_nuevos']:>8,}")
+    print(f"Zonas nuevas:            {resultado['zonas_nuevas']:>8,}")
+    print(f"Puestos actualizados:    {resultado['puestos_actualizados']:>8,}")
+    print(f"Puestos nuevos:          {resultado['puestos_nuevos']:>8,}")
+    if args.mesas:
+        print(f"Mesas nuevas:            {resultado['mesas_nuevas']:>8,}")
+
+    print("\nTiempo por etapa:")
+    for etapa, segundos in resultado['tiempos'].items():
+        print(f"   {etapa:<20} {segundos * 1000:>9.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -9,21 +9,22 @@ from datetime import datetime
 from typing import Dict, List, Optional, Any
 from werkzeug.security import generate_password_hash
 
+from core.database import SQLiteConnectionPool, get_connection_pool
+from core.permissions import invalidate_user_permissions
 from ..models import AdminData, SystemStats, UserManagementData, BulkActionData
 
 class AdminPanelService:
     """Servicio para el panel de administración del sistema"""
     
-    def __init__(self, db_path: str = 'electoral_system.db'):
+    def __init__(self, db_path: str = 'electoral_system.db',
+                 connection_pool: Optional[SQLiteConnectionPool] = None):
         self.db_path = db_path
+        self.connection_pool = connection_pool or get_connection_pool(db_path)
         self.logger = logging.getLogger(__name__)
         
     def get_connection(self) -> sqlite3.Connection:
-        """Obtener conexión a la base de datos"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        conn.execute("PRAGMA foreign_keys = ON")
-        return conn
+        """Obtener conexión del pool compartido"""
+        return self.connection_pool.connect(row_factory=sqlite3.Row, foreign_keys=True)
     
     # ==================== ESTADÍSTICAS DEL SISTEMA ====================
     
@@ -226,6 +227,7 @@ class AdminPanelService:
             
             conn.commit()
             conn.close()
+            invalidate_user_permissions(user_id)
             
             return {
                 'success': True,
@@ -253,6 +255,7 @@ class AdminPanelService:
             
             conn.commit()
             conn.close()
+            invalidate_user_permissions(user_id)
             
             return {
                 'success': True,
@@ -295,6 +298,8 @@ class AdminPanelService:
             
             conn.commit()
             conn.close()
+            for user_id in action_data.target_ids:
+                invalidate_user_permissions(user_id)
             
             return {
                 'success': True,
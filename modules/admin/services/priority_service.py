@@ -8,21 +8,21 @@ import logging
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 
+from core.database import SQLiteConnectionPool, get_connection_pool
 from ..models import PriorityData
 
 class PriorityService:
     """Servicio para gestión de prioridades del sistema"""
     
-    def __init__(self, db_path: str = 'electoral_system.db'):
+    def __init__(self, db_path: str = 'electoral_system.db',
+                 connection_pool: Optional[SQLiteConnectionPool] = None):
         self.db_path = db_path
+        self.connection_pool = connection_pool or get_connection_pool(db_path)
         self.logger = logging.getLogger(__name__)
         
     def get_connection(self) -> sqlite3.Connection:
-        """Obtener conexión a la base de datos"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        conn.execute("PRAGMA foreign_keys = ON")
-        return conn
+        """Obtener conexión del pool compartido"""
+        return self.connection_pool.connect(row_factory=sqlite3.Row, foreign_keys=True)
     
     # ==================== GESTIÓN DE PRIORIDADES ====================
     
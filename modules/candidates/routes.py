@@ -195,6 +195,7 @@ def search_candidates():
     """Búsqueda avanzada de candidatos"""
     try:
         search_params = {
+            'q': request.args.get('q'),
             'nombre': request.args.get('nombre'),
             'cedula': request.args.get('cedula'),
             'cargo': request.args.get('cargo'),
@@ -10,6 +10,7 @@ import statistics
 from datetime import datetime
 from typing import List, Dict, Optional, Tuple, Any
 
+from core.database import SQLiteConnectionPool, get_connection_pool
 from ..models import CandidateResult, PartyResult, CoalitionResult
 
 # Configurar logging
@@ -19,15 +20,15 @@ logger = logging.getLogger(__name__)
 class CandidateReportingService:
     """Servicio para cálculo de resultados y reportes de candidatos"""
     
-    def __init__(self, db_path: str = 'electoral_system.db'):
+    def __init__(self, db_path: str = 'electoral_system.db',
+                 connection_pool: Optional[SQLiteConnectionPool] = None):
         self.db_path = db_path
+        self.connection_pool = connection_pool or get_connection_pool(db_path)
         self.logger = logger
     
     def get_connection(self) -> sqlite3.Connection:
-        """Obtener conexión a la base de datos"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+        """Obtener conexión del pool compartido"""
+        return self.connection_pool.connect(row_factory=sqlite3.Row)
     
     def calculate_candidate_results(self, election_type_id: int, 
                                   calculated_by: Optional[int] = None) -> Dict[str, Any]:
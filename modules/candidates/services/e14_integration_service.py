@@ -9,6 +9,7 @@ import logging
 from datetime import datetime
 from typing import List, Dict, Optional, Tuple, Any
 
+from core.database import SQLiteConnectionPool, get_connection_pool
 from ..models import E14CandidateField, E14FormStructure
 
 # Configurar logging
@@ -18,15 +19,15 @@ logger = logging.getLogger(__name__)
 class E14CandidateIntegrationService:
     """Servicio para integrar candidatos con formularios E-14"""
     
-    def __init__(self, db_path: str = 'electoral_system.db'):
+    def __init__(self, db_path: str = 'electoral_system.db',
+                 connection_pool: Optional[SQLiteConnectionPool] = None):
         self.db_path = db_path
+        self.connection_pool = connection_pool or get_connection_pool(db_path)
         self.logger = logger
     
     def get_connection(self) -> sqlite3.Connection:
-        """Obtener conexión a la base de datos"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+        """Obtener conexión del pool compartido"""
+        return self.connection_pool.connect(row_factory=sqlite3.Row)
     
     def generate_e14_form_with_candidates(self, election_type_id: int, 
                                         mesa_id: Optional[int] = None) -> Dict[str, Any]:
@@ -3,10 +3,11 @@ Rutas del módulo de dashboard
 Sistema de Recolección Inicial de Votaciones - Caquetá
 """
 
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, send_file, Response
 import logging
 from datetime import datetime
 
+from services.dashboard_stream_service import get_dashboard_stream, DashboardStreamBusyError
 from .services import DashboardService, WidgetService
 
 # Configurar logging
@@ -19,6 +20,7 @@ dashboard_bp = Blueprint('dashboard', __name__, url_prefix='/api/dashboard')
 # Instancias de servicios
 dashboard_service = DashboardService()
 widget_service = WidgetService()
+dashboard_stream = get_dashboard_stream('caqueta_electoral.db')
 
 # ==================== ENDPOINTS PRINCIPALES ====================
 
@@ -42,6 +44,45 @@ def get_dashboard_overview():
             'error': 'Error interno del servidor'
         }), 500
 
+# ==================== ENDPOINTS EN TIEMPO REAL ====================
+
+@dashboard_bp.route('/stream', methods=['GET'])
+def stream_dashboard():
+    """Canal SSE con la instantánea compartida de E-14, consolidación y asignaciones"""
+    try:
+        frames = dashboard_stream.subscribe()
+    except DashboardStreamBusyError:
+        response = jsonify({
+            'success': False,
+            'error': 'Demasiados clientes conectados al canal en tiempo real'
+        })
+        response.status_code = 503
+        response.headers['Retry-After'] = '30'
+        return response
+    
+    response = Response(frames, mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@dashboard_bp.route('/snapshot', methods=['GET'])
+def get_dashboard_snapshot():
+    """Instantánea compartida para clientes sin EventSource (polling de respaldo)"""
+    try:
+        dashboard_stream.refresh()
+        
+        return jsonify({
+            'success': True,
+            'data': dashboard_stream.get_snapshot()
+        })
+        
+    except Exception as e:
+        logger.error(f"Error obteniendo instantánea del dashboard: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Error interno del servidor'
+        }), 500
+
 # ==================== ENDPOINTS DE WIDGETS ====================
 
 @dashboard_bp.route('/widgets/electoral-progress', methods=['GET'])
@@ -50,7 +91,7 @@ def get_electoral_progress_widget():
     try:
         process_id = request.args.get('process_id', type=int)
         
-        widget_data = dashboard_service.get_electoral_progress_widget(process_id)
+        widget_data = widget_service.get_widget('electoral_progress', params={'process_id': process_id})
         
         return jsonify({
             'success': True,
@@ -71,7 +112,9 @@ def get_candidate_ranking_widget():
         election_type_id = request.args.get('election_type_id', type=int)
         limit = request.args.get('limit', 5, type=int)
         
-        widget_data = dashboard_service.get_candidate_ranking_widget(election_type_id, limit)
+        widget_data = widget_service.get_widget('candidate_ranking', params={
+            'election_type_id': election_type_id, 'limit': limit
+        })
         
         return jsonify({
             'success': True,
@@ -91,7 +134,7 @@ def get_party_distribution_widget():
     try:
         election_type_id = request.args.get('election_type_id', type=int)
         
-        widget_data = dashboard_service.get_party_distribution_widget(election_type_id)
+        widget_data = widget_service.get_widget('party_distribution', params={'election_type_id': election_type_id})
         
         return jsonify({
             'success': True,
@@ -112,7 +155,9 @@ def get_geographic_map_widget():
         election_type_id = request.args.get('election_type_id', type=int)
         metric = request.args.get('metric', 'participation')
         
-        widget_data = dashboard_service.get_geographic_map_widget(election_type_id, metric)
+        widget_data = widget_service.get_widget('geographic_map', params={
+            'election_type_id': election_type_id, 'metric': metric
+        })
         
         return jsonify({
             'success': True,
@@ -130,7 +175,7 @@ def get_geographic_map_widget():
 def get_real_time_stats_widget():
     """Widget de estadísticas en tiempo real"""
     try:
-        widget_data = dashboard_service.get_real_time_stats_widget()
+        widget_data = widget_service.get_widget('real_time_stats')
         
         return jsonify({
             'success': True,
@@ -150,7 +195,7 @@ def get_user_activity_widget():
     try:
         time_range = request.args.get('time_range', '24h')
         
-        widget_data = dashboard_service.get_user_activity_widget(time_range)
+        widget_data = widget_service.get_widget('user_activity', params={'time_range': time_range})
         
         return jsonify({
             'success': True,
@@ -171,7 +216,7 @@ def get_alerts_widget():
         severity = request.args.get('severity', 'all')
         limit = request.args.get('limit', 10, type=int)
         
-        widget_data = dashboard_service.get_alerts_widget(severity, limit)
+        widget_data = widget_service.get_widget('alerts', params={'severity': severity, 'limit': limit})
         
         return jsonify({
             'success': True,
@@ -189,7 +234,7 @@ def get_alerts_widget():
 def get_performance_metrics_widget():
     """Widget de métricas de rendimiento"""
     try:
-        widget_data = dashboard_service.get_performance_metrics_widget()
+        widget_data = widget_service.get_widget('performance_metrics')
         
         return jsonify({
             'success': True,
@@ -332,6 +377,24 @@ def get_widget_categories():
             'error': 'Error interno del servidor'
         }), 500
 
+@dashboard_bp.route('/widgets/cache-stats', methods=['GET'])
+def get_widget_cache_stats():
+    """Aciertos y fallos de la caché compartida de widgets"""
+    try:
+        stats = widget_service.get_widget_cache_stats()
+        
+        return jsonify({
+            'success': True,
+            'data': stats
+        })
+        
+    except Exception as e:
+        logger.error(f"Error obteniendo estadísticas de la caché de widgets: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Error interno del servidor'
+        }), 500
+
 @dashboard_bp.route('/widgets/refresh-intervals', methods=['GET'])
 def get_widget_refresh_intervals():
     """Obtener intervalos de actualización recomendados"""
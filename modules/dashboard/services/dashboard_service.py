@@ -10,6 +10,8 @@ import random
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 
+from core.database import SQLiteConnectionPool, get_connection_pool
+from services.vote_aggregation_service import VoteAggregationService, NIVEL_DEPARTAMENTO, NIVEL_MUNICIPIO
 from ..models import (
     DashboardOverview, QuickStats, SystemStatus, RecentActivity,
     DashboardConfig, SystemAlert
@@ -18,16 +20,16 @@ from ..models import (
 class DashboardService:
     """Servicio principal para dashboard y widgets"""
     
-    def __init__(self, db_path: str = 'electoral_system.db'):
+    def __init__(self, db_path: str = 'electoral_system.db',
+                 connection_pool: Optional[SQLiteConnectionPool] = None):
         self.db_path = db_path
+        self.connection_pool = connection_pool or get_connection_pool(db_path)
         self.logger = logging.getLogger(__name__)
+        self.vote_aggregates = VoteAggregationService(db_path, self.connection_pool)
         
     def get_connection(self) -> sqlite3.Connection:
-        """Obtener conexión a la base de datos"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        conn.execute("PRAGMA foreign_keys = ON")
-        return conn
+        """Obtener conexión del pool compartido"""
+        return self.connection_pool.connect(row_factory=sqlite3.Row, foreign_keys=True)
     
     # ==================== DASHBOARD PRINCIPAL ====================
     
@@ -117,28 +119,30 @@ class DashboardService:
     def get_candidate_ranking_widget(self, election_type_id: Optional[int] = None, limit: int = 5) -> Dict[str, Any]:
         """Widget de ranking de candidatos"""
         try:
+            self.vote_aggregates.ensure_schema()
             conn = self.get_connection()
             cursor = conn.cursor()
             
+            # Los agregados se indexan por candidatos.id (el mismo id de datos_ocr_e14)
             query = """
                 SELECT 
                     c.nombre_completo,
-                    c.numero_tarjeton,
-                    c.party_siglas,
+                    c.numero_lista as numero_tarjeton,
+                    p.sigla as party_siglas,
                     COALESCE(v.votos, 0) as total_votos
-                FROM candidates c
-                LEFT JOIN (
-                    SELECT candidate_id, COUNT(*) as votos
-                    FROM votes 
-                    GROUP BY candidate_id
-                ) v ON c.id = v.candidate_id
+                FROM candidatos c
+                LEFT JOIN partidos_politicos p ON c.partido_id = p.id
+                LEFT JOIN votos_candidato_agregados v
+                       ON v.candidato_id = c.id AND v.nivel = ? AND v.ambito_id = 0
                 WHERE c.activo = 1
             """
             
-            params = []
+            # Totales departamentales precalculados desde los E-14 confirmados
+            params = [NIVEL_DEPARTAMENTO]
             
             if election_type_id:
-                query += " AND c.election_type_id = ?"
+                # El tipo de elección corresponde al cargo electoral del candidato
+                query += " AND c.cargo_id = ?"
                 params.append(election_type_id)
             
             query += f" ORDER BY total_votos DESC LIMIT {limit}"
@@ -175,31 +179,30 @@ class DashboardService:
     def get_party_distribution_widget(self, election_type_id: Optional[int] = None) -> Dict[str, Any]:
         """Widget de distribución por partido"""
         try:
+            self.vote_aggregates.ensure_schema()
             conn = self.get_connection()
             cursor = conn.cursor()
             
             query = """
                 SELECT 
-                    c.party_siglas,
+                    p.sigla as party_siglas,
                     COUNT(c.id) as total_candidatos,
                     COALESCE(SUM(v.votos), 0) as total_votos
-                FROM candidates c
-                LEFT JOIN (
-                    SELECT candidate_id, COUNT(*) as votos
-                    FROM votes 
-                    GROUP BY candidate_id
-                ) v ON c.id = v.candidate_id
-                WHERE c.activo = 1 AND c.party_siglas IS NOT NULL
+                FROM candidatos c
+                JOIN partidos_politicos p ON c.partido_id = p.id
+                LEFT JOIN votos_candidato_agregados v
+                       ON v.candidato_id = c.id AND v.nivel = ? AND v.ambito_id = 0
+                WHERE c.activo = 1 AND p.sigla IS NOT NULL
             """
             
-            params = []
+            params = [NIVEL_DEPARTAMENTO]
             
             if election_type_id:
-                query += " AND c.election_type_id = ?"
+                query += " AND c.cargo_id = ?"
                 params.append(election_type_id)
             
             query += """
-                GROUP BY c.party_siglas
+                GROUP BY p.sigla
                 HAVING total_candidatos > 0
                 ORDER BY total_votos DESC
             """
@@ -781,14 +784,32 @@ class DashboardService:
             return []
     
     def _get_votes_by_municipality(self, election_type_id: Optional[int]) -> List[Dict[str, Any]]:
-        """Obtener votos por municipio"""
-        # Esta función requeriría datos más detallados de resultados
-        # Por ahora retornamos datos simulados
-        return [
-            {'municipio': 'FLORENCIA', 'total_votos': 15000},
-            {'municipio': 'ALBANIA', 'total_votos': 8500},
-            {'municipio': 'EL DONCELLO', 'total_votos': 6200}
-        ]
+        """Obtener votos por municipio desde los agregados materializados"""
+        try:
+            self.vote_aggregates.ensure_schema()
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                SELECT m.nombre as municipio, SUM(v.votos) as total_votos
+                FROM votos_candidato_agregados v
+                JOIN municipios m ON v.ambito_id = m.id
+                WHERE v.nivel = ?
+                GROUP BY m.id, m.nombre
+                ORDER BY total_votos DESC
+            """, (NIVEL_MUNICIPIO,))
+            
+            results = [
+                {'municipio': row['municipio'], 'total_votos': row['total_votos']}
+                for row in cursor.fetchall()
+            ]
+            
+            conn.close()
+            return results
+            
+        except Exception as e:
+            self.logger.error(f"Error obteniendo votos por municipio: {e}")
+            return []
     
     def _get_municipality_coordinates(self, municipality_name: str) -> Dict[str, float]:
         """Obtener coordenadas de municipio (simuladas)"""
@@ -1,81 +1,104 @@
 """
 Servicio de Widgets para Dashboard
 Sistema de Recolección Inicial de Votaciones - Caquetá
+
+Los resultados de los widgets se comparten entre usuarios en una caché por
+(base de datos, widget, parámetros normalizados, alcance de rol) con el TTL
+de get_widget_refresh_intervals. Si varias peticiones encuentran un widget
+vencido, solo una lo recalcula y las demás esperan su resultado.
 """
 
+import copy
 import sqlite3
 import logging
+import os
+import threading
+import time
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
+
+from core.database import SQLiteConnectionPool, get_connection_pool
+from core.permissions import PermissionManager
+
+# Caché de widgets (false desactiva) y máximo de entradas
+WIDGET_CACHE_ENABLED = os.environ.get('WIDGET_CACHE_ENABLED', 'true').lower() == 'true'
+WIDGET_CACHE_MAX_ENTRADAS = int(os.environ.get('WIDGET_CACHE_MAX_ENTRADAS', '1000'))
+# Segundos que una petición espera el recálculo que está haciendo otra
+WIDGET_CACHE_ESPERA = float(os.environ.get('WIDGET_CACHE_ESPERA', '30'))
+
+# Valores por defecto de los parámetros de cada widget (también normalizan la clave)
+WIDGET_DEFAULT_PARAMS = {
+    'electoral_progress': {'process_id': None},
+    'candidate_ranking': {'election_type_id': None, 'limit': 5},
+    'party_distribution': {'election_type_id': None},
+    'geographic_map': {'election_type_id': None, 'metric': 'participation'},
+    'real_time_stats': {},
+    'user_activity': {'time_range': '24h'},
+    'alerts': {'severity': 'all', 'limit': 10},
+    'performance_metrics': {},
+}
+
+# Caché compartida entre instancias: clave -> (expira, datos)
+_widget_cache: Dict[Tuple, Tuple[float, Dict]] = {}
+# Recálculos en curso: clave -> evento que se marca al terminar
+_widget_inflight: Dict[Tuple, threading.Event] = {}
+_widget_cache_lock = threading.Lock()
+_widget_cache_stats = {'hits': 0, 'misses': 0, 'esperas': 0, 'errores': 0}
+
+
+def invalidate_widget_cache(widget_type: Optional[str] = None):
+    """Descartar los resultados en caché de un widget (o de todos)"""
+    with _widget_cache_lock:
+        if widget_type is None:
+            _widget_cache.clear()
+        else:
+            for clave in [c for c in _widget_cache if c[1] == widget_type]:
+                del _widget_cache[clave]
+
 
 class WidgetService:
     """Servicio especializado para widgets del dashboard"""
     
-    def __init__(self, db_path: str = 'electoral_system.db'):
+    def __init__(self, db_path: str = 'electoral_system.db',
+                 connection_pool: Optional[SQLiteConnectionPool] = None):
         self.db_path = db_path
+        self.connection_pool = connection_pool or get_connection_pool(db_path)
         self.logger = logging.getLogger(__name__)
+        self._cache_key = os.path.abspath(db_path)
+        self._dashboard_service = None
+        # Rol del usuario desde la caché compartida de roles
+        self.permissions = PermissionManager(self)
         
     def get_connection(self) -> sqlite3.Connection:
-        """Obtener conexión a la base de datos"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        conn.execute("PRAGMA foreign_keys = ON")
-        return conn
+        """Obtener conexión del pool compartido"""
+        return self.connection_pool.connect(row_factory=sqlite3.Row, foreign_keys=True)
+    
+    def execute_query(self, query: str, params: Dict[str, Any] = None) -> List[sqlite3.Row]:
+        """Consulta directa (interfaz de DatabaseManager que usa PermissionManager)"""
+        conn = self.get_connection()
+        try:
+            return conn.execute(query, params or {}).fetchall()
+        finally:
+            conn.close()
+    
+    @property
+    def dashboard_service(self):
+        """DashboardService reutilizado por todas las peticiones"""
+        if self._dashboard_service is None:
+            from .dashboard_service import DashboardService
+            self._dashboard_service = DashboardService(self.db_path, self.connection_pool)
+        return self._dashboard_service
     
     def get_widget_data(self, widget_type: str, user_id: int, params: Dict[str, Any] = None) -> Dict[str, Any]:
         """Obtener datos para un widget específico"""
         try:
-            if params is None:
-                params = {}
-            
-            # Importar el servicio principal para reutilizar métodos
-            from .dashboard_service import DashboardService
-            dashboard_service = DashboardService(self.db_path)
-            
-            if widget_type == 'electoral_progress':
-                return dashboard_service.get_electoral_progress_widget(
-                    process_id=params.get('process_id')
-                )
-            
-            elif widget_type == 'candidate_ranking':
-                return dashboard_service.get_candidate_ranking_widget(
-                    election_type_id=params.get('election_type_id'),
-                    limit=params.get('limit', 5)
-                )
-            
-            elif widget_type == 'party_distribution':
-                return dashboard_service.get_party_distribution_widget(
-                    election_type_id=params.get('election_type_id')
-                )
-            
-            elif widget_type == 'geographic_map':
-                return dashboard_service.get_geographic_map_widget(
-                    election_type_id=params.get('election_type_id'),
-                    metric=params.get('metric', 'participation')
-                )
-            
-            elif widget_type == 'real_time_stats':
-                return dashboard_service.get_real_time_stats_widget()
-            
-            elif widget_type == 'user_activity':
-                return dashboard_service.get_user_activity_widget(
-                    time_range=params.get('time_range', '24h')
-                )
-            
-            elif widget_type == 'alerts':
-                return dashboard_service.get_alerts_widget(
-                    severity=params.get('severity', 'all'),
-                    limit=params.get('limit', 10)
-                )
-            
-            elif widget_type == 'performance_metrics':
-                return dashboard_service.get_performance_metrics_widget()
-            
-            else:
+            if widget_type not in WIDGET_DEFAULT_PARAMS:
                 return {
                     'error': f'Tipo de widget no soportado: {widget_type}',
                     'available_widgets': self.get_available_widgets()
                 }
+            
+            return self.get_widget(widget_type, user_id, params)
                 
         except Exception as e:
             self.logger.error(f"Error obteniendo datos del widget {widget_type}: {e}")
@@ -84,6 +107,151 @@ class WidgetService:
                 'widget_type': widget_type
             }
     
+    # ==================== CACHÉ DE WIDGETS ====================
+    
+    def normalize_params(self, widget_type: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Solo los parámetros que declara el widget, con sus valores por defecto"""
+        params = params or {}
+        normalizados = {}
+        for nombre, defecto in WIDGET_DEFAULT_PARAMS.get(widget_type, {}).items():
+            valor = params.get(nombre)
+            normalizados[nombre] = defecto if valor is None or valor == '' else valor
+        return normalizados
+    
+    def _get_role_scope(self, user_id: Optional[int]) -> str:
+        if user_id is None:
+            return 'publico'
+        return self.permissions.get_user_role(user_id) or 'publico'
+    
+    def get_widget(self, widget_type: str, user_id: Optional[int] = None,
+                   params: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Datos de un widget desde la caché compartida (lanza la excepción del cálculo)
+        
+        Un resultado se reutiliza durante el intervalo de actualización del
+        widget; con una entrada vencida, solo una petición consulta la base de
+        datos y las concurrentes esperan ese mismo resultado.
+        """
+        params = self.normalize_params(widget_type, params)
+        ttl = self.get_widget_refresh_intervals().get(widget_type, 0)
+        if not WIDGET_CACHE_ENABLED or ttl <= 0:
+            return self._compute_widget(widget_type, params)
+        
+        clave = (self._cache_key, widget_type,
+                 tuple(sorted((k, str(v)) for k, v in params.items())),
+                 self._get_role_scope(user_id))
+        
+        while True:
+            with _widget_cache_lock:
+                entrada = _widget_cache.get(clave)
+                if entrada and entrada[0] > time.monotonic():
+                    _widget_cache_stats['hits'] += 1
+                    return copy.deepcopy(entrada[1])
+                
+                evento = _widget_inflight.get(clave)
+                if evento is None:
+                    evento = _widget_inflight[clave] = threading.Event()
+                    _widget_cache_stats['misses'] += 1
+                    break
+                _widget_cache_stats['esperas'] += 1
+            
+            # Otra petición ya está recalculando este widget
+            if not evento.wait(WIDGET_CACHE_ESPERA):
+                self.logger.warning(f"Tiempo de espera agotado recalculando el widget {widget_type}")
+                return self._compute_widget(widget_type, params)
+        
+        try:
+            datos = self._compute_widget(widget_type, params)
+        except Exception:
+            with _widget_cache_lock:
+                _widget_cache_stats['errores'] += 1
+                del _widget_inflight[clave]
+            evento.set()
+            raise
+        
+        # DashboardService devuelve {'error': ...} ante fallos: no se guarda para no
+        # dejar el widget en blanco para todos durante el TTL
+        if isinstance(datos, dict) and 'error' in datos:
+            with _widget_cache_lock:
+                _widget_cache_stats['errores'] += 1
+                del _widget_inflight[clave]
+            evento.set()
+            return copy.deepcopy(datos)
+        
+        with _widget_cache_lock:
+            if len(_widget_cache) >= WIDGET_CACHE_MAX_ENTRADAS:
+                self._purge_locked()
+            _widget_cache[clave] = (time.monotonic() + ttl, datos)
+            del _widget_inflight[clave]
+        evento.set()
+        return copy.deepcopy(datos)
+    
+    @staticmethod
+    def _purge_locked():
+        ahora = time.monotonic()
+        for clave in [c for c, (expira, _) in _widget_cache.items() if expira <= ahora]:
+            del _widget_cache[clave]
+        # Sin vencidas: descartar las que vencen primero
+        exceso = len(_widget_cache) - WIDGET_CACHE_MAX_ENTRADAS + 1
+        if exceso > 0:
+            for clave in sorted(_widget_cache, key=lambda c: _widget_cache[c][0])[:exceso]:
+                del _widget_cache[clave]
+    
+    def _compute_widget(self, widget_type: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Consultar un widget sin caché"""
+        dashboard_service = self.dashboard_service
+        
+        if widget_type == 'electoral_progress':
+            return dashboard_service.get_electoral_progress_widget(
+                process_id=params.get('process_id')
+            )
+        
+        elif widget_type == 'candidate_ranking':
+            return dashboard_service.get_candidate_ranking_widget(
+                election_type_id=params.get('election_type_id'),
+                limit=params.get('limit', 5)
+            )
+        
+        elif widget_type == 'party_distribution':
+            return dashboard_service.get_party_distribution_widget(
+                election_type_id=params.get('election_type_id')
+            )
+        
+        elif widget_type == 'geographic_map':
+            return dashboard_service.get_geographic_map_widget(
+                election_type_id=params.get('election_type_id'),
+                metric=params.get('metric', 'participation')
+            )
+        
+        elif widget_type == 'real_time_stats':
+            return dashboard_service.get_real_time_stats_widget()
+        
+        elif widget_type == 'user_activity':
+            return dashboard_service.get_user_activity_widget(
+                time_range=params.get('time_range', '24h')
+            )
+        
+        elif widget_type == 'alerts':
+            return dashboard_service.get_alerts_widget(
+                severity=params.get('severity', 'all'),
+                limit=params.get('limit', 10)
+            )
+        
+        elif widget_type == 'performance_metrics':
+            return dashboard_service.get_performance_metrics_widget()
+        
+        raise ValueError(f'Tipo de widget no soportado: {widget_type}')
+    
+    def get_widget_cache_stats(self) -> Dict[str, Any]:
+        """Aciertos, fallos, esperas por recálculo en curso y entradas en caché"""
+        with _widget_cache_lock:
+            stats = dict(_widget_cache_stats)
+            stats['entradas'] = len(_widget_cache)
+            stats['en_curso'] = len(_widget_inflight)
+        consultas = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / consultas, 3) if consultas else 0.0
+        return stats
+    
     def get_available_widgets(self) -> List[Dict[str, Any]]:
         """Obtener lista de widgets disponibles"""
         return [
@@ -6,6 +6,7 @@ Gestión de procesos electorales, jornadas y tipos de elección
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from .services import ElectoralService
+from core.pagination import pagination_args
 from core.permissions import Permission
 
 electoral_bp = Blueprint('electoral', __name__)
@@ -23,12 +24,11 @@ def get_electoral_processes():
         service = ElectoralService(current_app.db_manager)
         
         # Parámetros de consulta
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
+        paginacion = pagination_args(request.args)
         search = request.args.get('search', '')
         status = request.args.get('status', '')
         
-        result = service.get_electoral_processes(page, per_page, search, status)
+        result = service.get_electoral_processes(search=search, status=status, **paginacion)
         return jsonify(result)
         
     except Exception as e:
@@ -184,13 +184,13 @@ def get_electoral_mesas():
         service = ElectoralService(current_app.db_manager)
         
         # Parámetros de consulta
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
+        paginacion = pagination_args(request.args)
         municipio_id = request.args.get('municipio_id', type=int)
         puesto_id = request.args.get('puesto_id', type=int)
         estado = request.args.get('estado', '')
         
-        result = service.get_electoral_mesas(page, per_page, municipio_id, puesto_id, estado)
+        result = service.get_electoral_mesas(municipio_id=municipio_id, puesto_id=puesto_id,
+                                             estado=estado, **paginacion)
         return jsonify(result)
         
     except Exception as e:
@@ -6,16 +6,28 @@ Lógica de negocio para gestión electoral
 import logging
 from datetime import datetime
 
+from core.pagination import TOTAL_EXACTO, ensure_indexes, keyset_paginate
+
 logger = logging.getLogger(__name__)
 
+# Orden de los listados paginados por cursor; la última columna es única
+PROCESSES_ORDER = [("COALESCE(ep.fecha_creacion, '')", 8, True), ('ep.id', 0, True)]
+PROCESSES_INDEXES = ["CREATE INDEX IF NOT EXISTS idx_electoral_processes_fecha_id "
+                     "ON electoral_processes(COALESCE(fecha_creacion, ''), id)"]
+MESAS_ORDER = [('lm.nombre_municipio', 6, False), ('l.nombre_puesto', 5, False),
+               ('me.numero_mesa', 2, False), ('me.id', 0, False)]
+MESAS_INDEXES = ["CREATE INDEX IF NOT EXISTS idx_mesas_electorales_puesto_numero "
+                 "ON mesas_electorales(puesto_id, numero_mesa, id)"]
+
 class ElectoralService:
     """Servicio para gestión electoral"""
     
     def __init__(self, db_manager):
         self.db = db_manager
     
-    def get_electoral_processes(self, page=1, per_page=20, search='', status=''):
-        """Obtener procesos electorales con paginación y filtros"""
+    def get_electoral_processes(self, page=1, per_page=20, search='', status='',
+                                cursor=None, include_total=TOTAL_EXACTO):
+        """Obtener procesos electorales con paginación por cursor y filtros"""
         try:
             base_query = """
                 SELECT 
@@ -26,33 +38,29 @@ class ElectoralService:
                     ep.estado,
                     ej.nombre as jornada_nombre,
                     et.nombre as tipo_eleccion,
-                    ep.activo
+                    ep.activo,
+                    COALESCE(ep.fecha_creacion, '') as fecha_orden
                 FROM electoral_processes ep
                 JOIN electoral_journeys ej ON ep.jornada_electoral_id = ej.id
                 JOIN election_types et ON ep.election_type_id = et.id
             """
             
             conditions = []
+            params = {}
             
             if search:
-                conditions.append(f"(ep.nombre LIKE '%{search}%' OR ej.nombre LIKE '%{search}%')")
+                conditions.append("(ep.nombre LIKE :search OR ej.nombre LIKE :search)")
+                params['search'] = f'%{search}%'
             
             if status:
-                conditions.append(f"ep.estado = '{status}'")
-            
-            if conditions:
-                base_query += " WHERE " + " AND ".join(conditions)
-            
-            base_query += " ORDER BY ep.fecha_creacion DESC"
-            
-            # Paginación
-            offset = (page - 1) * per_page
-            count_query = f"SELECT COUNT(*) FROM ({base_query}) as count_table"
-            total_result = self.db.execute_query(count_query)
-            total = total_result[0][0] if total_result else 0
+                conditions.append("ep.estado = :status")
+                params['status'] = status
             
-            paginated_query = f"{base_query} LIMIT {per_page} OFFSET {offset}"
-            data = self.db.execute_query(paginated_query)
+            ensure_indexes(self.db.execute_update, 'electoral_processes_fecha', PROCESSES_INDEXES)
+            result = keyset_paginate(self.db.execute_query, base_query, PROCESSES_ORDER,
+                                     conditions=conditions, params=params, cursor=cursor,
+                                     per_page=per_page, include_total=include_total, page=page)
+            data = result['data']
             
             processes = [
                 {
@@ -71,12 +79,7 @@ class ElectoralService:
             return {
                 'success': True,
                 'data': processes,
-                'pagination': {
-                    'page': page,
-                    'per_page': per_page,
-                    'total': total,
-                    'pages': (total + per_page - 1) // per_page
-                }
+                'pagination': result['pagination']
             }
             
         except Exception as e:
@@ -278,8 +281,9 @@ class ElectoralService:
             logger.error(f"Get election types error: {e}")
             raise
     
-    def get_electoral_mesas(self, page=1, per_page=20, municipio_id=None, puesto_id=None, estado=''):
-        """Obtener mesas electorales con filtros"""
+    def get_electoral_mesas(self, page=1, per_page=20, municipio_id=None, puesto_id=None, estado='',
+                            cursor=None, include_total=TOTAL_EXACTO):
+        """Obtener mesas electorales con paginación por cursor y filtros"""
         try:
             base_query = """
                 SELECT 
@@ -298,29 +302,25 @@ class ElectoralService:
             """
             
             conditions = []
+            params = {}
             
             if municipio_id:
-                conditions.append(f"lm.id = {municipio_id}")
+                conditions.append("lm.id = :municipio_id")
+                params['municipio_id'] = municipio_id
             
             if puesto_id:
-                conditions.append(f"l.id = {puesto_id}")
+                conditions.append("l.id = :puesto_id")
+                params['puesto_id'] = puesto_id
             
             if estado:
-                conditions.append(f"me.estado_recoleccion = '{estado}'")
-            
-            if conditions:
-                base_query += " WHERE " + " AND ".join(conditions)
+                conditions.append("me.estado_recoleccion = :estado")
+                params['estado'] = estado
             
-            base_query += " ORDER BY lm.nombre_municipio, l.nombre_puesto, me.numero_mesa"
-            
-            # Paginación
-            offset = (page - 1) * per_page
-            count_query = f"SELECT COUNT(*) FROM ({base_query}) as count_table"
-            total_result = self.db.execute_query(count_query)
-            total = total_result[0][0] if total_result else 0
-            
-            paginated_query = f"{base_query} LIMIT {per_page} OFFSET {offset}"
-            data = self.db.execute_query(paginated_query)
+            ensure_indexes(self.db.execute_update, 'mesas_electorales_puesto', MESAS_INDEXES)
+            result = keyset_paginate(self.db.execute_query, base_query, MESAS_ORDER,
+                                     conditions=conditions, params=params, cursor=cursor,
+                                     per_page=per_page, include_total=include_total, page=page)
+            data = result['data']
             
             mesas = [
                 {
@@ -339,12 +339,7 @@ class ElectoralService:
             return {
                 'success': True,
                 'data': mesas,
-                'pagination': {
-                    'page': page,
-                    'per_page': per_page,
-                    'total': total,
-                    'pages': (total + per_page - 1) // per_page
-                }
+                'pagination': result['pagination']
             }
             
         except Exception as e:
@@ -11,12 +11,31 @@ import json
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 
+from core.audit import get_audit_sink
+from core.database import SQLiteConnectionPool, get_connection_pool
+
+EXPORT_LOGS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS export_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        report_type VARCHAR(100) NOT NULL,
+        export_format VARCHAR(50) NOT NULL,
+        success BOOLEAN NOT NULL,
+        exported_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    )
+"""
+
 class ExportService:
     """Servicio para exportación de reportes a diferentes formatos"""
     
-    def __init__(self, db_path: str = 'electoral_system.db'):
+    def __init__(self, db_path: str = 'electoral_system.db',
+                 connection_pool: Optional[SQLiteConnectionPool] = None):
         self.db_path = db_path
+        self.connection_pool = connection_pool or get_connection_pool(db_path)
         self.logger = logging.getLogger(__name__)
+        self.audit_sink = get_audit_sink(self.connection_pool.db_path)
+        self.audit_sink.register_schema(EXPORT_LOGS_SCHEMA)
         
     def export_to_csv(self, data: List[Dict[str, Any]], filename: str = None) -> io.BytesIO:
         """Exportar datos a formato CSV"""
@@ -181,32 +200,13 @@ class ExportService:
         ]
     
     def log_export(self, user_id: int, report_type: str, export_format: str, success: bool):
-        """Registrar exportación en el log"""
+        """Registrar exportación en el log (escritura asíncrona por lotes)"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Crear tabla de logs si no existe
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS export_logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    report_type VARCHAR(100) NOT NULL,
-                    export_format VARCHAR(50) NOT NULL,
-                    success BOOLEAN NOT NULL,
-                    exported_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users(id)
-                )
-            """)
-            
-            cursor.execute("""
+            self.audit_sink.submit("""
                 INSERT INTO export_logs (user_id, report_type, export_format, success)
                 VALUES (?, ?, ?, ?)
             """, (user_id, report_type, export_format, success))
             
-            conn.commit()
-            conn.close()
-            
             self.logger.info(f"Exportación registrada: {report_type} a {export_format} por usuario {user_id}")
             
         except Exception as e:
@@ -215,8 +215,7 @@ class ExportService:
     def get_export_history(self, user_id: int = None, limit: int = 50) -> List[Dict[str, Any]]:
         """Obtener historial de exportaciones"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
+            conn = self.connection_pool.connect(row_factory=sqlite3.Row)
             cursor = conn.cursor()
             
             query = """
@@ -0,0 +1,209 @@
+"""
+Caché de OCR direccionada por contenido
+Guarda la imagen preprocesada y el resultado de procesar_e14 por hash SHA-256
+Sistema Electoral Caquetá
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+OCR_CACHE_DIR = os.environ.get('OCR_CACHE_DIR', os.path.join('cache', 'ocr'))
+OCR_CACHE_MAX_BYTES = int(os.environ.get('OCR_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+OCR_CACHE_ENABLED = os.environ.get('OCR_CACHE_ENABLED', 'true').lower() == 'true'
+
+EXT_IMAGEN = '.npy'
+EXT_RESULTADO = '.json'
+
+
+def hash_contenido(datos: bytes) -> str:
+    """SHA-256 hexadecimal de los bytes de la imagen"""
+    return hashlib.sha256(datos).hexdigest()
+
+
+def version_plantilla(estructura_e14: List[Dict]) -> str:
+    """Versión estable de una plantilla E14 derivada de sus posiciones y zonas"""
+    canonica = json.dumps(estructura_e14, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonica.encode('utf-8')).hexdigest()[:16]
+
+
+class OCRCache:
+    """
+    Caché en disco con desalojo LRU por tamaño total
+
+    Las entradas son archivos ``<hash>.npy`` (imagen binarizada, se abre con
+    memory-map) y ``<hash>-<plantilla>.json`` (resultado OCR). El índice LRU
+    vive en memoria y se reconstruye desde el directorio ordenando por mtime;
+    con varios procesos cada uno aplica el límite sobre lo que ve.
+    """
+
+    def __init__(self, directorio: str = OCR_CACHE_DIR, max_bytes: int = OCR_CACHE_MAX_BYTES):
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()
+        self._total_bytes = 0
+        self.stats = {'hits_imagen': 0, 'hits_resultado': 0, 'misses': 0, 'desalojos': 0}
+
+        os.makedirs(self.directorio, exist_ok=True)
+        self._cargar_indice()
+
+    def _cargar_indice(self):
+        archivos = []
+        for nombre in os.listdir(self.directorio):
+            if not nombre.endswith((EXT_IMAGEN, EXT_RESULTADO)):
+                continue
+            try:
+                info = os.stat(os.path.join(self.directorio, nombre))
+            except OSError:
+                continue
+            archivos.append((info.st_mtime, nombre, info.st_size))
+
+        for _, nombre, tamano in sorted(archivos):
+            self._entradas[nombre] = tamano
+            self._total_bytes += tamano
+
+    def _ruta(self, nombre: str) -> str:
+        return os.path.join(self.directorio, nombre)
+
+    def _tocar(self, nombre: str) -> bool:
+        """Marcar una entrada como usada recientemente; False si ya no existe"""
+        ruta = self._ruta(nombre)
+        if not os.path.exists(ruta):
+            with self._lock:
+                tamano = self._entradas.pop(nombre, None)
+                if tamano is not None:
+                    self._total_bytes -= tamano
+            return False
+
+        try:
+            os.utime(ruta)
+        except OSError:
+            pass
+        with self._lock:
+            if nombre in self._entradas:
+                self._entradas.move_to_end(nombre)
+            else:
+                tamano = os.path.getsize(ruta)
+                self._entradas[nombre] = tamano
+                self._total_bytes += tamano
+        return True
+
+    def _registrar(self, nombre: str, escribir):
+        """Escribir una entrada de forma atómica y desalojar las menos usadas"""
+        ruta = self._ruta(nombre)
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            escribir(temporal)
+            os.replace(temporal, ruta)
+        except OSError as e:
+            logger.warning(f"No se pudo escribir en la caché OCR: {e}")
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            return
+
+        tamano = os.path.getsize(ruta)
+        desalojar = []
+        with self._lock:
+            anterior = self._entradas.pop(nombre, None)
+            if anterior is not None:
+                self._total_bytes -= anterior
+            self._entradas[nombre] = tamano
+            self._total_bytes += tamano
+
+            while self._total_bytes > self.max_bytes and len(self._entradas) > 1:
+                viejo, tamano_viejo = self._entradas.popitem(last=False)
+                self._total_bytes -= tamano_viejo
+                self.stats['desalojos'] += 1
+                desalojar.append(viejo)
+
+        for viejo in desalojar:
+            try:
+                os.remove(self._ruta(viejo))
+            except OSError:
+                pass
+
+    def get_imagen(self, hash_imagen: str) -> Optional[np.ndarray]:
+        """Imagen preprocesada (memory-mapped, solo lectura) o None"""
+        nombre = hash_imagen + EXT_IMAGEN
+        if not self._tocar(nombre):
+            return None
+        try:
+            imagen = np.load(self._ruta(nombre), mmap_mode='r')
+        except (OSError, ValueError) as e:
+            logger.warning(f"Entrada de caché OCR corrupta {nombre}: {e}")
+            return None
+        self.stats['hits_imagen'] += 1
+        return imagen
+
+    def put_imagen(self, hash_imagen: str, imagen: np.ndarray):
+        """Guardar imagen preprocesada"""
+        def escribir(ruta):
+            with open(ruta, 'wb') as f:
+                np.save(f, imagen)
+        self._registrar(hash_imagen + EXT_IMAGEN, escribir)
+
+    def get_resultado(self, hash_imagen: str, plantilla: str) -> Optional[Dict]:
+        """Resultado de procesar_e14 para la imagen y plantilla, o None"""
+        nombre = f"{hash_imagen}-{plantilla}{EXT_RESULTADO}"
+        if not self._tocar(nombre):
+            self.stats['misses'] += 1
+            return None
+        try:
+            with open(self._ruta(nombre), 'r', encoding='utf-8') as f:
+                resultado = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Entrada de caché OCR corrupta {nombre}: {e}")
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits_resultado'] += 1
+        return resultado
+
+    def put_resultado(self, hash_imagen: str, plantilla: str, resultado: Dict):
+        """Guardar resultado de procesar_e14"""
+        def escribir(ruta):
+            with open(ruta, 'w', encoding='utf-8') as f:
+                json.dump(resultado, f, ensure_ascii=False, default=float)
+        self._registrar(f"{hash_imagen}-{plantilla}{EXT_RESULTADO}", escribir)
+
+    def get_stats(self) -> Dict:
+        """Métricas de la caché"""
+        with self._lock:
+            return dict(self.stats, entradas=len(self._entradas), bytes=self._total_bytes,
+                        max_bytes=self.max_bytes)
+
+    def limpiar(self):
+        """Eliminar todas las entradas"""
+        with self._lock:
+            nombres = list(self._entradas)
+            self._entradas.clear()
+            self._total_bytes = 0
+        for nombre in nombres:
+            try:
+                os.remove(self._ruta(nombre))
+            except OSError:
+                pass
+
+
+_ocr_cache = None
+_ocr_cache_lock = threading.Lock()
+
+
+def get_ocr_cache() -> Optional[OCRCache]:
+    """Caché OCR compartida del proceso (None si está deshabilitada)"""
+    global _ocr_cache
+    if not OCR_CACHE_ENABLED:
+        return None
+    if _ocr_cache is None:
+        with _ocr_cache_lock:
+            if _ocr_cache is None:
+                _ocr_cache = OCRCache()
+    return _ocr_cache
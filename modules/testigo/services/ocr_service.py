@@ -3,31 +3,55 @@ Servicio de OCR para procesamiento de formularios E14
 Sistema Electoral Caquetá
 """
 
+import bisect
 import cv2
 import numpy as np
 import pytesseract
 from PIL import Image
 import logging
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 import os
 
+from services.ocr_preprocessing import MODO_COMPLETO, MODO_RAPIDO, modo_para_eleccion, preprocesar_rapido
+from .ocr_cache import OCRCache, get_ocr_cache, hash_contenido, version_plantilla
+
 logger = logging.getLogger(__name__)
 
 class OCRService:
     """Servicio para procesamiento OCR de formularios E14"""
     
-    def __init__(self):
+    # Márgenes en píxeles del montaje usado por el OCR en lote
+    MONTAJE_MARGEN = 10
+    MONTAJE_SEPARACION = 20
+    
+    def __init__(self, cache: Optional[OCRCache] = None):
         # Configurar ruta de Tesseract (ajustar según instalación)
         # Windows: pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-        pass
+        self.cache = cache if cache is not None else get_ocr_cache()
+    
+    def _leer_bytes(self, imagen_path: str) -> bytes:
+        with open(imagen_path, 'rb') as f:
+            return f.read()
     
-    def preprocesar_imagen(self, imagen_path: str) -> np.ndarray:
+    def preprocesar_imagen(self, imagen_path: str, contenido: Optional[bytes] = None) -> np.ndarray:
         """
         Preprocesar imagen para mejorar OCR
+        
+        Si hay caché, la imagen binarizada se reutiliza por hash del contenido
         """
         try:
+            if contenido is None:
+                contenido = self._leer_bytes(imagen_path)
+            
+            hash_imagen = hash_contenido(contenido) if self.cache else None
+            if hash_imagen:
+                imagen_cache = self.cache.get_imagen(hash_imagen)
+                if imagen_cache is not None:
+                    logger.info(f"Imagen preprocesada desde caché: {imagen_path}")
+                    return imagen_cache
+            
             # Cargar imagen
-            imagen = cv2.imread(imagen_path)
+            imagen = cv2.imdecode(np.frombuffer(contenido, dtype=np.uint8), cv2.IMREAD_COLOR)
             
             if imagen is None:
                 raise ValueError(f"No se pudo cargar la imagen: {imagen_path}")
@@ -49,6 +73,9 @@ class OCRService:
             clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
             mejorada = clahe.apply(denoised)
             
+            if hash_imagen:
+                self.cache.put_imagen(hash_imagen, mejorada)
+            
             logger.info(f"Imagen preprocesada exitosamente: {imagen_path}")
             return mejorada
             
@@ -56,6 +83,36 @@ class OCRService:
             logger.error(f"Error preprocesando imagen: {e}")
             raise
     
+    def preprocesar_para_zonas(self, imagen_path: str, zonas: List[Dict], modo: str = MODO_COMPLETO,
+                               contenido: Optional[bytes] = None) -> Tuple[np.ndarray, List[Dict]]:
+        """
+        Preprocesar imagen según el modo y retornar las zonas en sus coordenadas
+        
+        Args:
+            imagen_path: Ruta de la imagen
+            zonas: Zonas OCR de la plantilla
+            modo: 'completo' (imagen original) o 'rapido' (rectificada, DPI fijo,
+                  ruido eliminado solo en las zonas)
+            contenido: Bytes de la imagen si ya fueron leídos
+            
+        Returns:
+            Tuple (imagen preprocesada, zonas ajustadas a esa imagen)
+        """
+        if modo != MODO_RAPIDO:
+            return self.preprocesar_imagen(imagen_path, contenido), zonas
+        
+        if contenido is None:
+            contenido = self._leer_bytes(imagen_path)
+        
+        gris = cv2.imdecode(np.frombuffer(contenido, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+        if gris is None:
+            raise ValueError(f"No se pudo cargar la imagen: {imagen_path}")
+        
+        imagen, zonas_escaladas = preprocesar_rapido(gris, zonas)
+        logger.info(f"Imagen preprocesada (modo rápido) {gris.shape[1]}x{gris.shape[0]} -> "
+                    f"{imagen.shape[1]}x{imagen.shape[0]}: {imagen_path}")
+        return imagen, zonas_escaladas
+    
     def extraer_numero_de_zona(self, imagen: np.ndarray, zona: Dict) -> Tuple[int, float]:
         """
         Extraer número de una zona específica de la imagen
@@ -110,13 +167,95 @@ class OCRService:
             logger.error(f"Error extrayendo número de zona: {e}")
             return 0, 0
     
-    def procesar_e14(self, imagen_path: str, estructura_e14: List[Dict]) -> Dict:
+    def construir_montaje(self, imagen: np.ndarray, zonas: List[Dict]) -> Tuple[np.ndarray, List[Tuple[int, int]]]:
+        """
+        Apilar las zonas de interés en una sola imagen, una por renglón
+        
+        Args:
+            imagen: Imagen preprocesada
+            zonas: Lista de dicts con x, y, width, height
+            
+        Returns:
+            Tuple (montaje, franjas) donde franjas[i] es el rango vertical
+            (inicio, fin) que ocupa la zona i dentro del montaje
+        """
+        rois = [imagen[z['y']:z['y'] + z['height'], z['x']:z['x'] + z['width']] for z in zonas]
+        ancho = max((roi.shape[1] for roi in rois), default=0) + 2 * self.MONTAJE_MARGEN
+        alto = sum(roi.shape[0] + self.MONTAJE_SEPARACION for roi in rois) + self.MONTAJE_SEPARACION
+        
+        # Fondo blanco: las separaciones marcan renglones independientes para Tesseract
+        montaje = np.full((alto, ancho), 255, dtype=imagen.dtype)
+        franjas = []
+        y = self.MONTAJE_SEPARACION
+        for roi in rois:
+            h, w = roi.shape[:2]
+            montaje[y:y + h, self.MONTAJE_MARGEN:self.MONTAJE_MARGEN + w] = roi
+            franjas.append((y, y + h))
+            y += h + self.MONTAJE_SEPARACION
+        
+        return montaje, franjas
+    
+    def extraer_numeros_en_lote(self, imagen: np.ndarray, zonas: List[Dict]) -> List[Tuple[int, float]]:
+        """
+        Extraer los números de todas las zonas con una sola ejecución de Tesseract
+        
+        Args:
+            imagen: Imagen preprocesada
+            zonas: Lista de dicts con x, y, width, height
+            
+        Returns:
+            Lista de tuplas (número_extraído, confianza) en el orden de `zonas`
+        """
+        if not zonas:
+            return []
+        
+        montaje, franjas = self.construir_montaje(imagen, zonas)
+        
+        # psm 6: bloque uniforme, cada zona queda en su propio renglón
+        config = '--psm 6 -c tessedit_char_whitelist=0123456789'
+        datos = pytesseract.image_to_data(
+            montaje,
+            config=config,
+            output_type=pytesseract.Output.DICT
+        )
+        
+        # Asignar cada palabra reconocida a la zona cuya franja contiene su centro
+        inicios = [inicio for inicio, _ in franjas]
+        textos = [[] for _ in zonas]
+        confianzas = [[] for _ in zonas]
+        for i, texto in enumerate(datos['text']):
+            conf = float(datos['conf'][i])
+            if conf <= 0 or not texto.strip():
+                continue
+            centro = datos['top'][i] + datos['height'][i] / 2
+            indice = bisect.bisect_right(inicios, centro) - 1
+            if indice < 0 or centro > franjas[indice][1]:
+                continue
+            textos[indice].append((datos['left'][i], texto))
+            confianzas[indice].append(conf)
+        
+        resultados = []
+        for palabras, confs in zip(textos, confianzas):
+            digitos = ''.join(filter(str.isdigit, ''.join(t for _, t in sorted(palabras))))
+            if digitos:
+                resultados.append((int(digitos), float(np.mean(confs))))
+            else:
+                resultados.append((0, 0))
+        
+        return resultados
+    
+    def procesar_e14(self, imagen_path: str, estructura_e14: List[Dict], modo_lote: bool = True,
+                     tipo_eleccion: Optional[str] = None, modo_preprocesamiento: Optional[str] = None) -> Dict:
         """
         Procesar formulario E14 completo con OCR
         
         Args:
             imagen_path: Ruta de la imagen
             estructura_e14: Lista de posiciones con zonas OCR
+            modo_lote: Reconocer todas las zonas en una sola pasada de Tesseract
+                       (False: un proceso de Tesseract por zona)
+            tipo_eleccion: Define el modo de preprocesamiento configurado
+            modo_preprocesamiento: Forzar 'completo' o 'rapido'
             
         Returns:
             Dict con datos extraídos y métricas
@@ -124,8 +263,35 @@ class OCRService:
         try:
             logger.info(f"Iniciando procesamiento OCR de: {imagen_path}")
             
+            modo = modo_preprocesamiento or modo_para_eleccion(tipo_eleccion)
+            
+            # Reenvíos y revisiones de la misma foto no repiten OpenCV ni Tesseract
+            contenido = self._leer_bytes(imagen_path)
+            if self.cache:
+                hash_imagen = hash_contenido(contenido)
+                plantilla = f"{version_plantilla(estructura_e14)}-{modo}"
+                resultado_cache = self.cache.get_resultado(hash_imagen, plantilla)
+                if resultado_cache is not None:
+                    logger.info(f"Resultado OCR desde caché: {imagen_path}")
+                    resultado_cache['imagen_path'] = imagen_path
+                    return resultado_cache
+            
             # Preprocesar imagen
-            imagen_procesada = self.preprocesar_imagen(imagen_path)
+            imagen_procesada, zonas = self.preprocesar_para_zonas(
+                imagen_path,
+                [posicion['zona_ocr'] for posicion in estructura_e14],
+                modo,
+                contenido
+            )
+            
+            if modo_lote:
+                try:
+                    lecturas = self.extraer_numeros_en_lote(imagen_procesada, zonas)
+                except Exception as e:
+                    logger.warning(f"Fallo OCR en lote, procesando zona por zona: {e}")
+                    lecturas = [self.extraer_numero_de_zona(imagen_procesada, zona) for zona in zonas]
+            else:
+                lecturas = [self.extraer_numero_de_zona(imagen_procesada, zona) for zona in zonas]
             
             # Extraer datos de cada posición
             resultados = []
@@ -133,13 +299,7 @@ class OCRService:
             confianzas = []
             advertencias = []
             
-            for posicion in estructura_e14:
-                # Extraer número de la zona
-                votos, confianza = self.extraer_numero_de_zona(
-                    imagen_procesada, 
-                    posicion['zona_ocr']
-                )
-                
+            for posicion, (votos, confianza) in zip(estructura_e14, lecturas):
                 # Construir resultado
                 resultado = {
                     'posicion': posicion['posicion'],
@@ -170,9 +330,13 @@ class OCRService:
                 'total_votos': total_votos,
                 'confianza_promedio': round(confianza_promedio, 2),
                 'advertencias': advertencias,
-                'num_posiciones': len(resultados)
+                'num_posiciones': len(resultados),
+                'modo_preprocesamiento': modo
             }
             
+            if self.cache:
+                self.cache.put_resultado(hash_imagen, plantilla, resultado_final)
+            
             logger.info(f"OCR completado. Confianza promedio: {confianza_promedio:.2f}%")
             return resultado_final
             
@@ -0,0 +1,208 @@
+"""
+Escritor asíncrono de sesiones de autenticación
+Las inserciones en user_sessions (y las actualizaciones de ultimo_login y
+de logout) se encolan desde los hilos web y un único hilo escritor las
+aplica por lotes, una transacción por lote. A diferencia del sink de
+auditoría (core.audit), esta cola no descarta: de estas filas depende la
+revocación de tokens.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from core.database import SQLiteConnectionPool, get_connection_pool
+from .token_registry import USER_SESSIONS_SCHEMA
+
+logger = logging.getLogger(__name__)
+
+AUTH_LOGS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS auth_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        username VARCHAR(100),
+        action VARCHAR(50),
+        ip_address VARCHAR(45),
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        success BOOLEAN,
+        details TEXT
+    )
+"""
+
+
+class AuthEventWriter:
+    """Cola de escrituras de autenticación con group commit"""
+
+    def __init__(self, db_path: str = 'electoral_system_prod.db',
+                 connection_pool: Optional[SQLiteConnectionPool] = None,
+                 batch_size: Optional[int] = None, max_wait_ms: Optional[int] = None):
+        self.db_path = db_path
+        self.connection_pool = connection_pool or get_connection_pool(db_path)
+        self.batch_size = batch_size or int(os.environ.get('AUTH_EVENTOS_LOTE', '500'))
+        self.max_wait = (max_wait_ms or int(os.environ.get('AUTH_EVENTOS_ESPERA_MS', '100'))) / 1000.0
+        self.logger = logging.getLogger(__name__)
+
+        self._queue = queue.Queue()
+        self._start_lock = threading.Lock()
+        self._pendientes = 0
+        self._pendientes_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._started = False
+        self.stats = {'encolados': 0, 'escritos': 0, 'descartados': 0, 'lotes': 0}
+
+    # ==================== CICLO DE VIDA ====================
+
+    def start(self):
+        """Crear tablas e iniciar el hilo escritor"""
+        with self._start_lock:
+            if self._started:
+                return
+
+            conn = self.connection_pool.connect()
+            try:
+                conn.execute(USER_SESSIONS_SCHEMA)
+                conn.execute(AUTH_LOGS_SCHEMA)
+                conn.commit()
+            finally:
+                conn.close()
+
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='auth-eventos', daemon=True)
+            self._thread.start()
+            self._started = True
+
+    def shutdown(self, timeout: float = 10.0):
+        """Vaciar la cola y detener el hilo escritor"""
+        if not self._started:
+            return
+        self._stop.set()
+        self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._started = False
+
+    def wait_idle(self, timeout: float = 30.0) -> bool:
+        """Esperar a que todo lo encolado quede escrito (pruebas/apagado)"""
+        limite = time.monotonic() + timeout
+        while time.monotonic() < limite:
+            with self._pendientes_lock:
+                if self._pendientes == 0:
+                    return True
+            time.sleep(0.005)
+        return False
+
+    def submit(self, sql: str, params: Sequence):
+        """Encolar una sentencia; se ejecuta en el siguiente lote en orden de llegada"""
+        if not self._started:
+            self.start()
+        with self._pendientes_lock:
+            self._pendientes += 1
+            self.stats['encolados'] += 1
+        self._queue.put((sql, tuple(params)))
+
+    # ==================== ESCRITURA POR LOTES ====================
+
+    def _run(self):
+        while True:
+            entrada = self._queue.get()
+            if entrada is None:
+                if self._stop.is_set() and self._queue.empty():
+                    break
+                continue
+
+            lote = [entrada]
+            limite = time.monotonic() + self.max_wait
+            while len(lote) < self.batch_size:
+                restante = limite - time.monotonic()
+                try:
+                    siguiente = self._queue.get(timeout=restante) if restante > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if siguiente is None:
+                    self._queue.put(None)
+                    break
+                lote.append(siguiente)
+
+            escritos = self._flush(lote)
+            with self._pendientes_lock:
+                self._pendientes -= len(lote)
+                self.stats['escritos'] += escritos
+                self.stats['descartados'] += len(lote) - escritos
+                self.stats['lotes'] += 1
+
+    @staticmethod
+    def _agrupar(lote: List[Tuple[str, tuple]]) -> List[Tuple[str, List[tuple]]]:
+        """Sentencias consecutivas iguales se ejecutan con un solo executemany"""
+        grupos = []
+        for sql, params in lote:
+            if grupos and grupos[-1][0] == sql:
+                grupos[-1][1].append(params)
+            else:
+                grupos.append((sql, [params]))
+        return grupos
+
+    def _flush(self, lote: List[Tuple[str, tuple]]) -> int:
+        """Escribir un lote en una transacción; si falla, uno por uno. Retorna los escritos"""
+        for intento in range(5):
+            conn = self.connection_pool.connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                for sql, filas in self._agrupar(lote):
+                    conn.executemany(sql, filas)
+                conn.commit()
+                return len(lote)
+            except sqlite3.OperationalError as e:
+                conn.rollback()
+                if 'locked' in str(e) and intento < 4:
+                    time.sleep(0.05 * (2 ** intento))
+                    continue
+                break
+            except sqlite3.DatabaseError:
+                conn.rollback()
+                break
+            finally:
+                conn.close()
+
+        # Un registro inválido no debe perder el resto del lote
+        escritos = 0
+        conn = self.connection_pool.connect()
+        try:
+            for sql, params in lote:
+                try:
+                    conn.execute(sql, params)
+                    conn.commit()
+                    escritos += 1
+                except sqlite3.Error as e:
+                    conn.rollback()
+                    self.logger.error(f"Error escribiendo evento de autenticación: {e}")
+        finally:
+            conn.close()
+        return escritos
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._pendientes_lock:
+            return dict(self.stats, pendientes=self._pendientes)
+
+
+_writers: Dict[str, AuthEventWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_auth_event_writer(db_path: str = 'electoral_system_prod.db') -> AuthEventWriter:
+    """Escritor de eventos de autenticación compartido por base de datos"""
+    clave = os.path.abspath(db_path)
+    writer = _writers.get(clave)
+    if writer is None:
+        with _writers_lock:
+            writer = _writers.get(clave)
+            if writer is None:
+                writer = AuthEventWriter(db_path)
+                _writers[clave] = writer
+                atexit.register(writer.shutdown)
+    return writer
@@ -1,32 +1,62 @@
 """
 Servicio de Autenticación
 Sistema de Recolección Inicial de Votaciones - Caquetá
+
+validate_token verifica la firma del JWT (una vez por token, luego desde una
+caché acotada) y consulta el estado del usuario y de la sesión en
+TokenRegistry, en memoria; las sesiones se escriben por lotes con
+AuthEventWriter y los registros de login/logout con el sink de auditoría.
+AUTH_TOKEN_VALIDATION=base_datos restaura la consulta a users por token.
 """
 
+import os
 import sqlite3
 import logging
+import threading
+import time
 import jwt
 import hashlib
 from datetime import datetime, timedelta
 from typing import Dict, Optional, Any, List
 from werkzeug.security import check_password_hash
 
+from core.audit import AuditLogSink, get_audit_sink
+from core.database import SQLiteConnectionPool, get_connection_pool
 from ..models import LoginData, AuthToken, SessionData
+from .auth_event_writer import AUTH_LOGS_SCHEMA, AuthEventWriter, get_auth_event_writer
+from .token_registry import TokenRegistry, get_token_registry, hash_token
+
+VALIDACION_MEMORIA = 'memoria'
+VALIDACION_BASE_DATOS = 'base_datos'
 
 class AuthService:
     """Servicio para autenticación y gestión de sesiones"""
     
-    def __init__(self, db_path: str = 'electoral_system_prod.db', secret_key: str = 'electoral_secret_key_production_2024'):
+    def __init__(self, db_path: str = 'electoral_system_prod.db', secret_key: str = 'electoral_secret_key_production_2024',
+                 connection_pool: Optional[SQLiteConnectionPool] = None,
+                 token_registry: Optional[TokenRegistry] = None,
+                 event_writer: Optional[AuthEventWriter] = None,
+                 audit_sink: Optional[AuditLogSink] = None,
+                 validation_mode: Optional[str] = None):
         self.db_path = db_path
+        self.connection_pool = connection_pool or get_connection_pool(db_path)
         self.secret_key = secret_key
         self.logger = logging.getLogger(__name__)
+        self.token_registry = token_registry or get_token_registry(db_path)
+        self.event_writer = event_writer or get_auth_event_writer(db_path)
+        self.audit_sink = audit_sink or get_audit_sink(db_path)
+        self.audit_sink.register_schema(AUTH_LOGS_SCHEMA)
+        self.validation_mode = validation_mode or os.environ.get('AUTH_TOKEN_VALIDATION', VALIDACION_MEMORIA)
+        
+        # token -> (payload, hash del token) de firmas ya verificadas
+        self.token_cache_size = int(os.environ.get('AUTH_TOKEN_CACHE_SIZE', '50000'))
+        self._tokens_verificados = {}
+        self._tokens_lock = threading.Lock()
+        self._columna_ultimo_login = None
         
     def get_connection(self) -> sqlite3.Connection:
-        """Obtener conexión a la base de datos"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        conn.execute("PRAGMA foreign_keys = ON")
-        return conn
+        """Obtener conexión del pool compartido"""
+        return self.connection_pool.connect(row_factory=sqlite3.Row, foreign_keys=True)
     
     def authenticate_user(self, login_data: LoginData) -> Dict[str, Any]:
         """Autenticar usuario con credenciales"""
@@ -42,9 +72,9 @@ class AuthService:
             """, (login_data.username, login_data.username))
             
             user = cursor.fetchone()
+            conn.close()
             
             if not user:
-                conn.close()
                 return {
                     'success': False,
                     'error': 'Usuario no encontrado'
@@ -53,7 +83,6 @@ class AuthService:
             # Verificar contraseña (usando SHA256)
             password_hash = hashlib.sha256(login_data.password.encode()).hexdigest()
             if user['password_hash'] != password_hash:
-                conn.close()
                 self._log_failed_login(login_data.username, login_data.ip_address)
                 return {
                     'success': False,
@@ -70,18 +99,14 @@ class AuthService:
             
             token = jwt.encode(token_data, self.secret_key, algorithm='HS256')
             
-            # Actualizar último login
-            cursor.execute("""
-                UPDATE users SET ultimo_login = ? WHERE id = ?
-            """, (datetime.now(), user['id']))
+            # Actualizar último login, crear sesión y registrar el login (escritura por lotes)
+            if self._tiene_ultimo_login():
+                self.event_writer.submit("""
+                    UPDATE users SET ultimo_login = ? WHERE id = ?
+                """, (datetime.now(), user['id']))
             
-            # Crear sesión
             session_id = self._create_session(user['id'], token, login_data.ip_address, login_data.user_agent)
             
-            conn.commit()
-            conn.close()
-            
-            # Registrar login exitoso
             self._log_successful_login(user['id'], login_data.ip_address)
             
             return {
@@ -107,6 +132,13 @@ class AuthService:
     def validate_token(self, token: str) -> Optional[Dict[str, Any]]:
         """Validar token JWT"""
         try:
+            if self.validation_mode != VALIDACION_BASE_DATOS:
+                # Usuario activo y sesión no cerrada, sin consultar la base de datos
+                payload, token_hash = self._decode_token(token)
+                if not self.token_registry.is_valid(payload['user_id'], token_hash):
+                    return None
+                return dict(payload)
+            
             payload = jwt.decode(token, self.secret_key, algorithms=['HS256'])
             
             # Verificar que el usuario sigue activo
@@ -135,40 +167,56 @@ class AuthService:
             self.logger.error(f"Error validando token: {e}")
             return None    
 
+    def _decode_token(self, token: str):
+        """Payload y hash de un token con firma válida; la verificación se guarda por token"""
+        verificado = self._tokens_verificados.get(token)
+        if verificado is not None:
+            if verificado[0]['exp'] <= time.time():
+                raise jwt.ExpiredSignatureError('Signature has expired')
+            return verificado
+        
+        payload = jwt.decode(token, self.secret_key, algorithms=['HS256'])
+        verificado = (payload, hash_token(token))
+        with self._tokens_lock:
+            if len(self._tokens_verificados) >= self.token_cache_size:
+                # Descartar el más antiguo (orden de inserción)
+                self._tokens_verificados.pop(next(iter(self._tokens_verificados)), None)
+            self._tokens_verificados[token] = verificado
+        return verificado
+    
+    def _tiene_ultimo_login(self) -> bool:
+        """Si users tiene la columna ultimo_login (no existe en todos los esquemas)"""
+        if self._columna_ultimo_login is None:
+            conn = self.get_connection()
+            try:
+                columnas = {row['name'] for row in conn.execute("PRAGMA table_info(users)")}
+            finally:
+                conn.close()
+            self._columna_ultimo_login = 'ultimo_login' in columnas
+        return self._columna_ultimo_login
+    
     def logout_user(self, token: str, user_id: int) -> Dict[str, Any]:
         """Cerrar sesión de usuario"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            # Buscar sesión por token hash y user_id
-            token_hash = hashlib.sha256(token.encode()).hexdigest()
+            # Buscar sesión por token hash y user_id; el token queda revocado de inmediato
+            token_hash = hash_token(token)
+            self.token_registry.revoke(token_hash)
             
-            cursor.execute("""
+            self.event_writer.submit("""
                 UPDATE user_sessions 
                 SET active = 0, logout_time = ?
                 WHERE token_hash = ? AND user_id = ? AND active = 1
             """, (datetime.now(), token_hash, user_id))
             
-            rows_affected = cursor.rowcount
-            conn.commit()
-            conn.close()
-            
             # Registrar logout
             self._log_logout(user_id)
             
-            if rows_affected > 0:
-                return {
-                    'success': True,
-                    'message': 'Sesión cerrada exitosamente'
-                }
-            else:
-                # Aunque no se encuentre la sesión en BD, el logout es exitoso
-                # porque el token ya no será válido en el cliente
-                return {
-                    'success': True,
-                    'message': 'Sesión cerrada exitosamente'
-                }
+            # Aunque no se encuentre la sesión en BD, el logout es exitoso
+            # porque el token ya no será válido
+            return {
+                'success': True,
+                'message': 'Sesión cerrada exitosamente'
+            }
             
         except Exception as e:
             self.logger.error(f"Error cerrando sesión: {e}")
@@ -252,40 +300,18 @@ class AuthService:
             return []
     
     def _create_session(self, user_id: int, token: str, ip_address: str, user_agent: str) -> str:
-        """Crear nueva sesión"""
+        """Crear nueva sesión (la inserción se escribe en el siguiente lote)"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            # Crear tabla de sesiones si no existe
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS user_sessions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    session_id VARCHAR(255) UNIQUE NOT NULL,
-                    user_id INTEGER NOT NULL,
-                    token_hash VARCHAR(255),
-                    ip_address VARCHAR(45),
-                    user_agent TEXT,
-                    login_time DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    logout_time DATETIME,
-                    active BOOLEAN DEFAULT 1,
-                    FOREIGN KEY (user_id) REFERENCES users(id)
-                )
-            """)
-            
             # Generar session_id único
             session_id = hashlib.sha256(f"{user_id}_{datetime.now().isoformat()}_{ip_address or 'unknown'}".encode()).hexdigest()
-            token_hash = hashlib.sha256(token.encode()).hexdigest()
+            token_hash = hash_token(token)
             
-            cursor.execute("""
+            self.event_writer.submit("""
                 INSERT INTO user_sessions 
                 (session_id, user_id, token_hash, ip_address, user_agent, login_time, active)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
             """, (session_id, user_id, token_hash, ip_address, user_agent, datetime.now(), True))
             
-            conn.commit()
-            conn.close()
-            
             return session_id
             
         except Exception as e:
@@ -295,65 +321,33 @@ class AuthService:
     def _log_successful_login(self, user_id: int, ip_address: str):
         """Registrar login exitoso"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            # Crear tabla de logs si no existe
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS auth_logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    username VARCHAR(100),
-                    action VARCHAR(50),
-                    ip_address VARCHAR(45),
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    success BOOLEAN,
-                    details TEXT
-                )
-            """)
-            
-            cursor.execute("""
+            self.audit_sink.submit("""
                 INSERT INTO auth_logs (user_id, action, ip_address, timestamp, success)
                 VALUES (?, ?, ?, ?, ?)
             """, (user_id, 'login', ip_address, datetime.now(), True))
             
-            conn.commit()
-            conn.close()
-            
         except Exception as e:
             self.logger.error(f"Error registrando login exitoso: {e}")
     
     def _log_failed_login(self, username: str, ip_address: str):
         """Registrar intento de login fallido"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
+            self.audit_sink.submit("""
                 INSERT INTO auth_logs (username, action, ip_address, timestamp, success, details)
                 VALUES (?, ?, ?, ?, ?, ?)
             """, (username, 'login_failed', ip_address, datetime.now(), False, 'Credenciales incorrectas'))
             
-            conn.commit()
-            conn.close()
-            
         except Exception as e:
             self.logger.error(f"Error registrando login fallido: {e}")
     
     def _log_logout(self, user_id: int):
         """Registrar logout"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
+            self.audit_sink.submit("""
                 INSERT INTO auth_logs (user_id, action, timestamp, success)
                 VALUES (?, ?, ?, ?)
             """, (user_id, 'logout', datetime.now(), True))
             
-            conn.commit()
-            conn.close()
-            
         except Exception as e:
             self.logger.error(f"Error registrando logout: {e}")
     
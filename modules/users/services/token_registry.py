@@ -0,0 +1,195 @@
+"""
+Registro en memoria de usuarios activos y tokens revocados
+Permite validar tokens JWT solo con CPU: la firma se verifica con PyJWT y el
+estado del usuario y de la sesión se consulta en conjuntos en memoria.
+
+Los cambios en users.activo y en user_sessions.active (desde este proceso,
+desde otros procesos o desde scripts) incrementan auth_estado_version
+mediante triggers; el registro compara esa versión como máximo cada
+AUTH_REGISTRY_CHECK_INTERVAL segundos y se recarga si cambió. Los logout
+hechos por AuthService se aplican además de inmediato.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from core.database import SQLiteConnectionPool, get_connection_pool
+
+logger = logging.getLogger(__name__)
+
+AUTH_REGISTRY_CHECK_INTERVAL = float(os.environ.get('AUTH_REGISTRY_CHECK_INTERVAL', '5'))
+
+# Vigencia de los tokens emitidos por AuthService; las sesiones cerradas más
+# antiguas ya no pueden tener tokens válidos y no se cargan
+TOKEN_VIGENCIA_HORAS = 8
+
+USER_SESSIONS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS user_sessions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id VARCHAR(255) UNIQUE NOT NULL,
+        user_id INTEGER NOT NULL,
+        token_hash VARCHAR(255),
+        ip_address VARCHAR(45),
+        user_agent TEXT,
+        login_time DATETIME DEFAULT CURRENT_TIMESTAMP,
+        logout_time DATETIME,
+        active BOOLEAN DEFAULT 1,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    )
+"""
+
+AUTH_VERSION_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS auth_estado_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    "INSERT OR IGNORE INTO auth_estado_version (id, version) VALUES (1, 0)",
+    "CREATE INDEX IF NOT EXISTS idx_user_sessions_cerradas ON user_sessions(active, login_time)"
+]
+
+_INCREMENTAR = "UPDATE auth_estado_version SET version = version + 1 WHERE id = 1;"
+
+AUTH_VERSION_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_auth_version_users_{nombre}
+    AFTER {evento} ON users
+    BEGIN
+        {_INCREMENTAR}
+    END
+    """
+    for nombre, evento in (('insert', 'INSERT'), ('delete', 'DELETE'), ('update', 'UPDATE OF id, activo'))
+] + [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_auth_version_sesiones_update
+    AFTER UPDATE OF active, token_hash ON user_sessions
+    BEGIN
+        {_INCREMENTAR}
+    END
+    """
+]
+
+
+def hash_token(token: str) -> str:
+    """Hash con el que se guardan los tokens en user_sessions"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class TokenRegistry:
+    """Usuarios activos y tokens revocados de una base de datos"""
+
+    def __init__(self, db_path: str = 'electoral_system_prod.db',
+                 connection_pool: Optional[SQLiteConnectionPool] = None,
+                 check_interval: Optional[float] = None):
+        self.db_path = db_path
+        self.connection_pool = connection_pool or get_connection_pool(db_path)
+        self.check_interval = AUTH_REGISTRY_CHECK_INTERVAL if check_interval is None else check_interval
+        self.logger = logging.getLogger(__name__)
+
+        # Conjuntos inmutables: una recarga arma conjuntos nuevos y reemplaza la referencia
+        self._usuarios_activos = frozenset()
+        self._tokens_revocados = frozenset()
+        # Logout aún no escritos por el escritor asíncrono: token_hash -> expiración
+        self._revocados_locales = {}
+        self._version = None
+        self._ultima_verificacion = 0.0
+        self._lock = threading.Lock()
+        self.stats = {'recargas': 0}
+
+    def get_connection(self) -> sqlite3.Connection:
+        """Obtener conexión del pool compartido"""
+        return self.connection_pool.connect(row_factory=sqlite3.Row)
+
+    def _ensure_schema(self, conn: sqlite3.Connection):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(USER_SESSIONS_SCHEMA)
+            for sentencia in AUTH_VERSION_SCHEMA + AUTH_VERSION_TRIGGERS:
+                conn.execute(sentencia)
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+
+    def _reload_locked(self, conn: sqlite3.Connection, version: int):
+        desde = datetime.now() - timedelta(hours=TOKEN_VIGENCIA_HORAS)
+        self._usuarios_activos = frozenset(
+            row[0] for row in conn.execute("SELECT id FROM users WHERE activo = 1"))
+        ahora = time.monotonic()
+        self._revocados_locales = {t: expira for t, expira in self._revocados_locales.items() if expira > ahora}
+        self._tokens_revocados = frozenset(row[0] for row in conn.execute("""
+            SELECT token_hash FROM user_sessions
+            WHERE active = 0 AND token_hash IS NOT NULL AND login_time >= ?
+        """, (desde,))).union(self._revocados_locales)
+        self._version = version
+        self.stats['recargas'] += 1
+        self.logger.info(
+            f"Registro de tokens cargado (versión {version}): {len(self._usuarios_activos)} usuarios activos, "
+            f"{len(self._tokens_revocados)} tokens revocados")
+
+    def refresh(self, force: bool = False):
+        """Recargar si la versión cambió; como máximo cada check_interval segundos"""
+        if not force and self._version is not None and \
+                time.monotonic() - self._ultima_verificacion < self.check_interval:
+            return
+
+        if self._version is not None and not self._lock.acquire(blocking=False):
+            # Otro hilo ya está verificando: usar los conjuntos actuales
+            return
+        if self._version is None:
+            self._lock.acquire()
+
+        try:
+            conn = self.get_connection()
+            try:
+                if self._version is None:
+                    self._ensure_schema(conn)
+                version = conn.execute("SELECT version FROM auth_estado_version WHERE id = 1").fetchone()[0]
+                if force or version != self._version:
+                    self._reload_locked(conn, version)
+            finally:
+                conn.close()
+            self._ultima_verificacion = time.monotonic()
+        finally:
+            self._lock.release()
+
+    def is_valid(self, user_id: int, token_hash: str) -> bool:
+        """Usuario activo y token no revocado, sin consultar la base de datos"""
+        self.refresh()
+        return user_id in self._usuarios_activos and token_hash not in self._tokens_revocados
+
+    # ==================== EVENTOS DE CAMBIO ====================
+
+    def revoke(self, token_hash: str):
+        """Marcar un token como revocado (logout) antes de que se escriba en la base"""
+        with self._lock:
+            self._revocados_locales[token_hash] = time.monotonic() + TOKEN_VIGENCIA_HORAS * 3600
+            self._tokens_revocados = self._tokens_revocados | {token_hash}
+
+    def get_stats(self) -> Dict[str, int]:
+        return dict(self.stats, version=self._version, usuarios_activos=len(self._usuarios_activos),
+                    tokens_revocados=len(self._tokens_revocados))
+
+
+_registries: Dict[str, TokenRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_token_registry(db_path: str = 'electoral_system_prod.db') -> TokenRegistry:
+    """Registro de tokens compartido por base de datos"""
+    clave = os.path.abspath(db_path)
+    registry = _registries.get(clave)
+    if registry is None:
+        with _registries_lock:
+            registry = _registries.get(clave)
+            if registry is None:
+                registry = TokenRegistry(db_path)
+                _registries[clave] = registry
+    return registry
@@ -10,21 +10,22 @@ from datetime import datetime
 from typing import Dict, List, Optional, Any
 from werkzeug.security import generate_password_hash, check_password_hash
 
+from core.database import SQLiteConnectionPool, get_connection_pool
+from core.permissions import invalidate_user_permissions
 from ..models import UserData, UserProfile, PasswordChangeData, UserActivity
 
 class UserService:
     """Servicio para gestión de usuarios del sistema"""
     
-    def __init__(self, db_path: str = 'electoral_system_prod.db'):
+    def __init__(self, db_path: str = 'electoral_system_prod.db',
+                 connection_pool: Optional[SQLiteConnectionPool] = None):
         self.db_path = db_path
+        self.connection_pool = connection_pool or get_connection_pool(db_path)
         self.logger = logging.getLogger(__name__)
         
     def get_connection(self) -> sqlite3.Connection:
-        """Obtener conexión a la base de datos"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        conn.execute("PRAGMA foreign_keys = ON")
-        return conn
+        """Obtener conexión del pool compartido"""
+        return self.connection_pool.connect(row_factory=sqlite3.Row, foreign_keys=True)
     
     # ==================== GESTIÓN DE USUARIOS ====================
     
@@ -182,6 +183,7 @@ class UserService:
                 cursor.execute(query, params)
                 
                 conn.commit()
+                invalidate_user_permissions(user_id)
             
             conn.close()
             
@@ -246,6 +248,7 @@ class UserService:
             
             conn.commit()
             conn.close()
+            invalidate_user_permissions(password_data.user_id)
             
             # Registrar actividad
             self.log_user_activity(password_data.user_id, 'password_change', 'Contraseña cambiada')
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Verificar y reconstruir los agregados incrementales de consolidación E-24
+Compara agregados_e14_municipio (e14_capturas) y votos_candidato_agregados
+(datos_ocr_e14) con un recálculo completo
+
+Uso:
+    python reconstruir_agregados_e24.py              # verificar y corregir
+    python reconstruir_agregados_e24.py --verificar  # solo verificar (código 1 si difiere)
+"""
+
+import argparse
+import sys
+
+from services.municipal_coordination_service import MunicipalCoordinationService
+from services.vote_aggregation_service import VoteAggregationService
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Verificar/reconstruir agregados E-24')
+    parser.add_argument('--db', default='caqueta_electoral.db')
+    parser.add_argument('--verificar', action='store_true', help='Solo verificar, sin reconstruir')
+    args = parser.parse_args()
+
+    consolidacion = MunicipalCoordinationService(args.db).rebuild_e14_aggregates(verify_only=args.verificar)
+    votos = VoteAggregationService(args.db).rebuild(verify_only=args.verificar)
+
+    print("=" * 60)
+    print("AGREGADOS INCREMENTALES E-24")
+    print("=" * 60)
+    print(f"Municipios con E-14 confirmados: {consolidacion['municipios']}")
+    print(f"Filas de votos por candidato y nivel: {votos['filas']}")
+
+    codigo = 0
+    for nombre, resultado in (('consolidación municipal', consolidacion), ('votos por candidato', votos)):
+        if resultado['consistente']:
+            print(f"✅ {nombre}: coincide con el recálculo completo")
+            continue
+
+        print(f"⚠️  {nombre}: {len(resultado['diferencias'])} diferencias")
+        for diferencia in resultado['diferencias'][:20]:
+            print(f"   {diferencia}")
+
+        if resultado['reconstruido']:
+            print(f"✅ {nombre}: reconstruido desde las capturas")
+        else:
+            codigo = 1
+    return codigo
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -12,19 +12,21 @@ from typing import Dict, List, Optional, Any, Tuple
 import os
 import logging
 
+from core.database import SQLiteConnectionPool, get_connection_pool
+from services.search_index_service import get_search_index, match_terms
+
 class AdminPanelService:
     """Servicio principal para el panel de administración electoral"""
     
-    def __init__(self, db_path: str = 'caqueta_electoral.db'):
+    def __init__(self, db_path: str = 'caqueta_electoral.db',
+                 connection_pool: Optional[SQLiteConnectionPool] = None):
         self.db_path = db_path
+        self.connection_pool = connection_pool or get_connection_pool(db_path)
         self.logger = logging.getLogger(__name__)
         
     def get_connection(self) -> sqlite3.Connection:
-        """Obtener conexión a la base de datos"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # Para acceso por nombre de columna
-        conn.execute("PRAGMA foreign_keys = ON")
-        return conn
+        """Obtener conexión del pool compartido"""
+        return self.connection_pool.connect(row_factory=sqlite3.Row, foreign_keys=True)
     
     # ==================== GESTIÓN DE CANDIDATOS ====================
     
@@ -69,9 +71,15 @@ class AdminPanelService:
                     params.append(filters['estado'])
                 
                 if filters.get('search'):
-                    query += " AND (c.nombre_completo LIKE ? OR c.cedula LIKE ?)"
-                    search_term = f"%{filters['search']}%"
-                    params.extend([search_term, search_term])
+                    # Índice FTS5 (sin tildes, por prefijo); LIKE si no está disponible
+                    match = match_terms(filters['search'])
+                    if match and get_search_index(self.db_path).has_index('candidatos'):
+                        query += " AND c.id IN (SELECT rowid FROM candidatos_fts WHERE candidatos_fts MATCH ?)"
+                        params.append(match)
+                    else:
+                        query += " AND (c.nombre_completo LIKE ? OR c.cedula LIKE ?)"
+                        search_term = f"%{filters['search']}%"
+                        params.extend([search_term, search_term])
             
             query += " ORDER BY c.nombre_completo"
             
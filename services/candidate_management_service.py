@@ -11,10 +11,41 @@ from datetime import datetime
 from typing import List, Dict, Optional, Tuple, Any
 from dataclasses import dataclass
 
+from core.database import SQLiteConnectionPool, get_connection_pool
+from core.pagination import ensure_indexes, keyset_paginate
+from services.search_index_service import fts_table, get_search_index, match_expression
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+CANDIDATE_INSERT_SQL = '''
+INSERT INTO candidates 
+(nombre_completo, cedula, numero_tarjeton, cargo_aspirado, election_type_id,
+ circunscripcion, party_id, coalition_id, es_independiente, foto_url,
+ biografia, propuestas, experiencia, activo, habilitado_oficialmente, creado_por)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+CANDIDATE_LIST_SQL = '''
+SELECT c.*, 
+       et.nombre as election_type_name,
+       pp.nombre_oficial as party_name,
+       pp.siglas as party_siglas,
+       co.nombre_coalicion as coalition_name
+FROM candidates c
+LEFT JOIN election_types et ON c.election_type_id = et.id
+LEFT JOIN political_parties pp ON c.party_id = pp.id
+LEFT JOIN coalitions co ON c.coalition_id = co.id
+'''
+
+# Listado de candidatos por cursor: mismo orden que get_candidates con el id como desempate
+CANDIDATES_ORDER = [('c.numero_tarjeton', 'numero_tarjeton', False),
+                    ('c.nombre_completo', 'nombre_completo', False),
+                    ('c.id', 'id', False)]
+CANDIDATES_INDEXES = ["CREATE INDEX IF NOT EXISTS idx_candidates_tarjeton_nombre_id "
+                      "ON candidates(numero_tarjeton, nombre_completo, id)"]
+
 @dataclass
 class PoliticalPartyData:
     """Clase para datos de partido político"""
@@ -59,15 +90,15 @@ class CandidateData:
 class CandidateManagementService:
     """Servicio para gestión completa de candidatos, partidos y coaliciones"""
     
-    def __init__(self, db_path: str = 'electoral_system.db'):
+    def __init__(self, db_path: str = 'electoral_system.db',
+                 connection_pool: Optional[SQLiteConnectionPool] = None):
         self.db_path = db_path
+        self.connection_pool = connection_pool or get_connection_pool(db_path)
         self.logger = logger
     
     def get_connection(self) -> sqlite3.Connection:
-        """Obtener conexión a la base de datos"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+        """Obtener conexión del pool compartido"""
+        return self.connection_pool.connect(row_factory=sqlite3.Row)
     
     # ==================== GESTIÓN DE PARTIDOS POLÍTICOS ====================
     
@@ -376,30 +407,7 @@ class CandidateManagementService:
             conn = self.get_connection()
             cursor = conn.cursor()
             
-            cursor.execute('''
-            INSERT INTO candidates 
-            (nombre_completo, cedula, numero_tarjeton, cargo_aspirado, election_type_id,
-             circunscripcion, party_id, coalition_id, es_independiente, foto_url,
-             biografia, propuestas, experiencia, activo, habilitado_oficialmente, creado_por)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                candidate_data.nombre_completo,
-                candidate_data.cedula,
-                candidate_data.numero_tarjeton,
-                candidate_data.cargo_aspirado,
-                candidate_data.election_type_id,
-                candidate_data.circunscripcion,
-                candidate_data.party_id,
-                candidate_data.coalition_id,
-                candidate_data.es_independiente,
-                candidate_data.foto_url,
-                candidate_data.biografia,
-                candidate_data.propuestas,
-                candidate_data.experiencia,
-                candidate_data.activo,
-                candidate_data.habilitado_oficialmente,
-                created_by
-            ))
+            cursor.execute(CANDIDATE_INSERT_SQL, self._candidate_values(candidate_data, created_by))
             
             candidate_id = cursor.lastrowid
             conn.commit()
@@ -420,6 +428,28 @@ class CandidateManagementService:
                 'error': f'Error de base de datos: {str(e)}'
             }
     
+    @staticmethod
+    def _candidate_values(candidate_data: CandidateData, created_by: Optional[int]) -> tuple:
+        """Parámetros de CANDIDATE_INSERT_SQL"""
+        return (
+            candidate_data.nombre_completo,
+            candidate_data.cedula,
+            candidate_data.numero_tarjeton,
+            candidate_data.cargo_aspirado,
+            candidate_data.election_type_id,
+            candidate_data.circunscripcion,
+            candidate_data.party_id,
+            candidate_data.coalition_id,
+            candidate_data.es_independiente,
+            candidate_data.foto_url,
+            candidate_data.biografia,
+            candidate_data.propuestas,
+            candidate_data.experiencia,
+            candidate_data.activo,
+            candidate_data.habilitado_oficialmente,
+            created_by
+        )
+    
     def _validate_candidate_data(self, candidate_data: CandidateData) -> Dict[str, Any]:
         """Validar datos de candidato"""
         if not candidate_data.nombre_completo:
@@ -502,36 +532,11 @@ class CandidateManagementService:
             conn = self.get_connection()
             cursor = conn.cursor()
             
-            query = '''
-            SELECT c.*, 
-                   et.nombre as election_type_name,
-                   pp.nombre_oficial as party_name,
-                   pp.siglas as party_siglas,
-                   co.nombre_coalicion as coalition_name
-            FROM candidates c
-            LEFT JOIN election_types et ON c.election_type_id = et.id
-            LEFT JOIN political_parties pp ON c.party_id = pp.id
-            LEFT JOIN coalitions co ON c.coalition_id = co.id
-            WHERE 1=1
-            '''
-            
-            params = []
-            
-            if active_only:
-                query += " AND c.activo = 1"
-            
-            if election_type_id:
-                query += " AND c.election_type_id = ?"
-                params.append(election_type_id)
-            
-            if party_id:
-                query += " AND c.party_id = ?"
-                params.append(party_id)
-            
-            if coalition_id:
-                query += " AND c.coalition_id = ?"
-                params.append(coalition_id)
-            
+            conditions, params = self._candidate_filters(election_type_id, party_id,
+                                                         coalition_id, active_only)
+            query = CANDIDATE_LIST_SQL
+            if conditions:
+                query += " WHERE " + " AND ".join(conditions)
             query += " ORDER BY c.numero_tarjeton, c.nombre_completo"
             
             cursor.execute(query, params)
@@ -544,6 +549,60 @@ class CandidateManagementService:
             self.logger.error(f"Error obteniendo candidatos: {e}")
             return []
     
+    def paginate_candidates(self, election_type_id: Optional[int] = None,
+                            party_id: Optional[int] = None,
+                            coalition_id: Optional[int] = None,
+                            active_only: bool = True,
+                            cursor: Optional[str] = None, per_page: int = 20,
+                            include_total: Optional[str] = None,
+                            page: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Obtener una página de candidatos por cursor (core.pagination)
+        
+        Mismos filtros y orden que get_candidates. InvalidCursorError si el
+        cursor no corresponde a este listado.
+        
+        Returns:
+            Diccionario con 'data' (candidatos) y 'pagination'
+        """
+        conn = self.get_connection()
+        try:
+            ensure_indexes(lambda sql: (conn.execute(sql), conn.commit()),
+                           'candidates_tarjeton_nombre', CANDIDATES_INDEXES)
+            conditions, params = self._candidate_filters(election_type_id, party_id,
+                                                         coalition_id, active_only)
+            result = keyset_paginate(lambda sql, values: conn.execute(sql, values).fetchall(),
+                                     CANDIDATE_LIST_SQL, CANDIDATES_ORDER, conditions=conditions,
+                                     params=params, cursor=cursor, per_page=per_page,
+                                     include_total=include_total, page=page)
+            result['data'] = [dict(row) for row in result['data']]
+            return result
+        finally:
+            conn.close()
+    
+    def _candidate_filters(self, election_type_id: Optional[int], party_id: Optional[int],
+                           coalition_id: Optional[int], active_only: bool) -> Tuple[List[str], Dict[str, Any]]:
+        """Condiciones (parámetros con nombre) de los listados de candidatos"""
+        conditions = []
+        params = {}
+        
+        if active_only:
+            conditions.append("c.activo = 1")
+        
+        if election_type_id:
+            conditions.append("c.election_type_id = :election_type_id")
+            params['election_type_id'] = election_type_id
+        
+        if party_id:
+            conditions.append("c.party_id = :party_id")
+            params['party_id'] = party_id
+        
+        if coalition_id:
+            conditions.append("c.coalition_id = :coalition_id")
+            params['coalition_id'] = coalition_id
+        
+        return conditions, params
+    
     # ==================== CARGA MASIVA DESDE CSV ====================
     
     def load_candidates_from_csv(self, csv_file_path: str, election_type_id: int, 
@@ -551,6 +610,10 @@ class CandidateManagementService:
         """
         Cargar candidatos masivamente desde archivo CSV
         
+        Partidos, coaliciones y cédulas/tarjetones ya registrados se leen una
+        sola vez; cada fila se valida en memoria (incluidos los duplicados dentro
+        del mismo archivo) y todas se insertan en una única transacción.
+        
         Args:
             csv_file_path: Ruta del archivo CSV
             election_type_id: ID del tipo de elección
@@ -569,30 +632,53 @@ class CandidateManagementService:
             }
             
             with open(csv_file_path, 'r', encoding='utf-8') as file:
-                csv_reader = csv.DictReader(file)
+                rows = list(csv.DictReader(file))
+            
+            conn = self.get_connection()
+            try:
+                cursor = conn.cursor()
+                partidos, coaliciones, cedulas, tarjetones = self._cargar_referencias_csv(cursor, election_type_id)
                 
-                for row_num, row in enumerate(csv_reader, start=2):  # Start at 2 for header
+                for row_num, row in enumerate(rows, start=2):  # Start at 2 for header
                     results['total_processed'] += 1
                     
                     try:
                         # Mapear datos del CSV
-                        candidate_data = self._map_csv_to_candidate_data(row, election_type_id)
+                        candidate_data = self._map_csv_to_candidate_data(row, election_type_id,
+                                                                         partidos, coaliciones)
                         
-                        # Crear candidato
-                        result = self.create_candidate(candidate_data, created_by)
+                        validation_result = self._validate_candidate_data(candidate_data)
+                        if not validation_result['valid']:
+                            error = validation_result['error']
+                        elif candidate_data.cedula in cedulas:
+                            error = f'Ya existe un candidato con cédula {candidate_data.cedula} para este tipo de elección'
+                        elif candidate_data.numero_tarjeton in tarjetones:
+                            error = f'El número de tarjetón {candidate_data.numero_tarjeton} ya está en uso para este tipo de elección'
+                        else:
+                            error = None
                         
-                        if result['success']:
+                        if error is None:
+                            # Un INSERT rechazado (p. ej. cédula única de un candidato
+                            # inactivo) se revierte solo, sin afectar la transacción
+                            try:
+                                cursor.execute(CANDIDATE_INSERT_SQL, self._candidate_values(candidate_data, created_by))
+                            except sqlite3.Error as e:
+                                error = f'Error de base de datos: {str(e)}'
+                        
+                        if error is None:
+                            cedulas.add(candidate_data.cedula)
+                            tarjetones.add(candidate_data.numero_tarjeton)
                             results['successful'] += 1
                             results['candidates_created'].append({
                                 'row': row_num,
                                 'name': candidate_data.nombre_completo,
                                 'cedula': candidate_data.cedula,
-                                'candidate_id': result['candidate_id']
+                                'candidate_id': cursor.lastrowid
                             })
                         else:
                             results['errors'].append({
                                 'row': row_num,
-                                'error': result['error'],
+                                'error': error,
                                 'data': row
                             })
                     
@@ -602,6 +688,13 @@ class CandidateManagementService:
                             'error': f'Error procesando fila: {str(e)}',
                             'data': row
                         })
+                
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
             
             # Determinar si la operación fue exitosa en general
             if results['errors']:
@@ -626,8 +719,40 @@ class CandidateManagementService:
                 'error': f'Error procesando archivo CSV: {str(e)}'
             }
     
-    def _map_csv_to_candidate_data(self, row: Dict[str, str], election_type_id: int) -> CandidateData:
-        """Mapear fila de CSV a datos de candidato"""
+    def _cargar_referencias_csv(self, cursor: sqlite3.Cursor, election_type_id: int) -> Tuple[
+            Dict[str, int], Dict[str, int], set, set]:
+        """
+        Siglas de partidos y nombres de coaliciones activos ({valor: id}) y las
+        cédulas y tarjetones de candidatos activos del tipo de elección
+        """
+        partidos = {}
+        for row in cursor.execute("SELECT id, siglas FROM political_parties WHERE activo = 1 ORDER BY id"):
+            partidos.setdefault(row['siglas'], row['id'])
+        
+        coaliciones = {}
+        for row in cursor.execute("SELECT id, nombre_coalicion FROM coalitions WHERE activo = 1 ORDER BY id"):
+            coaliciones.setdefault(row['nombre_coalicion'], row['id'])
+        
+        cedulas = set()
+        tarjetones = set()
+        for row in cursor.execute('''
+        SELECT cedula, numero_tarjeton FROM candidates 
+        WHERE election_type_id = ? AND activo = 1
+        ''', (election_type_id,)):
+            cedulas.add(row['cedula'])
+            tarjetones.add(row['numero_tarjeton'])
+        
+        return partidos, coaliciones, cedulas, tarjetones
+    
+    def _map_csv_to_candidate_data(self, row: Dict[str, str], election_type_id: int,
+                                   partidos: Optional[Dict[str, int]] = None,
+                                   coaliciones: Optional[Dict[str, int]] = None) -> CandidateData:
+        """
+        Mapear fila de CSV a datos de candidato
+        
+        partidos/coaliciones: mapas {siglas: id} y {nombre: id} ya cargados; sin
+        ellos se consulta la base de datos
+        """
         
         # Determinar afiliación política
         party_id = None
@@ -635,9 +760,15 @@ class CandidateManagementService:
         es_independiente = False
         
         if row.get('party_siglas'):
-            party_id = self._get_party_id_by_siglas(row['party_siglas'])
+            if partidos is not None:
+                party_id = partidos.get(row['party_siglas'])
+            else:
+                party_id = self._get_party_id_by_siglas(row['party_siglas'])
         elif row.get('coalition_name'):
-            coalition_id = self._get_coalition_id_by_name(row['coalition_name'])
+            if coaliciones is not None:
+                coalition_id = coaliciones.get(row['coalition_name'])
+            else:
+                coalition_id = self._get_coalition_id_by_name(row['coalition_name'])
         else:
             es_independiente = True
         
@@ -687,6 +818,10 @@ class CandidateManagementService:
         """
         Búsqueda avanzada de candidatos con múltiples filtros
         
+        Los filtros de texto (nombre, cédula, cargo, circunscripción y el texto
+        libre 'q') usan el índice FTS5: sin distinguir tildes, por prefijo y con
+        los más relevantes primero. Sin FTS5 se filtra con LIKE.
+        
         Args:
             search_params: Parámetros de búsqueda
             
@@ -694,16 +829,34 @@ class CandidateManagementService:
             Lista de candidatos que coinciden con los criterios
         """
         try:
+            filtros_texto = {
+                'nombre_completo': search_params.get('nombre'),
+                'cedula': search_params.get('cedula'),
+                'cargo_aspirado': search_params.get('cargo'),
+                'circunscripcion': search_params.get('circunscripcion'),
+            }
+            filtros_texto = {columna: valor for columna, valor in filtros_texto.items() if valor}
+            texto_libre = search_params.get('q')
+            
+            match = None
+            indice = get_search_index(self.db_path)
+            if (filtros_texto or texto_libre) and indice.has_index('candidates'):
+                columnas = indice.indexed_columns('candidates')
+                if all(columna in columnas for columna in filtros_texto):
+                    match = match_expression(filtros_texto, texto_libre)
+            fts = fts_table('candidates')
+            
             conn = self.get_connection()
             cursor = conn.cursor()
             
-            query = '''
+            query = f'''
             SELECT c.*, 
                    et.nombre as election_type_name,
                    pp.nombre_oficial as party_name,
                    pp.siglas as party_siglas,
                    co.nombre_coalicion as coalition_name
             FROM candidates c
+            {f"JOIN {fts} ON {fts}.rowid = c.id" if match else ""}
             LEFT JOIN election_types et ON c.election_type_id = et.id
             LEFT JOIN political_parties pp ON c.party_id = pp.id
             LEFT JOIN coalitions co ON c.coalition_id = co.id
@@ -712,20 +865,17 @@ class CandidateManagementService:
             
             params = []
             
-            # Filtro por nombre
-            if search_params.get('nombre'):
-                query += " AND c.nombre_completo LIKE ?"
-                params.append(f"%{search_params['nombre']}%")
-            
-            # Filtro por cédula
-            if search_params.get('cedula'):
-                query += " AND c.cedula LIKE ?"
-                params.append(f"%{search_params['cedula']}%")
-            
-            # Filtro por cargo
-            if search_params.get('cargo'):
-                query += " AND c.cargo_aspirado LIKE ?"
-                params.append(f"%{search_params['cargo']}%")
+            if match:
+                query += f" AND {fts} MATCH ?"
+                params.append(match)
+            else:
+                # Sin índice FTS5: filtros LIKE por columna
+                for columna, valor in filtros_texto.items():
+                    query += f" AND c.{columna} LIKE ?"
+                    params.append(f"%{valor}%")
+                if texto_libre:
+                    query += " AND (c.nombre_completo LIKE ? OR c.cedula LIKE ?)"
+                    params.extend([f"%{texto_libre}%"] * 2)
             
             # Filtro por tipo de elección
             if search_params.get('election_type_id'):
@@ -746,17 +896,15 @@ class CandidateManagementService:
             if search_params.get('independientes_only'):
                 query += " AND c.es_independiente = 1"
             
-            # Filtro por circunscripción
-            if search_params.get('circunscripcion'):
-                query += " AND c.circunscripcion LIKE ?"
-                params.append(f"%{search_params['circunscripcion']}%")
-            
             # Filtro por habilitación
             if search_params.get('habilitado') is not None:
                 query += " AND c.habilitado_oficialmente = ?"
                 params.append(search_params['habilitado'])
             
-            query += " ORDER BY c.numero_tarjeton, c.nombre_completo"
+            if match:
+                query += f" ORDER BY bm25({fts}), c.numero_tarjeton, c.nombre_completo"
+            else:
+                query += " ORDER BY c.numero_tarjeton, c.nombre_completo"
             
             # Límite de resultados
             if search_params.get('limit'):
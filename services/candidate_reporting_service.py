@@ -11,6 +11,9 @@ from datetime import datetime
 from typing import List, Dict, Optional, Tuple, Any
 from dataclasses import dataclass
 
+from core.database import SQLiteConnectionPool, get_connection_pool
+from services.vote_aggregation_service import VoteAggregationService
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -54,15 +57,16 @@ class CoalitionResult:
 class CandidateReportingService:
     """Servicio para cálculo de resultados y reportes de candidatos"""
     
-    def __init__(self, db_path: str = 'electoral_system.db'):
+    def __init__(self, db_path: str = 'electoral_system.db',
+                 connection_pool: Optional[SQLiteConnectionPool] = None):
         self.db_path = db_path
+        self.connection_pool = connection_pool or get_connection_pool(db_path)
+        self.vote_aggregates = VoteAggregationService(db_path, self.connection_pool)
         self.logger = logger
     
     def get_connection(self) -> sqlite3.Connection:
-        """Obtener conexión a la base de datos"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+        """Obtener conexión del pool compartido"""
+        return self.connection_pool.connect(row_factory=sqlite3.Row)
     
     # ==================== CÁLCULO DE RESULTADOS POR CANDIDATO ====================
     
@@ -82,10 +86,6 @@ class CandidateReportingService:
             conn = self.get_connection()
             cursor = conn.cursor()
             
-            # Obtener votos por candidato desde formularios E-14
-            # TODO: Esta consulta debe adaptarse cuando se implementen los formularios E-14
-            # Por ahora simulamos con datos de ejemplo
-            
             # Obtener candidatos del tipo de elección
             cursor.execute('''
             SELECT c.*, pp.nombre_oficial as party_name, pp.siglas as party_siglas,
@@ -105,8 +105,15 @@ class CandidateReportingService:
                     'error': 'No se encontraron candidatos para este tipo de elección'
                 }
             
-            # Simular votos por candidato (en producción esto vendría de formularios E-14)
-            candidate_votes = self._simulate_candidate_votes(candidates)
+            # Votos desde los agregados de formularios E-14, indexados por candidatos.id:
+            # los candidatos de este catálogo se resuelven por cédula
+            votes_by_cedula = self.vote_aggregates.get_votes_by_cedula(
+                [candidate['cedula'] for candidate in candidates]
+            )
+            candidate_votes = {
+                candidate['id']: votes_by_cedula.get(str(candidate['cedula']), 0)
+                for candidate in candidates
+            }
             
             # Calcular totales y porcentajes
             total_votos_validos = sum(candidate_votes.values())
@@ -114,7 +121,7 @@ class CandidateReportingService:
             results = []
             for candidate in candidates:
                 candidate_id = candidate['id']
-                votos = candidate_votes.get(candidate_id, 0)
+                votos = candidate_votes[candidate_id]
                 porcentaje = (votos / total_votos_validos * 100) if total_votos_validos > 0 else 0
                 
                 result = CandidateResult(
@@ -163,17 +170,6 @@ class CandidateReportingService:
                 'error': f'Error de base de datos: {str(e)}'
             }
     
-    def _simulate_candidate_votes(self, candidates: List[Dict]) -> Dict[int, int]:
-        """Simular votos por candidato (temporal hasta implementar formularios E-14)"""
-        import random
-        
-        candidate_votes = {}
-        for candidate in candidates:
-            # Simular votos aleatorios entre 50 y 5000
-            candidate_votes[candidate['id']] = random.randint(50, 5000)
-        
-        return candidate_votes
-    
     def _save_candidate_results(self, results: List[CandidateResult], 
                                election_type_id: int, calculated_by: Optional[int]):
         """Guardar resultados de candidatos en la base de datos"""
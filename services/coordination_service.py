@@ -9,20 +9,89 @@ from datetime import datetime, date, timedelta
 from typing import Dict, List, Optional, Any, Tuple
 import json
 import logging
+import os
+import threading
+import time
+
+from core.database import SQLiteConnectionPool, get_connection_pool
+from services.search_index_service import get_search_index, match_terms
+
+# Segundos que se reutiliza el dashboard de un coordinador (0 desactiva la caché)
+DASHBOARD_CACHE_TTL = float(os.environ.get('COORDINATION_DASHBOARD_CACHE_TTL', '30'))
+
+# Caché compartida entre instancias: (ruta de la BD, coordinador_id) -> (expira, dashboard)
+_dashboard_cache: Dict[Tuple[str, int], Tuple[float, Dict]] = {}
+_dashboard_cache_lock = threading.Lock()
+
+
+def _copy_dashboard(dashboard: Dict) -> Dict:
+    """Copiar el dashboard en caché (dicts y listas de filas planas) para que el llamador pueda modificarlo"""
+    return {
+        clave: [dict(fila) for fila in valor] if isinstance(valor, list) else dict(valor)
+        for clave, valor in dashboard.items()
+    }
+
+
+# Índices del cálculo de cobertura: semi-join por mesa cubierto por el índice
+# de asignaciones y recorrido de mesas/puestos de un municipio sin tocar la tabla
+COVERAGE_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_asignaciones_mesa_estado "
+    "ON asignaciones_testigos(mesa_id, estado, proceso_electoral_id, testigo_id)",
+    "CREATE INDEX IF NOT EXISTS idx_mesas_municipio_estado "
+    "ON mesas_votacion(municipio_id, estado, numero)",
+    "CREATE INDEX IF NOT EXISTS idx_mesas_puesto_estado "
+    "ON mesas_votacion(puesto_votacion_id, estado)",
+    "CREATE INDEX IF NOT EXISTS idx_puestos_municipio "
+    "ON puestos_votacion(municipio_id, nombre)",
+)
+
+_indices_cobertura_creados = set()
+_indices_cobertura_lock = threading.Lock()
+
+ASSIGNMENT_INSERT_SQL = """
+    INSERT INTO asignaciones_testigos 
+    (testigo_id, mesa_id, coordinador_id, proceso_electoral_id, 
+     tipo_asignacion, hora_inicio, hora_fin, observaciones, created_by)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+DASHBOARD_STATISTICS_FIELDS = ('total_testigos', 'testigos_asignados', 'total_mesas', 'mesas_cubiertas')
+
+DASHBOARD_STATISTICS_QUERY = """
+    WITH asignadas AS (
+        SELECT COUNT(*) as testigos_asignados,
+               COUNT(DISTINCT at.mesa_id) as mesas_cubiertas
+        FROM asignaciones_testigos at
+        JOIN testigos_electorales te ON at.testigo_id = te.id
+        WHERE te.coordinador_id = ? AND at.estado = 'asignado'
+    )
+    SELECT cm.*, m.nombre as municipio_nombre,
+           (SELECT COUNT(*) FROM testigos_electorales te
+            WHERE te.coordinador_id = cm.id AND te.estado != 'inactivo') as total_testigos,
+           a.testigos_asignados,
+           (SELECT COUNT(*) FROM mesas_votacion mv
+            WHERE mv.municipio_id = cm.municipio_id
+              AND mv.estado IN ('activa', 'configurada')) as total_mesas,
+           a.mesas_cubiertas
+    FROM coordinadores_municipales cm
+    JOIN municipios m ON cm.municipio_id = m.id
+    CROSS JOIN asignadas a
+    WHERE cm.id = ?
+"""
 
 class CoordinationService:
     """Servicio para herramientas de coordinación municipal"""
     
-    def __init__(self, db_path: str = 'caqueta_electoral.db'):
+    def __init__(self, db_path: str = 'caqueta_electoral.db',
+                 connection_pool: Optional[SQLiteConnectionPool] = None):
         self.db_path = db_path
+        self.connection_pool = connection_pool or get_connection_pool(db_path)
         self.logger = logging.getLogger(__name__)
+        self._cache_key = os.path.abspath(db_path)
         
     def get_connection(self) -> sqlite3.Connection:
-        """Obtener conexión a la base de datos"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        conn.execute("PRAGMA foreign_keys = ON")
-        return conn
+        """Obtener conexión del pool compartido"""
+        return self.connection_pool.connect(row_factory=sqlite3.Row, foreign_keys=True)
     
     # ==================== GESTIÓN DE COORDINADORES ====================
     
@@ -51,7 +120,36 @@ class CoordinationService:
             raise
     
     def get_coordination_dashboard(self, coordinator_id: int) -> Dict:
-        """Obtener datos del dashboard de coordinación"""
+        """
+        Obtener datos del dashboard de coordinación
+
+        El resultado se guarda por coordinador durante DASHBOARD_CACHE_TTL
+        segundos; las escrituras de este servicio invalidan la entrada.
+        """
+        clave = (self._cache_key, coordinator_id)
+        with _dashboard_cache_lock:
+            entrada = _dashboard_cache.get(clave)
+            if entrada and entrada[0] > time.monotonic():
+                return _copy_dashboard(entrada[1])
+
+        dashboard = self._build_coordination_dashboard(coordinator_id)
+
+        if DASHBOARD_CACHE_TTL > 0:
+            with _dashboard_cache_lock:
+                _dashboard_cache[clave] = (time.monotonic() + DASHBOARD_CACHE_TTL, dashboard)
+        return _copy_dashboard(dashboard)
+
+    def invalidate_dashboard_cache(self, coordinator_id: Optional[int] = None):
+        """Descartar el dashboard en caché de un coordinador (o de todos)"""
+        with _dashboard_cache_lock:
+            if coordinator_id is None:
+                for clave in [c for c in _dashboard_cache if c[0] == self._cache_key]:
+                    del _dashboard_cache[clave]
+            else:
+                _dashboard_cache.pop((self._cache_key, coordinator_id), None)
+
+    def _build_coordination_dashboard(self, coordinator_id: int) -> Dict:
+        """Consultar el dashboard de coordinación sin caché"""
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
@@ -65,49 +163,17 @@ class CoordinationService:
                 'coverage_summary': {}
             }
             
-            # Información del coordinador
-            cursor.execute("""
-                SELECT cm.*, m.nombre as municipio_nombre
-                FROM coordinadores_municipales cm
-                JOIN municipios m ON cm.municipio_id = m.id
-                WHERE cm.id = ?
-            """, (coordinator_id,))
+            # Información del coordinador y estadísticas generales en una sola consulta
+            cursor.execute(DASHBOARD_STATISTICS_QUERY, (coordinator_id, coordinator_id))
             
             coordinator = cursor.fetchone()
             if coordinator:
-                dashboard['coordinator_info'] = dict(coordinator)
-                municipio_id = coordinator['municipio_id']
-                
-                # Estadísticas generales
-                cursor.execute("""
-                    SELECT COUNT(*) as total_testigos
-                    FROM testigos_electorales 
-                    WHERE coordinador_id = ? AND estado != 'inactivo'
-                """, (coordinator_id,))
-                total_testigos = cursor.fetchone()[0]
-                
-                cursor.execute("""
-                    SELECT COUNT(*) as testigos_asignados
-                    FROM testigos_electorales te
-                    JOIN asignaciones_testigos at ON te.id = at.testigo_id
-                    WHERE te.coordinador_id = ? AND at.estado = 'asignado'
-                """, (coordinator_id,))
-                testigos_asignados = cursor.fetchone()[0]
-                
-                cursor.execute("""
-                    SELECT COUNT(*) as total_mesas
-                    FROM mesas_votacion 
-                    WHERE municipio_id = ? AND estado IN ('activa', 'configurada')
-                """, (municipio_id,))
-                total_mesas = cursor.fetchone()[0]
-                
-                cursor.execute("""
-                    SELECT COUNT(DISTINCT at.mesa_id) as mesas_cubiertas
-                    FROM asignaciones_testigos at
-                    JOIN testigos_electorales te ON at.testigo_id = te.id
-                    WHERE te.coordinador_id = ? AND at.estado = 'asignado'
-                """, (coordinator_id,))
-                mesas_cubiertas = cursor.fetchone()[0]
+                coordinator_info = dict(coordinator)
+                total_testigos, testigos_asignados, total_mesas, mesas_cubiertas = (
+                    coordinator_info.pop(campo) or 0 for campo in DASHBOARD_STATISTICS_FIELDS
+                )
+                dashboard['coordinator_info'] = coordinator_info
+                municipio_id = coordinator_info['municipio_id']
                 
                 porcentaje_cobertura = (mesas_cubiertas / total_mesas * 100) if total_mesas > 0 else 0
                 
@@ -141,17 +207,20 @@ class CoordinationService:
                 
                 dashboard['notifications'] = [dict(row) for row in cursor.fetchall()]
                 
-                # Resumen de cobertura por puesto
+                # Resumen de cobertura por puesto (mesas cubiertas agrupadas antes del join)
                 cursor.execute("""
+                    WITH cubiertas AS (
+                        SELECT DISTINCT at.mesa_id
+                        FROM asignaciones_testigos at
+                        JOIN testigos_electorales te ON at.testigo_id = te.id
+                        WHERE te.coordinador_id = ? AND at.estado = 'asignado'
+                    )
                     SELECT pv.nombre as puesto_nombre, pv.id as puesto_id,
                            COUNT(mv.id) as total_mesas,
-                           COUNT(DISTINCT at.mesa_id) as mesas_cubiertas
+                           COUNT(c.mesa_id) as mesas_cubiertas
                     FROM puestos_votacion pv
                     LEFT JOIN mesas_votacion mv ON pv.id = mv.puesto_votacion_id AND mv.estado IN ('activa', 'configurada')
-                    LEFT JOIN asignaciones_testigos at ON mv.id = at.mesa_id 
-                        AND at.testigo_id IN (
-                            SELECT id FROM testigos_electorales WHERE coordinador_id = ?
-                        ) AND at.estado = 'asignado'
+                    LEFT JOIN cubiertas c ON c.mesa_id = mv.id
                     WHERE pv.municipio_id = ?
                     GROUP BY pv.id, pv.nombre
                     ORDER BY pv.nombre
@@ -211,9 +280,15 @@ class CoordinationService:
                     params.append(filters['tipo_testigo'])
                 
                 if filters.get('search'):
-                    query += " AND (te.nombre_completo LIKE ? OR te.cedula LIKE ?)"
-                    search_term = f"%{filters['search']}%"
-                    params.extend([search_term, search_term])
+                    # Índice FTS5 (sin tildes, por prefijo); LIKE si no está disponible
+                    match = match_terms(filters['search'])
+                    if match and get_search_index(self.db_path).has_index('testigos_electorales'):
+                        query += " AND te.id IN (SELECT rowid FROM testigos_electorales_fts WHERE testigos_electorales_fts MATCH ?)"
+                        params.append(match)
+                    else:
+                        query += " AND (te.nombre_completo LIKE ? OR te.cedula LIKE ?)"
+                        search_term = f"%{filters['search']}%"
+                        params.extend([search_term, search_term])
             
             query += """
                 GROUP BY te.id
@@ -285,6 +360,7 @@ class CoordinationService:
             witness_id = cursor.lastrowid
             conn.commit()
             conn.close()
+            self.invalidate_dashboard_cache(coordinator_id)
             
             self.logger.info(f"Testigo creado: {witness_id} - {witness_data['nombre_completo']}")
             return witness_id
@@ -343,6 +419,7 @@ class CoordinationService:
             
             conn.commit()
             conn.close()
+            self.invalidate_dashboard_cache(coordinator_id)
             
             self.logger.info(f"Testigo actualizado: {witness_id}")
             return True
@@ -502,12 +579,7 @@ class CoordinationService:
                 raise ValueError("Ya existe una asignación para este testigo en esta mesa")
             
             # Crear asignación
-            cursor.execute("""
-                INSERT INTO asignaciones_testigos 
-                (testigo_id, mesa_id, coordinador_id, proceso_electoral_id, 
-                 tipo_asignacion, hora_inicio, hora_fin, observaciones, created_by)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
+            cursor.execute(ASSIGNMENT_INSERT_SQL, (
                 testigo_id,
                 mesa_id,
                 coordinator_id,
@@ -530,6 +602,7 @@ class CoordinationService:
             
             conn.commit()
             conn.close()
+            self.invalidate_dashboard_cache(coordinator_id)
             
             self.logger.info(f"Asignación creada: {assignment_id} - Testigo {testigo_id} a Mesa {mesa_id}")
             return assignment_id
@@ -538,6 +611,165 @@ class CoordinationService:
             self.logger.error(f"Error creando asignación: {e}")
             raise
     
+    def bulk_assign_witnesses(self, assignments: List[Dict], coordinator_id: int,
+                              all_or_nothing: bool = False) -> Dict[str, Any]:
+        """
+        Asignar varios testigos a mesas en una sola transacción
+        
+        Los testigos del coordinador y sus asignaciones se leen una vez y cada
+        par testigo-mesa se valida en memoria (pertenencia, testigo inactivo,
+        asignación duplicada y testigo ya asignado a otra mesa del mismo proceso,
+        también dentro del mismo lote). Las asignaciones válidas se insertan con
+        executemany; con all_or_nothing cualquier error cancela el lote completo.
+        
+        Todo ocurre en una transacción BEGIN IMMEDIATE abierta antes de las
+        lecturas: dos lotes concurrentes no pueden validar contra el mismo estado
+        y las inserciones y el cambio de estado de los testigos se confirman juntos.
+        
+        Returns:
+            {'applied': bool, 'results': [{assignment_id, testigo_id, mesa_id, success}],
+             'errors': [{testigo_id, mesa_id, error}]}
+        """
+        errors = []
+        validas = []
+        
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            
+            cursor.execute("""
+                SELECT id, estado FROM testigos_electorales WHERE coordinador_id = ?
+            """, (coordinator_id,))
+            testigos = {row['id']: row['estado'] for row in cursor.fetchall()}
+            
+            # Asignaciones existentes de esos testigos: (testigo, mesa, proceso) y,
+            # de las vigentes, la mesa de cada (testigo, proceso)
+            cursor.execute("""
+                SELECT at.testigo_id, at.mesa_id, at.proceso_electoral_id, at.estado
+                FROM asignaciones_testigos at
+                JOIN testigos_electorales te ON at.testigo_id = te.id
+                WHERE te.coordinador_id = ?
+            """, (coordinator_id,))
+            existentes = set()
+            mesa_vigente = {}
+            for row in cursor.fetchall():
+                existentes.add((row['testigo_id'], row['mesa_id'], row['proceso_electoral_id']))
+                if row['estado'] == 'asignado':
+                    mesa_vigente[(row['testigo_id'], row['proceso_electoral_id'])] = row['mesa_id']
+            
+            for assignment_data in assignments:
+                if not isinstance(assignment_data, dict):
+                    errors.append({'testigo_id': None, 'mesa_id': None, 'error': "Asignación inválida"})
+                    continue
+                try:
+                    for field in ('testigo_id', 'mesa_id', 'proceso_electoral_id'):
+                        if not assignment_data.get(field):
+                            raise ValueError(f"Campo requerido: {field}")
+                    try:
+                        testigo_id = int(assignment_data['testigo_id'])
+                        mesa_id = int(assignment_data['mesa_id'])
+                        proceso_id = int(assignment_data['proceso_electoral_id'])
+                    except (TypeError, ValueError):
+                        raise ValueError("Identificadores de testigo, mesa y proceso deben ser numéricos")
+                    
+                    if testigo_id not in testigos:
+                        raise ValueError("Testigo no encontrado o no autorizado")
+                    if testigos[testigo_id] == 'inactivo':
+                        raise ValueError("No se puede asignar un testigo inactivo")
+                    if (testigo_id, mesa_id, proceso_id) in existentes:
+                        raise ValueError("Ya existe una asignación para este testigo en esta mesa")
+                    if mesa_vigente.get((testigo_id, proceso_id), mesa_id) != mesa_id:
+                        raise ValueError("El testigo ya está asignado a otra mesa en este proceso")
+                    
+                    existentes.add((testigo_id, mesa_id, proceso_id))
+                    mesa_vigente[(testigo_id, proceso_id)] = mesa_id
+                    validas.append((assignment_data, (
+                        testigo_id,
+                        mesa_id,
+                        coordinator_id,
+                        proceso_id,
+                        assignment_data.get('tipo_asignacion', 'principal'),
+                        assignment_data.get('hora_inicio', '06:00'),
+                        assignment_data.get('hora_fin', '18:00'),
+                        assignment_data.get('observaciones'),
+                        coordinator_id  # created_by
+                    )))
+                except ValueError as e:
+                    errors.append({
+                        'testigo_id': assignment_data.get('testigo_id'),
+                        'mesa_id': assignment_data.get('mesa_id'),
+                        'error': str(e)
+                    })
+            
+            if not validas or (all_or_nothing and errors):
+                conn.rollback()
+                return {'applied': False, 'results': [], 'errors': errors}
+            
+            insertadas = self._insertar_asignaciones(cursor, validas, errors)
+            if all_or_nothing and len(insertadas) < len(validas):
+                conn.rollback()
+                return {'applied': False, 'results': [], 'errors': errors}
+            
+            cursor.executemany("""
+                UPDATE testigos_electorales 
+                SET estado = 'asignado', updated_at = CURRENT_TIMESTAMP 
+                WHERE id = ?
+            """, [(testigo_id,) for testigo_id in {valores[0] for valores, _ in insertadas}])
+            
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            self.logger.error(f"Error en asignación masiva: {e}")
+            raise
+        finally:
+            conn.close()
+        
+        self.invalidate_dashboard_cache(coordinator_id)
+        results = [{
+            'assignment_id': assignment_id,
+            'testigo_id': valores[0],
+            'mesa_id': valores[1],
+            'success': True
+        } for valores, assignment_id in insertadas]
+        
+        self.logger.info(f"Asignación masiva: {len(results)} creadas, {len(errors)} errores "
+                         f"(coordinador {coordinator_id})")
+        return {'applied': True, 'results': results, 'errors': errors}
+    
+    def _insertar_asignaciones(self, cursor: sqlite3.Cursor, validas: List[Tuple[Dict, tuple]],
+                               errors: List[Dict]) -> List[Tuple[tuple, int]]:
+        """
+        Insertar con executemany dentro de un savepoint de la transacción abierta;
+        si alguna fila viola una restricción (p. ej. mesa inexistente) se
+        reintenta fila por fila para reportarla.
+        Retorna (parámetros, id de la asignación) de las filas insertadas
+        """
+        cursor.execute("SAVEPOINT asignacion_masiva")
+        try:
+            cursor.executemany(ASSIGNMENT_INSERT_SQL, [valores for _, valores in validas])
+            # Con BEGIN IMMEDIATE nadie más escribe: los IDs del lote son consecutivos
+            ultimo_id = cursor.execute("SELECT last_insert_rowid()").fetchone()[0]
+            cursor.execute("RELEASE asignacion_masiva")
+            primer_id = ultimo_id - len(validas) + 1
+            return [(valores, primer_id + offset) for offset, (_, valores) in enumerate(validas)]
+        except sqlite3.Error:
+            cursor.execute("ROLLBACK TO asignacion_masiva")
+            cursor.execute("RELEASE asignacion_masiva")
+        
+        insertadas = []
+        for assignment_data, valores in validas:
+            try:
+                cursor.execute(ASSIGNMENT_INSERT_SQL, valores)
+                insertadas.append((valores, cursor.lastrowid))
+            except sqlite3.Error as e:
+                errors.append({
+                    'testigo_id': assignment_data.get('testigo_id'),
+                    'mesa_id': assignment_data.get('mesa_id'),
+                    'error': str(e)
+                })
+        return insertadas
+    
     def get_assignments(self, coordinator_id: int, filters: Dict = None) -> List[Dict]:
         """Obtener asignaciones del coordinador"""
         try:
@@ -633,6 +865,7 @@ class CoordinationService:
             
             conn.commit()
             conn.close()
+            self.invalidate_dashboard_cache(coordinator_id)
             
             self.logger.info(f"Estado de asignación actualizado: {assignment_id} -> {new_status}")
             return True
@@ -721,6 +954,7 @@ class CoordinationService:
             
             conn.commit()
             conn.close()
+            self.invalidate_dashboard_cache(coordinator_id)
             
             self.logger.info(f"Progreso de tarea actualizado: {task_id} -> {progress}%")
             return True
@@ -734,6 +968,7 @@ class CoordinationService:
     def generate_coverage_report(self, coordinator_id: int, process_id: int = None) -> Dict:
         """Generar reporte de cobertura de mesas"""
         try:
+            self.ensure_coverage_indexes()
             conn = self.get_connection()
             cursor = conn.cursor()
             
@@ -761,25 +996,9 @@ class CoordinationService:
                 'witness_distribution': {}
             }
             
-            # Resumen general
-            cursor.execute("""
-                SELECT COUNT(*) as total_mesas
-                FROM mesas_votacion 
-                WHERE municipio_id = ? AND estado IN ('activa', 'configurada')
-            """, (municipio_id,))
-            total_mesas = cursor.fetchone()[0]
-            
-            query_filter = "" if not process_id else " AND at.proceso_electoral_id = ?"
-            params = [municipio_id] + ([process_id] if process_id else [])
-            
-            cursor.execute(f"""
-                SELECT COUNT(DISTINCT at.mesa_id) as mesas_cubiertas
-                FROM asignaciones_testigos at
-                JOIN testigos_electorales te ON at.testigo_id = te.id
-                WHERE te.municipio_id = ? AND at.estado = 'asignado'{query_filter}
-            """, params)
-            mesas_cubiertas = cursor.fetchone()[0]
-            
+            coverage = self._compute_coverage(cursor, municipio_id, process_id)
+            total_mesas = coverage['total_mesas']
+            mesas_cubiertas = coverage['mesas_cubiertas']
             porcentaje_cobertura = (mesas_cubiertas / total_mesas * 100) if total_mesas > 0 else 0
             
             report['summary'] = {
@@ -788,49 +1007,8 @@ class CoordinationService:
                 'mesas_sin_cobertura': total_mesas - mesas_cubiertas,
                 'porcentaje_cobertura': round(porcentaje_cobertura, 1)
             }
-            
-            # Cobertura por puesto
-            cursor.execute(f"""
-                SELECT pv.nombre as puesto_nombre, pv.direccion,
-                       COUNT(mv.id) as total_mesas,
-                       COUNT(DISTINCT at.mesa_id) as mesas_cubiertas
-                FROM puestos_votacion pv
-                LEFT JOIN mesas_votacion mv ON pv.id = mv.puesto_votacion_id AND mv.estado IN ('activa', 'configurada')
-                LEFT JOIN asignaciones_testigos at ON mv.id = at.mesa_id 
-                    AND at.testigo_id IN (
-                        SELECT id FROM testigos_electorales WHERE municipio_id = ?
-                    ) AND at.estado = 'asignado'{query_filter}
-                WHERE pv.municipio_id = ?
-                GROUP BY pv.id
-                ORDER BY pv.nombre
-            """, params + [municipio_id])
-            
-            coverage_by_station = []
-            for row in cursor.fetchall():
-                station = dict(row)
-                total = station['total_mesas'] or 0
-                cubiertas = station['mesas_cubiertas'] or 0
-                station['porcentaje_cobertura'] = (cubiertas / total * 100) if total > 0 else 0
-                coverage_by_station.append(station)
-            
-            report['coverage_by_station'] = coverage_by_station
-            
-            # Mesas sin cobertura
-            cursor.execute(f"""
-                SELECT mv.numero as numero_mesa, COALESCE(mv.ubicacion_especifica, pv.direccion) as direccion, pv.nombre as puesto_nombre
-                FROM mesas_votacion mv
-                LEFT JOIN puestos_votacion pv ON mv.puesto_votacion_id = pv.id
-                WHERE mv.municipio_id = ? AND mv.estado IN ('activa', 'configurada')
-                AND mv.id NOT IN (
-                    SELECT DISTINCT at.mesa_id 
-                    FROM asignaciones_testigos at
-                    JOIN testigos_electorales te ON at.testigo_id = te.id
-                    WHERE te.municipio_id = ? AND at.estado = 'asignado'{query_filter}
-                )
-                ORDER BY mv.numero
-            """, params + params)
-            
-            report['uncovered_tables'] = [dict(row) for row in cursor.fetchall()]
+            report['coverage_by_station'] = coverage['coverage_by_station']
+            report['uncovered_tables'] = coverage['uncovered_tables']
             
             conn.close()
             return report
@@ -839,6 +1017,92 @@ class CoordinationService:
             self.logger.error(f"Error generando reporte de cobertura: {e}")
             raise
     
+    def ensure_coverage_indexes(self):
+        """Crear los índices del cálculo de cobertura (una vez por base de datos)"""
+        if self._cache_key in _indices_cobertura_creados:
+            return
+        
+        with _indices_cobertura_lock:
+            if self._cache_key in _indices_cobertura_creados:
+                return
+            
+            conn = self.get_connection()
+            try:
+                for sql in COVERAGE_INDEXES:
+                    conn.execute(sql)
+                conn.commit()
+            finally:
+                conn.close()
+            _indices_cobertura_creados.add(self._cache_key)
+    
+    def _compute_coverage(self, cursor, municipio_id: int, process_id: int = None) -> Dict:
+        """
+        Calcular mesas cubiertas y sin cobertura del municipio en una sola pasada
+        
+        Cada mesa activa se marca con un semi-join (EXISTS) sobre sus asignaciones
+        vigentes hechas por testigos del municipio; el agrupado por puesto y la
+        lista de mesas sin cobertura se arman sobre ese mismo resultado.
+        """
+        query_filter = "" if not process_id else " AND at.proceso_electoral_id = ?"
+        params = [municipio_id] + ([process_id] if process_id else []) + [municipio_id]
+        
+        cursor.execute(f"""
+            SELECT mv.numero as numero_mesa, mv.puesto_votacion_id as puesto_id,
+                   COALESCE(mv.ubicacion_especifica, pv.direccion) as direccion,
+                   pv.nombre as puesto_nombre,
+                   EXISTS (
+                       SELECT 1 FROM asignaciones_testigos at
+                       JOIN testigos_electorales te ON te.id = at.testigo_id
+                       WHERE at.mesa_id = mv.id AND at.estado = 'asignado'
+                         AND te.municipio_id = ?{query_filter}
+                   ) as cubierta
+            FROM mesas_votacion mv
+            LEFT JOIN puestos_votacion pv ON mv.puesto_votacion_id = pv.id
+            WHERE mv.municipio_id = ? AND mv.estado IN ('activa', 'configurada')
+            ORDER BY mv.numero
+        """, params)
+        
+        por_puesto = {}
+        uncovered_tables = []
+        mesas_cubiertas = 0
+        total_mesas = 0
+        for row in cursor.fetchall():
+            total_mesas += 1
+            conteo = por_puesto.setdefault(row['puesto_id'], [0, 0])
+            conteo[0] += 1
+            if row['cubierta']:
+                conteo[1] += 1
+                mesas_cubiertas += 1
+            else:
+                uncovered_tables.append({
+                    'numero_mesa': row['numero_mesa'],
+                    'direccion': row['direccion'],
+                    'puesto_nombre': row['puesto_nombre']
+                })
+        
+        cursor.execute("""
+            SELECT id, nombre as puesto_nombre, direccion
+            FROM puestos_votacion
+            WHERE municipio_id = ?
+            ORDER BY nombre
+        """, (municipio_id,))
+        
+        coverage_by_station = []
+        for row in cursor.fetchall():
+            station = dict(row)
+            total, cubiertas = por_puesto.get(station.pop('id'), (0, 0))
+            station['total_mesas'] = total
+            station['mesas_cubiertas'] = cubiertas
+            station['porcentaje_cobertura'] = (cubiertas / total * 100) if total > 0 else 0
+            coverage_by_station.append(station)
+        
+        return {
+            'total_mesas': total_mesas,
+            'mesas_cubiertas': mesas_cubiertas,
+            'coverage_by_station': coverage_by_station,
+            'uncovered_tables': uncovered_tables
+        }
+    
     def update_coordination_statistics(self, coordinator_id: int) -> bool:
         """Actualizar estadísticas de coordinación"""
         try:
@@ -945,6 +1209,7 @@ class CoordinationService:
             notification_id = cursor.lastrowid
             conn.commit()
             conn.close()
+            self.invalidate_dashboard_cache(coordinator_id)
             
             self.logger.info(f"Notificación creada: {notification_id} para coordinador {coordinator_id}")
             return notification_id
@@ -970,6 +1235,7 @@ class CoordinationService:
             
             conn.commit()
             conn.close()
+            self.invalidate_dashboard_cache(coordinator_id)
             
             self.logger.info(f"Notificación {notification_id} marcada como leída")
             return True
@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+DashboardStreamService - Canal de eventos (SSE) para los dashboards
+Reemplaza el polling de intervalo fijo por una instantánea compartida que se
+publica a todos los navegadores conectados.
+
+Las escrituras de capturas E-14, consolidaciones E-24 y asignaciones de
+testigos (desde la aplicación, la cola de ingesta o los scripts) incrementan
+la versión de su canal en dashboard_version mediante triggers. Un único hilo
+por proceso compara las versiones como máximo cada
+DASHBOARD_STREAM_CHECK_INTERVAL segundos, recalcula solo las secciones de los
+canales que cambiaron y serializa la instantánea una vez; cada suscriptor
+recibe ese mismo frame. La carga sobre la base de datos depende de la tasa de
+escrituras, no de la cantidad de navegadores abiertos.
+
+Cada frame lleva además el detalle de qué mesas y municipios cambiaron
+(dashboard_version_detalle, escrito por los mismos triggers) para que un
+navegador que solo mira una mesa o un municipio ignore el resto de eventos.
+Cada conexión SSE ocupa un hilo del worker: servir con gunicorn.conf.py
+(worker gthread) y mantener DASHBOARD_STREAM_MAX_CLIENTES por debajo de
+GUNICORN_THREADS.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+
+from core.database import SQLiteConnectionPool, get_connection_pool
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD_STREAM_CHECK_INTERVAL = float(os.environ.get('DASHBOARD_STREAM_CHECK_INTERVAL', '1'))
+DASHBOARD_STREAM_HEARTBEAT = float(os.environ.get('DASHBOARD_STREAM_HEARTBEAT', '15'))
+# Por debajo de GUNICORN_THREADS para que queden hilos para las peticiones normales
+DASHBOARD_STREAM_MAX_CLIENTES = int(os.environ.get('DASHBOARD_STREAM_MAX_CLIENTES', '48'))
+
+CANAL_E14 = 'e14'
+CANAL_CONSOLIDACION = 'consolidacion'
+CANAL_ASIGNACIONES = 'asignaciones'
+
+# Tablas que alimentan cada canal y eventos que cambian la instantánea
+TABLAS_POR_CANAL = {
+    CANAL_E14: {
+        'capturas_e14': ('INSERT', 'DELETE', 'UPDATE OF estado, total_votos, mesa_id'),
+        'e14_capturas': ('INSERT', 'DELETE',
+                         'UPDATE OF confirmado, votos_validos, votos_blanco, votos_nulos, mesa_id'),
+    },
+    CANAL_CONSOLIDACION: {
+        'consolidaciones_e24': ('INSERT', 'DELETE', 'UPDATE OF estado, mesas_procesadas, estado_verificacion'),
+        'discrepancias_e24': ('INSERT', 'DELETE', 'UPDATE OF estado'),
+        'reclamaciones_e24': ('INSERT', 'DELETE', 'UPDATE OF estado'),
+    },
+    CANAL_ASIGNACIONES: {
+        'asignaciones_testigos': ('INSERT', 'DELETE', 'UPDATE OF estado, mesa_id, testigo_id'),
+        'mesas_votacion': ('INSERT', 'DELETE', 'UPDATE OF estado, activa'),
+    },
+}
+
+# Mesa y municipio afectados por una fila de cada tabla ({fila} = NEW u OLD)
+_MUNICIPIO_DE_MESA = '(SELECT municipio_id FROM mesas_votacion WHERE id = {fila}.mesa_id)'
+DETALLE_POR_TABLA = {
+    'capturas_e14': {'mesa': '{fila}.mesa_id', 'municipio': _MUNICIPIO_DE_MESA},
+    'e14_capturas': {'mesa': '{fila}.mesa_id', 'municipio': _MUNICIPIO_DE_MESA},
+    'asignaciones_testigos': {'mesa': '{fila}.mesa_id', 'municipio': _MUNICIPIO_DE_MESA},
+    'mesas_votacion': {'mesa': '{fila}.id', 'municipio': '{fila}.municipio_id'},
+}
+
+DASHBOARD_VERSION_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS dashboard_version (
+        canal TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS dashboard_version_detalle (
+        canal TEXT NOT NULL,
+        tipo TEXT NOT NULL,
+        clave INTEGER NOT NULL,
+        version INTEGER NOT NULL,
+        PRIMARY KEY (canal, tipo, clave)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_dashboard_version_detalle ON dashboard_version_detalle(canal, version)"
+] + [
+    f"INSERT OR IGNORE INTO dashboard_version (canal, version) VALUES ('{canal}', 0)"
+    for canal in TABLAS_POR_CANAL
+]
+
+
+def _detalle_trigger(canal: str, tabla: str, evento: str) -> str:
+    # Mesas/municipios tocados, con la versión del canal recién incrementada
+    filas = {'INSERT': ['NEW'], 'DELETE': ['OLD'], 'UPDATE': ['OLD', 'NEW']}[evento.split()[0]]
+    sentencias = []
+    for fila in filas:
+        for tipo, expresion in DETALLE_POR_TABLA.get(tabla, {}).items():
+            clave = expresion.format(fila=fila)
+            sentencias.append(f"""
+                        INSERT OR REPLACE INTO dashboard_version_detalle (canal, tipo, clave, version)
+                        SELECT '{canal}', '{tipo}', {clave}, version FROM dashboard_version
+                        WHERE canal = '{canal}' AND {clave} IS NOT NULL;""")
+    return ''.join(sentencias)
+
+
+def _version_triggers(tablas_existentes) -> list:
+    sentencias = []
+    for canal, tablas in TABLAS_POR_CANAL.items():
+        for tabla, eventos in tablas.items():
+            if tabla not in tablas_existentes:
+                continue
+            for evento in eventos:
+                nombre = f"trg_dashboard_version_{tabla}_{evento.split()[0].lower()}"
+                # Se recrean para que bases con la versión anterior del trigger registren el detalle
+                sentencias.append(f"DROP TRIGGER IF EXISTS {nombre}")
+                sentencias.append(f"""
+                    CREATE TRIGGER {nombre}
+                    AFTER {evento} ON {tabla}
+                    BEGIN
+                        UPDATE dashboard_version SET version = version + 1 WHERE canal = '{canal}';{_detalle_trigger(canal, tabla, evento)}
+                    END
+                """)
+    return sentencias
+
+
+class DashboardStreamBusyError(Exception):
+    """Se alcanzó DASHBOARD_STREAM_MAX_CLIENTES"""
+
+
+class DashboardSubscription:
+    """Iterable de frames SSE de un cliente; close() libera su cupo (lo llama el servidor WSGI)"""
+
+    def __init__(self, service: 'DashboardStreamService'):
+        self._service = service
+        self._frames = service._stream()
+        self._cerrada = False
+
+    def __iter__(self):
+        return self._frames
+
+    def close(self):
+        if not self._cerrada:
+            self._cerrada = True
+            self._frames.close()
+            self._service._release()
+
+
+class DashboardStreamService:
+    """Instantánea compartida de los dashboards y publicación por SSE"""
+
+    def __init__(self, db_path: str = 'caqueta_electoral.db',
+                 connection_pool: Optional[SQLiteConnectionPool] = None,
+                 check_interval: Optional[float] = None, heartbeat: Optional[float] = None,
+                 max_clientes: Optional[int] = None):
+        self.db_path = db_path
+        self.connection_pool = connection_pool or get_connection_pool(db_path)
+        self.check_interval = DASHBOARD_STREAM_CHECK_INTERVAL if check_interval is None else check_interval
+        self.heartbeat = DASHBOARD_STREAM_HEARTBEAT if heartbeat is None else heartbeat
+        self.max_clientes = max_clientes or DASHBOARD_STREAM_MAX_CLIENTES
+        self.logger = logging.getLogger(__name__)
+
+        # Instantánea vigente: secciones por canal y frame SSE ya serializado
+        self._versiones: Dict[str, int] = {}
+        self._secciones: Dict[str, Dict] = {}
+        self._snapshot: Optional[Dict] = None
+        self._frame: Optional[bytes] = None
+        self._secuencia = 0
+
+        self._cambio = threading.Condition()
+        self._refresh_lock = threading.Lock()
+        self._clientes = 0
+        self._thread = None
+        self._schema_lista = False
+        self._tablas = frozenset()
+        self.stats = {'recalculos': 0, 'verificaciones': 0, 'frames_enviados': 0, 'rechazados': 0}
+
+    def get_connection(self) -> sqlite3.Connection:
+        """Obtener conexión del pool compartido"""
+        return self.connection_pool.connect(row_factory=sqlite3.Row)
+
+    # ==================== ESQUEMA ====================
+
+    def ensure_schema(self):
+        """Crear la tabla de versiones y sus triggers (idempotente)"""
+        if self._schema_lista:
+            return
+        conn = self.get_connection()
+        try:
+            existentes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            conn.execute("BEGIN IMMEDIATE")
+            for sentencia in DASHBOARD_VERSION_SCHEMA + _version_triggers(existentes):
+                conn.execute(sentencia)
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        self._tablas = frozenset(existentes)
+        self._schema_lista = True
+
+    # ==================== INSTANTÁNEA ====================
+
+    def _seccion_e14(self, cursor) -> Dict:
+        por_estado = {row['estado'] or 'sin_estado': row['total'] for row in cursor.execute(
+            "SELECT estado, COUNT(*) as total FROM capturas_e14 GROUP BY estado")}
+        if 'agregados_e14_municipio' in self._tablas:
+            # Agregados por municipio mantenidos por triggers (MunicipalCoordinationService)
+            agregados = cursor.execute("""
+                SELECT COALESCE(SUM(mesas_procesadas), 0) as mesas_procesadas,
+                       COALESCE(SUM(total_votos_validos), 0) as votos_validos,
+                       COALESCE(SUM(total_votos_blancos), 0) as votos_blancos,
+                       COALESCE(SUM(total_votos_nulos), 0) as votos_nulos
+                FROM agregados_e14_municipio
+            """).fetchone()
+        else:
+            agregados = cursor.execute("""
+                SELECT COUNT(*) as mesas_procesadas,
+                       COALESCE(SUM(votos_validos), 0) as votos_validos,
+                       COALESCE(SUM(votos_blanco), 0) as votos_blancos,
+                       COALESCE(SUM(votos_nulos), 0) as votos_nulos
+                FROM e14_capturas WHERE confirmado = 1
+            """).fetchone()
+        return {
+            'capturas': sum(por_estado.values()),
+            'capturas_por_estado': por_estado,
+            **dict(agregados)
+        }
+
+    def _seccion_consolidacion(self, cursor) -> Dict:
+        por_estado = {row['estado'] or 'sin_estado': row['total'] for row in cursor.execute(
+            "SELECT estado, COUNT(*) as total FROM consolidaciones_e24 GROUP BY estado")}
+        discrepancias = cursor.execute(
+            "SELECT COUNT(*) FROM discrepancias_e24 WHERE estado IS NULL OR estado != 'resuelta'").fetchone()[0]
+        reclamaciones = cursor.execute("SELECT COUNT(*) FROM reclamaciones_e24").fetchone()[0]
+        return {
+            'consolidaciones': sum(por_estado.values()),
+            'consolidaciones_por_estado': por_estado,
+            'discrepancias_abiertas': discrepancias,
+            'reclamaciones': reclamaciones
+        }
+
+    def _seccion_asignaciones(self, cursor) -> Dict:
+        fila = cursor.execute("""
+            SELECT
+                (SELECT COUNT(*) FROM municipios) as municipios,
+                (SELECT COUNT(*) FROM puestos_votacion) as puestos,
+                (SELECT COUNT(*) FROM mesas_votacion WHERE estado IN ('activa', 'configurada')) as mesas,
+                (SELECT COUNT(*) FROM mesas_votacion mv
+                 WHERE mv.estado IN ('activa', 'configurada') AND EXISTS (
+                     SELECT 1 FROM asignaciones_testigos at
+                     WHERE at.mesa_id = mv.id AND at.estado = 'asignado')) as mesas_cubiertas,
+                (SELECT COUNT(DISTINCT testigo_id) FROM asignaciones_testigos
+                 WHERE estado = 'asignado') as testigos_asignados
+        """).fetchone()
+        seccion = dict(fila)
+        seccion['cobertura'] = round(seccion['mesas_cubiertas'] / seccion['mesas'] * 100, 1) if seccion['mesas'] else 0.0
+        return seccion
+
+    def refresh(self, force: bool = False) -> bool:
+        """Recalcular las secciones cuyos canales cambiaron; retorna si hubo cambio"""
+        self.ensure_schema()
+        with self._refresh_lock:
+            return self._refresh_locked(force)
+
+    def _refresh_locked(self, force: bool) -> bool:
+        conn = self.get_connection()
+        try:
+            self.stats['verificaciones'] += 1
+            versiones = {row['canal']: row['version'] for row in conn.execute(
+                "SELECT canal, version FROM dashboard_version")}
+            cambiados = [canal for canal in TABLAS_POR_CANAL
+                         if force or versiones.get(canal) != self._versiones.get(canal)]
+            if not cambiados:
+                return False
+            detalle = {} if force else self._detalle(conn, cambiados)
+
+            calculos = {
+                CANAL_E14: self._seccion_e14,
+                CANAL_CONSOLIDACION: self._seccion_consolidacion,
+                CANAL_ASIGNACIONES: self._seccion_asignaciones,
+            }
+            secciones = dict(self._secciones)
+            # Todas las secciones de un recálculo salen de la misma lectura
+            conn.execute("BEGIN")
+            try:
+                for canal in cambiados:
+                    try:
+                        secciones[canal] = calculos[canal](conn.cursor())
+                    except sqlite3.Error as e:
+                        self.logger.error(f"Error calculando sección {canal} del dashboard: {e}")
+                        secciones.setdefault(canal, {})
+            finally:
+                conn.rollback()
+        finally:
+            conn.close()
+
+        self._publicar(versiones, secciones, cambiados, detalle)
+        return True
+
+    def _detalle(self, conn, cambiados) -> Dict[str, Dict[str, list]]:
+        """Mesas y municipios de cada canal cambiados desde la instantánea anterior"""
+        detalle = {}
+        for canal in cambiados:
+            anterior = self._versiones.get(canal)
+            if anterior is None or not any(tabla in DETALLE_POR_TABLA for tabla in TABLAS_POR_CANAL[canal]):
+                # Sin referencia (primera instantánea) o canal sin detalle: el cliente asume que cambió todo
+                continue
+            claves: Dict[str, list] = {}
+            for row in conn.execute(
+                    "SELECT tipo, clave FROM dashboard_version_detalle WHERE canal = ? AND version > ?",
+                    (canal, anterior)):
+                claves.setdefault(row['tipo'], []).append(row['clave'])
+            detalle[canal] = {tipo: claves.get(tipo, []) for tipo in ('mesa', 'municipio')}
+        return detalle
+
+    def _publicar(self, versiones: Dict[str, int], secciones: Dict[str, Dict], cambiados,
+                  detalle: Optional[Dict[str, Dict[str, list]]] = None):
+        with self._cambio:
+            self._secuencia += 1
+            snapshot = {
+                'secuencia': self._secuencia,
+                'versiones': versiones,
+                'cambiados': cambiados,
+                'detalle': detalle or {},
+                'generado': datetime.now().isoformat(),
+                **secciones
+            }
+            datos = json.dumps(snapshot, separators=(',', ':'), default=str)
+            self._versiones = versiones
+            self._secciones = secciones
+            self._snapshot = snapshot
+            self._frame = f"id: {self._secuencia}\nevent: snapshot\ndata: {datos}\n\n".encode('utf-8')
+            self.stats['recalculos'] += 1
+            self._cambio.notify_all()
+
+    def get_snapshot(self) -> Dict:
+        """Instantánea vigente (la calcula si aún no existe)"""
+        if self._snapshot is None:
+            self.refresh()
+        return self._snapshot
+
+    # ==================== PUBLICACIÓN ====================
+
+    def _run(self):
+        while True:
+            with self._cambio:
+                if self._clientes == 0:
+                    self._thread = None
+                    return
+            try:
+                self.refresh()
+            except Exception as e:
+                self.logger.error(f"Error actualizando instantánea del dashboard: {e}")
+            time.sleep(self.check_interval)
+
+    def _ensure_thread(self):
+        # Llamado con self._cambio tomado
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='dashboard-stream', daemon=True)
+            self._thread.start()
+
+    def subscribe(self) -> DashboardSubscription:
+        """Frames SSE para un cliente; lanza DashboardStreamBusyError si no hay cupo"""
+        with self._cambio:
+            if self._clientes >= self.max_clientes:
+                self.stats['rechazados'] += 1
+                raise DashboardStreamBusyError()
+            self._clientes += 1
+            self._ensure_thread()
+        return DashboardSubscription(self)
+
+    def _release(self):
+        with self._cambio:
+            self._clientes -= 1
+
+    def _stream(self) -> Iterator[bytes]:
+        # Instantánea inicial inmediata: el cliente no espera al siguiente cambio
+        self.get_snapshot()
+        yield b"retry: 5000\n\n"
+        enviado = 0
+        while True:
+            with self._cambio:
+                if self._secuencia == enviado:
+                    self._cambio.wait(self.heartbeat)
+                secuencia, frame = self._secuencia, self._frame
+            if secuencia != enviado and frame is not None:
+                # Un cliente lento salta instantáneas intermedias y recibe la última
+                enviado = secuencia
+                self.stats['frames_enviados'] += 1
+                yield frame
+            else:
+                yield b": ping\n\n"
+
+    def get_stats(self) -> Dict:
+        with self._cambio:
+            return dict(self.stats, clientes=self._clientes, secuencia=self._secuencia,
+                        versiones=dict(self._versiones))
+
+
+_streams: Dict[str, DashboardStreamService] = {}
+_streams_lock = threading.Lock()
+
+
+def get_dashboard_stream(db_path: str = 'caqueta_electoral.db') -> DashboardStreamService:
+    """Canal de dashboards compartido por base de datos"""
+    clave = os.path.abspath(db_path)
+    stream = _streams.get(clave)
+    if stream is None:
+        with _streams_lock:
+            stream = _streams.get(clave)
+            if stream is None:
+                stream = DashboardStreamService(db_path)
+                _streams[clave] = stream
+    return stream
@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+DivipolaImportService - Importación masiva del archivo DIVIPOLA
+Carga departamentos, municipios, zonas y puestos (y opcionalmente mesas)
+desde divipola.csv para todo el país en una sola transacción
+
+El CSV se lee en streaming hacia una tabla temporal de staging con los
+nombres ya normalizados; desde ahí cada nivel se resuelve e inserta con
+sentencias por conjuntos (INSERT ... SELECT ... ON CONFLICT / UPDATE ... FROM).
+"""
+
+import csv
+import logging
+import re
+import sqlite3
+import time
+import unicodedata
+from typing import Dict, Iterator, Optional, Tuple
+
+from core.database import SQLiteConnectionPool, get_connection_pool
+
+logger = logging.getLogger(__name__)
+
+# Convención DIVIPOLA de códigos de zona (ver CONVENCION_ZONAS_DIVIPOLA.md)
+TIPOS_ZONA_ESPECIALES = {'90': 'censo', '98': 'carcel', '99': 'rural'}
+
+DEPARTAMENTOS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS departamentos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        codigo_dd TEXT NOT NULL UNIQUE,
+        nombre TEXT NOT NULL,
+        activo INTEGER DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+STAGING_SCHEMA = """
+    DROP TABLE IF EXISTS temp.divipola_staging;
+    CREATE TEMP TABLE divipola_staging (
+        fila INTEGER PRIMARY KEY,
+        dd TEXT NOT NULL,
+        mm TEXT NOT NULL,
+        zz TEXT NOT NULL,
+        pp TEXT NOT NULL,
+        departamento TEXT NOT NULL,
+        clave_departamento TEXT NOT NULL,
+        municipio TEXT NOT NULL,
+        clave_municipio TEXT NOT NULL,
+        puesto TEXT NOT NULL,
+        clave_puesto TEXT NOT NULL,
+        direccion TEXT,
+        comuna TEXT,
+        total INTEGER,
+        mesas INTEGER,
+        latitud REAL,
+        longitud REAL,
+        municipio_id INTEGER,
+        zona_id INTEGER,
+        puesto_id INTEGER,
+        codigo_divipola TEXT
+    );
+    DROP TABLE IF EXISTS temp.divipola_municipios;
+    CREATE TEMP TABLE divipola_municipios (
+        clave TEXT PRIMARY KEY,
+        municipio_id INTEGER NOT NULL
+    );
+    DROP TABLE IF EXISTS temp.divipola_puestos;
+    CREATE TEMP TABLE divipola_puestos (
+        municipio_id INTEGER NOT NULL,
+        clave TEXT NOT NULL,
+        puesto_id INTEGER NOT NULL,
+        PRIMARY KEY (municipio_id, clave)
+    );
+"""
+
+LIMPIAR_STAGING = """
+    DROP TABLE IF EXISTS temp.divipola_staging;
+    DROP TABLE IF EXISTS temp.divipola_municipios;
+    DROP TABLE IF EXISTS temp.divipola_puestos;
+"""
+
+
+def normalizar_nombre(texto: Optional[str]) -> str:
+    """Clave de comparación: mayúsculas, sin tildes ni puntuación, espacios simples"""
+    if not texto:
+        return ''
+    sin_tildes = unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(re.sub(r'[^0-9A-Za-z]+', ' ', sin_tildes).upper().split())
+
+
+def _codigo(valor: str, digitos: int) -> str:
+    """Códigos numéricos del CSV ('1.0') con ceros a la izquierda; los alfanuméricos se conservan"""
+    valor = (valor or '').strip()
+    try:
+        return f"{int(float(valor)):0{digitos}d}"
+    except ValueError:
+        return valor.upper()
+
+
+def _entero(valor: str) -> int:
+    try:
+        return int(float(valor))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _decimal(valor: str) -> Optional[float]:
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+class DivipolaImportService:
+    """Motor de importación de la estructura DIVIPOLA"""
+
+    def __init__(self, db_path: str = 'caqueta_electoral.db',
+                 connection_pool: Optional[SQLiteConnectionPool] = None):
+        self.db_path = db_path
+        self.connection_pool = connection_pool or get_connection_pool(db_path)
+        self.logger = logging.getLogger(__name__)
+
+    def get_connection(self) -> sqlite3.Connection:
+        """Obtener conexión del pool compartido"""
+        return self.connection_pool.connect(row_factory=sqlite3.Row)
+
+    def _leer_csv(self, ruta_csv: str, departamento: Optional[str]) -> Iterator[Tuple]:
+        """Filas del CSV normalizadas, una a una"""
+        filtro = normalizar_nombre(departamento) if departamento else None
+        with open(ruta_csv, 'r', encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                clave_departamento = normalizar_nombre(row['departamento'])
+                dd = _codigo(row['dd'], 2)
+                if filtro and filtro not in (clave_departamento, dd):
+                    continue
+                yield (
+                    dd,
+                    _codigo(row['mm'], 3),
+                    _codigo(row['zz'], 2),
+                    _codigo(row['pp'], 2),
+                    row['departamento'].strip().title(),
+                    clave_departamento,
+                    row['municipio'].strip().title(),
+                    f"{clave_departamento}|{normalizar_nombre(row['municipio'])}",
+                    row['puesto'].strip(),
+                    normalizar_nombre(row['puesto']),
+                    (row.get('dirección') or row.get('direccion') or '').strip(),
+                    (row.get('comuna') or '').strip() or None,
+                    _entero(row.get('total')),
+                    _entero(row.get('mesas')),
+                    _decimal(row.get('LATITUD')),
+                    _decimal(row.get('LONGITUD'))
+                )
+
+    def import_csv(self, ruta_csv: str = 'divipola.csv', departamento: Optional[str] = None,
+                   crear_mesas: bool = False) -> Dict:
+        """
+        Importar divipola.csv con upsert por nivel
+
+        Los municipios existentes se reconocen por departamento y nombre
+        normalizados (la base de datos usa códigos DANE y el CSV los de la
+        Registraduría); los puestos por codigo_divipola o, si aún no lo tienen,
+        por nombre normalizado dentro del municipio.
+
+        Args:
+            ruta_csv: Archivo DIVIPOLA
+            departamento: Limitar a un departamento (nombre o código dd del CSV)
+            crear_mesas: Crear las mesas de los puestos que no tienen ninguna,
+                         repartiendo el total de votantes del puesto
+
+        Returns:
+            Dict con conteos por nivel y tiempos por etapa en segundos
+        """
+        resultado = {'filas': 0, 'filas_sin_municipio': 0, 'departamentos': 0,
+                     'municipios_nuevos': 0, 'zonas_nuevas': 0,
+                     'puestos_actualizados': 0, 'puestos_nuevos': 0, 'mesas_nuevas': 0, 'tiempos': {}}
+        tiempos = resultado['tiempos']
+
+        conn = self.get_connection()
+        conn.create_function('normalizar', 1, normalizar_nombre, deterministic=True)
+        try:
+            inicio = etapa = time.perf_counter()
+
+            def marcar(nombre):
+                nonlocal etapa
+                ahora = time.perf_counter()
+                tiempos[nombre] = round(ahora - etapa, 4)
+                etapa = ahora
+
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(DEPARTAMENTOS_SCHEMA)
+            for sentencia in STAGING_SCHEMA.split(';'):
+                if sentencia.strip():
+                    conn.execute(sentencia)
+
+            conn.executemany("""
+                INSERT INTO divipola_staging (
+                    dd, mm, zz, pp, departamento, clave_departamento, municipio, clave_municipio,
+                    puesto, clave_puesto, direccion, comuna, total, mesas, latitud, longitud
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, self._leer_csv(ruta_csv, departamento))
+            resultado['filas'] = conn.execute("SELECT COUNT(*) FROM divipola_staging").fetchone()[0]
+            marcar('lectura_csv')
+
+            resultado['municipios_nuevos'] = self._upsert_municipios(conn)
+            resultado['filas_sin_municipio'] = conn.execute(
+                "SELECT COUNT(*) FROM divipola_staging WHERE municipio_id IS NULL").fetchone()[0]
+            marcar('municipios')
+
+            resultado['departamentos'] = self._upsert_departamentos(conn)
+            marcar('departamentos')
+
+            resultado['zonas_nuevas'] = self._upsert_zonas(conn)
+            marcar('zonas')
+
+            resultado['puestos_actualizados'], resultado['puestos_nuevos'] = self._upsert_puestos(conn)
+            marcar('puestos')
+
+            if crear_mesas:
+                resultado['mesas_nuevas'] = self._crear_mesas(conn)
+                marcar('mesas')
+
+            for sentencia in LIMPIAR_STAGING.split(';'):
+                if sentencia.strip():
+                    conn.execute(sentencia)
+            conn.commit()
+            marcar('commit')
+            tiempos['total'] = round(time.perf_counter() - inicio, 4)
+        except Exception as e:
+            conn.rollback()
+            self.logger.error(f"Error importando DIVIPOLA: {e}")
+            raise
+        finally:
+            conn.close()
+
+        self.logger.info(f"DIVIPOLA importado: {resultado}")
+        return resultado
+
+    def _upsert_municipios(self, conn: sqlite3.Connection) -> int:
+        """Resolver municipio_id de cada fila, creando los municipios que no existen"""
+        conn.execute("""
+            INSERT OR IGNORE INTO divipola_municipios (clave, municipio_id)
+            SELECT normalizar(departamento) || '|' || normalizar(nombre), id
+            FROM municipios
+        """)
+
+        antes = conn.execute("SELECT COUNT(*) FROM municipios").fetchone()[0]
+        conn.execute("""
+            INSERT INTO municipios (codigo, nombre, departamento, codigo_dd, codigo_mm)
+            SELECT s.dd || s.mm, MIN(s.municipio), MIN(s.departamento), s.dd, s.mm
+            FROM divipola_staging s
+            WHERE NOT EXISTS (SELECT 1 FROM divipola_municipios dm WHERE dm.clave = s.clave_municipio)
+            GROUP BY s.dd, s.mm
+            ON CONFLICT(codigo) DO NOTHING
+        """)
+        nuevos = conn.execute("SELECT COUNT(*) FROM municipios").fetchone()[0] - antes
+
+        # Un código ocupado por otro municipio (p.ej. un código DANE) deja la fila sin resolver
+        conn.execute("""
+            INSERT OR IGNORE INTO divipola_municipios (clave, municipio_id)
+            SELECT DISTINCT s.clave_municipio, m.id
+            FROM divipola_staging s
+            JOIN municipios m ON m.codigo = s.dd || s.mm
+            WHERE normalizar(m.nombre) = normalizar(s.municipio)
+        """)
+        conn.execute("""
+            UPDATE divipola_staging
+            SET municipio_id = dm.municipio_id
+            FROM divipola_municipios dm
+            WHERE dm.clave = divipola_staging.clave_municipio
+        """)
+
+        # Códigos dd/mm para municipios existentes que aún no los tienen
+        conn.execute("""
+            UPDATE municipios
+            SET codigo_dd = s.dd, codigo_mm = s.mm, updated_at = CURRENT_TIMESTAMP
+            FROM (SELECT municipio_id, MIN(dd) as dd, MIN(mm) as mm
+                  FROM divipola_staging GROUP BY municipio_id) s
+            WHERE municipios.id = s.municipio_id
+              AND (municipios.codigo_dd IS NULL OR municipios.codigo_mm IS NULL)
+        """)
+        return nuevos
+
+    def _upsert_departamentos(self, conn: sqlite3.Connection) -> int:
+        """Departamentos con el código dd que usan sus municipios en la base de datos"""
+        conn.execute("""
+            INSERT INTO departamentos (codigo_dd, nombre)
+            SELECT m.codigo_dd, MIN(m.departamento)
+            FROM municipios m
+            WHERE m.id IN (SELECT municipio_id FROM divipola_staging)
+              AND m.codigo_dd IS NOT NULL
+            GROUP BY m.codigo_dd
+            ON CONFLICT(codigo_dd) DO UPDATE SET
+                nombre = excluded.nombre,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE departamentos.nombre != excluded.nombre
+        """)
+        return conn.execute("""
+            SELECT COUNT(DISTINCT m.codigo_dd) FROM municipios m
+            WHERE m.id IN (SELECT municipio_id FROM divipola_staging)
+        """).fetchone()[0]
+
+    def _upsert_zonas(self, conn: sqlite3.Connection) -> int:
+        """Crear las zonas (municipio, zz) que falten y resolver zona_id"""
+        antes = conn.execute("SELECT COUNT(*) FROM zonas").fetchone()[0]
+        conn.execute(f"""
+            INSERT INTO zonas (codigo_zz, nombre, municipio_id, codigo_completo, tipo_zona)
+            SELECT s.zz, 'Zona ' || s.zz, s.municipio_id,
+                   m.codigo_dd || m.codigo_mm || s.zz,
+                   CASE s.zz {' '.join(f"WHEN '{zz}' THEN '{tipo}'" for zz, tipo in TIPOS_ZONA_ESPECIALES.items())}
+                        ELSE 'urbana' END
+            FROM (SELECT DISTINCT municipio_id, zz FROM divipola_staging) s
+            JOIN municipios m ON m.id = s.municipio_id
+            WHERE true
+            ON CONFLICT(municipio_id, codigo_zz) DO UPDATE SET
+                codigo_completo = COALESCE(zonas.codigo_completo, excluded.codigo_completo),
+                tipo_zona = COALESCE(zonas.tipo_zona, excluded.tipo_zona)
+            WHERE zonas.codigo_completo IS NULL OR zonas.tipo_zona IS NULL
+        """)
+        nuevas = conn.execute("SELECT COUNT(*) FROM zonas").fetchone()[0] - antes
+
+        conn.execute("""
+            UPDATE divipola_staging
+            SET zona_id = z.id,
+                codigo_divipola = z.codigo_completo || divipola_staging.pp
+            FROM zonas z
+            WHERE z.municipio_id = divipola_staging.municipio_id AND z.codigo_zz = divipola_staging.zz
+        """)
+        return nuevas
+
+    def _upsert_puestos(self, conn: sqlite3.Connection) -> Tuple[int, int]:
+        """Actualizar puestos existentes e insertar los nuevos"""
+        # 1. Por código DIVIPOLA
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_puestos_divipola ON puestos_votacion(codigo_divipola)")
+        conn.execute("CREATE INDEX temp.idx_staging_divipola ON divipola_staging(codigo_divipola)")
+        conn.execute("CREATE INDEX temp.idx_staging_puesto ON divipola_staging(municipio_id, clave_puesto)")
+        conn.execute("""
+            UPDATE divipola_staging
+            SET puesto_id = p.id
+            FROM puestos_votacion p
+            WHERE p.codigo_divipola = divipola_staging.codigo_divipola
+        """)
+
+        # 2. Por nombre normalizado dentro del municipio, solo si el nombre es único en ambos lados
+        conn.execute("""
+            INSERT OR IGNORE INTO divipola_puestos (municipio_id, clave, puesto_id)
+            SELECT municipio_id, normalizar(nombre), MIN(id)
+            FROM puestos_votacion
+            WHERE codigo_divipola IS NULL
+              AND municipio_id IN (SELECT municipio_id FROM divipola_staging)
+            GROUP BY municipio_id, normalizar(nombre)
+            HAVING COUNT(*) = 1
+        """)
+        conn.execute("""
+            UPDATE divipola_staging
+            SET puesto_id = dp.puesto_id
+            FROM divipola_puestos dp
+            JOIN (SELECT municipio_id, clave_puesto FROM divipola_staging
+                  GROUP BY municipio_id, clave_puesto HAVING COUNT(*) = 1) unicos
+              ON unicos.municipio_id = dp.municipio_id AND unicos.clave_puesto = dp.clave
+            WHERE divipola_staging.puesto_id IS NULL
+              AND dp.municipio_id = divipola_staging.municipio_id
+              AND dp.clave = divipola_staging.clave_puesto
+        """)
+
+        actualizados = conn.execute("""
+            UPDATE puestos_votacion
+            SET direccion = COALESCE(NULLIF(s.direccion, ''), puestos_votacion.direccion),
+                zona_id = s.zona_id,
+                codigo_pp = s.pp,
+                codigo_divipola = s.codigo_divipola,
+                capacidad_votantes = s.total,
+                barrio_vereda = COALESCE(s.comuna, puestos_votacion.barrio_vereda),
+                coordenadas_lat = COALESCE(s.latitud, puestos_votacion.coordenadas_lat),
+                coordenadas_lng = COALESCE(s.longitud, puestos_votacion.coordenadas_lng),
+                updated_at = CURRENT_TIMESTAMP
+            FROM divipola_staging s
+            WHERE puestos_votacion.id = s.puesto_id
+        """).rowcount
+
+        nuevos = conn.execute("""
+            INSERT INTO puestos_votacion (
+                nombre, direccion, municipio_id, zona_id, codigo_pp, codigo_divipola,
+                capacidad_votantes, barrio_vereda, coordenadas_lat, coordenadas_lng,
+                estado, activo
+            )
+            SELECT puesto, direccion, municipio_id, zona_id, pp, codigo_divipola,
+                   total, comuna, latitud, longitud, 'configurado', 1
+            FROM divipola_staging
+            WHERE puesto_id IS NULL AND zona_id IS NOT NULL
+            ORDER BY fila
+        """).rowcount
+        return actualizados, nuevos
+
+    def _crear_mesas(self, conn: sqlite3.Connection) -> int:
+        """Mesas 001..N para los puestos importados sin mesas, repartiendo los votantes"""
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_mesas_puesto_id ON mesas_votacion(puesto_id)")
+        antes = conn.execute("SELECT COUNT(*) FROM mesas_votacion").fetchone()[0]
+        conn.execute("""
+            WITH RECURSIVE puestos AS (
+                SELECT p.id as puesto_id, p.municipio_id, MAX(s.mesas, 1) as mesas, s.total
+                FROM divipola_staging s
+                JOIN puestos_votacion p ON p.codigo_divipola = s.codigo_divipola
+                WHERE NOT EXISTS (SELECT 1 FROM mesas_votacion mv WHERE mv.puesto_id = p.id)
+            ),
+            numeros(puesto_id, municipio_id, mesas, total, n) AS (
+                SELECT puesto_id, municipio_id, mesas, total, 1 FROM puestos
+                UNION ALL
+                SELECT puesto_id, municipio_id, mesas, total, n + 1 FROM numeros WHERE n < mesas
+            )
+            INSERT INTO mesas_votacion (
+                numero, puesto_id, municipio_id, votantes_habilitados, total_votantes, estado, activa
+            )
+            SELECT printf('%03d', n), puesto_id, municipio_id,
+                   total / mesas + (n <= total % mesas),
+                   total / mesas + (n <= total % mesas),
+                   'configurada', 1
+            FROM numeros
+            ORDER BY puesto_id, n
+        """)
+        return conn.execute("SELECT COUNT(*) FROM mesas_votacion").fetchone()[0] - antes
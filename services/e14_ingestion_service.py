@@ -0,0 +1,787 @@
+#!/usr/bin/env python3
+"""
+Cola de ingesta de formularios E14
+Acepta capturas E14, las registra en un journal de escritura anticipada y las
+escribe en SQLite por lotes (group commit) desde un único hilo escritor
+
+Cada proceso escribe su propio journal (<E14_INGESTA_JOURNAL>.<pid>) y lo
+mantiene bloqueado mientras vive; al iniciar, un proceso reproduce los journals
+huérfanos (sin bloqueo) de procesos terminados y luego los elimina.
+"""
+
+import atexit
+import glob
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Tuple
+
+from core.database import SQLiteConnectionPool, get_connection_pool
+from services.vote_aggregation_service import VoteAggregationService
+
+try:
+    import fcntl
+except ImportError:  # Windows: servidor de desarrollo de un solo proceso
+    fcntl = None
+
+# Tipos de captura aceptados por la cola
+TIPO_CAPTURA_E14 = 'e14_captura'      # /api/e14/capturar -> e14_capturas
+TIPO_ENVIO_TESTIGO = 'testigo_envio'  # /api/testigo/enviar-e14 -> capturas_e14 + datos_ocr_e14
+
+ESTADO_PENDIENTE = 'pendiente'
+ESTADO_CONFIRMADO = 'confirmado'
+ESTADO_RECHAZADO = 'rechazado'
+
+# Valores de capturas_e14 para los envíos del testigo (la foto aún no se recibe por esta ruta)
+RUTA_FOTO_PENDIENTE = 'uploads/e14/temp.jpg'
+ESTADO_ENVIO_TESTIGO = 'enviado'
+# Un reenvío del testigo reemplaza su envío anterior de la misma mesa: solo el
+# último queda 'enviado' y suma en los agregados de votos
+ESTADO_ENVIO_REEMPLAZADO = 'reemplazado'
+# Envíos revisados por el coordinador: el testigo ya no puede reemplazarlos
+ESTADOS_ENVIO_CERRADO = ('validado', 'confirmado')
+# Confianza registrada para votos digitados por el testigo
+CONFIANZA_DIGITADO = 0.95
+
+
+def _bloquear_journal(archivo) -> bool:
+    """Bloqueo exclusivo no bloqueante del journal; False si otro proceso lo tiene"""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(archivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+class E14ValidationError(ValueError):
+    """Error de validación de un payload E14"""
+
+    def __init__(self, message: str, codigo_error: str = 'E14_INVALIDO'):
+        super().__init__(message)
+        self.codigo_error = codigo_error
+
+
+class E14IngestionQueue:
+    """Cola de ingesta E14 con journal durable y escritura por lotes"""
+
+    def __init__(self, db_path: str = 'caqueta_electoral.db',
+                 connection_pool: Optional[SQLiteConnectionPool] = None,
+                 journal_path: Optional[str] = None,
+                 batch_size: int = 200, max_wait_ms: int = 50,
+                 fsync: bool = True, status_cache_size: int = 20000,
+                 confirm_wait_ms: Optional[int] = None):
+        self.db_path = db_path
+        self.connection_pool = connection_pool or get_connection_pool(db_path)
+        self.journal_base = journal_path or os.environ.get('E14_INGESTA_JOURNAL', 'e14_ingesta.journal')
+        self.journal_path = f"{self.journal_base}.{os.getpid()}"
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.fsync = fsync
+        if confirm_wait_ms is None:
+            confirm_wait_ms = int(os.environ.get('E14_INGESTA_ESPERA_MS', '2000'))
+        self.confirm_wait = confirm_wait_ms / 1000.0
+        self.logger = logging.getLogger(__name__)
+
+        self._queue = queue.Queue()
+        self._journal_lock = threading.Lock()
+        self._journal = None
+        self._journal_pending = 0
+        self._state_lock = threading.Lock()
+        self._status_changed = threading.Condition(self._state_lock)
+        self._start_lock = threading.Lock()
+        self._mesas_en_cola = set()
+        self._status = OrderedDict()
+        self._status_cache_size = status_cache_size
+        self._thread = None
+        self._stop = threading.Event()
+        self._started = False
+        self.stats = {'recibidos': 0, 'confirmados': 0, 'rechazados': 0, 'lotes': 0}
+
+    # ==================== CICLO DE VIDA ====================
+
+    def start(self):
+        """Crear tabla de estado, reproducir el journal e iniciar el hilo escritor"""
+        with self._start_lock:
+            if self._started:
+                return
+
+            self._ensure_schema()
+            # Triggers de votos_candidato_agregados antes de la primera escritura de datos_ocr_e14
+            VoteAggregationService(self.db_path, self.connection_pool).ensure_schema()
+            if os.path.exists(self.journal_path):
+                # PID reutilizado (p. ej. pid 1 en un contenedor): el journal es de un proceso anterior
+                os.replace(self.journal_path, f"{self.journal_path}.{uuid.uuid4().hex}")
+            self._journal = open(self.journal_path, 'a', encoding='utf-8')
+            if not _bloquear_journal(self._journal):
+                self._journal.close()
+                self._journal = None
+                raise RuntimeError(f"Journal E14 en uso por otro proceso: {self.journal_path}")
+            self._replay_journals()
+
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='e14-ingesta', daemon=True)
+            self._thread.start()
+            self._started = True
+
+    def shutdown(self, timeout: float = 10.0):
+        """Vaciar la cola y detener el hilo escritor"""
+        if not self._started:
+            return
+        self._stop.set()
+        self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join(timeout)
+        with self._journal_lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+                # Todo confirmado: el journal vacío no hace falta para el siguiente arranque
+                if self._journal_pending == 0 and os.path.exists(self.journal_path):
+                    os.remove(self.journal_path)
+        self._started = False
+
+    def _ensure_schema(self):
+        conn = self.connection_pool.connect()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS e14_ingesta (
+                    ack_id TEXT PRIMARY KEY,
+                    tipo TEXT NOT NULL,
+                    mesa_id INTEGER,
+                    estado TEXT NOT NULL,
+                    registro_id INTEGER,
+                    codigo_error TEXT,
+                    error TEXT,
+                    payload TEXT,
+                    recibido_en TIMESTAMP,
+                    procesado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            if conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'capturas_e14'").fetchone():
+                # Búsqueda del envío anterior del testigo para la mesa (reemplazo y validados)
+                conn.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_capturas_e14_mesa_testigo
+                    ON capturas_e14(mesa_id, testigo_id)
+                """)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _journals_huerfanos(self) -> List[str]:
+        """Journals de otros procesos (y el journal sin pid de versiones anteriores)"""
+        candidatos = set(glob.glob(glob.escape(self.journal_base) + '.*')) | {self.journal_base}
+        return sorted(path for path in candidatos if path != self.journal_path and os.path.isfile(path))
+
+    def _replay_journals(self):
+        """Adoptar las entradas sin confirmar de journals huérfanos"""
+        for path in self._journals_huerfanos():
+            try:
+                archivo = open(path, 'r+', encoding='utf-8')
+            except OSError:
+                continue
+            try:
+                # Bloqueado: su proceso sigue vivo. Sin enlaces: otro proceso ya lo adoptó
+                if not _bloquear_journal(archivo) or os.fstat(archivo.fileno()).st_nlink == 0:
+                    continue
+                self._adoptar_entradas(self._leer_journal(archivo))
+                os.remove(path)
+            finally:
+                archivo.close()
+
+    def _leer_journal(self, archivo) -> List[Dict[str, Any]]:
+        entradas = []
+        for line in archivo:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entradas.append(json.loads(line))
+            except ValueError:
+                self.logger.warning("Entrada corrupta en journal E14 descartada")
+        return entradas
+
+    def _adoptar_entradas(self, entradas: List[Dict[str, Any]]):
+        """Copiar al journal propio y re-encolar las entradas que no alcanzaron a confirmarse"""
+        if not entradas:
+            return
+
+        conn = self.connection_pool.connect()
+        try:
+            placeholders = ','.join('?' * len(entradas))
+            procesados = {row[0] for row in conn.execute(
+                f"SELECT ack_id FROM e14_ingesta WHERE ack_id IN ({placeholders})",
+                [e['ack_id'] for e in entradas]
+            )}
+        finally:
+            conn.close()
+
+        pendientes = [e for e in entradas if e['ack_id'] not in procesados]
+        for entrada in pendientes:
+            # Primero durable en el journal propio: el huérfano se elimina al terminar
+            self._append_journal(entrada)
+            if entrada['tipo'] == TIPO_CAPTURA_E14:
+                self._mesas_en_cola.add(entrada['payload']['mesa_id'])
+            self._set_status(entrada['ack_id'], {'estado': ESTADO_PENDIENTE})
+            self._queue.put(entrada)
+
+        if pendientes:
+            self.logger.info(f"Journal E14: {len(pendientes)} capturas re-encoladas")
+
+    # ==================== RECEPCIÓN ====================
+
+    def submit(self, tipo: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Validar y encolar una captura E14
+
+        Args:
+            tipo: TIPO_CAPTURA_E14 o TIPO_ENVIO_TESTIGO
+            payload: Datos de la captura
+
+        Returns:
+            Acuse con ack_id; la escritura en base de datos ocurre en lote
+
+        Raises:
+            E14ValidationError: Si el payload es inválido o la mesa ya tiene E14
+        """
+        if not self._started:
+            self.start()
+
+        registro = self._validate(tipo, payload)
+        self._validar_referencias(registro)
+        entrada = {
+            'ack_id': uuid.uuid4().hex,
+            'tipo': tipo,
+            'payload': registro,
+            'recibido_en': datetime.now().isoformat()
+        }
+
+        if tipo == TIPO_CAPTURA_E14:
+            mesa_id = registro['mesa_id']
+            # Lectura puntual por índice: en WAL no compite con el hilo escritor
+            ya_capturada = self._mesa_tiene_e14(mesa_id)
+            with self._state_lock:
+                if ya_capturada or mesa_id in self._mesas_en_cola:
+                    raise E14ValidationError(
+                        'Esta mesa ya tiene un E14 capturado. No se permite duplicados.',
+                        'E14_DUPLICADO'
+                    )
+                self._mesas_en_cola.add(mesa_id)
+        elif self._envio_cerrado(registro['mesa_id'], registro['testigo_id']):
+            raise E14ValidationError(
+                'El E14 de este testigo para la mesa ya fue validado. No se permite reenviarlo.',
+                'E14_DUPLICADO'
+            )
+
+        try:
+            self._append_journal(entrada)
+        except Exception:
+            if tipo == TIPO_CAPTURA_E14:
+                with self._state_lock:
+                    self._mesas_en_cola.discard(registro['mesa_id'])
+            raise
+
+        self._set_status(entrada['ack_id'], {'estado': ESTADO_PENDIENTE})
+        self._queue.put(entrada)
+        with self._state_lock:
+            self.stats['recibidos'] += 1
+
+        acuse = {'ack_id': entrada['ack_id'], 'estado': ESTADO_PENDIENTE, 'recibido_en': entrada['recibido_en']}
+        if 'total_votos' in registro:
+            acuse['total_votos'] = registro['total_votos']
+        return acuse
+
+    def _mesa_tiene_e14(self, mesa_id: int) -> bool:
+        conn = self.connection_pool.connect()
+        try:
+            return conn.execute(
+                "SELECT 1 FROM e14_capturas WHERE mesa_id = ? LIMIT 1", (mesa_id,)
+            ).fetchone() is not None
+        finally:
+            conn.close()
+
+    def _envio_cerrado(self, mesa_id: int, testigo_id: int) -> bool:
+        conn = self.connection_pool.connect()
+        try:
+            return conn.execute(f"""
+                SELECT 1 FROM capturas_e14
+                WHERE mesa_id = ? AND testigo_id = ? AND estado IN ({', '.join('?' * len(ESTADOS_ENVIO_CERRADO))})
+                LIMIT 1
+            """, (mesa_id, testigo_id, *ESTADOS_ENVIO_CERRADO)).fetchone() is not None
+        finally:
+            conn.close()
+
+    def _validar_referencias(self, registro: Dict[str, Any]):
+        """
+        Verificar mesa, testigo y candidatos antes de responder: un envío que el
+        hilo escritor no podría guardar debe fallar en la petición, no en el lote.
+        Los candidatos digitados solo por nombre se resuelven a candidatos.id
+        para que sus votos entren a votos_candidato_agregados
+        """
+        conn = self.connection_pool.connect()
+        try:
+            self._resolver_candidatos(conn, registro.get('candidatos', ()))
+            candidato_ids = {c['candidato_id'] for c in registro.get('candidatos', ())
+                             if c.get('candidato_id') is not None}
+            if conn.execute("SELECT 1 FROM mesas_votacion WHERE id = ?",
+                            (registro['mesa_id'],)).fetchone() is None:
+                raise E14ValidationError(f"Mesa no encontrada: {registro['mesa_id']}", 'E14_MESA_INVALIDA')
+            if conn.execute("SELECT 1 FROM users WHERE id = ?",
+                            (registro['testigo_id'],)).fetchone() is None:
+                raise E14ValidationError(f"Testigo no encontrado: {registro['testigo_id']}",
+                                         'E14_TESTIGO_INVALIDO')
+            if candidato_ids:
+                placeholders = ','.join('?' * len(candidato_ids))
+                existentes = {row[0] for row in conn.execute(
+                    f"SELECT id FROM candidatos WHERE id IN ({placeholders})", list(candidato_ids)
+                )}
+                faltantes = sorted(candidato_ids - existentes)
+                if faltantes:
+                    raise E14ValidationError(f"Candidatos no encontrados: {faltantes}", 'E14_CANDIDATO_INVALIDO')
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _normalizar_nombre(nombre: Optional[str]) -> str:
+        return ' '.join((nombre or '').split()).lower()
+
+    def _resolver_candidatos(self, conn, candidatos):
+        """Asignar candidato_id por nombre completo (y partido si el nombre se repite)"""
+        sin_id = [c for c in candidatos if c.get('candidato_id') is None and c.get('nombre')]
+        if not sin_id:
+            return
+        por_nombre: Dict[str, List[Tuple[int, str, str]]] = {}
+        for row in conn.execute("""
+            SELECT c.id, c.nombre_completo, p.nombre, p.sigla
+            FROM candidatos c
+            LEFT JOIN partidos_politicos p ON c.partido_id = p.id
+            WHERE c.activo = 1
+        """):
+            por_nombre.setdefault(self._normalizar_nombre(row[1]), []).append(
+                (row[0], self._normalizar_nombre(row[2]), self._normalizar_nombre(row[3])))
+        for candidato in sin_id:
+            opciones = por_nombre.get(self._normalizar_nombre(candidato['nombre']), [])
+            if len(opciones) > 1:
+                partido = self._normalizar_nombre(candidato.get('partido'))
+                opciones = [o for o in opciones if partido and partido in (o[1], o[2])]
+            if len(opciones) == 1:
+                candidato['candidato_id'] = opciones[0][0]
+            else:
+                self.logger.warning(f"Candidato E14 sin resolver a candidatos.id: {candidato['nombre']}")
+
+    def _append_journal(self, entrada: Dict[str, Any]):
+        line = json.dumps(entrada, ensure_ascii=False) + '\n'
+        with self._journal_lock:
+            self._journal.write(line)
+            self._journal.flush()
+            if self.fsync:
+                os.fsync(self._journal.fileno())
+            self._journal_pending += 1
+
+    def _validate(self, tipo: str, data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if not isinstance(data, dict):
+            raise E14ValidationError('Datos del formulario requeridos')
+
+        if tipo == TIPO_CAPTURA_E14:
+            for campo in ('mesa_id', 'testigo_id'):
+                if data.get(campo) is None:
+                    raise E14ValidationError(f'Campo requerido: {campo}')
+            if not data.get('imagen_e14'):
+                raise E14ValidationError('Campo requerido: imagen_e14')
+            registro = {
+                'mesa_id': self._to_int(data.get('mesa_id'), 'mesa_id'),
+                'testigo_id': self._to_int(data.get('testigo_id'), 'testigo_id'),
+                'imagen_e14': data.get('imagen_e14'),
+                'observaciones': data.get('observaciones'),
+                'confirmado': 1 if data.get('confirmado') else 0
+            }
+            for campo in ('votos_validos', 'votos_blanco', 'votos_nulos'):
+                registro[campo] = self._to_votes(data.get(campo), campo)
+            return registro
+
+        if tipo == TIPO_ENVIO_TESTIGO:
+            candidatos = data.get('candidatos')
+            if not candidatos or not isinstance(candidatos, list):
+                raise E14ValidationError('Debe incluir al menos un candidato')
+            for campo in ('mesa_id', 'testigo_id'):
+                if data.get(campo) is None:
+                    raise E14ValidationError(f'Campo requerido: {campo}')
+            registro = {
+                'testigo_id': self._to_int(data.get('testigo_id'), 'testigo_id'),
+                'mesa_id': self._to_int(data.get('mesa_id'), 'mesa_id'),
+                'candidatos': [self._validar_candidato(c) for c in candidatos],
+                'votos_blanco': self._to_votes(data.get('votosBlanco', 0), 'votosBlanco'),
+                'votos_nulos': self._to_votes(data.get('votosNulos', 0), 'votosNulos'),
+                'tarjetas_no_marcadas': self._to_votes(data.get('tarjetasNoMarcadas', 0), 'tarjetasNoMarcadas'),
+                'observaciones': data.get('observaciones', '')
+            }
+            registro['total_votos_candidatos'] = sum(c['votos'] for c in registro['candidatos'])
+            registro['total_votos'] = (registro['total_votos_candidatos'] +
+                                       registro['votos_blanco'] + registro['votos_nulos'])
+            return registro
+
+        raise E14ValidationError(f'Tipo de captura no soportado: {tipo}')
+
+    def _validar_candidato(self, candidato) -> Dict[str, Any]:
+        if not isinstance(candidato, dict):
+            raise E14ValidationError('Candidato inválido')
+        nombre = (candidato.get('nombre') or '').strip()
+        candidato_id = candidato.get('candidato_id')
+        if not nombre and candidato_id is None:
+            raise E14ValidationError('Cada candidato requiere nombre o candidato_id')
+        return {
+            'candidato_id': self._to_int(candidato_id, 'candidato_id') if candidato_id is not None else None,
+            'nombre': nombre,
+            'partido': candidato.get('partido'),
+            'votos': self._to_votes(candidato.get('votos'), 'votos')
+        }
+
+    @staticmethod
+    def _to_int(value, campo: str) -> int:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise E14ValidationError(f'Valor inválido para {campo}')
+
+    @classmethod
+    def _to_votes(cls, value, campo: str) -> int:
+        if value is None:
+            raise E14ValidationError(f'Campo requerido: {campo}')
+        votos = cls._to_int(value, campo)
+        if votos < 0:
+            raise E14ValidationError(f'{campo} no puede ser negativo')
+        return votos
+
+    # ==================== ESTADO ====================
+
+    def _set_status(self, ack_id: str, status: Dict[str, Any]):
+        with self._state_lock:
+            self._status[ack_id] = status
+            self._status.move_to_end(ack_id)
+            while len(self._status) > self._status_cache_size:
+                self._status.popitem(last=False)
+            self._status_changed.notify_all()
+
+    def get_status(self, ack_id: str) -> Optional[Dict[str, Any]]:
+        """Consultar el estado de una captura por su acuse"""
+        with self._state_lock:
+            status = self._status.get(ack_id)
+        if status is not None:
+            return dict(status, ack_id=ack_id)
+
+        conn = self.connection_pool.connect(row_factory=sqlite3.Row)
+        try:
+            row = conn.execute("""
+                SELECT ack_id, estado, registro_id, codigo_error, error, procesado_en
+                FROM e14_ingesta WHERE ack_id = ?
+            """, (ack_id,)).fetchone()
+        except sqlite3.OperationalError:
+            row = None
+        finally:
+            conn.close()
+        return dict(row) if row else None
+
+    def wait_for(self, ack_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Esperar a que el hilo escritor confirme o rechace una captura
+
+        Args:
+            ack_id: Acuse devuelto por submit
+            timeout: Segundos máximos de espera (por defecto E14_INGESTA_ESPERA_MS)
+
+        Returns:
+            Estado de la captura; sigue 'pendiente' si el lote no se escribió a tiempo
+        """
+        limite = time.monotonic() + (self.confirm_wait if timeout is None else timeout)
+        with self._status_changed:
+            while True:
+                status = self._status.get(ack_id)
+                restante = limite - time.monotonic()
+                if status is None or status['estado'] != ESTADO_PENDIENTE or restante <= 0:
+                    break
+                self._status_changed.wait(restante)
+        if status is None:
+            return self.get_status(ack_id)
+        return dict(status, ack_id=ack_id)
+
+    def wait_idle(self, timeout: float = 30.0) -> bool:
+        """Esperar a que todas las capturas encoladas se escriban (pruebas/apagado)"""
+        limite = time.monotonic() + timeout
+        while time.monotonic() < limite:
+            with self._journal_lock:
+                if self._journal_pending == 0:
+                    return True
+            time.sleep(0.005)
+        return False
+
+    # ==================== ESCRITURA POR LOTES ====================
+
+    def _run(self):
+        while True:
+            entrada = self._queue.get()
+            if entrada is None:
+                if self._stop.is_set() and self._queue.empty():
+                    break
+                continue
+
+            lote = [entrada]
+            limite = time.monotonic() + self.max_wait
+            while len(lote) < self.batch_size:
+                restante = limite - time.monotonic()
+                try:
+                    siguiente = self._queue.get(timeout=max(restante, 0)) if restante > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if siguiente is None:
+                    self._queue.put(None)
+                    break
+                lote.append(siguiente)
+
+            try:
+                self._flush(lote)
+            except Exception as e:
+                self.logger.error(f"Error escribiendo lote E14, se reintentará: {e}")
+                time.sleep(0.5)
+                for item in lote:
+                    self._queue.put(item)
+
+    def _flush(self, lote: List[Dict[str, Any]]):
+        """Escribir un lote completo en una sola transacción"""
+        for intento in range(5):
+            try:
+                resultados = self._write_batch(lote)
+                break
+            except sqlite3.OperationalError as e:
+                if 'locked' in str(e) and intento < 4:
+                    time.sleep(0.05 * (2 ** intento))
+                    continue
+                resultados = self._write_isolated(lote)
+                break
+            except sqlite3.DatabaseError:
+                resultados = self._write_isolated(lote)
+                break
+
+        self._apply_results(lote, resultados)
+
+    def _write_isolated(self, lote: List[Dict[str, Any]]) -> List[Tuple[str, Dict[str, Any]]]:
+        """Un registro inválido no debe bloquear al resto: escribir uno por uno"""
+        resultados = []
+        rechazos = []
+        for item in lote:
+            try:
+                resultados.extend(self._write_batch([item]))
+            except sqlite3.OperationalError as e:
+                if 'locked' in str(e):
+                    raise
+                rechazos.append((item, 'E14_ERROR', str(e)))
+            except sqlite3.DatabaseError as e:
+                rechazos.append((item, 'E14_INVALIDO', str(e)))
+        if rechazos:
+            resultados.extend(self._write_rejections(rechazos))
+        return resultados
+
+    def _write_batch(self, lote: List[Dict[str, Any]]) -> List[Tuple[str, Dict[str, Any]]]:
+        conn = self.connection_pool.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+
+            capturas = [e for e in lote if e['tipo'] == TIPO_CAPTURA_E14]
+            envios = [e for e in lote if e['tipo'] == TIPO_ENVIO_TESTIGO]
+            resultados = []
+            rechazos = []
+
+            if capturas:
+                # Misma semántica que antes: un solo E14 por mesa
+                mesa_ids = [e['payload']['mesa_id'] for e in capturas]
+                placeholders = ','.join('?' * len(mesa_ids))
+                existentes = {row[0] for row in cursor.execute(
+                    f"SELECT mesa_id FROM e14_capturas WHERE mesa_id IN ({placeholders})", mesa_ids
+                )}
+                aceptadas = []
+                vistas = set()
+                for e in capturas:
+                    mesa_id = e['payload']['mesa_id']
+                    if mesa_id in existentes or mesa_id in vistas:
+                        rechazos.append((e, 'E14_DUPLICADO',
+                                         'Esta mesa ya tiene un E14 capturado. No se permite duplicados.'))
+                    else:
+                        vistas.add(mesa_id)
+                        aceptadas.append(e)
+
+                if aceptadas:
+                    cursor.executemany("""
+                        INSERT INTO e14_capturas
+                        (mesa_id, testigo_id, imagen_e14, votos_validos, votos_blanco, votos_nulos,
+                         observaciones, confirmado, fecha_captura)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                    """, [
+                        (p['mesa_id'], p['testigo_id'], p['imagen_e14'], p['votos_validos'],
+                         p['votos_blanco'], p['votos_nulos'], p['observaciones'], p['confirmado'])
+                        for p in (e['payload'] for e in aceptadas)
+                    ])
+                    # Con BEGIN IMMEDIATE nadie más escribe: los IDs del lote son consecutivos
+                    ultimo_id = cursor.execute("SELECT last_insert_rowid()").fetchone()[0]
+                    primer_id = ultimo_id - len(aceptadas) + 1
+                    for offset, e in enumerate(aceptadas):
+                        resultados.append((e, primer_id + offset))
+
+            if envios:
+                # Un envío ya validado no se reemplaza (pudo validarse después del submit)
+                cerrados = {(row[0], row[1]) for row in cursor.execute(f"""
+                    SELECT mesa_id, testigo_id FROM capturas_e14
+                    WHERE mesa_id IN ({','.join('?' * len(envios))})
+                      AND estado IN ({', '.join('?' * len(ESTADOS_ENVIO_CERRADO))})
+                """, [e['payload']['mesa_id'] for e in envios] + list(ESTADOS_ENVIO_CERRADO))}
+                for e in envios:
+                    if (e['payload']['mesa_id'], e['payload']['testigo_id']) in cerrados:
+                        rechazos.append((e, 'E14_DUPLICADO',
+                                         'El E14 de este testigo para la mesa ya fue validado. '
+                                         'No se permite reenviarlo.'))
+                envios = [e for e in envios
+                          if (e['payload']['mesa_id'], e['payload']['testigo_id']) not in cerrados]
+
+            if envios:
+                # Esquema real de capturas_e14: los conteos del formulario van en datos_json
+                cursor.executemany("""
+                    INSERT INTO capturas_e14 (
+                        mesa_id, testigo_id, ruta_foto, datos_json,
+                        total_votos, observaciones, estado, procesado_ocr
+                    )
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, [
+                    (p['mesa_id'], p['testigo_id'], RUTA_FOTO_PENDIENTE, self._datos_json(p),
+                     p['total_votos'], p['observaciones'], ESTADO_ENVIO_TESTIGO, 1)
+                    for p in (e['payload'] for e in envios)
+                ])
+                ultimo_id = cursor.execute("SELECT last_insert_rowid()").fetchone()[0]
+                primer_id = ultimo_id - len(envios) + 1
+
+                votos = []
+                for offset, e in enumerate(envios):
+                    captura_id = primer_id + offset
+                    resultados.append((e, captura_id))
+                    for posicion, c in enumerate(e['payload']['candidatos'], start=1):
+                        votos.append((captura_id, posicion, c.get('candidato_id'),
+                                      c['votos'], c['votos'], CONFIANZA_DIGITADO, 1))
+
+                cursor.executemany("""
+                    INSERT INTO datos_ocr_e14 (
+                        captura_e14_id, posicion, candidato_id,
+                        votos_detectados, votos_confirmados, confianza, editado
+                    )
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, votos)
+
+                # El envío nuevo reemplaza los anteriores del mismo testigo y mesa
+                # (el trigger de capturas_e14 retira sus votos de los agregados)
+                cursor.executemany("""
+                    UPDATE capturas_e14 SET estado = ?
+                    WHERE mesa_id = ? AND testigo_id = ? AND estado = ? AND id < ?
+                """, [(ESTADO_ENVIO_REEMPLAZADO, e['payload']['mesa_id'], e['payload']['testigo_id'],
+                       ESTADO_ENVIO_TESTIGO, captura_id) for e, captura_id in resultados
+                      if e['tipo'] == TIPO_ENVIO_TESTIGO])
+
+            cursor.executemany("""
+                INSERT OR REPLACE INTO e14_ingesta
+                (ack_id, tipo, mesa_id, estado, registro_id, codigo_error, error, payload, recibido_en)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, [
+                (e['ack_id'], e['tipo'], e['payload'].get('mesa_id'), ESTADO_CONFIRMADO,
+                 registro_id, None, None, None, e['recibido_en'])
+                for e, registro_id in resultados
+            ] + [
+                (e['ack_id'], e['tipo'], e['payload'].get('mesa_id'), ESTADO_RECHAZADO,
+                 None, codigo, error, json.dumps(e['payload'], ensure_ascii=False), e['recibido_en'])
+                for e, codigo, error in rechazos
+            ])
+
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        return ([(e['ack_id'], {'estado': ESTADO_CONFIRMADO, 'registro_id': registro_id, 'mesa_id': e['payload'].get('mesa_id'), 'tipo': e['tipo']})
+                 for e, registro_id in resultados] +
+                [(e['ack_id'], {'estado': ESTADO_RECHAZADO, 'codigo_error': codigo, 'error': error, 'mesa_id': e['payload'].get('mesa_id'), 'tipo': e['tipo']})
+                 for e, codigo, error in rechazos])
+
+    @staticmethod
+    def _datos_json(payload: Dict[str, Any]) -> str:
+        """Formulario del testigo tal como se digitó (capturas_e14.datos_json)"""
+        return json.dumps({
+            'candidatos': payload['candidatos'],
+            'votos_blanco': payload['votos_blanco'],
+            'votos_nulos': payload['votos_nulos'],
+            'tarjetas_no_marcadas': payload['tarjetas_no_marcadas'],
+            'total_votos_candidatos': payload['total_votos_candidatos']
+        }, ensure_ascii=False)
+
+    def _write_rejections(self, rechazos) -> List[Tuple[str, Dict[str, Any]]]:
+        """Registrar capturas rechazadas conservando el payload para revisión"""
+        conn = self.connection_pool.connect()
+        try:
+            conn.executemany("""
+                INSERT OR REPLACE INTO e14_ingesta
+                (ack_id, tipo, mesa_id, estado, registro_id, codigo_error, error, payload, recibido_en)
+                VALUES (?, ?, ?, ?, NULL, ?, ?, ?, ?)
+            """, [
+                (e['ack_id'], e['tipo'], e['payload'].get('mesa_id'), ESTADO_RECHAZADO,
+                 codigo, error, json.dumps(e['payload'], ensure_ascii=False), e['recibido_en'])
+                for e, codigo, error in rechazos
+            ])
+            conn.commit()
+        finally:
+            conn.close()
+        return [(e['ack_id'], {'estado': ESTADO_RECHAZADO, 'codigo_error': codigo, 'error': error,
+                               'mesa_id': e['payload'].get('mesa_id'), 'tipo': e['tipo']})
+                for e, codigo, error in rechazos]
+
+    def _apply_results(self, lote: List[Dict[str, Any]], resultados: List[Tuple[str, Dict[str, Any]]]):
+        with self._state_lock:
+            for ack_id, status in resultados:
+                mesa_id = status.get('mesa_id')
+                if status['tipo'] == TIPO_CAPTURA_E14:
+                    self._mesas_en_cola.discard(mesa_id)
+                if status['estado'] == ESTADO_CONFIRMADO:
+                    self.stats['confirmados'] += 1
+                else:
+                    self.stats['rechazados'] += 1
+            self.stats['lotes'] += 1
+
+        for ack_id, status in resultados:
+            self._set_status(ack_id, status)
+
+        with self._journal_lock:
+            self._journal_pending -= len(lote)
+            # Todo lo del journal ya está en la base de datos: se puede truncar
+            if self._journal_pending <= 0 and self._journal is not None:
+                self._journal_pending = 0
+                self._journal.truncate(0)
+                self._journal.seek(0)
+
+
+_ingestion_queue = None
+_ingestion_lock = threading.Lock()
+
+
+def get_e14_ingestion_queue() -> E14IngestionQueue:
+    """Obtener la cola de ingesta E14 compartida del proceso"""
+    global _ingestion_queue
+    if _ingestion_queue is None:
+        with _ingestion_lock:
+            if _ingestion_queue is None:
+                _ingestion_queue = E14IngestionQueue()
+                atexit.register(_ingestion_queue.shutdown)
+    return _ingestion_queue
@@ -2,8 +2,16 @@
 """
 ExcelImportService - Servicio para importar datos desde archivos Excel
 Carga masiva de partidos, coaliciones, candidatos y tipos de elección
+
+Cada hoja se valida por columnas sobre el DataFrame completo (requeridos,
+partido/cargo/municipio resueltos con un map por columna), los duplicados
+contra la base se detectan con un anti-join sobre una tabla temporal de
+staging y las filas válidas se insertan con executemany en una sola
+transacción. El reporte por fila ("Fila N: ...") se mantiene.
 """
 
+import itertools
+import numpy as np
 import pandas as pd
 import sqlite3
 from datetime import datetime, date
@@ -11,19 +19,136 @@ from typing import Dict, List, Optional, Any, Tuple
 import logging
 import os
 
+from core.database import SQLiteConnectionPool, get_connection_pool
+
+try:
+    import python_calamine  # noqa: F401
+    CALAMINE_AVAILABLE = True
+except ImportError:
+    CALAMINE_AVAILABLE = False
+
+# Motor de lectura de pandas: calamine (lectura nativa, mucho más rápida que
+# openpyxl en libros grandes) si está instalado; None = el de pandas
+EXCEL_IMPORT_ENGINE = os.environ.get('EXCEL_IMPORT_ENGINE') or ('calamine' if CALAMINE_AVAILABLE else None)
+
+STAGING_TABLE = 'staging_importacion'
+
+
+def _filas(df: pd.DataFrame) -> pd.Series:
+    """Número de fila en la hoja (encabezado = fila 1)"""
+    return pd.Series(range(2, len(df) + 2), index=df.index)
+
+
+def _texto(df: pd.DataFrame, columna: str) -> pd.Series:
+    """Columna como texto sin espacios; celdas vacías o columna ausente -> None"""
+    if columna not in df.columns:
+        return pd.Series(None, index=df.index, dtype=object)
+    serie = df[columna].astype(object).str.strip()
+    return serie.where(serie.notna() & (serie != ''), None)
+
+
+def _enteros(serie: pd.Series) -> List[Optional[int]]:
+    """Valores numéricos (truncados) como int/None, tipos que acepta sqlite3"""
+    enteros = np.trunc(pd.to_numeric(serie, errors='coerce')).astype('Int64')
+    return enteros.astype(object).where(enteros.notna(), None).tolist()
+
+
+def _duplicadas(mascara: pd.Series, *columnas: pd.Series) -> pd.Series:
+    """Filas marcadas cuyo valor en alguna columna repite el de una fila marcada anterior"""
+    repetidas = pd.Series(False, index=mascara.index)
+    for columna in columnas:
+        repetidas |= columna[mascara].duplicated().reindex(mascara.index, fill_value=False)
+    return repetidas
+
+
+def _registrar(destino: List[Tuple[int, str]], filas: pd.Series, mascara: pd.Series, mensaje):
+    """Agregar (fila, mensaje) de las filas marcadas; mensaje es un texto o una Serie por fila"""
+    if not mascara.any():
+        return
+    if isinstance(mensaje, pd.Series):
+        textos = mensaje.loc[mascara[mascara].index].tolist()
+    else:
+        textos = [mensaje] * int(mascara.sum())
+    destino.extend(zip(filas[mascara].tolist(), textos))
+
+
+def _mensajes(registros: List[Tuple[int, str]]) -> List[str]:
+    """Mensajes "Fila N: ..." en el orden de la hoja"""
+    return [f"Fila {fila}: {mensaje}" for fila, mensaje in sorted(registros, key=lambda r: r[0])]
+
+
 class ExcelImportService:
     """Servicio para importar datos desde archivos Excel"""
     
-    def __init__(self, db_path: str = 'caqueta_electoral.db'):
+    def __init__(self, db_path: str = 'caqueta_electoral.db',
+                 connection_pool: Optional[SQLiteConnectionPool] = None):
         self.db_path = db_path
+        self.connection_pool = connection_pool or get_connection_pool(db_path)
         self.logger = logging.getLogger(__name__)
         
     def get_connection(self) -> sqlite3.Connection:
-        """Obtener conexión a la base de datos"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        conn.execute("PRAGMA foreign_keys = ON")
-        return conn
+        """Obtener conexión del pool compartido"""
+        return self.connection_pool.connect(row_factory=sqlite3.Row, foreign_keys=True)
+    
+    # ==================== LECTURA Y STAGING ====================
+    
+    def _leer_hoja(self, excel_file, sheet_name: str) -> pd.DataFrame:
+        """Leer una hoja con todas las celdas como texto (cédulas y siglas sin conversión numérica)"""
+        if isinstance(excel_file, pd.ExcelFile):
+            return pd.read_excel(excel_file, sheet_name=sheet_name, dtype=str)
+        return pd.read_excel(excel_file, sheet_name=sheet_name, dtype=str, engine=EXCEL_IMPORT_ENGINE)
+    
+    def _cargar_staging(self, cursor, filas: pd.Series, clave: pd.Series, clave2: Optional[pd.Series] = None):
+        """Cargar las claves de las filas a importar en la tabla temporal de staging"""
+        cursor.execute(f"""
+            CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} (
+                fila INTEGER PRIMARY KEY, clave TEXT, clave2 TEXT
+            )
+        """)
+        cursor.execute(f"DELETE FROM {STAGING_TABLE}")
+        segunda = clave2.tolist() if clave2 is not None else itertools.repeat(None)
+        cursor.executemany(f"INSERT INTO {STAGING_TABLE} (fila, clave, clave2) VALUES (?, ?, ?)",
+                           zip(filas.tolist(), clave.tolist(), segunda))
+    
+    def _filas_existentes(self, cursor, tabla: str, condicion: str) -> set:
+        """Anti-join contra staging: filas cuya clave ya existe en la tabla (alias t)"""
+        cursor.execute(f"""
+            SELECT s.fila FROM {STAGING_TABLE} s
+            WHERE EXISTS (SELECT 1 FROM {tabla} t WHERE {condicion})
+        """)
+        return {row[0] for row in cursor.fetchall()}
+    
+    def _ids_creados(self, cursor, tabla: str, columna: str, filas: List[int]) -> Dict[int, int]:
+        """IDs asignados a las filas insertadas, por su clave natural en staging"""
+        insertadas = set(filas)
+        cursor.execute(f"SELECT s.fila, t.id FROM {STAGING_TABLE} s JOIN {tabla} t ON t.{columna} = s.clave")
+        return {fila: registro_id for fila, registro_id in cursor.fetchall() if fila in insertadas}
+    
+    def _insertar_lote(self, cursor, sql: str, filas: List[int], params: List[tuple],
+                       errores: List[Tuple[int, str]]) -> List[int]:
+        """
+        Insertar con executemany dentro de un savepoint; si alguna fila viola una
+        restricción se reintenta fila por fila para reportarla. Retorna las filas insertadas
+        """
+        if not params:
+            return []
+        cursor.execute("SAVEPOINT importacion_lote")
+        try:
+            cursor.executemany(sql, params)
+            cursor.execute("RELEASE importacion_lote")
+            return list(filas)
+        except sqlite3.Error:
+            cursor.execute("ROLLBACK TO importacion_lote")
+            cursor.execute("RELEASE importacion_lote")
+        
+        insertadas = []
+        for fila, valores in zip(filas, params):
+            try:
+                cursor.execute(sql, valores)
+                insertadas.append(fila)
+            except sqlite3.Error as e:
+                errores.append((fila, str(e)))
+        return insertadas
     
     # ==================== IMPORTACIÓN DE PARTIDOS ====================
     
@@ -42,7 +167,7 @@ class ExcelImportService:
             }
             
             # Leer archivo Excel
-            df = pd.read_excel(excel_file_path, sheet_name=sheet_name)
+            df = self._leer_hoja(excel_file_path, sheet_name)
             results['total_rows'] = len(df)
             
             # Validar columnas requeridas
@@ -51,52 +176,59 @@ class ExcelImportService:
             if missing_columns:
                 raise ValueError(f"Columnas faltantes en Excel: {missing_columns}")
             
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            for index, row in df.iterrows():
-                try:
-                    # Validar datos básicos
-                    if pd.isna(row['nombre']) or pd.isna(row['sigla']):
-                        results['errors'].append(f"Fila {index + 2}: Nombre y sigla son requeridos")
-                        continue
-                    
-                    nombre = str(row['nombre']).strip()
-                    sigla = str(row['sigla']).strip()
-                    
-                    # Verificar duplicados
-                    cursor.execute("SELECT id FROM partidos_politicos WHERE nombre = ? OR sigla = ?", 
-                                  (nombre, sigla))
-                    if cursor.fetchone():
-                        results['warnings'].append(f"Fila {index + 2}: Partido {nombre} ({sigla}) ya existe")
-                        continue
-                    
-                    # Obtener color (opcional)
-                    color = '#007bff'  # Color por defecto
-                    if 'color_principal' in df.columns and not pd.isna(row['color_principal']):
-                        color = str(row['color_principal']).strip()
-                        if not color.startswith('#'):
-                            color = f"#{color}"
-                    
-                    # Crear partido
-                    cursor.execute("""
-                        INSERT INTO partidos_politicos (nombre, sigla, color_principal)
-                        VALUES (?, ?, ?)
-                    """, (nombre, sigla, color))
-                    
-                    party_id = cursor.lastrowid
-                    results['parties_created'].append({
-                        'id': party_id,
-                        'nombre': nombre,
-                        'sigla': sigla
-                    })
-                    results['processed'] += 1
-                    
-                except Exception as e:
-                    results['errors'].append(f"Fila {index + 2}: {str(e)}")
+            errores, advertencias = [], []
+            filas = _filas(df)
+            nombre = _texto(df, 'nombre')
+            sigla = _texto(df, 'sigla')
+            
+            # Color (opcional), siempre con '#'
+            color = _texto(df, 'color_principal')
+            color = color.where(color.notna(), '#007bff')
+            color = color.where(color.str.startswith('#'), '#' + color)
+            
+            # Validar datos básicos
+            pendientes = nombre.notna() & sigla.notna()
+            _registrar(errores, filas, ~pendientes, "Nombre y sigla son requeridos")
             
-            conn.commit()
-            conn.close()
+            conn = self.get_connection()
+            try:
+                cursor = conn.cursor()
+                
+                # Duplicados contra la base (anti-join) y dentro del archivo
+                self._cargar_staging(cursor, filas[pendientes], nombre[pendientes], sigla[pendientes])
+                existentes = self._filas_existentes(cursor, 'partidos_politicos',
+                                                    't.nombre = s.clave OR t.sigla = s.clave2')
+                duplicados = pendientes & (filas.isin(existentes) | _duplicadas(pendientes, nombre, sigla))
+                _registrar(advertencias, filas, duplicados,
+                           'Partido ' + nombre[duplicados] + ' (' + sigla[duplicados] + ') ya existe')
+                
+                # Crear partidos
+                insertar = pendientes & ~duplicados
+                insertadas = self._insertar_lote(cursor, """
+                    INSERT INTO partidos_politicos (nombre, sigla, color_principal)
+                    VALUES (?, ?, ?)
+                """, filas[insertar].tolist(),
+                    list(zip(nombre[insertar].tolist(), sigla[insertar].tolist(), color[insertar].tolist())),
+                    errores)
+                
+                ids = self._ids_creados(cursor, 'partidos_politicos', 'nombre', insertadas)
+                por_fila = dict(zip(filas.tolist(), zip(nombre.tolist(), sigla.tolist())))
+                results['parties_created'] = [
+                    {'id': ids.get(fila), 'nombre': por_fila[fila][0], 'sigla': por_fila[fila][1]}
+                    for fila in insertadas
+                ]
+                results['processed'] = len(insertadas)
+                
+                cursor.execute(f"DROP TABLE IF EXISTS temp.{STAGING_TABLE}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+            
+            results['errors'] = _mensajes(errores)
+            results['warnings'] = _mensajes(advertencias)
             
             self.logger.info(f"Importación de partidos completada: {results['processed']} procesados")
             return results
@@ -122,7 +254,7 @@ class ExcelImportService:
             }
             
             # Leer archivo Excel
-            df = pd.read_excel(excel_file_path, sheet_name=sheet_name)
+            df = self._leer_hoja(excel_file_path, sheet_name)
             results['total_rows'] = len(df)
             
             # Validar columnas requeridas
@@ -131,51 +263,59 @@ class ExcelImportService:
             if missing_columns:
                 raise ValueError(f"Columnas faltantes en Excel: {missing_columns}")
             
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            for index, row in df.iterrows():
-                try:
-                    # Validar datos básicos
-                    if pd.isna(row['nombre']) or pd.isna(row['nivel']):
-                        results['errors'].append(f"Fila {index + 2}: Nombre y nivel son requeridos")
-                        continue
-                    
-                    nombre = str(row['nombre']).strip()
-                    nivel = str(row['nivel']).strip().lower()
-                    descripcion = str(row.get('descripcion', '')).strip() if not pd.isna(row.get('descripcion')) else None
-                    
-                    # Validar nivel
-                    valid_levels = ['nacional', 'departamental', 'municipal']
-                    if nivel not in valid_levels:
-                        results['errors'].append(f"Fila {index + 2}: Nivel debe ser uno de: {valid_levels}")
-                        continue
-                    
-                    # Verificar duplicados
-                    cursor.execute("SELECT id FROM cargos_electorales WHERE nombre = ?", (nombre,))
-                    if cursor.fetchone():
-                        results['warnings'].append(f"Fila {index + 2}: Cargo {nombre} ya existe")
-                        continue
-                    
-                    # Crear cargo electoral
-                    cursor.execute("""
-                        INSERT INTO cargos_electorales (nombre, descripcion, nivel)
-                        VALUES (?, ?, ?)
-                    """, (nombre, descripcion, nivel))
-                    
-                    cargo_id = cursor.lastrowid
-                    results['election_types_created'].append({
-                        'id': cargo_id,
-                        'nombre': nombre,
-                        'nivel': nivel
-                    })
-                    results['processed'] += 1
-                    
-                except Exception as e:
-                    results['errors'].append(f"Fila {index + 2}: {str(e)}")
+            errores, advertencias = [], []
+            filas = _filas(df)
+            nombre = _texto(df, 'nombre')
+            nivel = _texto(df, 'nivel').str.lower()
+            descripcion = _texto(df, 'descripcion')
             
-            conn.commit()
-            conn.close()
+            # Validar datos básicos
+            pendientes = nombre.notna() & nivel.notna()
+            _registrar(errores, filas, ~pendientes, "Nombre y nivel son requeridos")
+            
+            # Validar nivel
+            valid_levels = ['nacional', 'departamental', 'municipal']
+            nivel_invalido = pendientes & ~nivel.isin(valid_levels)
+            _registrar(errores, filas, nivel_invalido, f"Nivel debe ser uno de: {valid_levels}")
+            pendientes &= ~nivel_invalido
+            
+            conn = self.get_connection()
+            try:
+                cursor = conn.cursor()
+                
+                # Duplicados contra la base (anti-join) y dentro del archivo
+                self._cargar_staging(cursor, filas[pendientes], nombre[pendientes])
+                existentes = self._filas_existentes(cursor, 'cargos_electorales', 't.nombre = s.clave')
+                duplicados = pendientes & (filas.isin(existentes) | _duplicadas(pendientes, nombre))
+                _registrar(advertencias, filas, duplicados, 'Cargo ' + nombre[duplicados] + ' ya existe')
+                
+                # Crear cargos electorales
+                insertar = pendientes & ~duplicados
+                insertadas = self._insertar_lote(cursor, """
+                    INSERT INTO cargos_electorales (nombre, descripcion, nivel)
+                    VALUES (?, ?, ?)
+                """, filas[insertar].tolist(),
+                    list(zip(nombre[insertar].tolist(), descripcion[insertar].tolist(), nivel[insertar].tolist())),
+                    errores)
+                
+                ids = self._ids_creados(cursor, 'cargos_electorales', 'nombre', insertadas)
+                por_fila = dict(zip(filas.tolist(), zip(nombre.tolist(), nivel.tolist())))
+                results['election_types_created'] = [
+                    {'id': ids.get(fila), 'nombre': por_fila[fila][0], 'nivel': por_fila[fila][1]}
+                    for fila in insertadas
+                ]
+                results['processed'] = len(insertadas)
+                
+                cursor.execute(f"DROP TABLE IF EXISTS temp.{STAGING_TABLE}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+            
+            results['errors'] = _mensajes(errores)
+            results['warnings'] = _mensajes(advertencias)
             
             self.logger.info(f"Importación de tipos de elección completada: {results['processed']} procesados")
             return results
@@ -201,7 +341,7 @@ class ExcelImportService:
             }
             
             # Leer archivo Excel
-            df = pd.read_excel(excel_file_path, sheet_name=sheet_name)
+            df = self._leer_hoja(excel_file_path, sheet_name)
             results['total_rows'] = len(df)
             
             # Validar columnas requeridas
@@ -210,86 +350,99 @@ class ExcelImportService:
             if missing_columns:
                 raise ValueError(f"Columnas faltantes en Excel: {missing_columns}")
             
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            # Crear mapas de referencia para optimizar consultas
-            party_map = self._create_party_map(cursor)
-            cargo_map = self._create_cargo_map(cursor)
-            municipio_map = self._create_municipio_map(cursor)
-            
-            for index, row in df.iterrows():
-                try:
-                    # Validar datos básicos
-                    if pd.isna(row['cedula']) or pd.isna(row['nombre_completo']):
-                        results['errors'].append(f"Fila {index + 2}: Cédula y nombre son requeridos")
-                        continue
-                    
-                    cedula = str(row['cedula']).strip()
-                    nombre_completo = str(row['nombre_completo']).strip()
-                    partido_sigla = str(row['partido_sigla']).strip()
-                    cargo_nombre = str(row['cargo_nombre']).strip()
-                    
-                    # Verificar duplicados
-                    cursor.execute("SELECT id FROM candidatos WHERE cedula = ? AND activo = 1", (cedula,))
-                    if cursor.fetchone():
-                        results['warnings'].append(f"Fila {index + 2}: Candidato con cédula {cedula} ya existe")
-                        continue
-                    
-                    # Buscar partido
-                    partido_id = party_map.get(partido_sigla.upper())
-                    if not partido_id:
-                        results['errors'].append(f"Fila {index + 2}: Partido con sigla '{partido_sigla}' no encontrado")
-                        continue
-                    
-                    # Buscar cargo
-                    cargo_id = cargo_map.get(cargo_nombre)
-                    if not cargo_id:
-                        results['errors'].append(f"Fila {index + 2}: Cargo '{cargo_nombre}' no encontrado")
-                        continue
-                    
-                    # Buscar municipio (opcional)
-                    municipio_id = None
-                    if 'municipio_nombre' in df.columns and not pd.isna(row['municipio_nombre']):
-                        municipio_nombre = str(row['municipio_nombre']).strip()
-                        municipio_id = municipio_map.get(municipio_nombre)
-                    
-                    # Obtener datos adicionales opcionales
-                    telefono = str(row.get('telefono', '')).strip() if not pd.isna(row.get('telefono')) else None
-                    email = str(row.get('email', '')).strip() if not pd.isna(row.get('email')) else None
-                    numero_lista = None
-                    if 'numero_lista' in df.columns and not pd.isna(row['numero_lista']):
-                        try:
-                            numero_lista = int(row['numero_lista'])
-                        except:
-                            pass
-                    
-                    # Crear candidato
-                    cursor.execute("""
-                        INSERT INTO candidatos 
-                        (cedula, nombre_completo, telefono, email, partido_id, cargo_id, 
-                         municipio_id, numero_lista, estado, fecha_inscripcion)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        cedula, nombre_completo, telefono, email, partido_id, cargo_id,
-                        municipio_id, numero_lista, 'inscrito', date.today().isoformat()
-                    ))
-                    
-                    candidate_id = cursor.lastrowid
-                    results['candidates_created'].append({
-                        'id': candidate_id,
-                        'cedula': cedula,
-                        'nombre': nombre_completo,
-                        'partido': partido_sigla,
-                        'cargo': cargo_nombre
-                    })
-                    results['processed'] += 1
-                    
-                except Exception as e:
-                    results['errors'].append(f"Fila {index + 2}: {str(e)}")
+            errores, advertencias = [], []
+            filas = _filas(df)
+            cedula = _texto(df, 'cedula')
+            nombre_completo = _texto(df, 'nombre_completo')
+            partido_sigla = _texto(df, 'partido_sigla')
+            cargo_nombre = _texto(df, 'cargo_nombre')
+            telefono = _texto(df, 'telefono')
+            email = _texto(df, 'email')
+            numero_lista = pd.to_numeric(_texto(df, 'numero_lista'), errors='coerce')
             
-            conn.commit()
-            conn.close()
+            # Validar datos básicos
+            pendientes = cedula.notna() & nombre_completo.notna()
+            _registrar(errores, filas, ~pendientes, "Cédula y nombre son requeridos")
+            
+            conn = self.get_connection()
+            try:
+                cursor = conn.cursor()
+                
+                # Verificar duplicados contra la base con un anti-join
+                self._cargar_staging(cursor, filas[pendientes], cedula[pendientes])
+                existentes = pendientes & filas.isin(
+                    self._filas_existentes(cursor, 'candidatos', 't.cedula = s.clave AND t.activo = 1'))
+                _registrar(advertencias, filas, existentes,
+                           'Candidato con cédula ' + cedula[existentes] + ' ya existe')
+                pendientes &= ~existentes
+                
+                # Resolver partido, cargo y municipio en una pasada por columna
+                party_map = self._create_party_map(cursor)
+                cargo_map = self._create_cargo_map(cursor)
+                municipio_map = self._create_municipio_map(cursor)
+                
+                partido_id = partido_sigla.str.upper().map(party_map)
+                sin_partido = pendientes & partido_id.isna()
+                _registrar(errores, filas, sin_partido,
+                           "Partido con sigla '" + partido_sigla[sin_partido].fillna('nan') + "' no encontrado")
+                pendientes &= ~sin_partido
+                
+                cargo_id = cargo_nombre.map(cargo_map)
+                sin_cargo = pendientes & cargo_id.isna()
+                _registrar(errores, filas, sin_cargo,
+                           "Cargo '" + cargo_nombre[sin_cargo].fillna('nan') + "' no encontrado")
+                pendientes &= ~sin_cargo
+                
+                # Municipio (opcional): sin coincidencia queda vacío
+                municipio_id = _texto(df, 'municipio_nombre').map(municipio_map)
+                
+                # Cédula repetida dentro del mismo archivo: vale la primera fila válida
+                repetidas = pendientes & _duplicadas(pendientes, cedula)
+                _registrar(advertencias, filas, repetidas,
+                           'Candidato con cédula ' + cedula[repetidas] + ' ya existe')
+                insertar = pendientes & ~repetidas
+                
+                # Crear candidatos en un solo executemany
+                fecha_inscripcion = date.today().isoformat()
+                params = list(zip(
+                    cedula[insertar].tolist(), nombre_completo[insertar].tolist(),
+                    telefono[insertar].tolist(), email[insertar].tolist(),
+                    _enteros(partido_id[insertar]), _enteros(cargo_id[insertar]),
+                    _enteros(municipio_id[insertar]), _enteros(numero_lista[insertar]),
+                    itertools.repeat('inscrito'), itertools.repeat(fecha_inscripcion)
+                ))
+                insertadas = self._insertar_lote(cursor, """
+                    INSERT INTO candidatos 
+                    (cedula, nombre_completo, telefono, email, partido_id, cargo_id, 
+                     municipio_id, numero_lista, estado, fecha_inscripcion)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, filas[insertar].tolist(), params, errores)
+                
+                ids = self._ids_creados(cursor, 'candidatos', 'cedula', insertadas)
+                por_fila = dict(zip(filas.tolist(), zip(cedula.tolist(), nombre_completo.tolist(),
+                                                        partido_sigla.tolist(), cargo_nombre.tolist())))
+                results['candidates_created'] = [
+                    {
+                        'id': ids.get(fila),
+                        'cedula': por_fila[fila][0],
+                        'nombre': por_fila[fila][1],
+                        'partido': por_fila[fila][2],
+                        'cargo': por_fila[fila][3]
+                    }
+                    for fila in insertadas
+                ]
+                results['processed'] = len(insertadas)
+                
+                cursor.execute(f"DROP TABLE IF EXISTS temp.{STAGING_TABLE}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+            
+            results['errors'] = _mensajes(errores)
+            results['warnings'] = _mensajes(advertencias)
             
             self.logger.info(f"Importación de candidatos completada: {results['processed']} procesados")
             return results
@@ -315,7 +468,7 @@ class ExcelImportService:
             }
             
             # Leer archivo Excel
-            df = pd.read_excel(excel_file_path, sheet_name=sheet_name)
+            df = self._leer_hoja(excel_file_path, sheet_name)
             results['total_rows'] = len(df)
             
             # Validar columnas requeridas
@@ -324,71 +477,82 @@ class ExcelImportService:
             if missing_columns:
                 raise ValueError(f"Columnas faltantes en Excel: {missing_columns}")
             
-            conn = self.get_connection()
-            cursor = conn.cursor()
+            errores, advertencias = [], []
+            filas = _filas(df)
+            nombre = _texto(df, 'nombre')
+            descripcion = _texto(df, 'descripcion')
+            partidos_siglas = _texto(df, 'partidos_siglas')
             
-            # Crear mapa de partidos
-            party_map = self._create_party_map(cursor)
-            
-            for index, row in df.iterrows():
-                try:
-                    # Validar datos básicos
-                    if pd.isna(row['nombre']) or pd.isna(row['partidos_siglas']):
-                        results['errors'].append(f"Fila {index + 2}: Nombre y partidos son requeridos")
-                        continue
-                    
-                    nombre = str(row['nombre']).strip()
-                    descripcion = str(row.get('descripcion', '')).strip() if not pd.isna(row.get('descripcion')) else None
-                    partidos_siglas = str(row['partidos_siglas']).strip()
-                    
-                    # Verificar duplicados
-                    cursor.execute("SELECT id FROM coaliciones WHERE nombre = ?", (nombre,))
-                    if cursor.fetchone():
-                        results['warnings'].append(f"Fila {index + 2}: Coalición {nombre} ya existe")
-                        continue
-                    
-                    # Procesar siglas de partidos
-                    siglas_list = [s.strip().upper() for s in partidos_siglas.split(',')]
-                    party_ids = []
-                    
-                    for sigla in siglas_list:
-                        party_id = party_map.get(sigla)
-                        if party_id:
-                            party_ids.append(party_id)
-                        else:
-                            results['warnings'].append(f"Fila {index + 2}: Partido con sigla '{sigla}' no encontrado")
-                    
-                    if not party_ids:
-                        results['errors'].append(f"Fila {index + 2}: No se encontraron partidos válidos para la coalición")
-                        continue
-                    
-                    # Crear coalición
-                    cursor.execute("""
-                        INSERT INTO coaliciones (nombre, descripcion, fecha_conformacion)
-                        VALUES (?, ?, ?)
-                    """, (nombre, descripcion, date.today().isoformat()))
-                    
-                    coalition_id = cursor.lastrowid
-                    
-                    # Agregar partidos a la coalición
-                    for party_id in party_ids:
-                        cursor.execute("""
-                            INSERT INTO coalicion_partidos (coalicion_id, partido_id)
-                            VALUES (?, ?)
-                        """, (coalition_id, party_id))
-                    
-                    results['coalitions_created'].append({
-                        'id': coalition_id,
-                        'nombre': nombre,
-                        'partidos_count': len(party_ids)
-                    })
-                    results['processed'] += 1
-                    
-                except Exception as e:
-                    results['errors'].append(f"Fila {index + 2}: {str(e)}")
+            # Validar datos básicos
+            pendientes = nombre.notna() & partidos_siglas.notna()
+            _registrar(errores, filas, ~pendientes, "Nombre y partidos son requeridos")
             
-            conn.commit()
-            conn.close()
+            conn = self.get_connection()
+            try:
+                cursor = conn.cursor()
+                
+                # Verificar duplicados contra la base con un anti-join
+                self._cargar_staging(cursor, filas[pendientes], nombre[pendientes])
+                existentes = pendientes & filas.isin(
+                    self._filas_existentes(cursor, 'coaliciones', 't.nombre = s.clave'))
+                _registrar(advertencias, filas, existentes, 'Coalición ' + nombre[existentes] + ' ya existe')
+                pendientes &= ~existentes
+                
+                # Una fila por sigla (índice = fila de la coalición)
+                party_map = self._create_party_map(cursor)
+                siglas = partidos_siglas[pendientes].str.split(',').explode().str.strip().str.upper()
+                partido_id = siglas.map(party_map)
+                sin_partido = partido_id.isna()
+                advertencias.extend(zip(filas[sin_partido.index[sin_partido]].tolist(),
+                                        ("Partido con sigla '" + siglas[sin_partido] + "' no encontrado").tolist()))
+                
+                con_partidos = pendientes & filas.index.isin(partido_id.dropna().index)
+                _registrar(errores, filas, pendientes & ~con_partidos,
+                           "No se encontraron partidos válidos para la coalición")
+                
+                repetidas = con_partidos & _duplicadas(con_partidos, nombre)
+                _registrar(advertencias, filas, repetidas, 'Coalición ' + nombre[repetidas] + ' ya existe')
+                insertar = con_partidos & ~repetidas
+                
+                # Crear coaliciones
+                fecha_conformacion = date.today().isoformat()
+                insertadas = self._insertar_lote(cursor, """
+                    INSERT INTO coaliciones (nombre, descripcion, fecha_conformacion)
+                    VALUES (?, ?, ?)
+                """, filas[insertar].tolist(),
+                    list(zip(nombre[insertar].tolist(), descripcion[insertar].tolist(),
+                             itertools.repeat(fecha_conformacion))),
+                    errores)
+                ids = self._ids_creados(cursor, 'coaliciones', 'nombre', insertadas)
+                
+                # Agregar partidos a las coaliciones (sin pares repetidos)
+                miembros = pd.DataFrame({'fila': filas[partido_id.dropna().index].to_numpy(),
+                                         'partido_id': partido_id.dropna().to_numpy()})
+                miembros['coalicion_id'] = miembros['fila'].map(ids)
+                miembros = miembros.dropna(subset=['coalicion_id']).drop_duplicates(['coalicion_id', 'partido_id'])
+                cursor.executemany("""
+                    INSERT INTO coalicion_partidos (coalicion_id, partido_id)
+                    VALUES (?, ?)
+                """, list(zip(_enteros(miembros['coalicion_id']), _enteros(miembros['partido_id']))))
+                
+                por_fila = dict(zip(filas.tolist(), nombre.tolist()))
+                cantidad = miembros.groupby('fila').size().to_dict()
+                results['coalitions_created'] = [
+                    {'id': ids.get(fila), 'nombre': por_fila[fila], 'partidos_count': int(cantidad.get(fila, 0))}
+                    for fila in insertadas
+                ]
+                results['processed'] = len(insertadas)
+                
+                cursor.execute(f"DROP TABLE IF EXISTS temp.{STAGING_TABLE}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+            
+            results['errors'] = _mensajes(errores)
+            results['warnings'] = _mensajes(advertencias)
             
             self.logger.info(f"Importación de coaliciones completada: {results['processed']} procesados")
             return results
@@ -435,35 +599,35 @@ class ExcelImportService:
             if not os.path.exists(excel_file_path):
                 raise FileNotFoundError(f"Archivo Excel no encontrado: {excel_file_path}")
             
-            # Obtener hojas disponibles
-            excel_file = pd.ExcelFile(excel_file_path)
+            # Obtener hojas disponibles (el libro se abre una sola vez para todas las hojas)
+            excel_file = pd.ExcelFile(excel_file_path, engine=EXCEL_IMPORT_ENGINE)
             available_sheets = excel_file.sheet_names
             
             # Importar partidos
             if 'Partidos' in available_sheets:
                 self.logger.info("Importando partidos...")
-                results['parties'] = self.import_parties_from_excel(excel_file_path, 'Partidos')
+                results['parties'] = self.import_parties_from_excel(excel_file, 'Partidos')
                 results['total_processed'] += results['parties']['processed']
                 results['total_errors'] += len(results['parties']['errors'])
             
             # Importar tipos de elección
             if 'TiposEleccion' in available_sheets:
                 self.logger.info("Importando tipos de elección...")
-                results['election_types'] = self.import_election_types_from_excel(excel_file_path, 'TiposEleccion')
+                results['election_types'] = self.import_election_types_from_excel(excel_file, 'TiposEleccion')
                 results['total_processed'] += results['election_types']['processed']
                 results['total_errors'] += len(results['election_types']['errors'])
             
             # Importar coaliciones
             if 'Coaliciones' in available_sheets:
                 self.logger.info("Importando coaliciones...")
-                results['coalitions'] = self.import_coalitions_from_excel(excel_file_path, 'Coaliciones')
+                results['coalitions'] = self.import_coalitions_from_excel(excel_file, 'Coaliciones')
                 results['total_processed'] += results['coalitions']['processed']
                 results['total_errors'] += len(results['coalitions']['errors'])
             
             # Importar candidatos
             if 'Candidatos' in available_sheets:
                 self.logger.info("Importando candidatos...")
-                results['candidates'] = self.import_candidates_from_excel(excel_file_path, 'Candidatos')
+                results['candidates'] = self.import_candidates_from_excel(excel_file, 'Candidatos')
                 results['total_processed'] += results['candidates']['processed']
                 results['total_errors'] += len(results['candidates']['errors'])
             
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+LocationTreeService - Árbol DIVIPOLA en memoria
+Departamento → Municipio → Zona → Puesto → Mesa para la cascada de ubicación
+
+El árbol se construye completo en una sola lectura y nunca se modifica: una
+recarga arma un árbol nuevo y reemplaza la referencia. Los cambios en las
+tablas de ubicación (desde la aplicación o desde los scripts de carga)
+incrementan divipola_version mediante triggers; el servicio compara esa
+versión como máximo cada DIVIPOLA_CHECK_INTERVAL segundos.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from types import MappingProxyType
+from typing import Dict, List, Optional
+
+from core.database import SQLiteConnectionPool, get_connection_pool
+
+logger = logging.getLogger(__name__)
+
+DIVIPOLA_CHECK_INTERVAL = float(os.environ.get('DIVIPOLA_CHECK_INTERVAL', '5'))
+
+DIVIPOLA_VERSION_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS divipola_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL DEFAULT 0
+    );
+    INSERT OR IGNORE INTO divipola_version (id, version) VALUES (1, 0);
+"""
+
+# Columnas que afectan la cascada por tabla; solo sus cambios invalidan el árbol
+TABLAS_UBICACION = {
+    'municipios': 'codigo, nombre, departamento, poblacion, activo, codigo_dd, codigo_mm',
+    'zonas': 'codigo_zz, nombre, municipio_id, codigo_completo, descripcion, activo, tipo_zona',
+    'puestos_votacion': 'nombre, direccion, municipio_id, activo, codigo, zona_id, codigo_pp, codigo_divipola',
+    'mesas_votacion': 'numero, puesto_id, municipio_id, votantes_habilitados, activa',
+}
+
+
+def _version_triggers() -> str:
+    sentencias = []
+    for tabla, columnas in TABLAS_UBICACION.items():
+        for evento in ('INSERT', 'DELETE', f'UPDATE OF {columnas}'):
+            nombre = f"trg_divipola_version_{tabla}_{evento.split()[0].lower()}"
+            sentencias.append(f"""
+                CREATE TRIGGER IF NOT EXISTS {nombre}
+                AFTER {evento} ON {tabla}
+                BEGIN
+                    UPDATE divipola_version SET version = version + 1 WHERE id = 1;
+                END;
+            """)
+    return '\n'.join(sentencias)
+
+
+class LocationTree:
+    """Instantánea inmutable de la estructura DIVIPOLA activa"""
+
+    def __init__(self, version: int, departamentos: List[Dict], municipios: List[Dict],
+                 zonas_por_municipio: Dict, puestos_por_municipio: Dict,
+                 puestos_por_zona: Dict, mesas_por_puesto: Dict):
+        self.version = version
+        self.departamentos = tuple(departamentos)
+        self.municipios = tuple(municipios)
+        self._municipios_por_id = MappingProxyType({m['id']: m for m in municipios})
+        self._zonas_por_municipio = MappingProxyType({k: tuple(v) for k, v in zonas_por_municipio.items()})
+        self._puestos_por_municipio = MappingProxyType({k: tuple(v) for k, v in puestos_por_municipio.items()})
+        self._puestos_por_zona = MappingProxyType({k: tuple(v) for k, v in puestos_por_zona.items()})
+        self._mesas_por_puesto = MappingProxyType({k: tuple(v) for k, v in mesas_por_puesto.items()})
+
+        firma = hashlib.sha1(json.dumps(
+            [self.municipios, sorted(self._zonas_por_municipio.items()),
+             sorted(self._puestos_por_municipio.items()), sorted(self._mesas_por_puesto.items())],
+            sort_keys=True, default=str
+        ).encode('utf-8')).hexdigest()
+        # ETag de todo el árbol: cambia con cualquier modificación de la cascada
+        self.etag = firma[:20]
+
+    def get_municipio(self, municipio_id: int) -> Optional[Dict]:
+        return self._municipios_por_id.get(municipio_id)
+
+    def get_municipios(self, codigo_dd: Optional[str] = None) -> List[Dict]:
+        if codigo_dd is None:
+            return list(self.municipios)
+        return [m for m in self.municipios if m['codigo_dd'] == codigo_dd]
+
+    def get_zonas(self, municipio_id: int) -> List[Dict]:
+        return list(self._zonas_por_municipio.get(municipio_id, ()))
+
+    def get_puestos_municipio(self, municipio_id: int) -> List[Dict]:
+        return list(self._puestos_por_municipio.get(municipio_id, ()))
+
+    def get_puestos_zona(self, zona_id: int) -> List[Dict]:
+        return [{'id': p['id'], 'nombre': p['nombre'], 'direccion': p['direccion']}
+                for p in self._puestos_por_zona.get(zona_id, ())]
+
+    def get_mesas(self, puesto_id: int) -> List[Dict]:
+        return list(self._mesas_por_puesto.get(puesto_id, ()))
+
+    def get_municipio_subtree(self, municipio_id: int) -> Optional[Dict]:
+        """Municipio con sus zonas, puestos y mesas en una sola estructura"""
+        municipio = self.get_municipio(municipio_id)
+        if municipio is None:
+            return None
+
+        def puesto_con_mesas(puesto):
+            return dict(puesto, mesas=self.get_mesas(puesto['id']))
+
+        zonas = []
+        for zona in self.get_zonas(municipio_id):
+            puestos = self._puestos_por_zona.get(zona['id'], ())
+            zonas.append(dict(zona, puestos=[puesto_con_mesas(p) for p in puestos]))
+
+        ids_zonas = {z['id'] for z in zonas}
+        sin_zona = [puesto_con_mesas(p) for p in self.get_puestos_municipio(municipio_id)
+                    if p['zona_id'] not in ids_zonas]
+
+        return dict(municipio, zonas=zonas, puestos_sin_zona=sin_zona)
+
+
+def _cargar_arbol(conn: sqlite3.Connection, version: int) -> LocationTree:
+    """Leer las tablas de ubicación y armar un LocationTree nuevo"""
+    municipios = []
+    departamentos = {}
+    for row in conn.execute("""
+        SELECT id, codigo, nombre, departamento, poblacion, codigo_dd, codigo_mm
+        FROM municipios
+        WHERE activo = 1
+        ORDER BY nombre
+    """):
+        municipio = {
+            'id': row['id'],
+            'codigo': row['codigo'],
+            'codigo_dd': row['codigo_dd'],
+            'codigo_mm': row['codigo_mm'],
+            'nombre': row['nombre'],
+            'departamento': row['departamento'],
+            'poblacion': row['poblacion']
+        }
+        municipios.append(municipio)
+        departamentos.setdefault(row['codigo_dd'], {
+            'codigo_dd': row['codigo_dd'],
+            'nombre': row['departamento']
+        })
+
+    zonas_por_municipio = {}
+    nombres_zona = {}
+    for row in conn.execute("""
+        SELECT id, municipio_id, codigo_zz, nombre, codigo_completo, descripcion, tipo_zona
+        FROM zonas
+        WHERE activo = 1
+        ORDER BY codigo_zz
+    """):
+        zonas_por_municipio.setdefault(row['municipio_id'], []).append({
+            'id': row['id'],
+            'codigo': row['codigo_zz'] or '',
+            'codigo_zz': row['codigo_zz'],
+            'codigo_completo': row['codigo_completo'],
+            'nombre': row['nombre'] or '',
+            'descripcion': row['descripcion'] or '',
+            'tipo': row['tipo_zona'] or ''
+        })
+        nombres_zona[row['id']] = (row['codigo_zz'], row['nombre'])
+
+    puestos_por_municipio = {}
+    for row in conn.execute("""
+        SELECT id, municipio_id, zona_id, nombre, direccion, codigo, codigo_divipola, codigo_pp
+        FROM puestos_votacion
+        WHERE activo = 1
+        ORDER BY codigo_divipola
+    """):
+        codigo_zz, zona_nombre = nombres_zona.get(row['zona_id'], (None, None))
+        puestos_por_municipio.setdefault(row['municipio_id'], []).append({
+            'id': row['id'],
+            'nombre': row['nombre'],
+            'direccion': row['direccion'] or '',
+            'codigo': row['codigo'],
+            'codigo_divipola': row['codigo_divipola'],
+            'codigo_pp': row['codigo_pp'],
+            'codigo_zz': codigo_zz,
+            'zona_nombre': zona_nombre,
+            'zona_id': row['zona_id']
+        })
+
+    # Cascada por zona: mismo contenido ordenado por nombre
+    puestos_por_zona = {}
+    for puestos in puestos_por_municipio.values():
+        for puesto in sorted(puestos, key=lambda p: p['nombre']):
+            if puesto['zona_id'] is not None:
+                puestos_por_zona.setdefault(puesto['zona_id'], []).append(puesto)
+
+    mesas_por_puesto = {}
+    for row in conn.execute("""
+        SELECT id, puesto_id, numero, votantes_habilitados
+        FROM mesas_votacion
+        WHERE activa = 1
+        ORDER BY numero
+    """):
+        mesas_por_puesto.setdefault(row['puesto_id'], []).append({
+            'id': row['id'],
+            'numero': row['numero'],
+            'votantes_habilitados': row['votantes_habilitados']
+        })
+
+    return LocationTree(version, list(departamentos.values()), municipios, zonas_por_municipio,
+                        puestos_por_municipio, puestos_por_zona, mesas_por_puesto)
+
+
+class LocationTreeService:
+    """Mantiene el árbol DIVIPOLA vigente y lo reconstruye cuando cambia la versión"""
+
+    def __init__(self, db_path: str = 'caqueta_electoral.db',
+                 connection_pool: Optional[SQLiteConnectionPool] = None,
+                 check_interval: float = DIVIPOLA_CHECK_INTERVAL):
+        self.db_path = db_path
+        self.connection_pool = connection_pool or get_connection_pool(db_path)
+        self.check_interval = check_interval
+        self._tree: Optional[LocationTree] = None
+        self._ultima_verificacion = 0.0
+        self._lock = threading.Lock()
+        self._schema_ready = False
+
+    def get_connection(self) -> sqlite3.Connection:
+        """Obtener conexión del pool compartido"""
+        return self.connection_pool.connect(row_factory=sqlite3.Row)
+
+    def ensure_schema(self):
+        """Crear divipola_version y los triggers que la incrementan"""
+        if self._schema_ready:
+            return
+        conn = self.get_connection()
+        try:
+            conn.executescript(DIVIPOLA_VERSION_SCHEMA + _version_triggers())
+        finally:
+            conn.close()
+        self._schema_ready = True
+
+    def _leer_version(self, conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT version FROM divipola_version WHERE id = 1").fetchone()[0]
+
+    def reload(self) -> LocationTree:
+        """Reconstruir el árbol desde la base de datos y reemplazarlo"""
+        with self._lock:
+            return self._reload_locked()
+
+    def _reload_locked(self) -> LocationTree:
+        self.ensure_schema()
+        conn = self.get_connection()
+        try:
+            # Versión y tablas dentro de la misma transacción de lectura
+            conn.execute("BEGIN")
+            version = self._leer_version(conn)
+            tree = _cargar_arbol(conn, version)
+            conn.rollback()
+        finally:
+            conn.close()
+
+        self._tree = tree
+        self._ultima_verificacion = time.monotonic()
+        logger.info(f"Árbol DIVIPOLA cargado: versión {version}, {len(tree.municipios)} municipios")
+        return tree
+
+    def get_tree(self) -> LocationTree:
+        """Árbol vigente; verifica la versión como máximo cada check_interval segundos"""
+        tree = self._tree
+        if tree is not None and time.monotonic() - self._ultima_verificacion < self.check_interval:
+            return tree
+
+        if tree is not None and not self._lock.acquire(blocking=False):
+            # Otro hilo ya está verificando/reconstruyendo: servir la instantánea actual
+            return tree
+        if tree is None:
+            self._lock.acquire()
+
+        try:
+            if self._tree is None:
+                return self._reload_locked()
+
+            conn = self.get_connection()
+            try:
+                version = self._leer_version(conn)
+            finally:
+                conn.close()
+
+            if version != self._tree.version:
+                return self._reload_locked()
+            self._ultima_verificacion = time.monotonic()
+            return self._tree
+        finally:
+            self._lock.release()
+
+
+_location_tree_services: Dict[str, LocationTreeService] = {}
+_location_tree_lock = threading.Lock()
+
+
+def get_location_tree_service(db_path: str = 'caqueta_electoral.db') -> LocationTreeService:
+    """Servicio de árbol DIVIPOLA compartido por base de datos"""
+    clave = os.path.abspath(db_path)
+    service = _location_tree_services.get(clave)
+    if service is None:
+        with _location_tree_lock:
+            service = _location_tree_services.get(clave)
+            if service is None:
+                service = LocationTreeService(db_path)
+                _location_tree_services[clave] = service
+    return service
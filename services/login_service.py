@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+LoginService - Ruta crítica de /api/auth/login
+El perfil de ubicación de cada usuario (municipio, puesto, mesa y zona) se
+mantiene desnormalizado en perfiles_usuario y el número de capturas E14 de
+cada testigo en capturas_e14_por_testigo, ambos actualizados por triggers;
+el login hace una sola búsqueda por índice en lugar del JOIN de cinco tablas
+y el COUNT(*) sobre capturas_e14. El perfil no copia el hash del password: se
+lee de users por clave primaria en la misma consulta.
+
+La verificación del password (pbkdf2/scrypt) se ejecuta en un pool acotado
+de hilos: con la cola llena el login se rechaza de inmediato en lugar de
+ocupar más hilos web durante el pico de ingreso de testigos.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional
+
+from core.database import SQLiteConnectionPool, get_connection_pool
+
+logger = logging.getLogger(__name__)
+
+ROL_TESTIGO = 'testigo_mesa'
+
+PERFILES_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS perfiles_usuario (
+        user_id INTEGER PRIMARY KEY,
+        username TEXT NOT NULL,
+        cedula TEXT NOT NULL,
+        nombre_completo TEXT,
+        rol TEXT NOT NULL,
+        activo INTEGER,
+        email TEXT,
+        telefono TEXT,
+        municipio_id INTEGER,
+        puesto_id INTEGER,
+        mesa_id INTEGER,
+        municipio_nombre TEXT,
+        municipio_codigo TEXT,
+        puesto_nombre TEXT,
+        puesto_direccion TEXT,
+        mesa_numero TEXT,
+        votantes_habilitados INTEGER,
+        zona_codigo TEXT,
+        zona_nombre TEXT
+    )
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_perfiles_usuario_cedula ON perfiles_usuario(cedula)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_perfiles_usuario_username ON perfiles_usuario(username)",
+    # Los triggers de puestos y mesas refrescan a los usuarios asignados
+    "CREATE INDEX IF NOT EXISTS idx_users_puesto ON users(puesto_id)",
+    "CREATE INDEX IF NOT EXISTS idx_users_mesa ON users(mesa_id)"
+]
+
+CONTADOR_CAPTURAS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS capturas_e14_por_testigo (
+        testigo_id INTEGER PRIMARY KEY,
+        total INTEGER NOT NULL DEFAULT 0
+    )
+"""
+
+
+def _refrescar_perfiles(condicion: str) -> str:
+    """Sentencia que recalcula el perfil de los usuarios que cumplen la condición"""
+    return f"""
+        INSERT OR REPLACE INTO perfiles_usuario (
+            user_id, username, cedula, nombre_completo, rol, activo, email, telefono,
+            municipio_id, puesto_id, mesa_id, municipio_nombre, municipio_codigo,
+            puesto_nombre, puesto_direccion, mesa_numero, votantes_habilitados, zona_codigo, zona_nombre
+        )
+        SELECT u.id, u.username, u.cedula, u.nombre_completo, u.rol, u.activo,
+               u.email, u.telefono, u.municipio_id, u.puesto_id, u.mesa_id,
+               mu.nombre, mu.codigo, p.nombre, p.direccion, m.numero, m.votantes_habilitados,
+               z.codigo_zz, z.nombre
+        FROM users u
+        LEFT JOIN municipios mu ON u.municipio_id = mu.id
+        LEFT JOIN puestos_votacion p ON u.puesto_id = p.id
+        LEFT JOIN mesas_votacion m ON u.mesa_id = m.id
+        LEFT JOIN zonas z ON p.zona_id = z.id
+        WHERE {condicion};
+    """
+
+
+# (tabla, columnas que aparecen en el perfil, usuarios afectados por la fila {fila})
+_ORIGENES_PERFIL = [
+    ('municipios', 'nombre, codigo', "u.municipio_id = {fila}.id"),
+    ('puestos_votacion', 'nombre, direccion, zona_id', "u.puesto_id = {fila}.id"),
+    ('mesas_votacion', 'numero, votantes_habilitados', "u.mesa_id = {fila}.id"),
+    ('zonas', 'codigo_zz, nombre',
+     "u.puesto_id IN (SELECT id FROM puestos_votacion WHERE zona_id = {fila}.id)")
+]
+
+PERFILES_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_perfiles_usuario_insert
+    AFTER INSERT ON users
+    BEGIN
+        {_refrescar_perfiles('u.id = NEW.id')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_perfiles_usuario_update
+    AFTER UPDATE OF id, username, cedula, nombre_completo, rol, activo, email, telefono,
+                    municipio_id, puesto_id, mesa_id ON users
+    BEGIN
+        DELETE FROM perfiles_usuario WHERE user_id = OLD.id;
+        {_refrescar_perfiles('u.id = NEW.id')}
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_perfiles_usuario_delete
+    AFTER DELETE ON users
+    BEGIN
+        DELETE FROM perfiles_usuario WHERE user_id = OLD.id;
+    END
+    """
+] + [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_perfiles_usuario_{tabla}_{evento.lower()}
+    AFTER {evento}{f' OF {columnas}' if evento == 'UPDATE' else ''} ON {tabla}
+    BEGIN
+        {_refrescar_perfiles(condicion.format(fila='OLD' if evento == 'DELETE' else 'NEW'))}
+    END
+    """
+    for tabla, columnas, condicion in _ORIGENES_PERFIL
+    for evento in ('UPDATE', 'DELETE')
+]
+
+CONTADOR_CAPTURAS_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_capturas_por_testigo_insert
+    AFTER INSERT ON capturas_e14
+    BEGIN
+        INSERT INTO capturas_e14_por_testigo (testigo_id, total) VALUES (NEW.testigo_id, 1)
+        ON CONFLICT(testigo_id) DO UPDATE SET total = total + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_capturas_por_testigo_delete
+    AFTER DELETE ON capturas_e14
+    BEGIN
+        UPDATE capturas_e14_por_testigo SET total = total - 1 WHERE testigo_id = OLD.testigo_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_capturas_por_testigo_update
+    AFTER UPDATE OF testigo_id ON capturas_e14
+    WHEN OLD.testigo_id IS NOT NEW.testigo_id
+    BEGIN
+        UPDATE capturas_e14_por_testigo SET total = total - 1 WHERE testigo_id = OLD.testigo_id;
+        INSERT INTO capturas_e14_por_testigo (testigo_id, total) VALUES (NEW.testigo_id, 1)
+        ON CONFLICT(testigo_id) DO UPDATE SET total = total + 1;
+    END
+    """
+]
+
+LOGIN_QUERY = f"""
+    SELECT p.user_id AS id, p.username, p.nombre_completo, u.password_hash, p.rol, p.activo,
+           p.cedula, p.email, p.telefono, p.municipio_id, p.puesto_id, p.mesa_id,
+           p.municipio_nombre, p.municipio_codigo, p.puesto_nombre, p.puesto_direccion,
+           p.mesa_numero, p.votantes_habilitados, p.zona_codigo, p.zona_nombre,
+           CASE WHEN p.rol = '{ROL_TESTIGO}' THEN COALESCE(c.total, 0) ELSE 0 END AS total_capturas
+    FROM perfiles_usuario p
+    JOIN users u ON u.id = p.user_id
+    LEFT JOIN capturas_e14_por_testigo c ON c.testigo_id = p.user_id
+    WHERE (p.cedula = ? OR p.username = ?) AND p.activo = 1
+    LIMIT 1
+"""
+
+# Campos del perfil devueltos al cliente (todo menos el hash y el estado)
+CAMPOS_PERFIL = (
+    'id', 'username', 'nombre_completo', 'rol', 'cedula', 'email', 'telefono',
+    'municipio_id', 'puesto_id', 'mesa_id', 'municipio_nombre', 'municipio_codigo',
+    'puesto_nombre', 'puesto_direccion', 'mesa_numero', 'votantes_habilitados',
+    'zona_codigo', 'zona_nombre', 'total_capturas'
+)
+
+# Ruta absoluta -> si la base tiene el contador de capturas por testigo
+_esquemas_inicializados = {}
+_esquemas_lock = threading.Lock()
+
+
+class LoginBusyError(Exception):
+    """El pool de verificación de passwords está saturado"""
+
+
+class PasswordVerifier:
+    """Pool acotado de hilos para verificar hashes de password"""
+
+    def __init__(self, verificar: Callable[[str, str], bool], workers: Optional[int] = None,
+                 max_queue: Optional[int] = None, timeout: Optional[float] = None):
+        self.verificar = verificar
+        self.workers = workers or int(os.environ.get('LOGIN_HASH_WORKERS', os.cpu_count() or 2))
+        self.max_queue = max_queue or int(os.environ.get('LOGIN_HASH_MAX_QUEUE', self.workers * 16))
+        self.timeout = timeout or float(os.environ.get('LOGIN_HASH_TIMEOUT', 10))
+
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='login-hash')
+        # Verificaciones en curso o en espera (incluye las que ejecutan los workers)
+        self._cupos = threading.BoundedSemaphore(self.workers + self.max_queue)
+        self._lock = threading.Lock()
+        self.stats = {'verificaciones': 0, 'rechazadas': 0, 'timeouts': 0}
+
+    def verify(self, password_hash: str, password: str) -> bool:
+        """
+        Verificar un password fuera del hilo que atiende la petición
+
+        Raises:
+            LoginBusyError: Si la cola está llena o la verificación excede el timeout
+        """
+        if not self._cupos.acquire(blocking=False):
+            with self._lock:
+                self.stats['rechazadas'] += 1
+            raise LoginBusyError('Demasiados inicios de sesión simultáneos, intente de nuevo')
+
+        future = self._executor.submit(self.verificar, password_hash, password)
+        future.add_done_callback(lambda _: self._cupos.release())
+        try:
+            resultado = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            with self._lock:
+                self.stats['timeouts'] += 1
+            raise LoginBusyError('La verificación de credenciales tardó demasiado, intente de nuevo')
+
+        with self._lock:
+            self.stats['verificaciones'] += 1
+        return bool(resultado)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Métricas del pool"""
+        with self._lock:
+            return dict(self.stats, workers=self.workers, max_queue=self.max_queue)
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+class LoginService:
+    """Autenticación por cédula o username sobre el perfil desnormalizado"""
+
+    def __init__(self, db_path: str = 'caqueta_electoral.db',
+                 connection_pool: Optional[SQLiteConnectionPool] = None,
+                 verificar_password: Optional[Callable[[str, str], bool]] = None,
+                 verifier: Optional[PasswordVerifier] = None):
+        self.db_path = db_path
+        self.connection_pool = connection_pool or get_connection_pool(db_path)
+        self.logger = logging.getLogger(__name__)
+        if verifier is None:
+            if verificar_password is None:
+                from werkzeug.security import check_password_hash
+                verificar_password = check_password_hash
+            verifier = PasswordVerifier(verificar_password)
+        self.verifier = verifier
+        self.contador_capturas = False
+
+    def get_connection(self) -> sqlite3.Connection:
+        """Obtener conexión del pool compartido"""
+        return self.connection_pool.connect(row_factory=sqlite3.Row)
+
+    def ensure_schema(self):
+        """Crear perfiles, contador de capturas y triggers (una vez por base de datos)"""
+        clave = os.path.abspath(self.db_path)
+        if clave in _esquemas_inicializados:
+            self.contador_capturas = _esquemas_inicializados[clave]
+            return
+
+        with _esquemas_lock:
+            if clave in _esquemas_inicializados:
+                self.contador_capturas = _esquemas_inicializados[clave]
+                return
+
+            conn = self.get_connection()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                self._eliminar_perfiles_con_hash(conn)
+                for sentencia in PERFILES_SCHEMA:
+                    conn.execute(sentencia)
+                conn.execute(CONTADOR_CAPTURAS_SCHEMA)
+
+                nuevos = conn.execute("""
+                    SELECT COUNT(*) FROM sqlite_master
+                    WHERE type = 'trigger' AND name = 'trg_perfiles_usuario_insert'
+                """).fetchone()[0] == 0
+                for trigger in PERFILES_TRIGGERS:
+                    conn.execute(trigger)
+                if nuevos:
+                    # Poblar con los usuarios existentes en la misma transacción
+                    conn.execute("DELETE FROM perfiles_usuario")
+                    conn.execute(_refrescar_perfiles('1 = 1'))
+
+                contador = conn.execute("""
+                    SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'capturas_e14'
+                """).fetchone()[0] > 0
+                if contador:
+                    nuevos = conn.execute("""
+                        SELECT COUNT(*) FROM sqlite_master
+                        WHERE type = 'trigger' AND name = 'trg_capturas_por_testigo_insert'
+                    """).fetchone()[0] == 0
+                    for trigger in CONTADOR_CAPTURAS_TRIGGERS:
+                        conn.execute(trigger)
+                    if nuevos:
+                        conn.execute("DELETE FROM capturas_e14_por_testigo")
+                        conn.execute("""
+                            INSERT INTO capturas_e14_por_testigo (testigo_id, total)
+                            SELECT testigo_id, COUNT(*) FROM capturas_e14
+                            WHERE testigo_id IS NOT NULL
+                            GROUP BY testigo_id
+                        """)
+                else:
+                    self.logger.warning(f"{self.db_path} no tiene capturas_e14; total_capturas será 0")
+                conn.commit()
+            except sqlite3.Error as e:
+                conn.rollback()
+                self.logger.error(f"Error creando perfiles de login: {e}")
+                raise
+            finally:
+                conn.close()
+
+            _esquemas_inicializados[clave] = contador
+            self.contador_capturas = contador
+
+    @staticmethod
+    def _eliminar_perfiles_con_hash(conn: sqlite3.Connection):
+        """Eliminar perfiles y triggers de versiones que copiaban password_hash"""
+        columnas = [row[1] for row in conn.execute("PRAGMA table_info(perfiles_usuario)")]
+        if 'password_hash' not in columnas:
+            return
+        triggers = [row[0] for row in conn.execute("""
+            SELECT name FROM sqlite_master
+            WHERE type = 'trigger' AND name LIKE 'trg_perfiles_usuario_%'
+        """)]
+        for trigger in triggers:
+            conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        conn.execute("DROP TABLE perfiles_usuario")
+
+    def get_profile(self, identificador: str) -> Optional[Dict[str, Any]]:
+        """Perfil activo por cédula o username, incluido el hash del password"""
+        self.ensure_schema()
+        conn = self.get_connection()
+        try:
+            row = conn.execute(LOGIN_QUERY, (identificador, identificador)).fetchone()
+        finally:
+            conn.close()
+        return dict(row) if row else None
+
+    def authenticate(self, identificador: str, password: str) -> Optional[Dict[str, Any]]:
+        """
+        Autenticar por cédula o username
+
+        Returns:
+            Perfil del usuario para la respuesta de login, o None si las
+            credenciales no son válidas
+
+        Raises:
+            LoginBusyError: Si el pool de verificación está saturado
+        """
+        perfil = self.get_profile(identificador)
+        if not perfil or not self.verifier.verify(perfil['password_hash'], password):
+            return None
+        return {campo: perfil[campo] for campo in CAMPOS_PERFIL}
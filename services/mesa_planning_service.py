@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+MesaPlanningService - Planificación vectorizada de mesas de votación
+Calcula la distribución de mesas de todos los puestos a la vez con NumPy
+(máximo de votantes por mesa según la zona, división por techo y reparto
+del residuo) y la compara con mesas_votacion para aplicar solo las
+inserciones, actualizaciones y desactivaciones necesarias.
+
+Las mesas existentes se emparejan con el plan por número dentro de cada
+puesto (la mesa 003 sigue siendo la 003), de modo que una mesa nunca queda
+renumerada sobre otra mesa física. Las mesas sobrantes se desactivan en lugar
+de borrarse, salvo las que aún referencian asignaciones_testigos o las
+capturas E14: esas se conservan sin cambios y se reportan.
+"""
+
+import logging
+import sqlite3
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from core.database import SQLiteConnectionPool, get_connection_pool
+
+logger = logging.getLogger(__name__)
+
+# Regla de la Registraduría: máximo 400 votantes por mesa
+LIMITE_VOTANTES_MESA = 400
+# Zonas con un límite distinto (zona 90: puestos censo)
+LIMITES_POR_ZONA = {'90': 600}
+
+ESTADO_MESA_NUEVA = 'configurada'
+ESTADO_MESA_INACTIVA = 'inactiva'
+
+ACCION_INSERTAR = 'insertar'
+ACCION_ACTUALIZAR = 'actualizar'
+ACCION_DESACTIVAR = 'desactivar'
+ACCION_CONSERVAR = 'conservar'
+
+# Tablas cuyas filas impiden desactivar una mesa sobrante
+TABLAS_DEPENDIENTES = ('asignaciones_testigos', 'e14_capturas', 'capturas_e14')
+
+
+def numero_mesa(indice) -> np.ndarray:
+    """Números de mesa 001, 002, ... a partir de índices base cero"""
+    return np.char.zfill((np.asarray(indice) + 1).astype(str), 3).astype(object)
+
+
+def planificar_mesas(puesto_ids: np.ndarray, municipio_ids: np.ndarray,
+                     votantes: np.ndarray, limites: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Distribución de mesas para un conjunto de puestos
+
+    Cada puesto recibe ceil(votantes / límite) mesas (al menos una) y los
+    votantes se reparten en partes iguales; las primeras `votantes % mesas`
+    mesas reciben un votante más.
+
+    Returns:
+        Dict de arreglos alineados, una posición por mesa planificada:
+        puesto_id, municipio_id, indice (base cero dentro del puesto) y votantes
+    """
+    votantes = np.asarray(votantes, dtype=np.int64)
+    limites = np.asarray(limites, dtype=np.int64)
+    mesas = np.maximum(-(-votantes // limites), 1)
+    base = votantes // mesas
+    resto = votantes % mesas
+
+    total = int(mesas.sum())
+    inicio = np.repeat(np.cumsum(mesas) - mesas, mesas)
+    indice = np.arange(total, dtype=np.int64) - inicio
+
+    return {
+        'puesto_id': np.repeat(np.asarray(puesto_ids, dtype=np.int64), mesas),
+        'municipio_id': np.repeat(np.asarray(municipio_ids, dtype=np.int64), mesas),
+        'indice': indice,
+        'votantes': np.repeat(base, mesas) + (indice < np.repeat(resto, mesas))
+    }
+
+
+class MesaPlanningService:
+    """Motor de redistribución de mesas por puesto de votación"""
+
+    def __init__(self, db_path: str = 'caqueta_electoral.db',
+                 connection_pool: Optional[SQLiteConnectionPool] = None):
+        self.db_path = db_path
+        self.connection_pool = connection_pool or get_connection_pool(db_path)
+        self.logger = logging.getLogger(__name__)
+
+    def get_connection(self) -> sqlite3.Connection:
+        """Obtener conexión del pool compartido"""
+        return self.connection_pool.connect(row_factory=sqlite3.Row)
+
+    def _cargar_puestos(self, conn: sqlite3.Connection, municipio_id: Optional[int]) -> Dict[str, np.ndarray]:
+        """Puestos activos con su capacidad y límite de votantes por mesa"""
+        filas = conn.execute("""
+            SELECT pv.id, pv.municipio_id, COALESCE(pv.capacidad_votantes, 0), COALESCE(z.codigo_zz, '')
+            FROM puestos_votacion pv
+            LEFT JOIN zonas z ON pv.zona_id = z.id
+            WHERE pv.activo = 1 AND (? IS NULL OR pv.municipio_id = ?)
+            ORDER BY pv.id
+        """, (municipio_id, municipio_id)).fetchall()
+
+        zonas = np.array([f[3] for f in filas], dtype=object)
+        limites = np.full(len(filas), LIMITE_VOTANTES_MESA, dtype=np.int64)
+        for codigo, limite in LIMITES_POR_ZONA.items():
+            limites[zonas == codigo] = limite
+
+        return {
+            'puesto_id': np.array([f[0] for f in filas], dtype=np.int64),
+            'municipio_id': np.array([f[1] for f in filas], dtype=np.int64),
+            'votantes': np.array([f[2] for f in filas], dtype=np.int64),
+            'limite': limites
+        }
+
+    def _cargar_mesas(self, conn: sqlite3.Connection, municipio_id: Optional[int]) -> Dict[str, np.ndarray]:
+        """
+        Mesas existentes con la posición que indica su número dentro del puesto
+
+        La posición es numero - 1; si dos mesas del puesto comparten número
+        solo la primera (activa, menor id) la ocupa y las demás quedan en -1,
+        igual que los números no numéricos, y se tratan como sobrantes.
+        """
+        existentes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        dependencias = ' + '.join(
+            f"EXISTS (SELECT 1 FROM {tabla} d WHERE d.mesa_id = mesas_votacion.id)"
+            for tabla in TABLAS_DEPENDIENTES if tabla in existentes) or '0'
+
+        filas = conn.execute(f"""
+            SELECT id, puesto_id, municipio_id, numero,
+                   COALESCE(votantes_habilitados, 0), COALESCE(total_votantes, 0), COALESCE(activa, 0),
+                   CASE WHEN CAST(numero AS INTEGER) > 0 AND ROW_NUMBER() OVER (
+                            PARTITION BY puesto_id, CAST(numero AS INTEGER)
+                            ORDER BY COALESCE(activa, 0) DESC, id
+                        ) = 1
+                        THEN CAST(numero AS INTEGER) - 1 ELSE -1 END,
+                   {dependencias}
+            FROM mesas_votacion
+            WHERE ? IS NULL OR municipio_id = ?
+               OR puesto_id IN (SELECT id FROM puestos_votacion WHERE municipio_id = ?)
+        """, (municipio_id, municipio_id, municipio_id)).fetchall()
+
+        columnas = zip(*filas) if filas else [()] * 9
+        ids, puestos, municipios, numeros, habilitados, totales, activas, indices, dependientes = columnas
+        return {
+            'id': np.array(ids, dtype=np.int64),
+            'puesto_id': np.array(puestos, dtype=np.int64),
+            'municipio_id': np.array(municipios, dtype=np.int64),
+            'numero': np.array(numeros, dtype=object),
+            'votantes_habilitados': np.array(habilitados, dtype=np.int64),
+            'total_votantes': np.array(totales, dtype=np.int64),
+            'activa': np.array(activas, dtype=np.int64),
+            'indice': np.array(indices, dtype=np.int64),
+            'dependencias': np.array(dependientes, dtype=np.int64)
+        }
+
+    def _diferencias(self, plan: Dict[str, np.ndarray], mesas: Dict[str, np.ndarray]) -> Dict:
+        """Emparejar plan y mesas existentes por (puesto, número) y clasificar los cambios"""
+        escala = int(max(plan['indice'].max(initial=0), mesas['indice'].max(initial=0))) + 1
+        clave_plan = plan['puesto_id'] * escala + plan['indice']
+        # Las mesas sin posición (-1) nunca se emparejan
+        con_posicion = np.flatnonzero(mesas['indice'] >= 0)
+        clave_mesas = mesas['puesto_id'][con_posicion] * escala + mesas['indice'][con_posicion]
+        _, i_plan, i_mesas = np.intersect1d(clave_plan, clave_mesas, assume_unique=True, return_indices=True)
+        i_mesas = con_posicion[i_mesas]
+
+        numeros_plan = numero_mesa(plan['indice'])
+
+        # Mesas emparejadas que difieren del plan
+        votantes = plan['votantes'][i_plan]
+        distinta = ((mesas['numero'][i_mesas] != numeros_plan[i_plan])
+                    | (mesas['municipio_id'][i_mesas] != plan['municipio_id'][i_plan])
+                    | (mesas['votantes_habilitados'][i_mesas] != votantes)
+                    | (mesas['total_votantes'][i_mesas] != votantes)
+                    | (mesas['activa'][i_mesas] != 1))
+        actualizar_plan, actualizar_mesas = i_plan[distinta], i_mesas[distinta]
+
+        # Posiciones del plan sin mesa existente
+        sin_mesa = np.ones(len(clave_plan), dtype=bool)
+        sin_mesa[i_plan] = False
+        insertar = np.flatnonzero(sin_mesa)
+
+        # Mesas existentes que sobran y siguen activas; las que tienen testigos
+        # asignados o capturas E14 se conservan
+        sobrante = np.ones(len(mesas['id']), dtype=bool)
+        sobrante[i_mesas] = False
+        sobrante &= mesas['activa'] == 1
+        con_dependencias = mesas['dependencias'] > 0
+        desactivar = np.flatnonzero(sobrante & ~con_dependencias)
+        conservar = np.flatnonzero(sobrante & con_dependencias)
+
+        return {
+            'numeros_plan': numeros_plan,
+            'actualizar': (actualizar_plan, actualizar_mesas),
+            'insertar': insertar,
+            'desactivar': desactivar,
+            'conservar': conservar,
+            'sin_cambios': int(len(i_plan) - len(actualizar_plan))
+        }
+
+    def redistribuir(self, municipio_id: Optional[int] = None, dry_run: bool = False) -> Dict:
+        """
+        Redistribuir las mesas de los puestos activos
+
+        Args:
+            municipio_id: Limitar a los puestos y mesas de un municipio
+            dry_run: Calcular y devolver las diferencias sin modificar la base de datos
+
+        Returns:
+            Dict con conteos, la lista de cambios (acción, mesa, puesto, número y
+            votantes antes/después) y tiempos por etapa en segundos
+        """
+        tiempos = {}
+        conn = self.get_connection()
+        try:
+            inicio = etapa = time.perf_counter()
+
+            def marcar(nombre):
+                nonlocal etapa
+                ahora = time.perf_counter()
+                tiempos[nombre] = round(ahora - etapa, 4)
+                etapa = ahora
+
+            if not dry_run:
+                conn.execute("BEGIN IMMEDIATE")
+
+            puestos = self._cargar_puestos(conn, municipio_id)
+            mesas = self._cargar_mesas(conn, municipio_id)
+            marcar('lectura')
+
+            plan = planificar_mesas(puestos['puesto_id'], puestos['municipio_id'],
+                                    puestos['votantes'], puestos['limite'])
+            marcar('plan')
+
+            diferencias = self._diferencias(plan, mesas)
+            cambios = self._lista_cambios(plan, mesas, diferencias)
+            marcar('diferencias')
+
+            if dry_run:
+                conn.rollback()
+            else:
+                self._aplicar(conn, plan, mesas, diferencias)
+                conn.commit()
+                marcar('aplicacion')
+            tiempos['total'] = round(time.perf_counter() - inicio, 4)
+        except Exception as e:
+            conn.rollback()
+            self.logger.error(f"Error redistribuyendo mesas: {e}")
+            raise
+        finally:
+            conn.close()
+
+        resultado = {
+            'dry_run': dry_run,
+            'puestos': int(len(puestos['puesto_id'])),
+            'mesas_existentes': int(len(mesas['id'])),
+            'mesas_planificadas': int(len(plan['puesto_id'])),
+            'insertar': int(len(diferencias['insertar'])),
+            'actualizar': int(len(diferencias['actualizar'][0])),
+            'desactivar': int(len(diferencias['desactivar'])),
+            'conservadas_con_dependencias': int(len(diferencias['conservar'])),
+            'sin_cambios': diferencias['sin_cambios'],
+            'max_votantes_mesa': int(plan['votantes'].max(initial=0)),
+            'cambios': cambios,
+            'tiempos': tiempos
+        }
+        self.logger.info(
+            f"Redistribución de mesas{' (dry-run)' if dry_run else ''}: "
+            f"{resultado['insertar']} nuevas, {resultado['actualizar']} actualizadas, "
+            f"{resultado['desactivar']} desactivadas")
+        if resultado['conservadas_con_dependencias']:
+            self.logger.warning(
+                f"{resultado['conservadas_con_dependencias']} mesas sobrantes no se desactivaron porque "
+                f"tienen testigos asignados o capturas E14")
+        return resultado
+
+    def _lista_cambios(self, plan: Dict[str, np.ndarray], mesas: Dict[str, np.ndarray],
+                       diferencias: Dict) -> List[Dict]:
+        """Diferencias en forma de filas, en orden de puesto y número"""
+        numeros_plan = diferencias['numeros_plan']
+        cambios = []
+
+        for p in diferencias['insertar'].tolist():
+            cambios.append({
+                'accion': ACCION_INSERTAR, 'mesa_id': None,
+                'puesto_id': int(plan['puesto_id'][p]), 'numero_antes': None, 'numero': numeros_plan[p],
+                'votantes_antes': None, 'votantes': int(plan['votantes'][p])
+            })
+
+        for p, m in zip(*(i.tolist() for i in diferencias['actualizar'])):
+            cambios.append({
+                'accion': ACCION_ACTUALIZAR, 'mesa_id': int(mesas['id'][m]),
+                'puesto_id': int(plan['puesto_id'][p]),
+                'numero_antes': mesas['numero'][m], 'numero': numeros_plan[p],
+                'votantes_antes': int(mesas['votantes_habilitados'][m]), 'votantes': int(plan['votantes'][p])
+            })
+
+        for m in diferencias['desactivar'].tolist():
+            cambios.append({
+                'accion': ACCION_DESACTIVAR, 'mesa_id': int(mesas['id'][m]),
+                'puesto_id': int(mesas['puesto_id'][m]),
+                'numero_antes': mesas['numero'][m], 'numero': mesas['numero'][m],
+                'votantes_antes': int(mesas['votantes_habilitados'][m]), 'votantes': 0
+            })
+
+        for m in diferencias['conservar'].tolist():
+            cambios.append({
+                'accion': ACCION_CONSERVAR, 'mesa_id': int(mesas['id'][m]),
+                'puesto_id': int(mesas['puesto_id'][m]),
+                'numero_antes': mesas['numero'][m], 'numero': mesas['numero'][m],
+                'votantes_antes': int(mesas['votantes_habilitados'][m]),
+                'votantes': int(mesas['votantes_habilitados'][m])
+            })
+
+        cambios.sort(key=lambda c: (c['puesto_id'], c['numero'] or ''))
+        return cambios
+
+    def _aplicar(self, conn: sqlite3.Connection, plan: Dict[str, np.ndarray],
+                 mesas: Dict[str, np.ndarray], diferencias: Dict):
+        """Ejecutar las inserciones, actualizaciones y desactivaciones del plan"""
+        numeros_plan = diferencias['numeros_plan']
+        actualizar_plan, actualizar_mesas = diferencias['actualizar']
+        insertar = diferencias['insertar']
+        desactivar = diferencias['desactivar']
+
+        conn.executemany("""
+            UPDATE mesas_votacion
+            SET numero = ?, municipio_id = ?, votantes_habilitados = ?, total_votantes = ?,
+                activa = 1,
+                estado = CASE WHEN COALESCE(activa, 0) = 1 THEN estado ELSE ? END,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, zip(numeros_plan[actualizar_plan].tolist(),
+                 plan['municipio_id'][actualizar_plan].tolist(),
+                 plan['votantes'][actualizar_plan].tolist(),
+                 plan['votantes'][actualizar_plan].tolist(),
+                 [ESTADO_MESA_NUEVA] * len(actualizar_plan),
+                 mesas['id'][actualizar_mesas].tolist()))
+
+        conn.executemany("""
+            INSERT INTO mesas_votacion (
+                numero, puesto_id, municipio_id, votantes_habilitados, total_votantes, estado, activa
+            ) VALUES (?, ?, ?, ?, ?, ?, 1)
+        """, zip(numeros_plan[insertar].tolist(),
+                 plan['puesto_id'][insertar].tolist(),
+                 plan['municipio_id'][insertar].tolist(),
+                 plan['votantes'][insertar].tolist(),
+                 plan['votantes'][insertar].tolist(),
+                 [ESTADO_MESA_NUEVA] * len(insertar)))
+
+        # Los votantes de las mesas sobrantes ya quedaron repartidos en las demás
+        conn.executemany("""
+            UPDATE mesas_votacion
+            SET activa = 0, estado = ?, votantes_habilitados = 0, total_votantes = 0,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, zip([ESTADO_MESA_INACTIVA] * len(desactivar), mesas['id'][desactivar].tolist()))
@@ -11,30 +11,279 @@ from typing import Dict, List, Optional, Any, Tuple
 import logging
 import os
 import hashlib
+import threading
+
+from core.audit import get_audit_sink
+from core.database import SQLiteConnectionPool, get_connection_pool
+
+# Municipio de una mesa, igual que el JOIN usado por la consolidación
+_MUNICIPIO_DE_MESA = """
+    SELECT pv.municipio_id FROM mesas_votacion mv
+    JOIN puestos_votacion pv ON mv.puesto_id = pv.id
+    WHERE mv.id = {mesa}
+"""
+
+
+
+def _mover_agregados_e14(mesas: str, municipio: str, signo: int) -> str:
+    """
+    Sumar (signo=1) o restar (signo=-1) en un municipio los E-14 confirmados
+    de las mesas que cumplen la condición; lo usan los triggers de reubicación
+    """
+    return f"""
+        INSERT INTO agregados_e14_municipio
+            (municipio_id, mesas_procesadas, total_votos_validos, total_votos_blancos, total_votos_nulos)
+        SELECT {municipio}, {signo} * COUNT(*), {signo} * COALESCE(SUM(e14.votos_validos), 0),
+               {signo} * COALESCE(SUM(e14.votos_blanco), 0), {signo} * COALESCE(SUM(e14.votos_nulos), 0)
+        FROM e14_capturas e14
+        JOIN mesas_votacion mv ON e14.mesa_id = mv.id
+        WHERE e14.confirmado = 1 AND {mesas}
+        HAVING COUNT(*) > 0 AND {municipio} IS NOT NULL
+        ON CONFLICT(municipio_id) DO UPDATE SET
+            mesas_procesadas = mesas_procesadas + excluded.mesas_procesadas,
+            total_votos_validos = total_votos_validos + excluded.total_votos_validos,
+            total_votos_blancos = total_votos_blancos + excluded.total_votos_blancos,
+            total_votos_nulos = total_votos_nulos + excluded.total_votos_nulos,
+            updated_at = CURRENT_TIMESTAMP;
+    """
+
+
+def _municipio_de_puesto(puesto: str) -> str:
+    return f"(SELECT municipio_id FROM puestos_votacion WHERE id = {puesto})"
+
+
+# Agregados corrientes de E-14 confirmados por municipio, mantenidos por triggers:
+# cada alta suma su delta, cada baja lo resta y cada corrección resta el valor
+# anterior antes de sumar el nuevo; mover una mesa o un puesto traslada sus totales
+AGREGADOS_E14_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS agregados_e14_municipio (
+        municipio_id INTEGER PRIMARY KEY,
+        mesas_procesadas INTEGER NOT NULL DEFAULT 0,
+        total_votos_validos INTEGER NOT NULL DEFAULT 0,
+        total_votos_blancos INTEGER NOT NULL DEFAULT 0,
+        total_votos_nulos INTEGER NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (municipio_id) REFERENCES municipios(id)
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_agregados_e14_insert
+    AFTER INSERT ON e14_capturas
+    WHEN NEW.confirmado = 1
+    BEGIN
+        INSERT INTO agregados_e14_municipio
+            (municipio_id, mesas_procesadas, total_votos_validos, total_votos_blancos, total_votos_nulos)
+        SELECT pv.municipio_id, 1, COALESCE(NEW.votos_validos, 0),
+               COALESCE(NEW.votos_blanco, 0), COALESCE(NEW.votos_nulos, 0)
+        FROM mesas_votacion mv
+        JOIN puestos_votacion pv ON mv.puesto_id = pv.id
+        WHERE mv.id = NEW.mesa_id
+        ON CONFLICT(municipio_id) DO UPDATE SET
+            mesas_procesadas = mesas_procesadas + 1,
+            total_votos_validos = total_votos_validos + excluded.total_votos_validos,
+            total_votos_blancos = total_votos_blancos + excluded.total_votos_blancos,
+            total_votos_nulos = total_votos_nulos + excluded.total_votos_nulos,
+            updated_at = CURRENT_TIMESTAMP;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_agregados_e14_delete
+    AFTER DELETE ON e14_capturas
+    WHEN OLD.confirmado = 1
+    BEGIN
+        UPDATE agregados_e14_municipio SET
+            mesas_procesadas = mesas_procesadas - 1,
+            total_votos_validos = total_votos_validos - COALESCE(OLD.votos_validos, 0),
+            total_votos_blancos = total_votos_blancos - COALESCE(OLD.votos_blanco, 0),
+            total_votos_nulos = total_votos_nulos - COALESCE(OLD.votos_nulos, 0),
+            updated_at = CURRENT_TIMESTAMP
+        WHERE municipio_id = ({_MUNICIPIO_DE_MESA.format(mesa='OLD.mesa_id')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_agregados_e14_update
+    AFTER UPDATE OF mesa_id, votos_validos, votos_blanco, votos_nulos, confirmado ON e14_capturas
+    BEGIN
+        UPDATE agregados_e14_municipio SET
+            mesas_procesadas = mesas_procesadas - 1,
+            total_votos_validos = total_votos_validos - COALESCE(OLD.votos_validos, 0),
+            total_votos_blancos = total_votos_blancos - COALESCE(OLD.votos_blanco, 0),
+            total_votos_nulos = total_votos_nulos - COALESCE(OLD.votos_nulos, 0),
+            updated_at = CURRENT_TIMESTAMP
+        WHERE OLD.confirmado = 1
+          AND municipio_id = ({_MUNICIPIO_DE_MESA.format(mesa='OLD.mesa_id')});
+
+        INSERT INTO agregados_e14_municipio
+            (municipio_id, mesas_procesadas, total_votos_validos, total_votos_blancos, total_votos_nulos)
+        SELECT pv.municipio_id, 1, COALESCE(NEW.votos_validos, 0),
+               COALESCE(NEW.votos_blanco, 0), COALESCE(NEW.votos_nulos, 0)
+        FROM mesas_votacion mv
+        JOIN puestos_votacion pv ON mv.puesto_id = pv.id
+        WHERE NEW.confirmado = 1 AND mv.id = NEW.mesa_id
+        ON CONFLICT(municipio_id) DO UPDATE SET
+            mesas_procesadas = mesas_procesadas + 1,
+            total_votos_validos = total_votos_validos + excluded.total_votos_validos,
+            total_votos_blancos = total_votos_blancos + excluded.total_votos_blancos,
+            total_votos_nulos = total_votos_nulos + excluded.total_votos_nulos,
+            updated_at = CURRENT_TIMESTAMP;
+    END
+    """,
+    # Una mesa que cambia de puesto lleva sus E-14 al municipio del puesto nuevo
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_agregados_e14_mesa_puesto
+    AFTER UPDATE OF puesto_id ON mesas_votacion
+    WHEN OLD.puesto_id IS NOT NEW.puesto_id
+    BEGIN
+        {_mover_agregados_e14('mv.id = NEW.id', _municipio_de_puesto('OLD.puesto_id'), -1)}
+        {_mover_agregados_e14('mv.id = NEW.id', _municipio_de_puesto('NEW.puesto_id'), 1)}
+    END
+    """,
+    # Un puesto que cambia de municipio lleva los E-14 de todas sus mesas
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_agregados_e14_puesto_municipio
+    AFTER UPDATE OF municipio_id ON puestos_votacion
+    WHEN OLD.municipio_id IS NOT NEW.municipio_id
+    BEGIN
+        {_mover_agregados_e14('mv.puesto_id = NEW.id', 'OLD.municipio_id', -1)}
+        {_mover_agregados_e14('mv.puesto_id = NEW.id', 'NEW.municipio_id', 1)}
+    END
+    """
+]
+
+# Recalculo completo, usado para poblar y verificar los agregados
+RECALCULO_AGREGADOS_E14 = """
+    SELECT pv.municipio_id,
+           COUNT(*) AS mesas_procesadas,
+           COALESCE(SUM(e14.votos_validos), 0) AS total_votos_validos,
+           COALESCE(SUM(e14.votos_blanco), 0) AS total_votos_blancos,
+           COALESCE(SUM(e14.votos_nulos), 0) AS total_votos_nulos
+    FROM e14_capturas e14
+    JOIN mesas_votacion mv ON e14.mesa_id = mv.id
+    JOIN puestos_votacion pv ON mv.puesto_id = pv.id
+    WHERE e14.confirmado = 1
+    GROUP BY pv.municipio_id
+"""
+
+CAMPOS_AGREGADO = ('mesas_procesadas', 'total_votos_validos', 'total_votos_blancos', 'total_votos_nulos')
+
+_esquemas_inicializados = set()
+_esquemas_lock = threading.Lock()
+
 
 class MunicipalCoordinationService:
     """Servicio para coordinación municipal electoral"""
     
-    def __init__(self, db_path: str = 'caqueta_electoral.db'):
+    def __init__(self, db_path: str = 'caqueta_electoral.db',
+                 connection_pool: Optional[SQLiteConnectionPool] = None):
         self.db_path = db_path
+        self.connection_pool = connection_pool or get_connection_pool(db_path)
         self.logger = logging.getLogger(__name__)
+        self.audit_sink = get_audit_sink(self.connection_pool.db_path)
+        self.ensure_aggregate_schema()
         
     def get_connection(self) -> sqlite3.Connection:
-        """Obtener conexión a la base de datos"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        conn.execute("PRAGMA foreign_keys = ON")
-        return conn
+        """Obtener conexión del pool compartido"""
+        return self.connection_pool.connect(row_factory=sqlite3.Row, foreign_keys=True)
+    
+    def ensure_aggregate_schema(self):
+        """Crear tabla y triggers de agregados E-14 (una vez por base de datos)"""
+        clave = os.path.abspath(self.db_path)
+        if clave in _esquemas_inicializados:
+            return
+        
+        with _esquemas_lock:
+            if clave in _esquemas_inicializados:
+                return
+            
+            conn = self.get_connection()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                nueva = conn.execute("""
+                    SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'agregados_e14_municipio'
+                """).fetchone() is None
+                for sentencia in AGREGADOS_E14_SCHEMA:
+                    conn.execute(sentencia)
+                if nueva:
+                    # Poblar con los E-14 existentes en la misma transacción que crea los triggers
+                    conn.execute(f"""
+                        INSERT INTO agregados_e14_municipio
+                            (municipio_id, {', '.join(CAMPOS_AGREGADO)})
+                        {RECALCULO_AGREGADOS_E14}
+                    """)
+                conn.commit()
+            except sqlite3.Error as e:
+                conn.rollback()
+                self.logger.error(f"Error creando agregados E-14: {e}")
+                raise
+            finally:
+                conn.close()
+            
+            _esquemas_inicializados.add(clave)
+    
+    def rebuild_e14_aggregates(self, verify_only: bool = False) -> Dict:
+        """
+        Comparar los agregados incrementales con un recálculo completo
+        
+        Args:
+            verify_only: Solo reportar diferencias, sin corregirlas
+            
+        Returns:
+            Dict con municipios revisados, diferencias encontradas y si se reconstruyó
+        """
+        conn = self.get_connection()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            
+            esperados = {row['municipio_id']: dict(row) for row in conn.execute(RECALCULO_AGREGADOS_E14)}
+            actuales = {row['municipio_id']: dict(row) for row in conn.execute(f"""
+                SELECT municipio_id, {', '.join(CAMPOS_AGREGADO)} FROM agregados_e14_municipio
+            """)}
+            
+            diferencias = []
+            for municipio_id in sorted(set(esperados) | set(actuales)):
+                vacio = {campo: 0 for campo in CAMPOS_AGREGADO}
+                esperado = esperados.get(municipio_id, vacio)
+                actual = actuales.get(municipio_id, vacio)
+                campos = {
+                    campo: {'incremental': actual[campo], 'recalculado': esperado[campo]}
+                    for campo in CAMPOS_AGREGADO if actual[campo] != esperado[campo]
+                }
+                if campos:
+                    diferencias.append({'municipio_id': municipio_id, 'campos': campos})
+            
+            reconstruido = bool(diferencias) and not verify_only
+            if reconstruido:
+                conn.execute("DELETE FROM agregados_e14_municipio")
+                conn.execute(f"""
+                    INSERT INTO agregados_e14_municipio
+                        (municipio_id, {', '.join(CAMPOS_AGREGADO)})
+                    {RECALCULO_AGREGADOS_E14}
+                """)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            self.logger.error(f"Error verificando agregados E-14: {e}")
+            raise
+        finally:
+            conn.close()
+        
+        if diferencias:
+            self.logger.warning(f"Agregados E-14 inconsistentes en {len(diferencias)} municipios")
+        
+        return {
+            'municipios': len(esperados),
+            'consistente': not diferencias,
+            'diferencias': diferencias,
+            'reconstruido': reconstruido
+        }
     
     def log_action(self, municipio_id: int, usuario_id: int, accion: str, 
                    entidad_tipo: str = None, entidad_id: int = None, 
                    descripcion: str = None, datos_adicionales: Dict = None):
-        """Registrar acción en el log de coordinación"""
+        """Registrar acción en el log de coordinación (escritura asíncrona por lotes)"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
+            self.audit_sink.submit("""
                 INSERT INTO log_coordinacion_municipal 
                 (municipio_id, usuario_id, accion, entidad_tipo, entidad_id, 
                  descripcion, datos_adicionales)
@@ -44,9 +293,6 @@ class MunicipalCoordinationService:
                 descripcion, json.dumps(datos_adicionales) if datos_adicionales else None
             ))
             
-            conn.commit()
-            conn.close()
-            
         except Exception as e:
             self.logger.error(f"Error registrando acción: {e}")
     
@@ -232,29 +478,18 @@ class MunicipalCoordinationService:
             
             consolidation = dict(cursor.fetchone())
             
-            # Obtener E-14s del municipio para este tipo de elección
-            cursor.execute("""
-                SELECT e14.*, mv.numero as mesa_numero, pv.nombre as puesto_nombre
-                FROM e14_capturas e14
-                JOIN mesas_votacion mv ON e14.mesa_id = mv.id
-                JOIN puestos_votacion pv ON mv.puesto_id = pv.id
-                WHERE pv.municipio_id = ? AND e14.confirmado = 1
-                ORDER BY pv.nombre, mv.numero
+            # Totales corrientes del municipio (mantenidos por triggers sobre e14_capturas)
+            cursor.execute(f"""
+                SELECT {', '.join(CAMPOS_AGREGADO)}
+                FROM agregados_e14_municipio
+                WHERE municipio_id = ?
             """, (consolidation['municipio_id'],))
             
-            e14_forms = cursor.fetchall()
-            
-            # Consolidar datos
-            total_votos_validos = 0
-            total_votos_blancos = 0
-            total_votos_nulos = 0
-            mesas_procesadas = 0
-            
-            for e14 in e14_forms:
-                total_votos_validos += e14['votos_validos'] or 0
-                total_votos_blancos += e14['votos_blanco'] or 0
-                total_votos_nulos += e14['votos_nulos'] or 0
-                mesas_procesadas += 1
+            agregado = cursor.fetchone()
+            mesas_procesadas = agregado['mesas_procesadas'] if agregado else 0
+            total_votos_validos = agregado['total_votos_validos'] if agregado else 0
+            total_votos_blancos = agregado['total_votos_blancos'] if agregado else 0
+            total_votos_nulos = agregado['total_votos_nulos'] if agregado else 0
             
             total_tarjetones = total_votos_validos + total_votos_blancos + total_votos_nulos
             
@@ -9,17 +9,20 @@ from typing import Dict, List, Optional
 import sqlite3
 from datetime import datetime
 
+from core.database import SQLiteConnectionPool, get_connection_pool
+
 class OCRE14Service:
     """Servicio para procesar formularios E14 con OCR"""
     
-    def __init__(self):
+    def __init__(self, connection_pool: Optional[SQLiteConnectionPool] = None):
         self.db_path = 'caqueta_electoral.db'
+        self.connection_pool = connection_pool or get_connection_pool(self.db_path)
+        # Límite en segundos para Tesseract (0 = sin límite); lo fija el pool OCR
+        self.tesseract_timeout = 0
     
     def get_db_connection(self):
-        """Obtener conexión a la base de datos"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+        """Obtener conexión del pool compartido"""
+        return self.connection_pool.connect(row_factory=sqlite3.Row)
     
     def procesar_imagen_e14(self, imagen_path: str, tipo_eleccion: str = 'senado') -> Dict:
         """
@@ -43,7 +46,7 @@ class OCRE14Service:
                 print(f"Procesando imagen con Tesseract: {imagen_path}")
                 
                 # Extraer texto de la imagen
-                texto = self.extraer_texto_tesseract(imagen_path)
+                texto = self.extraer_texto_tesseract(imagen_path, tipo_eleccion)
                 print(f"Texto extraído (primeros 500 caracteres): {texto[:500]}")
                 
                 # Parsear texto y extraer datos estructurados
@@ -175,8 +178,8 @@ class OCRE14Service:
         """
         Guardar candidatos y partidos en la base de datos si no existen
         """
+        conn = self.get_db_connection()
         try:
-            conn = self.get_db_connection()
             cursor = conn.cursor()
             
             for candidato in candidatos:
@@ -245,14 +248,19 @@ class OCRE14Service:
                     ))
             
             conn.commit()
-            conn.close()
             
         except Exception as e:
             print(f"Error guardando candidatos/partidos: {e}")
+        finally:
+            # Varios workers OCR escriben en paralelo: no retener la transacción fallida
+            conn.close()
     
-    def extraer_texto_tesseract(self, imagen_path: str) -> str:
+    def extraer_texto_tesseract(self, imagen_path: str, tipo_eleccion: Optional[str] = None) -> str:
         """
         Extraer texto de imagen usando Tesseract OCR
+        
+        En modo 'rapido' la página se rectifica y reduce a DPI fijo antes de
+        eliminar ruido; el modo se configura por tipo de elección
         """
         try:
             import pytesseract
@@ -276,15 +284,14 @@ class OCRE14Service:
             clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
             enhanced = clahe.apply(gray)
             
-            # 3. Binarización adaptativa
-            thresh = cv2.adaptiveThreshold(
-                enhanced, 255, 
-                cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                cv2.THRESH_BINARY, 11, 2
-            )
+            from services.ocr_preprocessing import MODO_RAPIDO, modo_para_eleccion, preprocesar_completo, preprocesar_rapido
             
-            # 4. Reducir ruido
-            denoised = cv2.fastNlMeansDenoising(thresh, None, 10, 7, 21)
+            if modo_para_eleccion(tipo_eleccion) == MODO_RAPIDO:
+                # 3-4. Rectificar, reducir a DPI fijo, binarizar y reducir ruido
+                denoised, _ = preprocesar_rapido(enhanced)
+            else:
+                # 3-4. Binarización adaptativa y reducción de ruido a resolución completa
+                denoised = preprocesar_completo(enhanced)
             
             print("Imagen preprocesada, aplicando OCR...")
             
@@ -292,7 +299,8 @@ class OCRE14Service:
             custom_config = r'--oem 3 --psm 6 -l spa'
             
             # Aplicar OCR
-            texto = pytesseract.image_to_string(denoised, config=custom_config)
+            texto = pytesseract.image_to_string(denoised, config=custom_config,
+                                                timeout=self.tesseract_timeout)
             
             print(f"OCR completado, texto extraído: {len(texto)} caracteres")
             
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Preprocesamiento de imágenes E14 para OCR
+Modo completo: binarización y fastNlMeansDenoising sobre la imagen original
+Modo rápido: rectifica el formulario al marco fijo de la plantilla, lo lleva a
+un DPI fijo y solo elimina ruido en las zonas que se van a reconocer
+
+Las zonas de estructura_e14 están en coordenadas del marco de la plantilla: el
+formulario completo (carta) a OCR_PLANTILLA_DPI. El modo rápido proyecta la foto
+sobre ese marco, así que las zonas solo se multiplican por el factor fijo
+OCR_DPI_OBJETIVO / OCR_PLANTILLA_DPI, igual para todas las imágenes.
+"""
+
+import os
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+MODO_COMPLETO = 'completo'
+MODO_RAPIDO = 'rapido'
+MODOS_PREPROCESAMIENTO = (MODO_COMPLETO, MODO_RAPIDO)
+
+# Modo global; se sobrescribe por elección con OCR_PREPROCESAMIENTO_<TIPO> (p.ej. _SENADO).
+# El modo rápido es opcional hasta comparar su exactitud con fotos reales de E-14
+MODO_POR_DEFECTO = os.environ.get('OCR_PREPROCESAMIENTO', MODO_COMPLETO)
+OCR_DPI_OBJETIVO = int(os.environ.get('OCR_DPI_OBJETIVO', '200'))
+# Resolución a la que están definidas las zonas de la plantilla
+OCR_PLANTILLA_DPI = int(os.environ.get('OCR_PLANTILLA_DPI', '200'))
+ANCHO_FORMULARIO_PULGADAS = 8.5
+ALTO_FORMULARIO_PULGADAS = 11.0
+
+# Tamaño máximo de la copia usada para buscar el contorno del formulario
+LADO_DETECCION_PX = 800
+MARGEN_ZONA_PX = 4
+
+
+def modo_para_eleccion(tipo_eleccion: Optional[str] = None) -> str:
+    """Modo de preprocesamiento configurado para un tipo de elección"""
+    modo = MODO_POR_DEFECTO
+    if tipo_eleccion:
+        modo = os.environ.get(f'OCR_PREPROCESAMIENTO_{tipo_eleccion.upper()}', modo)
+    return modo if modo in MODOS_PREPROCESAMIENTO else MODO_COMPLETO
+
+
+def marco_formulario(dpi: int = OCR_PLANTILLA_DPI) -> Tuple[int, int]:
+    """Tamaño (ancho, alto) en píxeles del formulario completo al DPI indicado"""
+    return int(round(ANCHO_FORMULARIO_PULGADAS * dpi)), int(round(ALTO_FORMULARIO_PULGADAS * dpi))
+
+
+def binarizar(gris: np.ndarray) -> np.ndarray:
+    """Umbral adaptativo gaussiano usado por ambos modos"""
+    return cv2.adaptiveThreshold(
+        gris, 255,
+        cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+        cv2.THRESH_BINARY, 11, 2
+    )
+
+
+def eliminar_ruido(imagen: np.ndarray) -> np.ndarray:
+    """fastNlMeansDenoising con los parámetros históricos del sistema"""
+    return cv2.fastNlMeansDenoising(imagen, None, 10, 7, 21)
+
+
+def ordenar_esquinas(puntos: np.ndarray) -> np.ndarray:
+    """Ordenar 4 puntos como superior-izquierda, superior-derecha, inferior-derecha, inferior-izquierda"""
+    suma = puntos.sum(axis=1)
+    diferencia = np.diff(puntos, axis=1).ravel()
+    return np.array([
+        puntos[np.argmin(suma)],
+        puntos[np.argmin(diferencia)],
+        puntos[np.argmax(suma)],
+        puntos[np.argmax(diferencia)]
+    ], dtype=np.float32)
+
+
+def detectar_contorno_formulario(gris: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Buscar el cuadrilátero del formulario en una foto
+
+    Returns:
+        Esquinas ordenadas en coordenadas de la imagen original, o None si no
+        hay un contorno de 4 lados que cubra al menos la mitad de la imagen
+        (escaneos ya rectos)
+    """
+    escala = min(1.0, LADO_DETECCION_PX / max(gris.shape[:2]))
+    pequena = gris
+    if escala < 1.0:
+        pequena = cv2.resize(gris, None, fx=escala, fy=escala, interpolation=cv2.INTER_AREA)
+
+    bordes = cv2.Canny(cv2.GaussianBlur(pequena, (5, 5), 0), 50, 150)
+    bordes = cv2.dilate(bordes, None)
+    contornos, _ = cv2.findContours(bordes, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    area_minima = 0.5 * pequena.shape[0] * pequena.shape[1]
+    for contorno in sorted(contornos, key=cv2.contourArea, reverse=True)[:5]:
+        if cv2.contourArea(contorno) < area_minima:
+            break
+        aproximado = cv2.approxPolyDP(contorno, 0.02 * cv2.arcLength(contorno, True), True)
+        if len(aproximado) == 4:
+            return ordenar_esquinas(aproximado.reshape(4, 2).astype(np.float32) / escala)
+    return None
+
+
+def rectificar(gris: np.ndarray, ancho: int, alto: int) -> np.ndarray:
+    """
+    Proyectar el formulario sobre un marco fijo de `ancho` x `alto` en una sola transformación
+
+    Las esquinas detectadas van a las esquinas del marco, de modo que una zona
+    de la plantilla cae en el mismo lugar sin importar el tamaño, la
+    inclinación o la proporción de la foto. Sin contorno (escaneo ya recto) se
+    asume que la imagen es la página completa y se lleva al marco.
+    """
+    esquinas = detectar_contorno_formulario(gris)
+    if esquinas is None:
+        interpolacion = cv2.INTER_AREA if gris.shape[1] > ancho else cv2.INTER_LINEAR
+        return cv2.resize(gris, (ancho, alto), interpolation=interpolacion)
+
+    destino = np.array([[0, 0], [ancho - 1, 0], [ancho - 1, alto - 1], [0, alto - 1]], dtype=np.float32)
+    matriz = cv2.getPerspectiveTransform(esquinas, destino)
+    return cv2.warpPerspective(gris, matriz, (ancho, alto), flags=cv2.INTER_LINEAR,
+                               borderMode=cv2.BORDER_REPLICATE)
+
+
+def escalar_zona(zona: Dict, factor: float) -> Dict:
+    """Llevar una zona de la plantilla al DPI de trabajo (factor = DPI objetivo / DPI de la plantilla)"""
+    if factor == 1.0:
+        return dict(zona)
+    return {
+        'x': int(round(zona['x'] * factor)),
+        'y': int(round(zona['y'] * factor)),
+        'width': max(1, int(round(zona['width'] * factor))),
+        'height': max(1, int(round(zona['height'] * factor)))
+    }
+
+
+def preprocesar_completo(gris: np.ndarray) -> np.ndarray:
+    """Binarizar y eliminar ruido sobre toda la imagen en su resolución original"""
+    return eliminar_ruido(binarizar(gris))
+
+
+def preprocesar_rapido(gris: np.ndarray, zonas: Optional[List[Dict]] = None,
+                       dpi: int = OCR_DPI_OBJETIVO) -> Tuple[np.ndarray, List[Dict]]:
+    """
+    Rectificar al marco de la plantilla a DPI fijo y eliminar ruido solo en las zonas OCR
+
+    Args:
+        gris: Imagen en escala de grises
+        zonas: Zonas de la plantilla (coordenadas del marco a OCR_PLANTILLA_DPI);
+               None para eliminar ruido en toda la página rectificada
+        dpi: Resolución de trabajo del formulario
+
+    Returns:
+        Tuple (imagen binarizada, zonas en coordenadas de la imagen resultante)
+    """
+    rectificada = rectificar(gris, *marco_formulario(dpi))
+    binaria = binarizar(rectificada)
+
+    if zonas is None:
+        return eliminar_ruido(binaria), []
+
+    alto, ancho = binaria.shape[:2]
+    factor = dpi / OCR_PLANTILLA_DPI
+    zonas_escaladas = [escalar_zona(zona, factor) for zona in zonas]
+    for zona in zonas_escaladas:
+        y0 = max(zona['y'] - MARGEN_ZONA_PX, 0)
+        x0 = max(zona['x'] - MARGEN_ZONA_PX, 0)
+        y1 = min(zona['y'] + zona['height'] + MARGEN_ZONA_PX, alto)
+        x1 = min(zona['x'] + zona['width'] + MARGEN_ZONA_PX, ancho)
+        if y1 > y0 and x1 > x0:
+            binaria[y0:y1, x0:x1] = eliminar_ruido(np.ascontiguousarray(binaria[y0:y1, x0:x1]))
+
+    return binaria, zonas_escaladas
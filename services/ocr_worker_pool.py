@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Pool de procesos para OCR de formularios E14
+Ejecuta Tesseract/OpenCV fuera de los hilos web: el endpoint encola un trabajo,
+recibe un job_id y el cliente consulta (o escucha por SSE) el resultado
+
+Cada proceso web tiene su propio pool, pero el estado de los trabajos se
+guarda también en ocr_trabajos: la consulta o el SSE de un job_id pueden
+llegar a otro worker de gunicorn y lo encuentran en la base de datos.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Any
+
+from core.database import SQLiteConnectionPool, get_connection_pool
+
+logger = logging.getLogger(__name__)
+
+ESTADO_EN_COLA = 'en_cola'
+ESTADO_PROCESANDO = 'procesando'
+ESTADO_COMPLETADO = 'completado'
+ESTADO_ERROR = 'error'
+ESTADO_TIMEOUT = 'timeout'
+
+ESTADOS_FINALES = (ESTADO_COMPLETADO, ESTADO_ERROR, ESTADO_TIMEOUT)
+
+OCR_JOBS_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS ocr_trabajos (
+        job_id TEXT PRIMARY KEY,
+        estado TEXT NOT NULL,
+        tipo_eleccion TEXT,
+        resultado TEXT,
+        error TEXT,
+        creado_en REAL NOT NULL,
+        actualizado_en REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_ocr_trabajos_actualizado ON ocr_trabajos(actualizado_en)"
+]
+
+# Intervalo (s) con que un proceso sin el trabajo en memoria consulta ocr_trabajos
+OCR_POLL_INTERVAL = 0.5
+
+# Servicio OCR instanciado una vez por proceso worker
+_worker_service = None
+
+
+def _procesar_en_worker(imagen_path: str, tipo_eleccion: str, timeout: float) -> Dict[str, Any]:
+    """Punto de entrada en el proceso worker"""
+    global _worker_service
+    if _worker_service is None:
+        from services.ocr_e14_service import OCRE14Service
+        _worker_service = OCRE14Service()
+    # Tesseract se cancela antes del límite del trabajo para liberar el worker
+    _worker_service.tesseract_timeout = max(timeout - 1, 1)
+    return _worker_service.procesar_imagen_e14(imagen_path, tipo_eleccion)
+
+
+class OCRQueueFullError(Exception):
+    """La cola de OCR alcanzó su capacidad máxima"""
+
+
+class OCRWorkerPool:
+    """Motor OCR basado en un pool de procesos con API de trabajos"""
+
+    def __init__(self, workers: Optional[int] = None, max_queue: Optional[int] = None,
+                 job_timeout: Optional[float] = None, result_ttl: float = 600,
+                 db_path: str = 'caqueta_electoral.db',
+                 connection_pool: Optional[SQLiteConnectionPool] = None):
+        self.workers = workers or int(os.environ.get('OCR_WORKERS', os.cpu_count() or 2))
+        self.max_queue = max_queue or int(os.environ.get('OCR_MAX_QUEUE', self.workers * 8))
+        self.job_timeout = job_timeout or float(os.environ.get('OCR_JOB_TIMEOUT', 60))
+        self.result_ttl = result_ttl
+        self.db_path = db_path
+        self.connection_pool = connection_pool or get_connection_pool(db_path)
+        self._schema_lista = False
+
+        self._executor = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._watchdog = None
+        self._stop = threading.Event()
+        self.stats = {'enviados': 0, 'completados': 0, 'errores': 0, 'timeouts': 0, 'rechazados': 0}
+
+    def _ensure_started(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            self._stop.clear()
+            self._watchdog = threading.Thread(target=self._watch, name='ocr-watchdog', daemon=True)
+            self._watchdog.start()
+
+    def _in_flight(self) -> int:
+        # Futures sin terminar: un trabajo vencido sigue ocupando su worker hasta que Tesseract corta
+        return sum(1 for job in self._jobs.values() if not job['future'].done())
+
+    # ==================== ESTADO COMPARTIDO ====================
+
+    def get_connection(self) -> sqlite3.Connection:
+        """Obtener conexión del pool compartido"""
+        return self.connection_pool.connect(row_factory=sqlite3.Row)
+
+    def _ensure_schema(self):
+        if self._schema_lista:
+            return
+        conn = self.get_connection()
+        try:
+            for sentencia in OCR_JOBS_SCHEMA:
+                conn.execute(sentencia)
+            conn.commit()
+        finally:
+            conn.close()
+        self._schema_lista = True
+
+    def _guardar(self, job: Dict[str, Any]):
+        """Publicar el estado de un trabajo en ocr_trabajos (los errores solo se registran)"""
+        try:
+            self._ensure_schema()
+            conn = self.get_connection()
+            try:
+                conn.execute("""
+                    INSERT OR REPLACE INTO ocr_trabajos
+                        (job_id, estado, tipo_eleccion, resultado, error, creado_en, actualizado_en)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, (job['job_id'], job['estado'], job['tipo_eleccion'],
+                      json.dumps(job['resultado'], default=str) if job['resultado'] is not None else None,
+                      job['error'], job['creado_en'], time.time()))
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Error guardando estado del trabajo OCR {job['job_id']}: {e}")
+
+    def _leer(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Trabajo encolado por otro proceso"""
+        try:
+            self._ensure_schema()
+            conn = self.get_connection()
+            try:
+                row = conn.execute("SELECT * FROM ocr_trabajos WHERE job_id = ?", (job_id,)).fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Error consultando trabajo OCR {job_id}: {e}")
+            return None
+        if row is None:
+            return None
+        return {
+            'job_id': job_id,
+            'estado': row['estado'],
+            'tipo_eleccion': row['tipo_eleccion'],
+            'resultado': json.loads(row['resultado']) if row['resultado'] else None,
+            'error': row['error']
+        }
+
+    def _purgar(self, ahora: float):
+        try:
+            self._ensure_schema()
+            conn = self.get_connection()
+            try:
+                conn.execute(f"""
+                    DELETE FROM ocr_trabajos
+                    WHERE actualizado_en < ? AND estado IN ({', '.join('?' * len(ESTADOS_FINALES))})
+                """, (ahora - self.result_ttl, *ESTADOS_FINALES))
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Error purgando trabajos OCR: {e}")
+
+    def submit(self, imagen_path: str, tipo_eleccion: str = 'senado',
+               timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Encolar una imagen E14 para OCR
+
+        Returns:
+            Dict con job_id y estado inicial
+
+        Raises:
+            OCRQueueFullError: Si hay demasiados trabajos pendientes (backpressure)
+        """
+        timeout = timeout or self.job_timeout
+
+        with self._lock:
+            self._ensure_started()
+            if self._in_flight() >= self.max_queue:
+                self.stats['rechazados'] += 1
+                raise OCRQueueFullError(
+                    f'Cola de OCR llena ({self.max_queue} trabajos pendientes), intente más tarde'
+                )
+
+            job_id = uuid.uuid4().hex
+            job = {
+                'job_id': job_id,
+                'estado': ESTADO_EN_COLA,
+                'imagen_path': imagen_path,
+                'tipo_eleccion': tipo_eleccion,
+                'creado_en': time.time(),
+                'limite': None,
+                'timeout': timeout,
+                'resultado': None,
+                'error': None,
+                'evento': threading.Event()
+            }
+            self._jobs[job_id] = job
+            future = self._executor.submit(_procesar_en_worker, imagen_path, tipo_eleccion, timeout)
+            job['future'] = future
+            self.stats['enviados'] += 1
+
+        self._guardar(job)
+        future.add_done_callback(lambda f, job_id=job_id: self._on_done(job_id, f))
+        return {'job_id': job_id, 'estado': ESTADO_EN_COLA}
+
+    def _on_done(self, job_id: str, future):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job['estado'] in ESTADOS_FINALES:
+                return
+            try:
+                job['resultado'] = future.result()
+                job['estado'] = ESTADO_COMPLETADO
+                self.stats['completados'] += 1
+            except Exception as e:
+                job['error'] = str(e)
+                job['estado'] = ESTADO_ERROR
+                self.stats['errores'] += 1
+            job['terminado_en'] = time.time()
+        self._guardar(job)
+        job['evento'].set()
+
+    def _watch(self):
+        """Marcar trabajos vencidos y purgar resultados antiguos"""
+        ultima_purga = time.time()
+        while not self._stop.wait(0.5):
+            ahora = time.time()
+            iniciados = []
+            vencidos = []
+            with self._lock:
+                for job_id, job in list(self._jobs.items()):
+                    estado = job['estado']
+                    if estado == ESTADO_EN_COLA and job['future'].running():
+                        # El límite corre desde que un worker toma el trabajo
+                        job['estado'] = ESTADO_PROCESANDO
+                        job['limite'] = ahora + job['timeout']
+                        iniciados.append(job)
+                    elif estado == ESTADO_PROCESANDO and job['limite'] and ahora > job['limite']:
+                        job['estado'] = ESTADO_TIMEOUT
+                        job['error'] = f"El OCR excedió {job['timeout']:.0f}s"
+                        job['terminado_en'] = ahora
+                        self.stats['timeouts'] += 1
+                        vencidos.append(job)
+                    elif (estado in ESTADOS_FINALES and job['future'].done()
+                          and ahora - job.get('terminado_en', ahora) > self.result_ttl):
+                        # Un vencido se conserva mientras su future siga ocupando un worker
+                        del self._jobs[job_id]
+            for job in iniciados + vencidos:
+                self._guardar(job)
+            for job in vencidos:
+                job['evento'].set()
+            if ahora - ultima_purga > self.result_ttl:
+                self._purgar(ahora)
+                ultima_purga = ahora
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Consultar estado (y resultado si terminó) de un trabajo"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            # Encolado por otro proceso web: la lectura se hace sin tomar el lock
+            return self._leer(job_id)
+        with self._lock:
+            if job['estado'] == ESTADO_EN_COLA and job['future'].running():
+                job['estado'] = ESTADO_PROCESANDO
+                job['limite'] = time.time() + job['timeout']
+            return {
+                'job_id': job_id,
+                'estado': job['estado'],
+                'tipo_eleccion': job['tipo_eleccion'],
+                'resultado': job['resultado'],
+                'error': job['error']
+            }
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Bloquear hasta que el trabajo termine o venza `timeout`"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            job['evento'].wait(timeout)
+            return self.get_job(job_id)
+
+        # Trabajo de otro proceso: consultar ocr_trabajos hasta que termine o venza `timeout`
+        limite = None if timeout is None else time.monotonic() + timeout
+        while True:
+            estado = self._leer(job_id)
+            if estado is None or estado['estado'] in ESTADOS_FINALES:
+                return estado
+            if limite is not None and time.monotonic() >= limite:
+                return estado
+            time.sleep(OCR_POLL_INTERVAL if limite is None else
+                       max(0, min(OCR_POLL_INTERVAL, limite - time.monotonic())))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Métricas del pool"""
+        with self._lock:
+            vencidos_ocupando = sum(1 for job in self._jobs.values()
+                                    if job['estado'] == ESTADO_TIMEOUT and not job['future'].done())
+            return dict(self.stats, workers=self.workers, max_queue=self.max_queue,
+                        pendientes=self._in_flight(), vencidos_ocupando=vencidos_ocupando)
+
+    def shutdown(self, wait: bool = True):
+        """Detener workers y watchdog"""
+        self._stop.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+
+_ocr_pool = None
+_ocr_pool_lock = threading.Lock()
+
+
+def get_ocr_worker_pool() -> OCRWorkerPool:
+    """Obtener el pool OCR compartido del proceso"""
+    global _ocr_pool
+    if _ocr_pool is None:
+        with _ocr_pool_lock:
+            if _ocr_pool is None:
+                _ocr_pool = OCRWorkerPool()
+    return _ocr_pool
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+SearchIndexService - Índice de búsqueda de texto completo (SQLite FTS5)
+Reemplaza los filtros LIKE '%término%' (que recorren la tabla completa) por
+tablas FTS5 de contenido externo sobre candidatos, testigos, usuarios y
+puestos de votación.
+
+El tokenizador unicode61 con remove_diacritics ignora tildes y eñes ("Perez"
+encuentra "Pérez", "montanita" encuentra "Montañita"), cada término se busca
+por prefijo y los resultados se ordenan por relevancia (bm25). Triggers sobre
+las tablas fuente mantienen el índice al día con cualquier escritura, también
+la de los scripts de carga.
+"""
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from core.database import SQLiteConnectionPool, get_connection_pool
+
+logger = logging.getLogger(__name__)
+
+SEARCH_DEFAULT_LIMIT = int(os.environ.get('SEARCH_DEFAULT_LIMIT', '20'))
+SEARCH_MAX_LIMIT = int(os.environ.get('SEARCH_MAX_LIMIT', '100'))
+
+FTS_TOKENIZER = 'unicode61 remove_diacritics 2'
+# Índices de prefijo para búsquedas de 2 y 3 caracteres
+FTS_PREFIX = '2 3'
+
+# Entidad -> tablas fuente posibles (la primera que exista) y columnas indexadas.
+# Los dos esquemas del sistema conviven: candidates (gestión de candidatos) y
+# candidatos (base departamental).
+FUENTES = {
+    'candidatos': [
+        ('candidates', ('nombre_completo', 'cedula', 'cargo_aspirado', 'circunscripcion')),
+        ('candidatos', ('nombre_completo', 'cedula', 'profesion')),
+    ],
+    'testigos': [
+        ('testigos_electorales', ('nombre_completo', 'cedula', 'email', 'telefono')),
+    ],
+    'usuarios': [
+        ('users', ('nombre_completo', 'cedula', 'username', 'email')),
+    ],
+    'puestos': [
+        ('puestos_votacion', ('nombre', 'direccion', 'barrio_vereda', 'codigo')),
+    ],
+}
+
+_TERMINO = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_table(tabla: str) -> str:
+    return f"{tabla}_fts"
+
+
+def match_terms(texto: Optional[str]) -> Optional[str]:
+    """
+    Expresión MATCH de un texto libre: cada palabra entre comillas y por prefijo
+    (los operadores y comillas del usuario no llegan a FTS5). None si no hay palabras
+    """
+    if not texto:
+        return None
+    terminos = _TERMINO.findall(str(texto))
+    if not terminos:
+        return None
+    return ' '.join(f'"{termino}"*' for termino in terminos)
+
+
+def match_expression(filtros: Dict[str, Optional[str]], texto: Optional[str] = None) -> Optional[str]:
+    """
+    Combinar filtros por columna ({columna: texto}) y un texto general en una
+    expresión MATCH (AND entre todos). None si no queda ningún término
+    """
+    partes = []
+    for columna, valor in filtros.items():
+        terminos = match_terms(valor)
+        if terminos:
+            partes.append(f"{columna} : ({terminos})")
+    general = match_terms(texto)
+    if general:
+        partes.append(f"({general})")
+    return ' AND '.join(partes) if partes else None
+
+
+class SearchIndexService:
+    """Tablas FTS5 sincronizadas por triggers y búsqueda rankeada"""
+
+    def __init__(self, db_path: str = 'caqueta_electoral.db',
+                 connection_pool: Optional[SQLiteConnectionPool] = None):
+        self.db_path = db_path
+        self.connection_pool = connection_pool or get_connection_pool(db_path)
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._listo = False
+        # Tabla fuente -> columnas indexadas, solo de las tablas que existen
+        self._indices: Dict[str, Tuple[str, ...]] = {}
+        # Entidad -> tabla fuente
+        self._entidades: Dict[str, str] = {}
+
+    def get_connection(self) -> sqlite3.Connection:
+        """Obtener conexión del pool compartido"""
+        return self.connection_pool.connect(row_factory=sqlite3.Row)
+
+    # ==================== ESQUEMA ====================
+
+    @staticmethod
+    def _triggers(tabla: str, columnas: Sequence[str]) -> List[str]:
+        fts = fts_table(tabla)
+        lista = ', '.join(columnas)
+        nuevos = ', '.join(f"new.{columna}" for columna in columnas)
+        viejos = ', '.join(f"old.{columna}" for columna in columnas)
+        return [
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {tabla} BEGIN
+                INSERT INTO {fts} (rowid, {lista}) VALUES (new.id, {nuevos});
+            END
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {tabla} BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {lista}) VALUES ('delete', old.id, {viejos});
+            END
+            """,
+            # Solo cambios en columnas indexadas (no los de estado o asignación)
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {lista} ON {tabla} BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {lista}) VALUES ('delete', old.id, {viejos});
+                INSERT INTO {fts} (rowid, {lista}) VALUES (new.id, {nuevos});
+            END
+            """,
+        ]
+
+    def ensure_schema(self) -> bool:
+        """Crear (una vez) las tablas FTS5 y sus triggers; False si SQLite no tiene FTS5"""
+        if self._listo:
+            return bool(self._indices)
+        with self._lock:
+            if self._listo:
+                return bool(self._indices)
+            conn = self.get_connection()
+            try:
+                existentes = {row[0] for row in conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table'")}
+                for entidad, fuentes in FUENTES.items():
+                    for tabla, columnas in fuentes:
+                        if tabla not in existentes:
+                            continue
+                        disponibles = {row[1] for row in conn.execute(f"PRAGMA table_info({tabla})")}
+                        columnas = tuple(c for c in columnas if c in disponibles)
+                        if 'id' not in disponibles or not columnas:
+                            continue
+                        self._crear_indice(conn, tabla, columnas, fts_table(tabla) in existentes)
+                        self._indices[tabla] = columnas
+                        self._entidades.setdefault(entidad, tabla)
+                conn.commit()
+            except sqlite3.OperationalError as e:
+                conn.rollback()
+                self._indices.clear()
+                self._entidades.clear()
+                self.logger.warning(f"Índice de búsqueda FTS5 no disponible: {e}")
+            finally:
+                conn.close()
+            self._listo = True
+        return bool(self._indices)
+
+    def _crear_indice(self, conn: sqlite3.Connection, tabla: str, columnas: Sequence[str], existe: bool):
+        fts = fts_table(tabla)
+        if existe:
+            # Las columnas de un índice existente mandan (la tabla fuente pudo cambiar)
+            actuales = tuple(row[1] for row in conn.execute(f"PRAGMA table_info({fts})"))
+            if actuales != tuple(columnas):
+                for sufijo in ('ai', 'ad', 'au'):
+                    conn.execute(f"DROP TRIGGER IF EXISTS {fts}_{sufijo}")
+                conn.execute(f"DROP TABLE {fts}")
+                existe = False
+        if not existe:
+            conn.execute(f"""
+                CREATE VIRTUAL TABLE {fts} USING fts5(
+                    {', '.join(columnas)},
+                    content='{tabla}', content_rowid='id',
+                    tokenize='{FTS_TOKENIZER}', prefix='{FTS_PREFIX}'
+                )
+            """)
+            conn.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+            self.logger.info(f"Índice de búsqueda creado: {fts} ({len(columnas)} columnas)")
+        for sql in self._triggers(tabla, columnas):
+            conn.execute(sql)
+
+    def has_index(self, tabla: str) -> bool:
+        """Si la tabla fuente tiene índice FTS5 (crea el esquema la primera vez)"""
+        self.ensure_schema()
+        return tabla in self._indices
+
+    def indexed_columns(self, tabla: str) -> Tuple[str, ...]:
+        self.ensure_schema()
+        return self._indices.get(tabla, ())
+
+    def rebuild(self):
+        """Reconstruir todos los índices desde sus tablas fuente (mantenimiento)"""
+        self.ensure_schema()
+        conn = self.get_connection()
+        try:
+            for tabla in self._indices:
+                fts = fts_table(tabla)
+                conn.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ==================== BÚSQUEDA ====================
+
+    def search(self, texto: str, entidades: Optional[Sequence[str]] = None,
+               limit: Optional[int] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Buscar un texto en las entidades indicadas (todas por omisión)
+
+        Returns:
+            {entidad: [{'id', columnas indexadas..., 'rank'}]} ordenado por relevancia
+        """
+        match = match_terms(texto)
+        if not match or not self.ensure_schema():
+            return {}
+        limit = max(1, min(int(limit or SEARCH_DEFAULT_LIMIT), SEARCH_MAX_LIMIT))
+
+        resultados = {}
+        conn = self.get_connection()
+        try:
+            for entidad in entidades or self._entidades:
+                tabla = self._entidades.get(entidad)
+                if tabla is None:
+                    continue
+                fts = fts_table(tabla)
+                columnas = ', '.join(self._indices[tabla])
+                filas = conn.execute(f"""
+                    SELECT rowid AS id, {columnas}, bm25({fts}) AS rank
+                    FROM {fts}
+                    WHERE {fts} MATCH ?
+                    ORDER BY rank
+                    LIMIT ?
+                """, (match, limit)).fetchall()
+                resultados[entidad] = [dict(fila) for fila in filas]
+        finally:
+            conn.close()
+        return resultados
+
+
+_indices: Dict[str, SearchIndexService] = {}
+_indices_lock = threading.Lock()
+
+
+def get_search_index(db_path: str = 'caqueta_electoral.db') -> SearchIndexService:
+    """Índice de búsqueda compartido por base de datos"""
+    clave = os.path.abspath(db_path)
+    indice = _indices.get(clave)
+    if indice is None:
+        with _indices_lock:
+            indice = _indices.get(clave)
+            if indice is None:
+                indice = SearchIndexService(db_path)
+                _indices[clave] = indice
+    return indice
@@ -0,0 +1,500 @@
+#!/usr/bin/env python3
+"""
+VoteAggregationService - Agregados materializados de votos por candidato
+Mantiene votos por candidato en cada nivel geográfico (mesa, puesto, zona,
+municipio, departamento) a partir de datos_ocr_e14 de capturas confirmadas
+
+El puesto, la zona y el municipio se resuelven al registrar cada voto; si una
+mesa cambia de puesto o un puesto cambia de zona o municipio, los triggers de
+mesas_votacion y puestos_votacion mueven los votos ya agregados al nuevo ámbito.
+"""
+
+import sqlite3
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Any
+
+from core.database import SQLiteConnectionPool, get_connection_pool
+
+NIVEL_MESA = 'mesa'
+NIVEL_PUESTO = 'puesto'
+NIVEL_ZONA = 'zona'
+NIVEL_MUNICIPIO = 'municipio'
+NIVEL_DEPARTAMENTO = 'departamento'
+NIVELES = (NIVEL_MESA, NIVEL_PUESTO, NIVEL_ZONA, NIVEL_MUNICIPIO, NIVEL_DEPARTAMENTO)
+
+# Estados de capturas_e14 cuyos votos cuentan en los agregados; de los envíos
+# de un testigo para una mesa solo el último queda 'enviado' (los anteriores
+# pasan a 'reemplazado' al escribirse el nuevo)
+ESTADOS_CONFIRMADOS = ('enviado', 'validado', 'confirmado')
+
+_ESTADOS_SQL = ', '.join(f"'{estado}'" for estado in ESTADOS_CONFIRMADOS)
+
+_NIVELES_SQL = ' UNION ALL '.join(f"SELECT '{nivel}' AS nivel" for nivel in NIVELES)
+
+_VOTOS_FILA = "COALESCE({d}.votos_confirmados, {d}.votos_detectados, 0)"
+
+
+def _delta_sql(filas: str, mesa: str, confirmada: str, signo: int) -> str:
+    """
+    Sentencia que suma (signo=1) o resta (signo=-1) votos en todos los niveles
+
+    Args:
+        filas: Subconsulta con columnas candidato_id y votos
+        mesa: Expresión con el mesa_id de la captura
+        confirmada: Condición de captura confirmada
+        signo: 1 para aplicar, -1 para retractar
+    """
+    return f"""
+        INSERT INTO votos_candidato_agregados (nivel, ambito_id, candidato_id, votos)
+        SELECT niveles.nivel,
+               CASE niveles.nivel
+                   WHEN '{NIVEL_MESA}' THEN mv.id
+                   WHEN '{NIVEL_PUESTO}' THEN mv.puesto_id
+                   WHEN '{NIVEL_ZONA}' THEN pv.zona_id
+                   WHEN '{NIVEL_MUNICIPIO}' THEN pv.municipio_id
+                   ELSE 0
+               END AS ambito,
+               f.candidato_id,
+               {signo} * f.votos
+        FROM {filas} f
+        JOIN mesas_votacion mv ON mv.id = {mesa}
+        JOIN puestos_votacion pv ON mv.puesto_id = pv.id
+        CROSS JOIN ({_NIVELES_SQL}) niveles
+        WHERE {confirmada} AND f.candidato_id IS NOT NULL AND ambito IS NOT NULL
+        ON CONFLICT(nivel, ambito_id, candidato_id) DO UPDATE SET
+            votos = votos + excluded.votos,
+            updated_at = CURRENT_TIMESTAMP;
+    """
+
+
+def _mover_sql(filas: str, puesto: str, zona: str, municipio: str, condicion: str,
+               signo: int, niveles=(NIVEL_PUESTO, NIVEL_ZONA, NIVEL_MUNICIPIO)) -> str:
+    """
+    Sentencia que suma o resta votos en ámbitos dados explícitamente
+
+    Los triggers de reubicación la usan con los ámbitos anteriores (signo=-1)
+    y los nuevos (signo=1); mesa y departamento no cambian y no se tocan.
+    """
+    niveles_sql = ' UNION ALL '.join(f"SELECT '{nivel}' AS nivel" for nivel in niveles)
+    return f"""
+        INSERT INTO votos_candidato_agregados (nivel, ambito_id, candidato_id, votos)
+        SELECT niveles.nivel,
+               CASE niveles.nivel
+                   WHEN '{NIVEL_PUESTO}' THEN {puesto}
+                   WHEN '{NIVEL_ZONA}' THEN {zona}
+                   WHEN '{NIVEL_MUNICIPIO}' THEN {municipio}
+               END AS ambito,
+               f.candidato_id,
+               {signo} * f.votos
+        FROM {filas} f
+        CROSS JOIN ({niveles_sql}) niveles
+        WHERE {condicion} AND f.candidato_id IS NOT NULL AND ambito IS NOT NULL
+        ON CONFLICT(nivel, ambito_id, candidato_id) DO UPDATE SET
+            votos = votos + excluded.votos,
+            updated_at = CURRENT_TIMESTAMP;
+    """
+
+
+def _filas_confirmadas(mesas: str) -> str:
+    """Votos por candidato de las capturas confirmadas de las mesas que cumplen la condición"""
+    return f"""(
+        SELECT d.candidato_id, SUM({_VOTOS_FILA.format(d='d')}) AS votos
+        FROM datos_ocr_e14 d
+        JOIN capturas_e14 c ON d.captura_e14_id = c.id
+        JOIN mesas_votacion mv ON c.mesa_id = mv.id
+        WHERE {mesas} AND c.estado IN ({_ESTADOS_SQL})
+        GROUP BY d.candidato_id
+    )"""
+
+
+def _del_puesto(columna: str, puesto: str) -> str:
+    return f"(SELECT {columna} FROM puestos_votacion WHERE id = {puesto})"
+
+
+def _existe_puesto(puesto: str) -> str:
+    return f"EXISTS (SELECT 1 FROM puestos_votacion WHERE id = {puesto})"
+
+
+def _fila_dato(d: str) -> str:
+    return f"(SELECT {d}.candidato_id AS candidato_id, {_VOTOS_FILA.format(d=d)} AS votos)"
+
+
+def _filas_captura(captura: str) -> str:
+    return f"""(
+        SELECT candidato_id, {_VOTOS_FILA.format(d='datos_ocr_e14')} AS votos
+        FROM datos_ocr_e14 WHERE captura_e14_id = {captura}
+    )"""
+
+
+def _mesa_de_captura(captura: str) -> str:
+    return f"(SELECT mesa_id FROM capturas_e14 WHERE id = {captura})"
+
+
+def _captura_confirmada(captura: str) -> str:
+    return f"(SELECT estado FROM capturas_e14 WHERE id = {captura}) IN ({_ESTADOS_SQL})"
+
+
+AGREGADOS_VOTOS_TABLA = """
+    CREATE TABLE IF NOT EXISTS votos_candidato_agregados (
+        nivel TEXT NOT NULL,
+        ambito_id INTEGER NOT NULL,
+        candidato_id INTEGER NOT NULL,
+        votos INTEGER NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (nivel, ambito_id, candidato_id)
+    ) WITHOUT ROWID
+"""
+
+AGREGADOS_VOTOS_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_votos_agregados_dato_insert
+    AFTER INSERT ON datos_ocr_e14
+    BEGIN
+        {_delta_sql(_fila_dato('NEW'), _mesa_de_captura('NEW.captura_e14_id'),
+                    _captura_confirmada('NEW.captura_e14_id'), 1)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_votos_agregados_dato_delete
+    AFTER DELETE ON datos_ocr_e14
+    BEGIN
+        {_delta_sql(_fila_dato('OLD'), _mesa_de_captura('OLD.captura_e14_id'),
+                    _captura_confirmada('OLD.captura_e14_id'), -1)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_votos_agregados_dato_update
+    AFTER UPDATE OF captura_e14_id, candidato_id, votos_detectados, votos_confirmados ON datos_ocr_e14
+    BEGIN
+        {_delta_sql(_fila_dato('OLD'), _mesa_de_captura('OLD.captura_e14_id'),
+                    _captura_confirmada('OLD.captura_e14_id'), -1)}
+        {_delta_sql(_fila_dato('NEW'), _mesa_de_captura('NEW.captura_e14_id'),
+                    _captura_confirmada('NEW.captura_e14_id'), 1)}
+    END
+    """,
+    # Confirmar, rechazar o reasignar de mesa una captura mueve todos sus votos
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_votos_agregados_captura_update
+    AFTER UPDATE OF estado, mesa_id ON capturas_e14
+    BEGIN
+        {_delta_sql(_filas_captura('OLD.id'), 'OLD.mesa_id', f"OLD.estado IN ({_ESTADOS_SQL})", -1)}
+        {_delta_sql(_filas_captura('NEW.id'), 'NEW.mesa_id', f"NEW.estado IN ({_ESTADOS_SQL})", 1)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_votos_agregados_captura_delete
+    AFTER DELETE ON capturas_e14
+    BEGIN
+        {_delta_sql(_filas_captura('OLD.id'), 'OLD.mesa_id', f"OLD.estado IN ({_ESTADOS_SQL})", -1)}
+    END
+    """,
+    # Mover una mesa a otro puesto lleva sus votos al puesto, zona y municipio nuevos
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_votos_agregados_mesa_puesto
+    AFTER UPDATE OF puesto_id ON mesas_votacion
+    WHEN OLD.puesto_id IS NOT NEW.puesto_id
+    BEGIN
+        {_mover_sql(_filas_confirmadas('mv.id = NEW.id'), 'OLD.puesto_id',
+                    _del_puesto('zona_id', 'OLD.puesto_id'), _del_puesto('municipio_id', 'OLD.puesto_id'),
+                    _existe_puesto('OLD.puesto_id'), -1)}
+        {_mover_sql(_filas_confirmadas('mv.id = NEW.id'), 'NEW.puesto_id',
+                    _del_puesto('zona_id', 'NEW.puesto_id'), _del_puesto('municipio_id', 'NEW.puesto_id'),
+                    _existe_puesto('NEW.puesto_id'), 1)}
+    END
+    """,
+    # Cambiar la zona o el municipio de un puesto mueve los votos de todas sus mesas
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_votos_agregados_puesto_ubicacion
+    AFTER UPDATE OF zona_id, municipio_id ON puestos_votacion
+    WHEN OLD.zona_id IS NOT NEW.zona_id OR OLD.municipio_id IS NOT NEW.municipio_id
+    BEGIN
+        {_mover_sql(_filas_confirmadas('mv.puesto_id = NEW.id'), 'NULL', 'OLD.zona_id', 'OLD.municipio_id',
+                    '1', -1, niveles=(NIVEL_ZONA, NIVEL_MUNICIPIO))}
+        {_mover_sql(_filas_confirmadas('mv.puesto_id = NEW.id'), 'NULL', 'NEW.zona_id', 'NEW.municipio_id',
+                    '1', 1, niveles=(NIVEL_ZONA, NIVEL_MUNICIPIO))}
+    END
+    """
+]
+
+# Recálculo completo desde las filas de captura (poblado inicial y verificación)
+RECALCULO_VOTOS = f"""
+    SELECT niveles.nivel,
+           CASE niveles.nivel
+               WHEN '{NIVEL_MESA}' THEN mv.id
+               WHEN '{NIVEL_PUESTO}' THEN mv.puesto_id
+               WHEN '{NIVEL_ZONA}' THEN pv.zona_id
+               WHEN '{NIVEL_MUNICIPIO}' THEN pv.municipio_id
+               ELSE 0
+           END AS ambito,
+           d.candidato_id,
+           SUM({_VOTOS_FILA.format(d='d')}) AS votos
+    FROM datos_ocr_e14 d
+    JOIN capturas_e14 c ON d.captura_e14_id = c.id
+    JOIN mesas_votacion mv ON c.mesa_id = mv.id
+    JOIN puestos_votacion pv ON mv.puesto_id = pv.id
+    CROSS JOIN ({_NIVELES_SQL}) niveles
+    WHERE c.estado IN ({_ESTADOS_SQL}) AND d.candidato_id IS NOT NULL AND ambito IS NOT NULL
+    GROUP BY niveles.nivel, ambito, d.candidato_id
+"""
+
+TABLAS_ORIGEN = ('datos_ocr_e14', 'capturas_e14', 'mesas_votacion', 'puestos_votacion')
+
+# Ruta absoluta -> si la base tiene triggers de mantenimiento incremental
+_esquemas_inicializados = {}
+_esquemas_lock = threading.Lock()
+
+
+class VoteAggregationService:
+    """Servicio de agregados de votos por candidato y nivel geográfico"""
+
+    def __init__(self, db_path: str = 'caqueta_electoral.db',
+                 connection_pool: Optional[SQLiteConnectionPool] = None):
+        self.db_path = db_path
+        self.connection_pool = connection_pool or get_connection_pool(db_path)
+        self.logger = logging.getLogger(__name__)
+        self.triggers_activos = False
+
+    def get_connection(self) -> sqlite3.Connection:
+        """Obtener conexión del pool compartido"""
+        return self.connection_pool.connect(row_factory=sqlite3.Row)
+
+    def ensure_schema(self):
+        """Crear tabla de agregados y triggers (una vez por base de datos, al primer uso)"""
+        clave = os.path.abspath(self.db_path)
+        if clave in _esquemas_inicializados:
+            self.triggers_activos = _esquemas_inicializados[clave]
+            return
+
+        with _esquemas_lock:
+            if clave in _esquemas_inicializados:
+                self.triggers_activos = _esquemas_inicializados[clave]
+                return
+
+            conn = self.get_connection()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute(AGREGADOS_VOTOS_TABLA)
+
+                existentes = {row[0] for row in conn.execute(f"""
+                    SELECT name FROM sqlite_master
+                    WHERE type = 'table' AND name IN ({', '.join('?' * len(TABLAS_ORIGEN))})
+                """, TABLAS_ORIGEN)}
+                if existentes != set(TABLAS_ORIGEN):
+                    # Base sin capturas E-14: los agregados quedan vacíos
+                    conn.commit()
+                    self.logger.warning(
+                        f"{self.db_path} no tiene {sorted(set(TABLAS_ORIGEN) - existentes)}; "
+                        "agregados de votos sin mantenimiento incremental"
+                    )
+                    _esquemas_inicializados[clave] = False
+                    return
+
+                nuevos = conn.execute("""
+                    SELECT COUNT(*) FROM sqlite_master
+                    WHERE type = 'trigger' AND name = 'trg_votos_agregados_dato_insert'
+                """).fetchone()[0] == 0
+                for trigger in AGREGADOS_VOTOS_TRIGGERS:
+                    conn.execute(trigger)
+                if nuevos:
+                    # Poblar con las capturas existentes en la misma transacción
+                    conn.execute("DELETE FROM votos_candidato_agregados")
+                    conn.execute(f"""
+                        INSERT INTO votos_candidato_agregados (nivel, ambito_id, candidato_id, votos)
+                        {RECALCULO_VOTOS}
+                    """)
+                conn.commit()
+            except sqlite3.Error as e:
+                conn.rollback()
+                self.logger.error(f"Error creando agregados de votos: {e}")
+                raise
+            finally:
+                conn.close()
+
+            _esquemas_inicializados[clave] = True
+            self.triggers_activos = True
+
+    # ==================== CONSULTAS ====================
+
+    def get_votes_by_candidate(self, candidate_ids: Optional[List[int]] = None,
+                               nivel: str = NIVEL_DEPARTAMENTO, ambito_id: int = 0) -> Dict[int, int]:
+        """Votos por candidato en un ámbito (por defecto todo el departamento)"""
+        self.ensure_schema()
+        query = """
+            SELECT candidato_id, votos FROM votos_candidato_agregados
+            WHERE nivel = ? AND ambito_id = ?
+        """
+        params = [nivel, ambito_id]
+        if candidate_ids is not None:
+            if not candidate_ids:
+                return {}
+            query += f" AND candidato_id IN ({', '.join('?' * len(candidate_ids))})"
+            params.extend(candidate_ids)
+
+        conn = self.get_connection()
+        try:
+            return {row['candidato_id']: row['votos'] for row in conn.execute(query, params)}
+        finally:
+            conn.close()
+
+    def get_votes_by_cedula(self, cedulas: List[str], nivel: str = NIVEL_DEPARTAMENTO,
+                            ambito_id: int = 0) -> Dict[str, int]:
+        """
+        Votos por cédula del candidato en un ámbito
+
+        Los agregados están indexados por candidatos.id; otros catálogos de
+        candidatos (p. ej. la tabla candidates) se cruzan por cédula.
+        """
+        self.ensure_schema()
+        cedulas = [str(cedula) for cedula in cedulas if cedula]
+        if not cedulas:
+            return {}
+
+        conn = self.get_connection()
+        try:
+            existe = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'candidatos'").fetchone()
+            if existe is None:
+                return {}
+            return {row['cedula']: row['votos'] for row in conn.execute(f"""
+                SELECT c.cedula, SUM(a.votos) AS votos
+                FROM candidatos c
+                JOIN votos_candidato_agregados a
+                     ON a.candidato_id = c.id AND a.nivel = ? AND a.ambito_id = ?
+                WHERE c.cedula IN ({', '.join('?' * len(cedulas))})
+                GROUP BY c.cedula
+            """, [nivel, ambito_id] + cedulas)}
+        finally:
+            conn.close()
+
+    def get_candidate_ranking(self, nivel: str = NIVEL_DEPARTAMENTO, ambito_id: int = 0,
+                              cargo_id: Optional[int] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Ranking de candidatos con partido y coalición"""
+        self.ensure_schema()
+        query = """
+            SELECT c.id AS candidato_id, c.nombre_completo, c.numero_lista,
+                   p.id AS partido_id, p.sigla AS partido_sigla,
+                   co.id AS coalicion_id, co.nombre AS coalicion_nombre,
+                   COALESCE(a.votos, 0) AS votos
+            FROM candidatos c
+            LEFT JOIN votos_candidato_agregados a
+                   ON a.candidato_id = c.id AND a.nivel = ? AND a.ambito_id = ?
+            LEFT JOIN partidos_politicos p ON c.partido_id = p.id
+            LEFT JOIN coaliciones co ON c.coalicion_id = co.id
+            WHERE c.activo = 1
+        """
+        params = [nivel, ambito_id]
+        if cargo_id:
+            query += " AND c.cargo_id = ?"
+            params.append(cargo_id)
+        query += " ORDER BY votos DESC, c.numero_lista"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        conn = self.get_connection()
+        try:
+            return [dict(row) for row in conn.execute(query, params)]
+        finally:
+            conn.close()
+
+    def get_party_totals(self, nivel: str = NIVEL_DEPARTAMENTO, ambito_id: int = 0,
+                         cargo_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Votos por partido sumando los agregados de sus candidatos"""
+        return self._group_totals('partidos_politicos', 'partido_id', 'p.nombre, p.sigla',
+                                  nivel, ambito_id, cargo_id)
+
+    def get_coalition_totals(self, nivel: str = NIVEL_DEPARTAMENTO, ambito_id: int = 0,
+                             cargo_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Votos por coalición sumando los agregados de sus candidatos"""
+        return self._group_totals('coaliciones', 'coalicion_id', 'p.nombre',
+                                  nivel, ambito_id, cargo_id)
+
+    def _group_totals(self, tabla: str, columna: str, campos: str, nivel: str,
+                      ambito_id: int, cargo_id: Optional[int]) -> List[Dict[str, Any]]:
+        self.ensure_schema()
+        query = f"""
+            SELECT p.id, {campos},
+                   COUNT(c.id) AS total_candidatos,
+                   COALESCE(SUM(a.votos), 0) AS votos
+            FROM {tabla} p
+            JOIN candidatos c ON c.{columna} = p.id AND c.activo = 1
+            LEFT JOIN votos_candidato_agregados a
+                   ON a.candidato_id = c.id AND a.nivel = ? AND a.ambito_id = ?
+        """
+        params = [nivel, ambito_id]
+        if cargo_id:
+            query += " WHERE c.cargo_id = ?"
+            params.append(cargo_id)
+        query += " GROUP BY p.id ORDER BY votos DESC"
+
+        conn = self.get_connection()
+        try:
+            return [dict(row) for row in conn.execute(query, params)]
+        finally:
+            conn.close()
+
+    def get_totals_by_area(self, nivel: str = NIVEL_MUNICIPIO) -> Dict[int, int]:
+        """Total de votos a candidatos por ámbito de un nivel"""
+        self.ensure_schema()
+        conn = self.get_connection()
+        try:
+            return {row['ambito_id']: row['votos'] for row in conn.execute("""
+                SELECT ambito_id, SUM(votos) AS votos
+                FROM votos_candidato_agregados
+                WHERE nivel = ?
+                GROUP BY ambito_id
+            """, (nivel,))}
+        finally:
+            conn.close()
+
+    # ==================== VERIFICACIÓN ====================
+
+    def rebuild(self, verify_only: bool = False) -> Dict[str, Any]:
+        """
+        Comparar los agregados con un recálculo completo y reconstruirlos si difieren
+
+        Returns:
+            Dict con filas revisadas, diferencias y si se reconstruyó
+        """
+        self.ensure_schema()
+        if not self.triggers_activos:
+            return {'filas': 0, 'consistente': True, 'diferencias': [], 'reconstruido': False}
+
+        conn = self.get_connection()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            esperados = {(r[0], r[1], r[2]): r[3] for r in conn.execute(RECALCULO_VOTOS)}
+            actuales = {(r[0], r[1], r[2]): r[3] for r in conn.execute("""
+                SELECT nivel, ambito_id, candidato_id, votos FROM votos_candidato_agregados
+            """)}
+
+            diferencias = [
+                {'nivel': clave[0], 'ambito_id': clave[1], 'candidato_id': clave[2],
+                 'incremental': actuales.get(clave, 0), 'recalculado': esperados.get(clave, 0)}
+                for clave in sorted(set(esperados) | set(actuales), key=str)
+                if actuales.get(clave, 0) != esperados.get(clave, 0)
+            ]
+
+            reconstruido = bool(diferencias) and not verify_only
+            if reconstruido:
+                conn.execute("DELETE FROM votos_candidato_agregados")
+                conn.execute(f"""
+                    INSERT INTO votos_candidato_agregados (nivel, ambito_id, candidato_id, votos)
+                    {RECALCULO_VOTOS}
+                """)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            self.logger.error(f"Error verificando agregados de votos: {e}")
+            raise
+        finally:
+            conn.close()
+
+        return {
+            'filas': len(esperados),
+            'consistente': not diferencias,
+            'diferencias': diferencias,
+            'reconstruido': reconstruido
+        }
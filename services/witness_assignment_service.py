@@ -0,0 +1,669 @@
+#!/usr/bin/env python3
+"""
+WitnessAssignmentService - Asignación automática de testigos a mesas
+Propone en un solo cálculo qué testigo disponible cubre cada mesa sin
+cobertura, en lugar de elegir los pares uno a uno.
+
+El problema se resuelve como un flujo de costo mínimo por municipio (los
+testigos solo cubren mesas de su municipio):
+
+    fuente -> clase de testigos -> (partido, puesto) -> puesto -> sumidero
+
+Una clase agrupa los testigos intercambiables: mismo partido y mismo puesto
+de referencia (el de su última asignación). Así el tamaño de la red depende
+de partidos y puestos y no del número de testigos. Los costos son enteros y
+ordenan los objetivos:
+
+    1. Cubrir el máximo de mesas ponderadas por la prioridad del municipio y
+       del proceso (configuración de prioridades activa).
+    2. Entre testigos sobrantes, preferir los de partidos prioritarios.
+    3. Balance de partidos: cada partido tiene en cada puesto una cuota
+       proporcional a sus testigos disponibles; exceder la cuota se penaliza.
+    4. Cercanía: distancia (coordenadas_lat/lng) entre el puesto de
+       referencia del testigo y el puesto de la mesa.
+
+Un testigo recibe a lo sumo una mesa en todo el plan, aunque incluya varios
+procesos. El plan se aplica por CoordinationService.bulk_assign_witnesses.
+"""
+
+import heapq
+import logging
+import os
+import sqlite3
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.database import SQLiteConnectionPool, get_connection_pool
+
+logger = logging.getLogger(__name__)
+
+# Peso de cada nivel de prioridad (1=Alta, 2=Media, 3=Baja); sin prioridad configurada cuenta como Baja
+PESOS_PRIORIDAD = {1: 3, 2: 2, 3: 1}
+PESO_SIN_PRIORIDAD = 1
+
+# Penalización por cada testigo de un partido por encima de su cuota en un puesto
+# (en las mismas unidades que la distancia: 10 por km)
+ASSIGNMENT_BALANCE_PENALTY = int(os.environ.get('ASSIGNMENT_BALANCE_PENALTY', '200'))
+# Puestos más cercanos con arco propio por clase; más lejos se toma la distancia máxima de la clase
+ASSIGNMENT_NEAREST_PUESTOS = int(os.environ.get('ASSIGNMENT_NEAREST_PUESTOS', '10'))
+
+COSTO_KM = 10
+DISTANCIA_MAXIMA_KM = 200
+# Distancia supuesta cuando el puesto de referencia o el de la mesa no tienen coordenadas
+DISTANCIA_SIN_COORDENADAS_KM = 20
+
+# Escalas de costo: una mesa cubierta pesa más que cualquier combinación de
+# partido, balance y distancia, y la prioridad de partido más que 100 km
+ESCALA_PARTIDO = 100 * COSTO_KM
+ESCALA_COBERTURA = 100 * (ESCALA_PARTIDO * max(PESOS_PRIORIDAD.values())
+                          + DISTANCIA_MAXIMA_KM * COSTO_KM + ASSIGNMENT_BALANCE_PENALTY)
+
+RADIO_TIERRA_KM = 6371.0
+
+# Estados de mesa que cuentan para cobertura (igual que el dashboard de coordinación)
+ESTADOS_MESA = ('activa', 'configurada')
+# Procesos a planificar por omisión
+ESTADOS_PROCESO = ('configuracion', 'activo')
+
+_INF = float('inf')
+
+
+def peso_prioridad(prioridad: Optional[int]) -> int:
+    return PESOS_PRIORIDAD.get(prioridad, PESO_SIN_PRIORIDAD)
+
+
+def distancias_km(lat1, lng1, lat2, lng2) -> np.ndarray:
+    """Matriz de distancias haversine (km) entre dos conjuntos de puntos; NaN si falta alguna coordenada"""
+    lat1 = np.radians(np.asarray(lat1, dtype=float))[:, None]
+    lng1 = np.radians(np.asarray(lng1, dtype=float))[:, None]
+    lat2 = np.radians(np.asarray(lat2, dtype=float))[None, :]
+    lng2 = np.radians(np.asarray(lng2, dtype=float))[None, :]
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * RADIO_TIERRA_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+class RedFlujo:
+    """
+    Flujo de costo mínimo por caminos más cortos sucesivos (Dijkstra con potenciales)
+
+    Los nodos deben numerarse en orden topológico de la red inicial (todo arco
+    va de un nodo menor a uno mayor): así los potenciales iniciales se calculan
+    en una pasada aunque haya costos negativos.
+    """
+
+    def __init__(self, nodos: int):
+        self.nodos = nodos
+        self.salientes: List[List[int]] = [[] for _ in range(nodos)]
+        self.destino: List[int] = []
+        self.capacidad: List[int] = []
+        self.costo: List[int] = []
+
+    def agregar_arco(self, origen: int, destino: int, capacidad: int, costo: int) -> int:
+        """Agregar un arco (y su residual); retorna el índice del arco"""
+        arco = len(self.destino)
+        self.destino += [destino, origen]
+        self.capacidad += [capacidad, 0]
+        self.costo += [costo, -costo]
+        self.salientes[origen].append(arco)
+        self.salientes[destino].append(arco + 1)
+        return arco
+
+    def flujo(self, arco: int) -> int:
+        return self.capacidad[arco ^ 1]
+
+    def _potenciales_iniciales(self, fuente: int) -> List[float]:
+        potencial = [_INF] * self.nodos
+        potencial[fuente] = 0
+        for nodo in range(self.nodos):
+            if potencial[nodo] == _INF:
+                continue
+            for arco in self.salientes[nodo]:
+                if self.capacidad[arco] > 0:
+                    destino = self.destino[arco]
+                    if potencial[nodo] + self.costo[arco] < potencial[destino]:
+                        potencial[destino] = potencial[nodo] + self.costo[arco]
+        return [p if p != _INF else 0 for p in potencial]
+
+    def resolver(self, fuente: int, sumidero: int) -> Tuple[int, int]:
+        """Enviar flujo mientras el camino más corto tenga costo negativo; retorna (flujo, costo)"""
+        salientes, destino, capacidad, costo = self.salientes, self.destino, self.capacidad, self.costo
+        potencial = self._potenciales_iniciales(fuente)
+        flujo_total = costo_total = 0
+
+        while True:
+            distancia = [_INF] * self.nodos
+            distancia[fuente] = 0
+            cola = [(0, fuente)]
+            while cola:
+                d, nodo = heapq.heappop(cola)
+                if d > distancia[nodo]:
+                    continue
+                if nodo == sumidero:
+                    break
+                base = d + potencial[nodo]
+                for arco in salientes[nodo]:
+                    if capacidad[arco] > 0:
+                        siguiente = destino[arco]
+                        nueva = base + costo[arco] - potencial[siguiente]
+                        if nueva < distancia[siguiente]:
+                            distancia[siguiente] = nueva
+                            heapq.heappush(cola, (nueva, siguiente))
+
+            limite = distancia[sumidero]
+            if limite == _INF:
+                break
+            # Búsqueda detenida en el sumidero: acotar por su distancia mantiene
+            # los costos reducidos no negativos
+            for nodo in range(self.nodos):
+                potencial[nodo] += min(distancia[nodo], limite)
+            costo_camino = potencial[sumidero] - potencial[fuente]
+            if costo_camino >= 0:
+                break
+
+            # Todos los caminos más cortos de la fase a la vez: flujo máximo
+            # sobre los arcos de costo reducido cero
+            enviado = self._flujo_admisible(fuente, sumidero, potencial)
+            flujo_total += enviado
+            costo_total += enviado * costo_camino
+
+        return flujo_total, costo_total
+
+    def _flujo_admisible(self, fuente: int, sumidero: int, potencial: List[float]) -> int:
+        """Flujo máximo (Dinic) restringido a los arcos con capacidad y costo reducido cero"""
+        salientes, destino, capacidad, costo = self.salientes, self.destino, self.capacidad, self.costo
+        total = 0
+        while True:
+            nivel = [-1] * self.nodos
+            nivel[fuente] = 0
+            pendientes = [fuente]
+            for nodo in pendientes:
+                for arco in salientes[nodo]:
+                    siguiente = destino[arco]
+                    if (nivel[siguiente] < 0 and capacidad[arco] > 0
+                            and costo[arco] + potencial[nodo] - potencial[siguiente] == 0):
+                        nivel[siguiente] = nivel[nodo] + 1
+                        pendientes.append(siguiente)
+            if nivel[sumidero] < 0:
+                return total
+
+            # Flujo bloqueante con arco actual por nodo
+            actual = [0] * self.nodos
+            camino = []
+            nodo = fuente
+            while True:
+                if nodo == sumidero:
+                    envio = min(capacidad[arco] for arco in camino)
+                    for arco in camino:
+                        capacidad[arco] -= envio
+                        capacidad[arco ^ 1] += envio
+                    total += envio
+                    camino = []
+                    nodo = fuente
+                    continue
+                arcos = salientes[nodo]
+                while actual[nodo] < len(arcos):
+                    arco = arcos[actual[nodo]]
+                    siguiente = destino[arco]
+                    if (capacidad[arco] > 0 and nivel[siguiente] == nivel[nodo] + 1
+                            and costo[arco] + potencial[nodo] - potencial[siguiente] == 0):
+                        break
+                    actual[nodo] += 1
+                else:
+                    # Sin salida: retroceder y descartar el arco que llevó aquí
+                    if not camino:
+                        break
+                    arco = camino.pop()
+                    nodo = destino[arco ^ 1]
+                    actual[nodo] += 1
+                    continue
+                camino.append(arco)
+                nodo = siguiente
+
+
+class WitnessAssignmentService:
+    """Plan de asignación de testigos a mesas sin cobertura"""
+
+    def __init__(self, db_path: str = 'caqueta_electoral.db',
+                 connection_pool: Optional[SQLiteConnectionPool] = None):
+        self.db_path = db_path
+        self.connection_pool = connection_pool or get_connection_pool(db_path)
+        self.logger = logger
+
+    def get_connection(self) -> sqlite3.Connection:
+        """Obtener conexión del pool compartido"""
+        return self.connection_pool.connect(row_factory=sqlite3.Row)
+
+    # ==================== LECTURA ====================
+
+    def _prioridades(self, conn: sqlite3.Connection) -> Dict[str, Dict[int, int]]:
+        """Prioridades de municipios, procesos y partidos de la configuración activa"""
+        config = conn.execute("""
+            SELECT id FROM configuracion_prioridades
+            WHERE activa = 1
+            ORDER BY created_at DESC
+            LIMIT 1
+        """).fetchone()
+        prioridades = {'municipios': {}, 'procesos': {}, 'partidos': {}}
+        if not config:
+            return prioridades
+        for clave, tabla, columna in (('municipios', 'prioridades_municipios', 'municipio_id'),
+                                      ('procesos', 'prioridades_procesos', 'proceso_id'),
+                                      ('partidos', 'prioridades_partidos', 'partido_id')):
+            prioridades[clave] = {row[0]: row[1] for row in conn.execute(f"""
+                SELECT {columna}, prioridad FROM {tabla}
+                WHERE configuracion_id = ? AND activo = 1
+            """, (config['id'],))}
+        return prioridades
+
+    def _procesos(self, conn: sqlite3.Connection, proceso_ids: Optional[Sequence[int]]) -> Dict[int, Optional[int]]:
+        """Procesos a planificar -> municipio al que se limitan (None = todos)"""
+        if proceso_ids:
+            marcas = ', '.join('?' * len(proceso_ids))
+            filas = conn.execute(f"""
+                SELECT id, municipio_id FROM procesos_electorales WHERE id IN ({marcas})
+            """, [int(p) for p in proceso_ids])
+        else:
+            marcas = ', '.join('?' * len(ESTADOS_PROCESO))
+            filas = conn.execute(f"""
+                SELECT id, municipio_id FROM procesos_electorales
+                WHERE activo = 1 AND estado IN ({marcas})
+            """, ESTADOS_PROCESO)
+        return {row[0]: row[1] for row in filas}
+
+    def _testigos(self, conn: sqlite3.Connection, coordinator_id: Optional[int],
+                  municipio_id: Optional[int], procesos: Sequence[int]) -> List[Dict[str, Any]]:
+        """
+        Testigos disponibles sin asignación vigente en los procesos, con su
+        puesto de referencia y las (mesa, proceso) que ya tienen registradas
+        en cualquier estado (la asignación masiva las rechazaría)
+        """
+        marcas = ', '.join('?' * len(procesos))
+        testigos = [dict(row) for row in conn.execute(f"""
+            SELECT te.id, te.coordinador_id, te.municipio_id, COALESCE(te.partido_id, 0) as partido_id
+            FROM testigos_electorales te
+            WHERE te.estado = 'disponible'
+              AND (? IS NULL OR te.coordinador_id = ?)
+              AND (? IS NULL OR te.municipio_id = ?)
+              AND NOT EXISTS (
+                  SELECT 1 FROM asignaciones_testigos at
+                  WHERE at.testigo_id = te.id AND at.estado = 'asignado'
+                    AND at.proceso_electoral_id IN ({marcas})
+              )
+            ORDER BY te.id
+        """, (coordinator_id, coordinator_id, municipio_id, municipio_id, *procesos))]
+
+        # Puesto de la asignación más reciente de cada testigo (cualquier proceso)
+        referencias = {}
+        previas = defaultdict(set)
+        for row in conn.execute("""
+            SELECT at.testigo_id, COALESCE(mv.puesto_votacion_id, mv.puesto_id), at.mesa_id, at.proceso_electoral_id
+            FROM asignaciones_testigos at
+            JOIN testigos_electorales te ON at.testigo_id = te.id
+            JOIN mesas_votacion mv ON at.mesa_id = mv.id
+            WHERE te.estado = 'disponible'
+              AND (? IS NULL OR te.coordinador_id = ?)
+              AND (? IS NULL OR te.municipio_id = ?)
+            ORDER BY at.created_at, at.id
+        """, (coordinator_id, coordinator_id, municipio_id, municipio_id)):
+            referencias[row[0]] = row[1]
+            if row[3] in procesos:
+                previas[row[0]].add((row[2], row[3]))
+        for testigo in testigos:
+            testigo['puesto_referencia'] = referencias.get(testigo['id'])
+            testigo['previas'] = previas.get(testigo['id'], set())
+        return testigos
+
+    def _mesas(self, conn: sqlite3.Connection, municipios: Sequence[int]) -> List[Dict[str, Any]]:
+        """Mesas de los municipios con su puesto y coordenadas (las del puesto o, si no, las de la mesa)"""
+        marcas_municipios = ', '.join('?' * len(municipios))
+        marcas_estados = ', '.join('?' * len(ESTADOS_MESA))
+        return [dict(row) for row in conn.execute(f"""
+            SELECT mv.id, mv.municipio_id, COALESCE(mv.puesto_votacion_id, mv.puesto_id) as puesto_id,
+                   COALESCE(mv.votantes_habilitados, 0) as votantes,
+                   COALESCE(pv.coordenadas_lat, mv.coordenadas_lat) as lat,
+                   COALESCE(pv.coordenadas_lng, mv.coordenadas_lng) as lng
+            FROM mesas_votacion mv
+            LEFT JOIN puestos_votacion pv ON pv.id = COALESCE(mv.puesto_votacion_id, mv.puesto_id)
+            WHERE mv.municipio_id IN ({marcas_municipios}) AND mv.estado IN ({marcas_estados})
+            ORDER BY mv.id
+        """, (*municipios, *ESTADOS_MESA))]
+
+    def _cubiertas(self, conn: sqlite3.Connection, procesos: Sequence[int]) -> set:
+        """(mesa, proceso) con asignación vigente"""
+        marcas = ', '.join('?' * len(procesos))
+        return {(row[0], row[1]) for row in conn.execute(f"""
+            SELECT DISTINCT mesa_id, proceso_electoral_id FROM asignaciones_testigos
+            WHERE estado = 'asignado' AND proceso_electoral_id IN ({marcas})
+        """, tuple(procesos))}
+
+    # ==================== PLAN ====================
+
+    def plan_assignments(self, coordinator_id: Optional[int] = None, municipio_id: Optional[int] = None,
+                         proceso_ids: Optional[Sequence[int]] = None) -> Dict[str, Any]:
+        """
+        Calcular un plan de asignación (sin modificar la base de datos)
+
+        Args:
+            coordinator_id: Limitar a los testigos de un coordinador
+            municipio_id: Limitar a un municipio
+            proceso_ids: Procesos a cubrir (por omisión los activos o en configuración)
+
+        Returns:
+            Dict con las asignaciones propuestas ({testigo_id, mesa_id,
+            proceso_electoral_id, coordinador_id, municipio_id, puesto_id,
+            partido_id, prioridad, distancia_km}), un resumen de cobertura y
+            balance y los tiempos por etapa en segundos
+        """
+        tiempos = {}
+        inicio = etapa = time.perf_counter()
+
+        def marcar(nombre):
+            nonlocal etapa
+            ahora = time.perf_counter()
+            tiempos[nombre] = round(ahora - etapa, 4)
+            etapa = ahora
+
+        conn = self.get_connection()
+        try:
+            prioridades = self._prioridades(conn)
+            procesos = self._procesos(conn, proceso_ids)
+            testigos = self._testigos(conn, coordinator_id, municipio_id, list(procesos)) if procesos else []
+            municipios = sorted({t['municipio_id'] for t in testigos})
+            mesas = self._mesas(conn, municipios) if municipios else []
+            cubiertas = self._cubiertas(conn, list(procesos)) if procesos else set()
+        finally:
+            conn.close()
+        marcar('lectura')
+
+        testigos_por_municipio = defaultdict(list)
+        for testigo in testigos:
+            testigos_por_municipio[testigo['municipio_id']].append(testigo)
+        mesas_por_municipio = defaultdict(list)
+        for mesa in mesas:
+            mesas_por_municipio[mesa['municipio_id']].append(mesa)
+
+        asignaciones = []
+        por_municipio = []
+        pendientes_total = peso_total = peso_cubierto = excesos = 0
+        for municipio in municipios:
+            resultado = self._resolver_municipio(
+                municipio, testigos_por_municipio[municipio], mesas_por_municipio[municipio],
+                procesos, cubiertas, prioridades)
+            asignaciones.extend(resultado['asignaciones'])
+            pendientes_total += resultado['pendientes']
+            peso_total += resultado['peso_total']
+            peso_cubierto += resultado['peso_cubierto']
+            excesos += resultado['excesos_balance']
+            por_municipio.append({
+                'municipio_id': municipio,
+                'testigos_disponibles': len(testigos_por_municipio[municipio]),
+                'mesas_pendientes': resultado['pendientes'],
+                'asignaciones': len(resultado['asignaciones'])
+            })
+        marcar('optimizacion')
+        tiempos['total'] = round(time.perf_counter() - inicio, 4)
+
+        distancias = [a['distancia_km'] for a in asignaciones if a['distancia_km'] is not None]
+        resumen = {
+            'procesos': sorted(procesos),
+            'testigos_disponibles': len(testigos),
+            'mesas_pendientes': pendientes_total,
+            'asignaciones': len(asignaciones),
+            'cobertura': round(len(asignaciones) / pendientes_total * 100, 2) if pendientes_total else 0,
+            'cobertura_ponderada': round(peso_cubierto / peso_total * 100, 2) if peso_total else 0,
+            'excesos_balance': excesos,
+            'distancia_promedio_km': round(sum(distancias) / len(distancias), 2) if distancias else None,
+            'por_municipio': por_municipio
+        }
+        self.logger.info(f"Plan de asignación: {len(asignaciones)} asignaciones para "
+                         f"{pendientes_total} mesas pendientes ({tiempos['total']} s)")
+        return {'asignaciones': asignaciones, 'resumen': resumen, 'tiempos': tiempos}
+
+    def _resolver_municipio(self, municipio_id: int, testigos: List[Dict], mesas: List[Dict],
+                            procesos: Dict[int, Optional[int]], cubiertas: set,
+                            prioridades: Dict[str, Dict[int, int]]) -> Dict[str, Any]:
+        """Flujo de costo mínimo de un municipio"""
+        peso_municipio = peso_prioridad(prioridades['municipios'].get(municipio_id))
+
+        # Mesas pendientes por (proceso, puesto), las de más votantes primero
+        pendientes = defaultdict(list)
+        coordenadas = {}
+        for mesa in mesas:
+            puesto = mesa['puesto_id']
+            if puesto not in coordenadas or coordenadas[puesto][0] is None:
+                coordenadas[puesto] = (mesa['lat'], mesa['lng'])
+            for proceso, municipio_proceso in procesos.items():
+                if municipio_proceso not in (None, municipio_id) or (mesa['id'], proceso) in cubiertas:
+                    continue
+                pendientes[(proceso, puesto)].append(mesa)
+        for lista in pendientes.values():
+            lista.sort(key=lambda m: (-m['votantes'], m['id']))
+
+        valores = {p: peso_municipio * peso_prioridad(prioridades['procesos'].get(p)) for p in procesos}
+        peso_total = sum(valores[p] * len(lista) for (p, _), lista in pendientes.items())
+        total_pendientes = sum(len(lista) for lista in pendientes.values())
+        if not testigos or not pendientes:
+            return {'asignaciones': [], 'pendientes': total_pendientes, 'peso_total': peso_total,
+                    'peso_cubierto': 0, 'excesos_balance': 0}
+
+        puestos = sorted({puesto for _, puesto in pendientes})
+        indice_puesto = {puesto: i for i, puesto in enumerate(puestos)}
+        demanda = [0] * len(puestos)
+        for (_, puesto), lista in pendientes.items():
+            demanda[indice_puesto[puesto]] += len(lista)
+
+        # Clases de testigos intercambiables: (partido, puesto de referencia)
+        clases = defaultdict(list)
+        for testigo in testigos:
+            clases[(testigo['partido_id'], testigo['puesto_referencia'])].append(testigo)
+        claves = sorted(clases, key=lambda c: (c[0], -1 if c[1] is None else c[1]))
+        partidos = sorted({partido for partido, _ in claves})
+        indice_partido = {partido: i for i, partido in enumerate(partidos)}
+
+        costos = self._costos_distancia(claves, puestos, coordenadas)
+
+        # Nodos en orden topológico: fuente, clases, concentradores por partido,
+        # (partido, puesto), puestos, sumidero
+        n_clases, n_partidos, n_puestos = len(claves), len(partidos), len(puestos)
+        base_clase = 1
+        base_partido = base_clase + n_clases
+        base_grupo = base_partido + n_partidos
+        base_puesto = base_grupo + n_partidos * n_puestos
+        sumidero = base_puesto + n_puestos
+        red = RedFlujo(sumidero + 1)
+
+        def grupo(partido_idx, puesto_idx):
+            return base_grupo + partido_idx * n_puestos + puesto_idx
+
+        arcos_directos = []    # (clase, puesto, arco)
+        arcos_concentrador = []  # (clase, arco)
+        for c, (partido, _) in enumerate(claves):
+            peso_partido = peso_prioridad(prioridades['partidos'].get(partido)) if partido else PESO_SIN_PRIORIDAD
+            red.agregar_arco(0, base_clase + c, len(clases[claves[c]]), -ESCALA_PARTIDO * peso_partido)
+            fila = costos[c]
+            lejano = int(fila.max())
+            p = indice_partido[partido]
+            if fila.min() < lejano:
+                cercanos = np.argsort(fila, kind='stable')[:ASSIGNMENT_NEAREST_PUESTOS]
+                for s in cercanos.tolist():
+                    if fila[s] < lejano:
+                        arcos_directos.append((c, s, red.agregar_arco(base_clase + c, grupo(p, s),
+                                                                      len(clases[claves[c]]), int(fila[s]))))
+            # Cualquier otro puesto a la distancia máxima de la clase
+            arcos_concentrador.append((c, red.agregar_arco(base_clase + c, base_partido + p,
+                                                           len(clases[claves[c]]), lejano)))
+
+        arcos_reparto = {}
+        for p in range(n_partidos):
+            for s in range(n_puestos):
+                arcos_reparto[(p, s)] = red.agregar_arco(base_partido + p, grupo(p, s), demanda[s], 0)
+
+        # Balance: cuota proporcional a los testigos del partido (sobre lo que se
+        # puede cubrir); por encima de la cuota cada testigo se penaliza
+        disponibles = defaultdict(int)
+        for (partido, _), lista in clases.items():
+            disponibles[partido] += len(lista)
+        cubrible = max(len(testigos), total_pendientes)
+        arcos_exceso = []
+        for partido, p in indice_partido.items():
+            for s in range(n_puestos):
+                cuota = min(demanda[s], -(-demanda[s] * disponibles[partido] // cubrible))
+                red.agregar_arco(grupo(p, s), base_puesto + s, cuota, 0)
+                if demanda[s] > cuota:
+                    arcos_exceso.append(red.agregar_arco(grupo(p, s), base_puesto + s,
+                                                         demanda[s] - cuota, ASSIGNMENT_BALANCE_PENALTY))
+
+        arcos_mesas = []
+        for (proceso, puesto), lista in sorted(pendientes.items()):
+            arco = red.agregar_arco(base_puesto + indice_puesto[puesto], sumidero, len(lista),
+                                    -ESCALA_COBERTURA * valores[proceso])
+            arcos_mesas.append((proceso, puesto, arco))
+
+        red.resolver(0, sumidero)
+
+        # Testigos por puesto: arcos directos y, por el concentrador de cada
+        # partido, el reparto de sus arcos hacia los puestos
+        reservas = {c: clases[clave][::-1] for c, clave in enumerate(claves)}
+        por_puesto = defaultdict(list)
+        for c, s, arco in arcos_directos:
+            for _ in range(red.flujo(arco)):
+                por_puesto[s].append(reservas[c].pop())
+        via_concentrador = defaultdict(list)
+        for c, arco in arcos_concentrador:
+            for _ in range(red.flujo(arco)):
+                via_concentrador[indice_partido[claves[c][0]]].append(reservas[c].pop())
+        for (p, s), arco in arcos_reparto.items():
+            for _ in range(red.flujo(arco)):
+                por_puesto[s].append(via_concentrador[p].pop())
+
+        referencias = {t['puesto_referencia'] for t in testigos if t['puesto_referencia'] is not None}
+        km = self._km_referencias(referencias, puestos, coordenadas)
+
+        asignaciones = []
+
+        def registrar(testigo, mesa, proceso, puesto):
+            referencia = testigo['puesto_referencia']
+            asignaciones.append({
+                'testigo_id': testigo['id'],
+                'mesa_id': mesa['id'],
+                'proceso_electoral_id': proceso,
+                'coordinador_id': testigo['coordinador_id'],
+                'municipio_id': municipio_id,
+                'puesto_id': puesto,
+                'partido_id': testigo['partido_id'] or None,
+                'prioridad': valores[proceso],
+                'distancia_km': km.get((referencia, puesto)) if referencia is not None else None
+            })
+
+        def elegir(candidatos, mesa, proceso):
+            # Se evita repetir una asignación ya registrada del testigo
+            return next((i for i in range(len(candidatos) - 1, -1, -1)
+                         if (mesa['id'], proceso) not in candidatos[i]['previas']), None)
+
+        sin_cubrir = []
+        for proceso, puesto, arco in arcos_mesas:
+            cupo = red.flujo(arco)
+            disponibles = por_puesto[indice_puesto[puesto]]
+            for mesa in pendientes[(proceso, puesto)]:
+                i = elegir(disponibles, mesa, proceso) if cupo else None
+                if i is None:
+                    sin_cubrir.append((proceso, puesto, mesa))
+                    continue
+                cupo -= 1
+                registrar(disponibles.pop(i), mesa, proceso, puesto)
+
+        # Testigos que el flujo envió a un puesto donde solo quedaban mesas que ya
+        # tuvieron registradas: las mesas restantes de mayor prioridad
+        sobrantes = [testigo for lista in por_puesto.values() for testigo in lista]
+        sin_cubrir.sort(key=lambda m: (-valores[m[0]], -m[2]['votantes'], m[2]['id']))
+        for proceso, puesto, mesa in sin_cubrir:
+            if not sobrantes:
+                break
+            i = elegir(sobrantes, mesa, proceso)
+            if i is not None:
+                registrar(sobrantes.pop(i), mesa, proceso, puesto)
+
+        peso_cubierto = sum(a['prioridad'] for a in asignaciones)
+
+        return {
+            'asignaciones': asignaciones,
+            'pendientes': total_pendientes,
+            'peso_total': peso_total,
+            'peso_cubierto': peso_cubierto,
+            'excesos_balance': sum(red.flujo(arco) for arco in arcos_exceso)
+        }
+
+    @staticmethod
+    def _costos_distancia(claves: List[Tuple[int, Optional[int]]], puestos: List[int],
+                          coordenadas: Dict[int, Tuple]) -> np.ndarray:
+        """Costo de distancia clase x puesto (0 sin puesto de referencia o en el mismo puesto)"""
+        costos = np.zeros((len(claves), len(puestos)), dtype=np.int64)
+        con_referencia = [c for c, (_, referencia) in enumerate(claves) if referencia is not None]
+        if not con_referencia:
+            return costos
+
+        def coords(puesto):
+            lat, lng = coordenadas.get(puesto, (None, None))
+            return (np.nan if lat is None else lat), (np.nan if lng is None else lng)
+
+        origen = np.array([coords(claves[c][1]) for c in con_referencia], dtype=float).reshape(-1, 2)
+        destino = np.array([coords(p) for p in puestos], dtype=float).reshape(-1, 2)
+        km = distancias_km(origen[:, 0], origen[:, 1], destino[:, 0], destino[:, 1])
+        km = np.where(np.isnan(km), DISTANCIA_SIN_COORDENADAS_KM, np.minimum(km, DISTANCIA_MAXIMA_KM))
+        filas = np.rint(km * COSTO_KM).astype(np.int64)
+
+        puestos_arr = np.array(puestos)
+        referencias = np.array([claves[c][1] for c in con_referencia])
+        filas[referencias[:, None] == puestos_arr[None, :]] = 0
+        costos[con_referencia] = filas
+        return costos
+
+    @staticmethod
+    def _km_referencias(referencias: set, puestos: List[int],
+                        coordenadas: Dict[int, Tuple]) -> Dict[Tuple[int, int], float]:
+        """Distancia en km (solo con coordenadas conocidas) de cada puesto de referencia a cada puesto"""
+        origen = [r for r in referencias if coordenadas.get(r, (None, None))[0] is not None]
+        destino = [p for p in puestos if coordenadas.get(p, (None, None))[0] is not None]
+        distancias = {(r, r): 0.0 for r in referencias}
+        if origen and destino:
+            km = distancias_km([coordenadas[r][0] for r in origen], [coordenadas[r][1] for r in origen],
+                               [coordenadas[p][0] for p in destino], [coordenadas[p][1] for p in destino])
+            for i, r in enumerate(origen):
+                for j, p in enumerate(destino):
+                    distancias[(r, p)] = round(float(km[i, j]), 2)
+        return distancias
+
+    # ==================== APLICACIÓN ====================
+
+    def apply_plan(self, asignaciones: List[Dict[str, Any]], all_or_nothing: bool = False) -> Dict[str, Any]:
+        """
+        Registrar un plan con la asignación masiva de cada coordinador
+        (all_or_nothing se aplica al lote de cada coordinador)
+
+        Returns:
+            {'applied': bool, 'results': [...], 'errors': [...]} como
+            CoordinationService.bulk_assign_witnesses, acumulado por coordinador
+        """
+        from services.coordination_service import CoordinationService
+
+        coordinacion = CoordinationService(self.db_path, connection_pool=self.connection_pool)
+        por_coordinador = defaultdict(list)
+        for asignacion in asignaciones:
+            por_coordinador[asignacion['coordinador_id']].append({
+                'testigo_id': asignacion['testigo_id'],
+                'mesa_id': asignacion['mesa_id'],
+                'proceso_electoral_id': asignacion['proceso_electoral_id'],
+                'observaciones': 'Asignación automática'
+            })
+
+        resultado = {'applied': False, 'results': [], 'errors': []}
+        for coordinator_id, lote in sorted(por_coordinador.items()):
+            parcial = coordinacion.bulk_assign_witnesses(lote, coordinator_id, all_or_nothing=all_or_nothing)
+            resultado['applied'] = resultado['applied'] or parcial['applied']
+            resultado['results'].extend(parcial['results'])
+            resultado['errors'].extend(parcial['errors'])
+        return resultado
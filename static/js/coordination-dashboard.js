@@ -15,8 +15,16 @@ document.addEventListener('DOMContentLoaded', function() {
     loadPoliticalParties();
     setupEventListeners();
     
-    // Actualizar datos cada 5 minutos
-    setInterval(refreshDashboard, 300000);
+    if (window.DashboardStream) {
+        // Actualizar solo cuando cambian asignaciones o capturas E-14 del municipio del coordinador
+        DashboardStream.subscribe(['asignaciones', 'e14'], refreshDashboard, {
+            intervaloMinimo: 10000,
+            claves: () => ({ municipio: (dashboardData.coordinator_info || {}).municipio_id })
+        });
+    } else {
+        // Actualizar datos cada 5 minutos
+        setInterval(refreshDashboard, 300000);
+    }
 });
 
 /**
@@ -121,8 +121,11 @@ async function loadCoordinationData() {
 
 // Actualizar estadísticas en el dashboard
 async function updateDashboardStats() {
-    const coordData = await loadCoordinationData();
-    
+    renderDashboardStats(await loadCoordinationData());
+}
+
+// Pintar estadísticas (desde la API o desde la instantánea en tiempo real)
+function renderDashboardStats(coordData) {
     // Actualizar números en el hero section
     const statsElements = document.querySelectorAll('.stat-number');
     if (statsElements.length >= 4) {
@@ -222,11 +225,26 @@ async function initDashboard() {
     // Actualizar estado del sistema
     await updateSystemStatus();
     
-    // Actualizar cada 30 segundos
-    setInterval(async () => {
-        await updateDashboardStats();
-        await updateSystemStatus();
-    }, 30000);
+    if (window.DashboardStream) {
+        // Pintar desde la instantánea compartida del servidor, sin volver a consultar la API
+        DashboardStream.subscribe(['asignaciones'], snapshot => {
+            const asignaciones = snapshot.asignaciones || {};
+            renderDashboardStats({
+                municipios: asignaciones.municipios,
+                puestos: asignaciones.puestos,
+                mesas: asignaciones.mesas,
+                cobertura: asignaciones.cobertura
+            });
+        });
+        // El estado del sistema no depende de las escrituras electorales
+        setInterval(updateSystemStatus, 300000);
+    } else {
+        // Actualizar cada 30 segundos
+        setInterval(async () => {
+            await updateDashboardStats();
+            await updateSystemStatus();
+        }, 30000);
+    }
     
     console.log('Dashboard inicializado correctamente');
 }
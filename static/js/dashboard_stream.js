@@ -0,0 +1,160 @@
+/**
+ * Canal en tiempo real de los dashboards
+ * Una sola conexión SSE por página a /api/dashboard/stream; el servidor
+ * publica una instantánea compartida cuando cambian las capturas E-14, las
+ * consolidaciones o las asignaciones. Sin EventSource (o si el servidor
+ * rechaza la conexión) se vuelve al polling de /api/dashboard/snapshot.
+ * Cada instantánea trae el detalle de mesas y municipios que cambiaron; un
+ * suscriptor con claves ({ mesa } o { municipio }) solo se entera de los suyos.
+ */
+
+const DashboardStream = (function() {
+    const STREAM_URL = '/api/dashboard/stream';
+    const SNAPSHOT_URL = '/api/dashboard/snapshot';
+
+    const suscriptores = [];
+    let fuente = null;
+    let ultimaInstantanea = null;
+    let pollingActivo = false;
+    // Falso si se perdió alguna instantánea intermedia (reconexión, polling): el detalle no alcanza
+    let detalleContinuo = false;
+
+    // Canales que cambiaron para un suscriptor desde la última instantánea que recibió
+    function canalesCambiados(suscriptor, snapshot) {
+        const versiones = snapshot.versiones || {};
+        return suscriptor.canales.filter(canal => suscriptor.versiones[canal] !== versiones[canal]);
+    }
+
+    // Si alguno de los canales cambiados toca la mesa/municipio del suscriptor
+    function esRelevante(suscriptor, snapshot, cambiados) {
+        const claves = typeof suscriptor.claves === 'function' ? suscriptor.claves() : suscriptor.claves;
+        if (!claves) {
+            return true;
+        }
+        const detalle = snapshot.detalle || {};
+        return cambiados.some(canal => {
+            const porTipo = detalle[canal];
+            if (!detalleContinuo || !porTipo) {
+                return true;
+            }
+            return Object.keys(claves).some(tipo => {
+                const clave = Number(claves[tipo]);
+                // Sin clave conocida (p. ej. testigo sin mesa) no hay nada propio que actualizar
+                return Boolean(clave) && (!Array.isArray(porTipo[tipo]) || porTipo[tipo].includes(clave));
+            });
+        });
+    }
+
+    function entregar(suscriptor, snapshot) {
+        if (!snapshot) {
+            return;
+        }
+        const cambiados = canalesCambiados(suscriptor, snapshot);
+        if (cambiados.length === 0) {
+            return;
+        }
+        suscriptor.versiones = Object.assign({}, snapshot.versiones);
+        if (!esRelevante(suscriptor, snapshot, cambiados)) {
+            return;
+        }
+
+        // Agrupar ráfagas de cambios: como máximo una llamada cada intervaloMinimo
+        const ahora = Date.now();
+        const espera = suscriptor.ultimaEntrega + suscriptor.intervaloMinimo - ahora;
+        if (espera > 0) {
+            if (!suscriptor.pendiente) {
+                suscriptor.pendiente = setTimeout(() => {
+                    suscriptor.pendiente = null;
+                    suscriptor.ultimaEntrega = Date.now();
+                    suscriptor.callback(ultimaInstantanea);
+                }, espera);
+            }
+            return;
+        }
+        suscriptor.ultimaEntrega = ahora;
+        suscriptor.callback(snapshot);
+    }
+
+    function publicar(snapshot) {
+        detalleContinuo = !pollingActivo && ultimaInstantanea !== null &&
+            snapshot.secuencia === ultimaInstantanea.secuencia + 1;
+        ultimaInstantanea = snapshot;
+        suscriptores.forEach(suscriptor => entregar(suscriptor, snapshot));
+    }
+
+    async function consultarSnapshot() {
+        try {
+            const response = await fetch(SNAPSHOT_URL);
+            const result = await response.json();
+            if (result.success) {
+                publicar(result.data);
+            }
+        } catch (error) {
+            console.error('Error consultando instantánea del dashboard:', error);
+        }
+    }
+
+    function iniciarPolling() {
+        if (pollingActivo) {
+            return;
+        }
+        pollingActivo = true;
+        const intervalo = Math.min(...suscriptores.map(s => s.respaldo));
+        consultarSnapshot();
+        setInterval(consultarSnapshot, intervalo);
+    }
+
+    function conectar() {
+        if (fuente || pollingActivo) {
+            return;
+        }
+        if (!window.EventSource) {
+            iniciarPolling();
+            return;
+        }
+
+        fuente = new EventSource(STREAM_URL);
+        fuente.addEventListener('snapshot', event => {
+            publicar(JSON.parse(event.data));
+        });
+        fuente.onerror = () => {
+            // CLOSED: el servidor rechazó la conexión (p. ej. 503); el navegador no reintenta
+            if (fuente.readyState === EventSource.CLOSED) {
+                fuente = null;
+                iniciarPolling();
+            }
+        };
+    }
+
+    /**
+     * Suscribirse a cambios de uno o más canales ('e14', 'consolidacion', 'asignaciones').
+     * callback recibe la instantánea compartida. opciones.claves ({ mesa: id } o
+     * { municipio: id }, o una función que los retorne) limita las llamadas a los
+     * cambios de esa mesa o municipio.
+     */
+    function subscribe(canales, callback, opciones = {}) {
+        const suscriptor = {
+            canales: canales,
+            callback: callback,
+            versiones: {},
+            intervaloMinimo: opciones.intervaloMinimo || 2000,
+            respaldo: opciones.respaldo || 30000,
+            claves: opciones.claves || null,
+            ultimaEntrega: 0,
+            pendiente: null
+        };
+        suscriptores.push(suscriptor);
+        if (ultimaInstantanea) {
+            entregar(suscriptor, ultimaInstantanea);
+        }
+        conectar();
+        return suscriptor;
+    }
+
+    return {
+        subscribe: subscribe,
+        getSnapshot: () => ultimaInstantanea
+    };
+})();
+
+window.DashboardStream = DashboardStream;
@@ -146,12 +146,19 @@ function setupDashboardCharts() {
  * Configurar actualizaciones en tiempo real
  */
 function setupRealTimeUpdates() {
-    // Actualizar métricas cada 30 segundos
-    const metricsInterval = setInterval(() => {
-        updateDashboardMetrics();
-    }, SuperAdmin.config.refreshInterval);
-    
-    SuperAdmin.state.intervals.push(metricsInterval);
+    if (window.DashboardStream) {
+        // Métricas electorales pintadas desde la instantánea que publica el servidor (sin consultar la API)
+        DashboardStream.subscribe(['e14', 'consolidacion', 'asignaciones'], snapshot => {
+            updateMetricCards(metricasDesdeInstantanea(snapshot));
+        }, { intervaloMinimo: 2000 });
+    } else {
+        // Actualizar métricas cada 30 segundos
+        const metricsInterval = setInterval(() => {
+            updateDashboardMetrics();
+        }, SuperAdmin.config.refreshInterval);
+        
+        SuperAdmin.state.intervals.push(metricsInterval);
+    }
     
     // Actualizar gráficos cada minuto
     const chartsInterval = setInterval(() => {
@@ -184,6 +191,23 @@ function updateDashboardMetrics() {
         });
 }
 
+/**
+ * Métricas de las cards a partir de la instantánea del canal en tiempo real
+ */
+function metricasDesdeInstantanea(snapshot) {
+    const e14 = snapshot.e14 || {};
+    const consolidacion = snapshot.consolidacion || {};
+    const asignaciones = snapshot.asignaciones || {};
+    return {
+        capturas_e14: e14.capturas || 0,
+        mesas_procesadas: e14.mesas_procesadas || 0,
+        consolidaciones: consolidacion.consolidaciones || 0,
+        discrepancias_abiertas: consolidacion.discrepancias_abiertas || 0,
+        mesas_cubiertas: asignaciones.mesas_cubiertas || 0,
+        testigos_asignados: asignaciones.testigos_asignados || 0
+    };
+}
+
 /**
  * Actualizar cards de métricas
  */
@@ -19,9 +19,6 @@ function initializeTestigoDashboard() {
     
     // Configurar animaciones de entrada
     animateElements();
-    
-    // Configurar actualizaciones automáticas
-    setInterval(updateObservations, 30000); // Actualizar cada 30 segundos
 }
 
 // Inicializar formulario de observaciones
@@ -352,8 +349,22 @@ function animateElements() {
     });
 }
 
+// Mesa que reporta el testigo (la seleccionada en el formulario o la asignada)
+function obtenerMesaTestigo() {
+    const selectMesa = document.getElementById('mesaForm');
+    return (selectMesa && selectMesa.value) || document.body.dataset.mesaId || null;
+}
+
 // Configurar actualizaciones en tiempo real
 function initializeRealTimeUpdates() {
+    if (window.DashboardStream) {
+        // Actualizar solo cuando cambian las capturas E-14 de la mesa del testigo
+        DashboardStream.subscribe(['e14'], updateObservations, {
+            intervaloMinimo: 30000,
+            claves: () => ({ mesa: obtenerMesaTestigo() })
+        });
+        return;
+    }
     // Actualizar cada 30 segundos
     setInterval(() => {
         updateObservations();
@@ -0,0 +1,21 @@
+"""
+Fixtures compartidas: cada prueba trabaja sobre una copia de caqueta_electoral.db
+"""
+
+import os
+import shutil
+import sys
+
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Copia de la base de datos del repositorio en un directorio temporal"""
+    destino = tmp_path / 'caqueta_electoral.db'
+    shutil.copy(os.path.join(BASE_DIR, 'caqueta_electoral.db'), destino)
+    return str(destino)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Pruebas del sink de auditoría (core/audit.py)
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from core.audit import AuditLogSink
+from core.database import SQLiteConnectionPool
+
+ESQUEMA = "CREATE TABLE IF NOT EXISTS auditoria_prueba (id INTEGER PRIMARY KEY, accion TEXT NOT NULL)"
+INSERT = "INSERT INTO auditoria_prueba (accion) VALUES (?)"
+
+
+def _acciones(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return [row[0] for row in conn.execute("SELECT accion FROM auditoria_prueba ORDER BY id")]
+    finally:
+        conn.close()
+
+
+def test_hilo_escritor_sobrevive_a_errores_de_conexion(tmp_path):
+    """Si la base no abre, el lote vuelve al buffer y se escribe cuando la base responde"""
+    directorio = tmp_path / 'aun_no_existe'
+    db_path = str(directorio / 'auditoria.db')
+    sink = AuditLogSink(db_path, connection_pool=SQLiteConnectionPool(db_path), flush_interval_ms=10)
+    sink.register_schema(ESQUEMA)
+    try:
+        sink.submit(INSERT, ('login',))
+        assert not sink.flush(timeout=0.3)
+        assert sink._thread.is_alive()
+        assert sink.get_stats()['pendientes'] == 1
+
+        directorio.mkdir()
+        sink.submit(INSERT, ('logout',))
+        assert sink.flush(timeout=10)
+        assert _acciones(db_path) == ['login', 'logout']
+        assert sink.get_stats()['fallidos'] == 0
+    finally:
+        sink.shutdown()
+
+
+def test_submit_reinicia_un_hilo_escritor_terminado(tmp_path):
+    """Un hilo escritor muerto se reemplaza en el siguiente submit en vez de perder los registros"""
+    db_path = str(tmp_path / 'auditoria.db')
+    sink = AuditLogSink(db_path, connection_pool=SQLiteConnectionPool(db_path), flush_interval_ms=10)
+    sink.register_schema(ESQUEMA)
+    try:
+        sink.submit(INSERT, ('primero',))
+        assert sink.flush(timeout=10)
+
+        # Simular un hilo que terminó inesperadamente
+        muerto = threading.Thread(target=lambda: None)
+        muerto.start()
+        muerto.join()
+        sink._thread = muerto
+
+        sink.submit(INSERT, ('segundo',))
+        assert sink._thread is not muerto and sink._thread.is_alive()
+        assert sink.flush(timeout=10)
+        assert _acciones(db_path) == ['primero', 'segundo']
+    finally:
+        sink.shutdown()
+
+
+def test_shutdown_antes_de_borrar_la_base_no_deja_pendientes(tmp_path):
+    """Tras shutdown no queda nada que el hook atexit intente escribir"""
+    db_path = str(tmp_path / 'auditoria.db')
+    sink = AuditLogSink(db_path, connection_pool=SQLiteConnectionPool(db_path), flush_interval_ms=1000)
+    sink.register_schema(ESQUEMA)
+    for i in range(50):
+        sink.submit(INSERT, (f'accion-{i}',))
+    inicio = time.monotonic()
+    sink.shutdown()
+    assert time.monotonic() - inicio < 5
+    assert sink.get_stats()['pendientes'] == 0
+    assert len(_acciones(db_path)) == 50
+    os.remove(db_path)
+    # Un segundo shutdown (atexit) no hace nada
+    sink.shutdown()
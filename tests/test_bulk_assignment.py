@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la asignación masiva de testigos (CoordinationService.bulk_assign_witnesses)
+"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from core.database import SQLiteConnectionPool
+from services.coordination_service import CoordinationService
+
+COORDINADOR = 1
+PROCESO = 1
+
+
+@pytest.fixture
+def servicio(db_path):
+    return CoordinationService(db_path, connection_pool=SQLiteConnectionPool(db_path))
+
+
+def _datos(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        testigos = [row[0] for row in conn.execute("""
+            SELECT id FROM testigos_electorales
+            WHERE coordinador_id = ? AND estado = 'disponible' ORDER BY id
+        """, (COORDINADOR,))]
+        mesas = [row[0] for row in conn.execute("SELECT id FROM mesas_votacion ORDER BY id LIMIT 10")]
+    finally:
+        conn.close()
+    return testigos, mesas
+
+
+def _asignaciones(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return {row[0]: row[1:] for row in conn.execute(
+            "SELECT id, testigo_id, mesa_id, proceso_electoral_id FROM asignaciones_testigos")}
+    finally:
+        conn.close()
+
+
+def test_ids_retornados_corresponden_a_las_filas(servicio, db_path):
+    """Los assignment_id vienen de la inserción (lote y fila por fila) y existen en la base"""
+    testigos, mesas = _datos(db_path)
+    lote = [{'testigo_id': t, 'mesa_id': m, 'proceso_electoral_id': PROCESO}
+            for t, m in zip(testigos[:2], mesas)]
+    # Una mesa inexistente obliga al camino fila por fila
+    lote.append({'testigo_id': testigos[2], 'mesa_id': 999999, 'proceso_electoral_id': PROCESO})
+    lote.append({'testigo_id': testigos[3], 'mesa_id': mesas[3], 'proceso_electoral_id': PROCESO})
+
+    resultado = servicio.bulk_assign_witnesses(lote, COORDINADOR)
+
+    assert resultado['applied']
+    assert len(resultado['results']) == 3 and len(resultado['errors']) == 1
+    filas = _asignaciones(db_path)
+    for creada in resultado['results']:
+        assert filas[creada['assignment_id']] == (creada['testigo_id'], creada['mesa_id'], PROCESO)
+
+
+def test_all_or_nothing_no_deja_filas(servicio, db_path):
+    """Con all_or_nothing un error de inserción cancela todo el lote"""
+    testigos, mesas = _datos(db_path)
+    antes = _asignaciones(db_path)
+    lote = [{'testigo_id': testigos[0], 'mesa_id': mesas[0], 'proceso_electoral_id': PROCESO},
+            {'testigo_id': testigos[1], 'mesa_id': 999999, 'proceso_electoral_id': PROCESO}]
+
+    resultado = servicio.bulk_assign_witnesses(lote, COORDINADOR, all_or_nothing=True)
+
+    assert not resultado['applied']
+    assert _asignaciones(db_path) == antes
+
+
+def test_fallo_posterior_a_las_inserciones_revierte_todo(servicio, db_path):
+    """Si falla la actualización de testigos, las asignaciones no quedan confirmadas"""
+    testigos, mesas = _datos(db_path)
+    antes = _asignaciones(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        CREATE TRIGGER falla_estado BEFORE UPDATE OF estado ON testigos_electorales
+        BEGIN SELECT RAISE(ABORT, 'fallo simulado'); END
+    """)
+    conn.commit()
+    conn.close()
+
+    with pytest.raises(sqlite3.DatabaseError):
+        servicio.bulk_assign_witnesses(
+            [{'testigo_id': testigos[0], 'mesa_id': mesas[0], 'proceso_electoral_id': PROCESO}],
+            COORDINADOR, all_or_nothing=True)
+
+    assert _asignaciones(db_path) == antes
+
+
+def test_lotes_concurrentes_no_duplican_testigo(db_path):
+    """Dos lotes simultáneos no pueden asignar el mismo testigo a mesas distintas del proceso"""
+    testigos, mesas = _datos(db_path)
+    resultados = []
+    barrera = threading.Barrier(2)
+
+    def asignar(mesa_id):
+        servicio = CoordinationService(db_path, connection_pool=SQLiteConnectionPool(db_path))
+        barrera.wait()
+        resultados.append(servicio.bulk_assign_witnesses(
+            [{'testigo_id': testigos[0], 'mesa_id': mesa_id, 'proceso_electoral_id': PROCESO}],
+            COORDINADOR))
+
+    hilos = [threading.Thread(target=asignar, args=(mesa,)) for mesa in mesas[:2]]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert sorted(len(r['results']) for r in resultados) == [0, 1]
+    vigentes = [fila for fila in _asignaciones(db_path).values()
+                if fila[0] == testigos[0] and fila[2] == PROCESO]
+    assert len(vigentes) == 1
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Pruebas del pool de conexiones SQLite compartido (core/database.py)
+"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from core.database import SQLiteConnectionPool, get_connection_pool
+
+ESQUEMA = "CREATE TABLE IF NOT EXISTS registros (id INTEGER PRIMARY KEY, valor TEXT NOT NULL)"
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = SQLiteConnectionPool(str(tmp_path / 'pool.db'))
+    conn = pool.connect()
+    conn.execute(ESQUEMA)
+    conn.commit()
+    conn.close()
+    yield pool
+    pool.close_all()
+
+
+def _valores(pool):
+    conn = sqlite3.connect(pool.db_path)
+    try:
+        return [row[0] for row in conn.execute("SELECT valor FROM registros ORDER BY id")]
+    finally:
+        conn.close()
+
+
+def test_close_descarta_la_transaccion_abierta(pool):
+    """Una escritura sin commit no se filtra al siguiente uso de la conexión reutilizada"""
+    conn = pool.connect()
+    conn.execute("INSERT INTO registros (valor) VALUES ('sin commit')")
+    conn.close()
+
+    reutilizada = pool.connect()
+    assert reutilizada is conn and not reutilizada.in_transaction
+    reutilizada.execute("INSERT INTO registros (valor) VALUES ('confirmado')")
+    reutilizada.commit()
+    reutilizada.close()
+
+    assert _valores(pool) == ['confirmado']
+
+
+def test_transaction_hace_commit_o_rollback(pool):
+    with pool.transaction() as conn:
+        conn.execute("INSERT INTO registros (valor) VALUES ('ok')")
+
+    with pytest.raises(RuntimeError):
+        with pool.transaction() as conn:
+            conn.execute("INSERT INTO registros (valor) VALUES ('revertido')")
+            raise RuntimeError('fallo')
+
+    assert _valores(pool) == ['ok']
+
+
+def test_conexiones_por_hilo_y_anidadas(pool):
+    """Las conexiones anidadas son distintas y un hilo nunca recibe la conexión de otro"""
+    externa = pool.connect()
+    anidada = pool.connect()
+    assert externa is not anidada
+    anidada.close()
+    externa.close()
+
+    recibidas = []
+    hilo = threading.Thread(target=lambda: recibidas.append(pool.connect()))
+    hilo.start()
+    hilo.join()
+    assert recibidas[0] not in (externa, anidada)
+
+
+def test_row_factory_y_foreign_keys_por_solicitud(pool):
+    conn = pool.connect(row_factory=sqlite3.Row, foreign_keys=True)
+    assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+    conn.close()
+
+    conn = pool.connect()
+    assert conn.row_factory is None
+    assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 0
+    conn.close()
+
+
+def test_pool_compartido_por_ruta(tmp_path):
+    ruta = tmp_path / 'compartido.db'
+    assert get_connection_pool(str(ruta)) is get_connection_pool(str(tmp_path / '.' / 'compartido.db'))
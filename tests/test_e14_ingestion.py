@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la cola de ingesta E14 (services/e14_ingestion_service.py)
+"""
+
+import json
+import os
+import sqlite3
+
+import pytest
+
+from core.database import SQLiteConnectionPool
+from services.e14_ingestion_service import (
+    E14IngestionQueue, E14ValidationError, TIPO_ENVIO_TESTIGO, ESTADO_CONFIRMADO
+)
+
+
+@pytest.fixture
+def cola(db_path, tmp_path):
+    cola = E14IngestionQueue(db_path, connection_pool=SQLiteConnectionPool(db_path),
+                             journal_path=str(tmp_path / 'e14.journal'), fsync=False)
+    yield cola
+    cola.shutdown()
+
+
+def _mesa_y_candidato(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        mesa_id = conn.execute("SELECT id FROM mesas_votacion ORDER BY id LIMIT 1").fetchone()[0]
+        candidato_id = conn.execute("SELECT id FROM candidatos ORDER BY id LIMIT 1").fetchone()[0]
+        testigo_id = conn.execute("SELECT id FROM users ORDER BY id LIMIT 1").fetchone()[0]
+    finally:
+        conn.close()
+    return mesa_id, candidato_id, testigo_id
+
+
+def _envio(mesa_id, testigo_id, candidato_id):
+    return {
+        'mesa_id': mesa_id,
+        'testigo_id': testigo_id,
+        'candidatos': [
+            {'candidato_id': candidato_id, 'nombre': 'Candidato A', 'partido': 'P1', 'votos': 120},
+            {'nombre': 'Candidato sin registro', 'partido': 'P2', 'votos': 30}
+        ],
+        'votosBlanco': 4,
+        'votosNulos': 2,
+        'tarjetasNoMarcadas': 1,
+        'observaciones': 'Prueba'
+    }
+
+
+def test_envio_testigo_se_escribe_en_el_esquema_real(cola, db_path):
+    """Un envío del testigo queda en capturas_e14 y datos_ocr_e14 con sus columnas reales"""
+    mesa_id, candidato_id, testigo_id = _mesa_y_candidato(db_path)
+
+    acuse = cola.submit(TIPO_ENVIO_TESTIGO, _envio(mesa_id, testigo_id, candidato_id))
+    assert acuse['total_votos'] == 156
+    assert cola.wait_idle(10)
+
+    estado = cola.get_status(acuse['ack_id'])
+    assert estado['estado'] == ESTADO_CONFIRMADO, estado
+
+    conn = sqlite3.connect(db_path)
+    try:
+        captura = conn.execute("""
+            SELECT mesa_id, testigo_id, ruta_foto, datos_json, total_votos, estado
+            FROM capturas_e14 WHERE id = ?
+        """, (estado['registro_id'],)).fetchone()
+        votos = conn.execute("""
+            SELECT posicion, candidato_id, votos_confirmados FROM datos_ocr_e14
+            WHERE captura_e14_id = ? ORDER BY posicion
+        """, (estado['registro_id'],)).fetchall()
+    finally:
+        conn.close()
+
+    assert captura[:2] == (mesa_id, testigo_id)
+    assert captura[2]
+    datos = json.loads(captura[3])
+    assert datos['votos_blanco'] == 4 and datos['tarjetas_no_marcadas'] == 1
+    assert captura[4] == 156 and captura[5] == 'enviado'
+    assert votos[0] == (1, candidato_id, 120)
+    assert votos[1][0] == 2 and votos[1][2] == 30
+
+
+def test_envio_por_nombre_alimenta_agregados_y_ranking(cola, db_path):
+    """Un candidato digitado solo por nombre se resuelve a candidatos.id y suma en el ranking"""
+    from modules.dashboard.services.dashboard_service import DashboardService
+    from services.vote_aggregation_service import NIVEL_DEPARTAMENTO
+
+    mesa_id, _, testigo_id = _mesa_y_candidato(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        candidato_id, nombre = conn.execute("""
+            SELECT id, nombre_completo FROM candidatos WHERE activo = 1
+            GROUP BY nombre_completo HAVING COUNT(*) = 1 ORDER BY id LIMIT 1
+        """).fetchone()
+    finally:
+        conn.close()
+
+    envio = _envio(mesa_id, testigo_id, None)
+    envio['candidatos'] = [{'nombre': f"  {nombre.upper()} ", 'votos': 77}]
+    acuse = cola.submit(TIPO_ENVIO_TESTIGO, envio)
+    assert cola.wait_idle(10)
+    assert cola.get_status(acuse['ack_id'])['estado'] == ESTADO_CONFIRMADO
+
+    conn = sqlite3.connect(db_path)
+    try:
+        votos = conn.execute("""
+            SELECT votos FROM votos_candidato_agregados
+            WHERE nivel = ? AND ambito_id = 0 AND candidato_id = ?
+        """, (NIVEL_DEPARTAMENTO, candidato_id)).fetchone()
+    finally:
+        conn.close()
+    assert votos == (77,)
+
+    ranking = DashboardService(db_path, cola.connection_pool).get_candidate_ranking_widget(limit=10)
+    assert {'nombre': nombre, 'total_votos': 77}.items() <= ranking['candidates'][0].items()
+
+
+def test_envio_con_mesa_inexistente_falla_en_la_peticion(cola, db_path):
+    """Referencias inválidas se rechazan al recibir, no en el hilo escritor"""
+    _, candidato_id, testigo_id = _mesa_y_candidato(db_path)
+
+    with pytest.raises(E14ValidationError) as error:
+        cola.submit(TIPO_ENVIO_TESTIGO, _envio(999999, testigo_id, candidato_id))
+    assert error.value.codigo_error == 'E14_MESA_INVALIDA'
+
+    with pytest.raises(E14ValidationError):
+        cola.submit(TIPO_ENVIO_TESTIGO, dict(_envio(1, testigo_id, candidato_id), mesa_id=None))
+    assert cola.stats['recibidos'] == 0
+
+
+def test_journal_por_proceso_y_reproduccion_de_huerfanos(db_path, tmp_path):
+    """Cada proceso usa su journal; los journals huérfanos se reproducen y eliminan al iniciar"""
+    mesa_id, candidato_id, testigo_id = _mesa_y_candidato(db_path)
+    base = str(tmp_path / 'e14.journal')
+
+    # Journal de un proceso terminado con una captura sin confirmar
+    cola = E14IngestionQueue(db_path, connection_pool=SQLiteConnectionPool(db_path),
+                             journal_path=base, fsync=False)
+    registro = cola._validate(TIPO_ENVIO_TESTIGO, _envio(mesa_id, testigo_id, candidato_id))
+    huerfano = f"{base}.999999999"
+    with open(huerfano, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'ack_id': 'huerfano-1', 'tipo': TIPO_ENVIO_TESTIGO,
+                            'payload': registro, 'recibido_en': '2026-01-01T00:00:00'}) + '\n')
+
+    assert cola.journal_path == f"{base}.{os.getpid()}"
+    cola.start()
+    try:
+        assert cola.wait_idle(10)
+        assert not os.path.exists(huerfano)
+        assert cola.get_status('huerfano-1')['estado'] == ESTADO_CONFIRMADO
+    finally:
+        cola.shutdown()
+    # Apagado limpio: no quedan journals
+    assert not [n for n in os.listdir(tmp_path) if n.startswith('e14.journal')]
+
+
+def test_journal_bloqueado_no_se_reproduce(db_path, tmp_path):
+    """El journal de un proceso vivo (bloqueado) no se toca"""
+    base = str(tmp_path / 'e14.journal')
+    primera = E14IngestionQueue(db_path, connection_pool=SQLiteConnectionPool(db_path),
+                                journal_path=base, fsync=False)
+    primera.start()
+    try:
+        # Otro "proceso": mismo base, distinto pid simulado
+        segunda = E14IngestionQueue(db_path, connection_pool=SQLiteConnectionPool(db_path),
+                                    journal_path=base, fsync=False)
+        segunda.journal_path = f"{base}.1"
+        segunda.start()
+        segunda.shutdown()
+        assert os.path.exists(primera.journal_path)
+    finally:
+        primera.shutdown()
+
+
+def test_reenvio_del_testigo_reemplaza_el_anterior(cola, db_path):
+    """Un reintento del testigo no suma sus votos dos veces; un envío validado no se reemplaza"""
+    from services.vote_aggregation_service import NIVEL_MESA
+
+    mesa_id, candidato_id, testigo_id = _mesa_y_candidato(db_path)
+    primero = cola.submit(TIPO_ENVIO_TESTIGO, _envio(mesa_id, testigo_id, candidato_id))
+    segundo = cola.submit(TIPO_ENVIO_TESTIGO, _envio(mesa_id, testigo_id, candidato_id))
+    assert cola.wait_idle(10)
+    assert cola.get_status(segundo['ack_id'])['estado'] == ESTADO_CONFIRMADO
+
+    conn = sqlite3.connect(db_path)
+    try:
+        estados = [row[0] for row in conn.execute("""
+            SELECT estado FROM capturas_e14 WHERE mesa_id = ? AND testigo_id = ? ORDER BY id
+        """, (mesa_id, testigo_id))]
+        votos = conn.execute("""
+            SELECT votos FROM votos_candidato_agregados WHERE nivel = ? AND ambito_id = ? AND candidato_id = ?
+        """, (NIVEL_MESA, mesa_id, candidato_id)).fetchone()
+        conn.execute("UPDATE capturas_e14 SET estado = 'validado' WHERE id = ?",
+                     (cola.get_status(segundo['ack_id'])['registro_id'],))
+        conn.commit()
+    finally:
+        conn.close()
+    assert estados[-2:] == ['reemplazado', 'enviado']
+    assert votos == (120,)
+    assert cola.get_status(primero['ack_id'])['estado'] == ESTADO_CONFIRMADO
+
+    with pytest.raises(E14ValidationError) as error:
+        cola.submit(TIPO_ENVIO_TESTIGO, _envio(mesa_id, testigo_id, candidato_id))
+    assert error.value.codigo_error == 'E14_DUPLICADO'
+
+
+def test_enviar_e14_responde_con_la_captura_escrita(cola, db_path, monkeypatch):
+    """El endpoint espera el lote y conserva la respuesta de la escritura directa (201 con captura_id)"""
+    from flask import Flask
+    import api.testigo_api as testigo_api_module
+
+    mesa_id, candidato_id, testigo_id = _mesa_y_candidato(db_path)
+    monkeypatch.setattr(testigo_api_module, 'get_e14_ingestion_queue', lambda: cola)
+    app = Flask(__name__)
+    app.register_blueprint(testigo_api_module.testigo_api)
+
+    respuesta = app.test_client().post('/api/testigo/enviar-e14', json=_envio(mesa_id, testigo_id, candidato_id))
+
+    assert respuesta.status_code == 201
+    datos = respuesta.get_json()
+    assert datos['total_votos'] == 156
+    assert cola.get_status(datos['ack_id'])['registro_id'] == datos['captura_id']
+
+    cola.confirm_wait = 0
+    respuesta = app.test_client().post('/api/testigo/enviar-e14', json=_envio(mesa_id, testigo_id, candidato_id))
+    assert respuesta.status_code in (201, 202)
+    assert cola.wait_for(respuesta.get_json()['ack_id'], 10)['estado'] == ESTADO_CONFIRMADO
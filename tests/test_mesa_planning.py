@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la redistribución de mesas (MesaPlanningService)
+"""
+
+import sqlite3
+
+import pytest
+
+from core.database import SQLiteConnectionPool
+from services.mesa_planning_service import ACCION_CONSERVAR, MesaPlanningService
+
+
+@pytest.fixture
+def puesto(db_path):
+    """Puesto de 500 votantes (dos mesas) con las mesas 002, 005 y 007; la 002 y la 007 tienen testigo"""
+    conn = sqlite3.connect(db_path)
+    try:
+        municipio_id = conn.execute("SELECT id FROM municipios ORDER BY id LIMIT 1").fetchone()[0]
+        testigo_id, coordinador_id = conn.execute(
+            "SELECT id, coordinador_id FROM testigos_electorales ORDER BY id LIMIT 1").fetchone()
+        proceso_id = conn.execute("SELECT id FROM procesos_electorales ORDER BY id LIMIT 1").fetchone()[0]
+        puesto_id = conn.execute("""
+            INSERT INTO puestos_votacion (nombre, direccion, municipio_id, capacidad_votantes, activo)
+            VALUES ('Puesto Prueba Mesas', 'Calle 1', ?, 500, 1)
+        """, (municipio_id,)).lastrowid
+        mesas = {}
+        for numero in ('002', '005', '007'):
+            mesas[numero] = conn.execute("""
+                INSERT INTO mesas_votacion (numero, puesto_id, municipio_id, votantes_habilitados,
+                                            total_votantes, activa)
+                VALUES (?, ?, ?, 100, 100, 1)
+            """, (numero, puesto_id, municipio_id)).lastrowid
+        for numero in ('002', '007'):
+            conn.execute("""
+                INSERT INTO asignaciones_testigos (testigo_id, mesa_id, coordinador_id, proceso_electoral_id)
+                VALUES (?, ?, ?, ?)
+            """, (testigo_id, mesas[numero], coordinador_id, proceso_id))
+        conn.commit()
+    finally:
+        conn.close()
+    return {'id': puesto_id, 'municipio_id': municipio_id, 'mesas': mesas}
+
+
+def _mesas(db_path, puesto_id):
+    conn = sqlite3.connect(db_path)
+    try:
+        return {row[0]: row[1:] for row in conn.execute(
+            "SELECT id, numero, activa, votantes_habilitados FROM mesas_votacion WHERE puesto_id = ?",
+            (puesto_id,))}
+    finally:
+        conn.close()
+
+
+def test_mesas_se_emparejan_por_numero_y_conservan_dependientes(db_path, puesto):
+    """La 002 no se renumera, la 005 se desactiva y la 007 (con testigo) se conserva y se reporta"""
+    servicio = MesaPlanningService(db_path, connection_pool=SQLiteConnectionPool(db_path))
+
+    resultado = servicio.redistribuir(municipio_id=puesto['municipio_id'])
+
+    mesas = _mesas(db_path, puesto['id'])
+    ids = puesto['mesas']
+    assert mesas[ids['002']] == ('002', 1, 250)
+    assert mesas[ids['005']][1] == 0
+    assert mesas[ids['007']] == ('007', 1, 100)
+    nuevas = [fila for mesa_id, fila in mesas.items() if mesa_id not in ids.values()]
+    assert nuevas == [('001', 1, 250)]
+
+    conservadas = [c['mesa_id'] for c in resultado['cambios'] if c['accion'] == ACCION_CONSERVAR]
+    assert ids['007'] in conservadas and ids['005'] not in conservadas
+    assert resultado['conservadas_con_dependencias'] >= 1
+
+
+def test_dry_run_no_modifica_mesas(db_path, puesto):
+    servicio = MesaPlanningService(db_path, connection_pool=SQLiteConnectionPool(db_path))
+    antes = _mesas(db_path, puesto['id'])
+
+    resultado = servicio.redistribuir(municipio_id=puesto['municipio_id'], dry_run=True)
+
+    assert resultado['dry_run']
+    assert _mesas(db_path, puesto['id']) == antes
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Pruebas de los agregados E-14 por municipio (services/municipal_coordination_service.py)
+"""
+
+import sqlite3
+
+import pytest
+
+from core.database import SQLiteConnectionPool
+from services.municipal_coordination_service import MunicipalCoordinationService
+
+
+@pytest.fixture
+def servicio(db_path):
+    return MunicipalCoordinationService(db_path, connection_pool=SQLiteConnectionPool(db_path))
+
+
+@pytest.fixture
+def ubicacion(db_path, servicio):
+    """Dos puestos en municipios distintos y una mesa del primero con un E-14 confirmado"""
+    conn = sqlite3.connect(db_path)
+    try:
+        municipio_a, municipio_b = [row[0] for row in conn.execute(
+            "SELECT id FROM municipios ORDER BY id LIMIT 2")]
+        testigo_id = conn.execute("SELECT id FROM users ORDER BY id LIMIT 1").fetchone()[0]
+        puesto_a = conn.execute("""
+            INSERT INTO puestos_votacion (nombre, direccion, municipio_id) VALUES ('Puesto A', 'Calle A', ?)
+        """, (municipio_a,)).lastrowid
+        puesto_b = conn.execute("""
+            INSERT INTO puestos_votacion (nombre, direccion, municipio_id) VALUES ('Puesto B', 'Calle B', ?)
+        """, (municipio_b,)).lastrowid
+        mesa_id = conn.execute("""
+            INSERT INTO mesas_votacion (numero, puesto_id, municipio_id) VALUES ('001', ?, ?)
+        """, (puesto_a, municipio_a)).lastrowid
+        conn.execute("""
+            INSERT INTO e14_capturas (mesa_id, testigo_id, imagen_e14, votos_validos, votos_blanco,
+                                      votos_nulos, confirmado)
+            VALUES (?, ?, 'prueba.jpg', 120, 4, 2, 1)
+        """, (mesa_id, testigo_id))
+        conn.commit()
+    finally:
+        conn.close()
+    return {'municipio_a': municipio_a, 'municipio_b': municipio_b,
+            'puesto_a': puesto_a, 'puesto_b': puesto_b, 'mesa_id': mesa_id}
+
+
+def _actualizar(db_path, sentencia, params):
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute(sentencia, params)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _validos(db_path, municipio_id):
+    conn = sqlite3.connect(db_path)
+    try:
+        row = conn.execute("SELECT total_votos_validos FROM agregados_e14_municipio WHERE municipio_id = ?",
+                           (municipio_id,)).fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else 0
+
+
+def test_mover_mesa_de_puesto_traslada_el_e14(db_path, servicio, ubicacion):
+    antes_a = _validos(db_path, ubicacion['municipio_a'])
+    antes_b = _validos(db_path, ubicacion['municipio_b'])
+
+    _actualizar(db_path, "UPDATE mesas_votacion SET puesto_id = ? WHERE id = ?",
+                (ubicacion['puesto_b'], ubicacion['mesa_id']))
+
+    assert _validos(db_path, ubicacion['municipio_a']) == antes_a - 120
+    assert _validos(db_path, ubicacion['municipio_b']) == antes_b + 120
+    verificacion = servicio.rebuild_e14_aggregates(verify_only=True)
+    assert verificacion['consistente'], verificacion['diferencias']
+
+
+def test_mover_puesto_de_municipio_traslada_sus_mesas(db_path, servicio, ubicacion):
+    _actualizar(db_path, "UPDATE puestos_votacion SET municipio_id = ? WHERE id = ?",
+                (ubicacion['municipio_b'], ubicacion['puesto_a']))
+
+    verificacion = servicio.rebuild_e14_aggregates(verify_only=True)
+    assert verificacion['consistente'], verificacion['diferencias']
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Pruebas de los endpoints OCR del testigo (api/testigo_api.py)
+"""
+
+import io
+import time
+
+import pytest
+from flask import Flask
+
+import api.testigo_api as testigo_api_module
+from core.database import SQLiteConnectionPool
+from services.ocr_worker_pool import ESTADO_COMPLETADO, ESTADOS_FINALES, OCRWorkerPool
+
+RESULTADO = {'candidatos': [], 'votos_especiales': {}, 'totales': {'total': 0}}
+
+
+def procesar_simulado(imagen_path, tipo_eleccion, timeout):
+    """Reemplazo de Tesseract/OpenCV en el proceso worker"""
+    return dict(RESULTADO, tipo_eleccion=tipo_eleccion)
+
+
+@pytest.fixture
+def cliente(db_path, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr('services.ocr_worker_pool._procesar_en_worker', procesar_simulado)
+    pool = OCRWorkerPool(workers=1, db_path=db_path, connection_pool=SQLiteConnectionPool(db_path))
+    monkeypatch.setattr(testigo_api_module, 'get_ocr_worker_pool', lambda: pool)
+    app = Flask(__name__)
+    app.register_blueprint(testigo_api_module.testigo_api)
+    yield app.test_client()
+    pool.shutdown()
+
+
+def test_trabajo_ocr_se_consulta_en_la_url_devuelta(cliente):
+    respuesta = cliente.post('/api/testigo/procesar-ocr', content_type='multipart/form-data', data={
+        'imagen': (io.BytesIO(b'imagen'), 'e14.jpg'),
+        'tipo_eleccion': 'camara'
+    })
+    assert respuesta.status_code == 202
+    datos = respuesta.get_json()
+    assert datos['consultar_en'] == f"/api/testigo/ocr/{datos['job_id']}"
+
+    limite = time.monotonic() + 30
+    while True:
+        consulta = cliente.get(datos['consultar_en'])
+        assert consulta.status_code == 200
+        job = consulta.get_json()['job']
+        if job['estado'] in ESTADOS_FINALES or time.monotonic() > limite:
+            break
+        time.sleep(0.05)
+
+    assert job['job_id'] == datos['job_id']
+    assert job['estado'] == ESTADO_COMPLETADO, job
+    assert job['resultado']['tipo_eleccion'] == 'camara'
+
+    stream = cliente.get(f"{datos['consultar_en']}/stream")
+    assert stream.status_code == 200
+    assert f'event: {ESTADO_COMPLETADO}' in stream.get_data(as_text=True)
+
+
+def test_trabajo_inexistente_responde_404(cliente):
+    assert cliente.get('/api/testigo/ocr/no-existe').status_code == 404
+    assert cliente.get('/api/testigo/ocr/no-existe/stream').status_code == 404
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la caché de roles de PermissionManager y su invalidación
+"""
+
+import sqlite3
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+import core.permissions as permissions
+from core.database import SQLiteConnectionPool
+from core.permissions import PermissionManager
+from modules.users.models import PasswordChangeData
+from modules.users.services.user_service import UserService
+
+
+class BaseDatosPrueba:
+    """Interfaz mínima de DatabaseManager sobre el pool SQLite"""
+
+    def __init__(self, db_path):
+        self.connection_pool = SQLiteConnectionPool(db_path)
+        self.consultas = 0
+
+    def execute_query(self, query, params=None):
+        self.consultas += 1
+        conn = self.connection_pool.connect()
+        try:
+            return conn.execute(query, params or {}).fetchall()
+        finally:
+            conn.close()
+
+
+@pytest.fixture(autouse=True)
+def cache_limpia():
+    permissions.invalidate_user_permissions()
+    permissions._versiones_vistas.clear()
+    yield
+    permissions.invalidate_user_permissions()
+    permissions._versiones_vistas.clear()
+
+
+def _usuario_activo(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT id, rol FROM users WHERE activo = 1 ORDER BY id LIMIT 1").fetchone()
+    finally:
+        conn.close()
+
+
+def test_rol_en_cache_sin_consultas(db_path):
+    db = BaseDatosPrueba(db_path)
+    manager = PermissionManager(db)
+    user_id, rol = _usuario_activo(db_path)
+
+    assert manager.get_user_role(user_id) == rol
+    assert manager.get_user_role(user_id) == rol
+    assert db.consultas == 1
+
+
+def test_cambio_de_rol_en_otro_proceso_invalida_la_cache(db_path, monkeypatch):
+    """El trigger de users publica la versión y el proceso descarta su entrada"""
+    monkeypatch.setattr(permissions, 'PERMISSIONS_VERSION_CHECK', 0)
+    db = BaseDatosPrueba(db_path)
+    # Lo que hace la app al iniciar
+    permissions.ensure_permissions_version_schema(db.connection_pool)
+    manager = PermissionManager(db)
+    user_id, rol = _usuario_activo(db_path)
+    assert manager.get_user_role(user_id) == rol
+
+    # Escritura directa, sin pasar por invalidate_user_permissions
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE users SET activo = 0 WHERE id = ?", (user_id,))
+    conn.commit()
+    conn.close()
+
+    assert manager.get_user_role(user_id) is None
+
+
+def test_servicio_de_usuarios_invalida_al_actualizar(db_path, monkeypatch):
+    invalidados = []
+    monkeypatch.setattr('modules.users.services.user_service.invalidate_user_permissions',
+                        invalidados.append)
+    user_id, _ = _usuario_activo(db_path)
+
+    # UserService usa el esquema de electoral_system_prod.db (fecha_actualizacion)
+    conn = sqlite3.connect(db_path)
+    conn.execute("ALTER TABLE users ADD COLUMN fecha_actualizacion TIMESTAMP")
+    conn.execute("UPDATE users SET password_hash = ? WHERE id = ?",
+                 (generate_password_hash('clave-actual'), user_id))
+    conn.commit()
+    conn.close()
+    servicio = UserService(db_path, connection_pool=SQLiteConnectionPool(db_path))
+
+    assert servicio.update_user_profile(user_id, {'telefono': '3000000000'})['success']
+    assert invalidados == [user_id]
+
+    resultado = servicio.change_password(PasswordChangeData(
+        user_id=user_id, current_password='clave-actual',
+        new_password='clave-nueva', confirm_password='clave-nueva'))
+    assert resultado['success'], resultado
+    assert invalidados == [user_id, user_id]
+
+
+def test_constructor_no_crea_esquema_ni_archivo(tmp_path):
+    """Construir el gestor (p. ej. desde WidgetService al importar) no toca la base de datos"""
+    db_path = tmp_path / 'no_creada.db'
+    manager = PermissionManager(BaseDatosPrueba(str(db_path)))
+    assert not db_path.exists()
+    # Sin permisos_version solo cuenta la invalidación local
+    permissions.sync_permissions_versions(manager._connection_pool)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Pruebas de los agregados de votos por candidato (services/vote_aggregation_service.py)
+"""
+
+import sqlite3
+
+import pytest
+
+from core.database import SQLiteConnectionPool
+from services.vote_aggregation_service import (
+    NIVEL_MUNICIPIO, NIVEL_PUESTO, NIVEL_ZONA, VoteAggregationService
+)
+
+VOTOS = 37
+
+
+@pytest.fixture
+def servicio(db_path):
+    servicio = VoteAggregationService(db_path, connection_pool=SQLiteConnectionPool(db_path))
+    servicio.ensure_schema()
+    return servicio
+
+
+@pytest.fixture
+def ubicacion(db_path, servicio):
+    """Dos puestos en municipios distintos y una mesa del primero con una captura confirmada"""
+    conn = sqlite3.connect(db_path)
+    try:
+        municipio_a, municipio_b = [row[0] for row in conn.execute(
+            "SELECT id FROM municipios ORDER BY id LIMIT 2")]
+        zona_b = conn.execute("SELECT id FROM zonas ORDER BY id LIMIT 1").fetchone()[0]
+        candidato_id = conn.execute("SELECT id FROM candidatos ORDER BY id LIMIT 1").fetchone()[0]
+        testigo_id = conn.execute("SELECT id FROM users ORDER BY id LIMIT 1").fetchone()[0]
+        puesto_a = conn.execute("""
+            INSERT INTO puestos_votacion (nombre, direccion, municipio_id) VALUES ('Puesto A', 'Calle A', ?)
+        """, (municipio_a,)).lastrowid
+        puesto_b = conn.execute("""
+            INSERT INTO puestos_votacion (nombre, direccion, municipio_id, zona_id)
+            VALUES ('Puesto B', 'Calle B', ?, ?)
+        """, (municipio_b, zona_b)).lastrowid
+        mesa_id = conn.execute("""
+            INSERT INTO mesas_votacion (numero, puesto_id, municipio_id) VALUES ('001', ?, ?)
+        """, (puesto_a, municipio_a)).lastrowid
+        captura_id = conn.execute("""
+            INSERT INTO capturas_e14 (mesa_id, testigo_id, ruta_foto, datos_json, estado)
+            VALUES (?, ?, 'prueba.jpg', '{}', 'confirmado')
+        """, (mesa_id, testigo_id)).lastrowid
+        conn.execute("""
+            INSERT INTO datos_ocr_e14 (captura_e14_id, candidato_id, votos_confirmados) VALUES (?, ?, ?)
+        """, (captura_id, candidato_id, VOTOS))
+        conn.commit()
+    finally:
+        conn.close()
+    return {'municipio_a': municipio_a, 'municipio_b': municipio_b, 'zona_b': zona_b,
+            'puesto_a': puesto_a, 'puesto_b': puesto_b, 'mesa_id': mesa_id, 'candidato_id': candidato_id}
+
+
+def _actualizar(db_path, sentencia, params):
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute(sentencia, params)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def test_mover_mesa_de_puesto_mueve_sus_votos(db_path, servicio, ubicacion):
+    """La mesa pasa a un puesto de otro municipio y zona; los agregados siguen al recálculo"""
+    candidato = [ubicacion['candidato_id']]
+    antes_a = servicio.get_votes_by_candidate(candidato, NIVEL_MUNICIPIO, ubicacion['municipio_a'])
+    antes_b = servicio.get_votes_by_candidate(candidato, NIVEL_MUNICIPIO, ubicacion['municipio_b'])
+
+    _actualizar(db_path, "UPDATE mesas_votacion SET puesto_id = ? WHERE id = ?",
+                (ubicacion['puesto_b'], ubicacion['mesa_id']))
+
+    assert servicio.get_votes_by_candidate(candidato, NIVEL_PUESTO, ubicacion['puesto_a']).get(
+        ubicacion['candidato_id'], 0) == 0
+    assert servicio.get_votes_by_candidate(candidato, NIVEL_PUESTO, ubicacion['puesto_b']) == {
+        ubicacion['candidato_id']: VOTOS}
+    assert servicio.get_votes_by_candidate(candidato, NIVEL_MUNICIPIO, ubicacion['municipio_a']).get(
+        ubicacion['candidato_id'], 0) == antes_a.get(ubicacion['candidato_id'], 0) - VOTOS
+    assert servicio.get_votes_by_candidate(candidato, NIVEL_MUNICIPIO, ubicacion['municipio_b']).get(
+        ubicacion['candidato_id'], 0) == antes_b.get(ubicacion['candidato_id'], 0) + VOTOS
+    assert servicio.rebuild(verify_only=True)['consistente']
+
+
+def test_mover_puesto_de_municipio_y_zona_mueve_sus_votos(db_path, servicio, ubicacion):
+    """El puesto con la mesa sale de su zona y cambia de municipio"""
+    candidato = [ubicacion['candidato_id']]
+    _actualizar(db_path, "UPDATE mesas_votacion SET puesto_id = ? WHERE id = ?",
+                (ubicacion['puesto_b'], ubicacion['mesa_id']))
+    zona_antes = servicio.get_votes_by_candidate(candidato, NIVEL_ZONA, ubicacion['zona_b'])
+
+    _actualizar(db_path, "UPDATE puestos_votacion SET municipio_id = ?, zona_id = NULL WHERE id = ?",
+                (ubicacion['municipio_a'], ubicacion['puesto_b']))
+
+    assert servicio.get_votes_by_candidate(candidato, NIVEL_ZONA, ubicacion['zona_b']).get(
+        ubicacion['candidato_id'], 0) == zona_antes[ubicacion['candidato_id']] - VOTOS
+    verificacion = servicio.rebuild(verify_only=True)
+    assert verificacion['consistente'], verificacion['diferencias'][:5]
+
+
+def test_votos_por_cedula_usan_el_id_de_candidatos(db_path, servicio, ubicacion):
+    """Los reportes sobre otros catálogos de candidatos se cruzan con los agregados por cédula"""
+    conn = sqlite3.connect(db_path)
+    try:
+        cedula = conn.execute("SELECT cedula FROM candidatos WHERE id = ?",
+                              (ubicacion['candidato_id'],)).fetchone()[0]
+    finally:
+        conn.close()
+
+    assert servicio.get_votes_by_cedula([cedula, 'sin-candidato'], NIVEL_PUESTO, ubicacion['puesto_a']) == {
+        cedula: VOTOS}
+    assert servicio.get_votes_by_cedula([]) == {}
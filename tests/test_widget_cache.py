@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la caché compartida de widgets (modules/dashboard/services/widget_service.py)
+"""
+
+from core.database import SQLiteConnectionPool
+from modules.dashboard.services.widget_service import WidgetService, invalidate_widget_cache
+
+
+def test_resultado_con_error_no_se_guarda_en_cache(db_path, monkeypatch):
+    """Un fallo transitorio de DashboardService no deja el widget en blanco durante el TTL"""
+    servicio = WidgetService(db_path, connection_pool=SQLiteConnectionPool(db_path))
+    respuestas = [{'error': 'database is locked'}, {'total': 1}, {'total': 2}]
+    monkeypatch.setattr(servicio, '_compute_widget', lambda widget_type, params: respuestas.pop(0))
+    invalidate_widget_cache('real_time_stats')
+
+    assert servicio.get_widget('real_time_stats') == {'error': 'database is locked'}
+    assert servicio.get_widget('real_time_stats') == {'total': 1}
+    assert servicio.get_widget('real_time_stats') == {'total': 1}
+    invalidate_widget_cache('real_time_stats')